@@ -0,0 +1,37 @@
+"""0026_create_stats_rollups
+
+Revision ID: 0026_stats_rollups
+Revises: 0025_studio_collections
+Create Date: 2026-10-19
+
+Hourly rollup table for the admin dashboard (plays, sessions, new users, orders).
+Populate history with: python scripts/refresh_rollups.py --backfill
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0026_stats_rollups'
+down_revision = '0025_studio_collections'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'stats_rollups',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('metric', sa.String(50), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('dimension', sa.String(50), nullable=False, server_default=''),
+        sa.Column('count', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('total', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.UniqueConstraint('metric', 'bucket_start', 'dimension', name='uq_stats_rollups_bucket'),
+    )
+    op.create_index('ix_stats_rollups_metric_bucket_start', 'stats_rollups', ['metric', 'bucket_start'])
+
+
+def downgrade():
+    op.drop_index('ix_stats_rollups_metric_bucket_start', table_name='stats_rollups')
+    op.drop_table('stats_rollups')
@@ -0,0 +1,69 @@
+"""0027_analytics_heatmap_index_and_daily_paths
+
+Revision ID: 0027_analytics_daily_paths
+Revises: 0026_stats_rollups
+Create Date: 2026-10-19
+
+Composite (event_type, created_at, path) index for windowed heatmap queries and
+a per-day path count table materialized from analytics_events.
+Populate history with: python scripts/refresh_rollups.py --backfill --metric paths
+
+If analytics_events is missing (it used to be created outside Alembic) this
+revision creates it. downgrade() leaves that table and its indexes in place
+on purpose: most databases had it before this revision, and nothing records
+which one created it, so dropping it could destroy existing analytics. A
+later upgrade finds the table and only re-adds this revision's index.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0027_analytics_daily_paths'
+down_revision = '0026_stats_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # analytics_events was historically created outside Alembic
+    # (scripts/create_analytics_table.py); create it here if it is missing.
+    if not inspector.has_table('analytics_events'):
+        op.create_table(
+            'analytics_events',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='SET NULL'), nullable=True, index=True),
+            sa.Column('event_type', sa.String(50), nullable=False, index=True),
+            sa.Column('path', sa.String(255), nullable=True, index=True),
+            sa.Column('metadata_json', sa.JSON(), nullable=True),
+            sa.Column('ip_address', sa.String(45), nullable=True),
+            sa.Column('session_id', sa.String(100), nullable=True, index=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False, index=True),
+        )
+        op.create_index('ix_analytics_events_type_created_at', 'analytics_events', ['event_type', 'created_at'])
+
+    op.create_index(
+        'ix_analytics_events_type_created_at_path',
+        'analytics_events',
+        ['event_type', 'created_at', 'path'],
+    )
+
+    op.create_table(
+        'analytics_daily_paths',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('event_type', sa.String(50), nullable=False),
+        sa.Column('path', sa.String(255), nullable=False, server_default=''),
+        sa.Column('count', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.UniqueConstraint('day', 'event_type', 'path', name='uq_analytics_daily_paths_day_type_path'),
+    )
+    op.create_index('ix_analytics_daily_paths_type_day', 'analytics_daily_paths', ['event_type', 'day'])
+
+
+def downgrade():
+    op.drop_index('ix_analytics_daily_paths_type_day', table_name='analytics_daily_paths')
+    op.drop_table('analytics_daily_paths')
+    # analytics_events itself stays, even if upgrade() created it (see the module docstring)
+    op.drop_index('ix_analytics_events_type_created_at_path', table_name='analytics_events')
@@ -0,0 +1,174 @@
+"""0028_partition_event_tables
+
+Revision ID: 0028_partition_event_tables
+Revises: 0027_analytics_daily_paths
+Create Date: 2026-10-19
+
+Adds retention_watermarks and, on PostgreSQL, converts analytics_events,
+play_history and listening_sessions into tables range-partitioned by month on
+their time column (primary key becomes (id, <time column>)). Existing rows are
+copied into monthly partitions; a DEFAULT partition catches anything outside
+the created ranges. scripts/event_retention.py keeps creating partitions
+ahead and drops expired ones. SQLite keeps plain tables (archive-and-delete).
+
+PostgreSQL requires a unique index on a partitioned table to include the
+partition column. Any UNIQUE index on these tables is therefore recreated
+with that column appended, so it only guarantees uniqueness per timestamp.
+Each widened index is logged as a warning by name. A partial or expression
+unique index can't be widened this way, so the upgrade stops naming it
+rather than dropping it silently.
+
+The copy rewrites each table once; run it in a maintenance window on large
+databases.
+"""
+import logging
+import re
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0028_partition_event_tables'
+down_revision = '0027_analytics_daily_paths'
+branch_labels = None
+depends_on = None
+
+
+# table -> (partition column, timezone-aware)
+PARTITIONED_TABLES = {
+    'analytics_events': ('created_at', False),
+    'play_history': ('played_at', False),
+    'listening_sessions': ('started_at', True),
+}
+MONTHS_AHEAD = 2
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+# CREATE UNIQUE INDEX name ON [ONLY] table USING method (columns) -- nothing after the column list
+_PLAIN_UNIQUE = re.compile(r'^(CREATE UNIQUE INDEX \S+ ON (?:ONLY )?\S+ USING \w+ \()([^()]*)\)$')
+
+
+def _add_months(dt, months):
+    index = dt.year * 12 + (dt.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _bound(month, aware):
+    return f"{month:%Y-%m-%d %H:%M:%S}+00" if aware else f"{month:%Y-%m-%d %H:%M:%S}"
+
+
+def _table_exists(bind, table):
+    return sa.inspect(bind).has_table(table)
+
+
+def _rebuild(bind, table, create_sql):
+    """Move ``table`` aside and create its replacement; returns what _finish() restores."""
+    legacy = f"{table}_old"
+    indexes = bind.execute(sa.text(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = :t AND schemaname = current_schema()"
+    ), {'t': table}).fetchall()
+    pkey = bind.execute(sa.text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:t) AND contype = 'p'"
+    ), {'t': table}).scalar()
+    foreign_keys = bind.execute(sa.text(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(:t) AND contype = 'f'"
+    ), {'t': table}).fetchall()
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence(:t, 'id')"), {'t': table}).scalar()
+
+    op.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    op.execute(create_sql.format(table=table, legacy=legacy))
+    return legacy, indexes, pkey, foreign_keys, sequence
+
+
+def _partitioned_unique(table, name, definition, column):
+    """``definition`` with the partition ``column`` added; raises for indexes that can't take it."""
+    match = _PLAIN_UNIQUE.match(definition)
+    if match is None:
+        raise RuntimeError(
+            f"0028: unique index {name} on {table} can't be recreated on the partitioned table "
+            f"(needs {column} in its key): {definition}"
+        )
+    columns = [c.strip() for c in match.group(2).split(',')]
+    if column in columns:
+        return definition
+    logger.warning("0028: unique index %s on %s now includes %s (uniqueness is per %s)",
+                   name, table, column, column)
+    return f"{match.group(1)}{match.group(2)}, {column})"
+
+
+def _finish(table, legacy, indexes, pkey, foreign_keys, sequence, pk_columns, partition_column=None):
+    """Copy rows into the replacement, then restore sequence ownership, keys and indexes."""
+    op.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+    op.execute(f"DROP TABLE {legacy}")
+
+    # Index names are schema-wide, so recreate them only once the old table is gone.
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {pkey or table + '_pkey'} PRIMARY KEY ({pk_columns})")
+    for name, definition in indexes:
+        if name == pkey:
+            continue
+        if partition_column and ' UNIQUE ' in definition:
+            definition = _partitioned_unique(table, name, definition, partition_column)
+        # Captured before the rename, so the definition already names ``table``;
+        # partitioned parents report theirs as "ON ONLY".
+        op.execute(definition.replace(' ON ONLY ', ' ON '))
+    for name, definition in foreign_keys:
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+
+
+def upgrade():
+    op.create_table(
+        'retention_watermarks',
+        sa.Column('table_name', sa.String(64), primary_key=True),
+        sa.Column('pruned_before', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+    )
+
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    now = datetime.utcnow()
+    for table, (column, aware) in PARTITIONED_TABLES.items():
+        if not _table_exists(bind, table):
+            continue
+        oldest = bind.execute(sa.text(f"SELECT MIN({column}) FROM {table}")).scalar()
+
+        state = _rebuild(
+            bind, table,
+            "CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({column})",
+        )
+
+        month = datetime(oldest.year, oldest.month, 1) if oldest is not None else datetime(now.year, now.month, 1)
+        last = _add_months(datetime(now.year, now.month, 1), MONTHS_AHEAD)
+        while month <= last:
+            upper = _add_months(month, 1)
+            op.execute(
+                f"CREATE TABLE {table}_p{month:%Y%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{_bound(month, aware)}') TO ('{_bound(upper, aware)}')"
+            )
+            month = upper
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+        _finish(table, *state, pk_columns=f"id, {column}", partition_column=column)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        for table in PARTITIONED_TABLES:
+            relkind = bind.execute(
+                sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)"), {'t': table}
+            ).scalar()
+            if relkind != 'p':
+                continue
+            state = _rebuild(
+                bind, table,
+                "CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)",
+            )
+            _finish(table, *state, pk_columns="id")
+
+    op.drop_table('retention_watermarks')
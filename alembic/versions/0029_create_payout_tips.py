@@ -0,0 +1,70 @@
+"""0029_create_payout_tips
+
+Revision ID: 0029_payout_tips
+Revises: 0028_partition_event_tables
+Create Date: 2026-10-19
+
+payout_tips links artist_payouts to the tips they cover (normalizing
+artist_payouts.related_tip_ids) and is backfilled from the JSON arrays.
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0029_payout_tips'
+down_revision = '0028_partition_event_tables'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def _tip_ids(raw):
+    """related_tip_ids as stored: JSON(B) list, JSON text, or NULL."""
+    if raw is None:
+        return []
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            return []
+    if not isinstance(raw, list):
+        return []
+    ids = []
+    for value in raw:
+        try:
+            ids.append(int(value))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+def upgrade():
+    payout_tips = op.create_table(
+        'payout_tips',
+        sa.Column('payout_id', sa.Integer(), sa.ForeignKey('artist_payouts.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('tip_id', sa.Integer(), sa.ForeignKey('tips.id', ondelete='CASCADE'), primary_key=True),
+    )
+    op.create_index('ix_payout_tips_tip_id', 'payout_tips', ['tip_id'])
+
+    # Backfill from related_tip_ids, skipping ids of tips that no longer exist.
+    bind = op.get_bind()
+    existing_tips = {row[0] for row in bind.execute(sa.text("SELECT id FROM tips"))}
+    links = set()
+    for payout_id, raw in bind.execute(
+        sa.text("SELECT id, related_tip_ids FROM artist_payouts WHERE related_tip_ids IS NOT NULL")
+    ):
+        for tip_id in _tip_ids(raw):
+            if tip_id in existing_tips:
+                links.add((payout_id, tip_id))
+
+    rows = [{'payout_id': p, 'tip_id': t} for p, t in sorted(links)]
+    for start in range(0, len(rows), BATCH_SIZE):
+        op.bulk_insert(payout_tips, rows[start:start + BATCH_SIZE])
+
+
+def downgrade():
+    op.drop_index('ix_payout_tips_tip_id', table_name='payout_tips')
+    op.drop_table('payout_tips')
@@ -0,0 +1,68 @@
+"""0030_create_tip_ledger
+
+Revision ID: 0030_tip_ledger
+Revises: 0029_payout_tips
+Create Date: 2026-10-19
+
+artist_balances and user_boost_totals: running tip totals maintained by
+services/ledger.py, backfilled here from the tips table.
+Verify afterwards with: python scripts/reconcile_ledger.py
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0030_tip_ledger'
+down_revision = '0029_payout_tips'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'artist_balances',
+        sa.Column('artist_id', sa.String(255), primary_key=True),
+        sa.Column('total_boosted', sa.Numeric(12, 2), nullable=False, server_default='0'),
+        sa.Column('total_net', sa.Numeric(12, 2), nullable=False, server_default='0'),
+        sa.Column('total_payout', sa.Numeric(12, 2), nullable=False, server_default='0'),
+        sa.Column('total_earned', sa.Numeric(12, 2), nullable=False, server_default='0'),
+        sa.Column('boost_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_tip_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+    )
+    op.create_table(
+        'user_boost_totals',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('total_boosted', sa.Numeric(12, 2), nullable=False, server_default='0'),
+        sa.Column('boost_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_boost_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+    )
+
+    op.execute("""
+        INSERT INTO artist_balances
+            (artist_id, total_boosted, total_net, total_payout, total_earned, boost_count, last_tip_at, updated_at)
+        SELECT artist_id,
+               COALESCE(SUM(amount), 0),
+               COALESCE(SUM(net_amount), 0),
+               COALESCE(SUM(artist_payout), 0),
+               COALESCE(SUM(COALESCE(NULLIF(artist_payout, 0), amount)), 0),
+               COUNT(*),
+               MAX(created_at),
+               CURRENT_TIMESTAMP
+        FROM tips
+        GROUP BY artist_id
+    """)
+    # tips.user_id is SET NULL when a user is deleted, so the remaining ids all exist.
+    op.execute("""
+        INSERT INTO user_boost_totals (user_id, total_boosted, boost_count, last_boost_at, updated_at)
+        SELECT user_id, COALESCE(SUM(amount), 0), COUNT(*), MAX(created_at), CURRENT_TIMESTAMP
+        FROM tips
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+    """)
+
+
+def downgrade():
+    op.drop_table('user_boost_totals')
+    op.drop_table('artist_balances')
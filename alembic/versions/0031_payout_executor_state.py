@@ -0,0 +1,32 @@
+"""0031_payout_executor_state
+
+Revision ID: 0031_payout_executor_state
+Revises: 0030_tip_ledger
+Create Date: 2026-10-19
+
+Columns backing the Stripe payout executor's state machine
+(queued -> submitted -> completed/failed): the per-tip-set idempotency key,
+the retry round and the destination account.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0031_payout_executor_state'
+down_revision = '0030_tip_ledger'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('artist_payouts', sa.Column('idempotency_key', sa.String(100), nullable=True))
+    op.add_column('artist_payouts', sa.Column('retry_round', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('artist_payouts', sa.Column('stripe_destination', sa.String(255), nullable=True))
+    op.create_index('ix_artist_payouts_idempotency_key', 'artist_payouts', ['idempotency_key'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_artist_payouts_idempotency_key', table_name='artist_payouts')
+    op.drop_column('artist_payouts', 'stripe_destination')
+    op.drop_column('artist_payouts', 'retry_round')
+    op.drop_column('artist_payouts', 'idempotency_key')
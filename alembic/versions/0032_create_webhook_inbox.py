@@ -0,0 +1,41 @@
+"""0032_create_webhook_inbox
+
+Revision ID: 0032_webhook_inbox
+Revises: 0031_payout_executor_state
+Create Date: 2026-10-19
+
+webhook_inbox: durable, deduplicated queue of Stripe webhook events drained
+by services/webhook_inbox.py. The key is (source, id): both Stripe endpoints
+can receive the same event and each processes its own copy.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0032_webhook_inbox'
+down_revision = '0031_payout_executor_state'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'webhook_inbox',
+        sa.Column('source', sa.String(50), primary_key=True),
+        sa.Column('id', sa.String(255), primary_key=True),
+        sa.Column('event_type', sa.String(100), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('received_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_webhook_inbox_status_next_attempt', 'webhook_inbox', ['status', 'next_attempt_at'])
+
+
+def downgrade():
+    op.drop_index('ix_webhook_inbox_status_next_attempt', table_name='webhook_inbox')
+    op.drop_table('webhook_inbox')
@@ -0,0 +1,32 @@
+"""0033_create_gcs_sync_objects
+
+Revision ID: 0033_gcs_sync_objects
+Revises: 0032_webhook_inbox
+Create Date: 2026-10-19
+
+gcs_sync_objects: per-blob generation checkpoint for the incremental GCS
+content sync (services/gcs_sync.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0033_gcs_sync_objects'
+down_revision = '0032_webhook_inbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'gcs_sync_objects',
+        sa.Column('bucket', sa.String(255), primary_key=True),
+        sa.Column('name', sa.String(1024), primary_key=True),
+        sa.Column('generation', sa.BigInteger(), nullable=False),
+        sa.Column('metadata_generation', sa.BigInteger(), nullable=True),
+        sa.Column('synced_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+    )
+
+
+def downgrade():
+    op.drop_table('gcs_sync_objects')
@@ -0,0 +1,29 @@
+"""0034_purchases_updated_at
+
+Revision ID: 0034_purchases_updated_at
+Revises: 0033_gcs_sync_objects
+Create Date: 2026-10-19
+
+purchases.updated_at: set on every change (ORM onupdate), so the orders
+rollup (services/rollups.py) re-counts a bucket when an old order is paid or
+fulfilled. Existing rows start at fulfilled_at, else created_at.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0034_purchases_updated_at'
+down_revision = '0033_gcs_sync_objects'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('purchases', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE purchases SET updated_at = COALESCE(fulfilled_at, created_at)")
+    op.create_index('ix_purchases_updated_at', 'purchases', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_purchases_updated_at', table_name='purchases')
+    op.drop_column('purchases', 'updated_at')
@@ -42,8 +42,13 @@ from blueprints.payments import bp as payments_bp
 from routes.boost_stripe import bp as boost_stripe_bp
 from routes.boost_stripe import boost_api_bp
 from routes.stripe_webhooks import bp as stripe_webhooks_bp
+from services.merch_catalog import (
+    CatalogIndex, catalog_and_purchased as merch_catalog_and_purchased,
+    checkout_index as merch_checkout_index, mark_purchased as mark_merch_purchased,
+)
 from services.listening import start_session as listening_start_session, end_session as listening_end_session
 from services.user_resolver import resolve_db_user_id
+from services.static_files import StaticIndex
 from db import get_session
 from models import UserArtistFollow
 from models import Purchase, BetaSignup
@@ -691,8 +696,8 @@ def create_app():
     @app.route('/downloads')
     def downloads_page():
         """Landing page to download latest desktop builds."""
-        import requests
         from datetime import datetime
+        from services.release_info import latest_release
         
         def _format_size(n: int) -> str:
             """Format file size in human-readable format"""
@@ -730,21 +735,9 @@ def create_app():
         release_tag = "No releases yet"
         
         try:
-            # Use GitHub API to get latest release
-            github_token = os.getenv('GITHUB_TOKEN')
-            headers = {}
-            if github_token:
-                headers['Authorization'] = f'token {github_token}'
-            
-            # Get repository info from git remote or use default
-            repo_owner = "oooAHOYooo"  # Update this to match your GitHub username
-            repo_name = "ahoy-little-platform"
-            
-            url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/releases/latest"
-            response = requests.get(url, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                release_data = response.json()
+            # Latest GitHub release, cached per process and refreshed in the background
+            release_data = latest_release()
+            if release_data:
                 release_tag = release_data.get('tag_name', 'Unknown')
                 
                 # Filter and format assets
@@ -892,42 +885,38 @@ def create_app():
         else:
             return render_template('downloads.html', files=local_files, release_assets=None, release_tag="Local Builds")
 
+    # Installers are large: served with Range support so interrupted downloads resume
+    _downloads_index = StaticIndex(os.path.join(app.root_path, DOWNLOADS_DIR))
+    _dist_index = StaticIndex(os.path.join(app.root_path, DIST_DIR))
+
     @app.route('/downloads/<path:filename>')
     def download_artifact(filename):
         """Serve built desktop artifacts from downloads/ directory."""
         if not DOWNLOADS_DIR.exists():
             return jsonify({'error': 'No downloads available'}), 404
-        try:
-            return send_from_directory(str(DOWNLOADS_DIR), filename, as_attachment=True)
-        except Exception:
+        response = _downloads_index.serve(filename, request, as_attachment=True)
+        if response is None:
             return jsonify({'error': 'File not found'}), 404
+        return response
     
     @app.route('/downloads/dist/<path:filename>')
     def download_dist_artifact(filename):
         """Serve built desktop artifacts from dist/ directory."""
         if not DIST_DIR.exists():
             return jsonify({'error': 'No builds available'}), 404
-        try:
-            return send_from_directory(str(DIST_DIR), filename, as_attachment=True)
-        except Exception:
+        response = _dist_index.serve(filename, request, as_attachment=True)
+        if response is None:
             return jsonify({'error': 'File not found'}), 404
+        return response
 
     @app.route('/api/downloads/latest')
     def api_downloads_latest():
         """Return latest macOS release zip for Settings / downloads table (version, date, download link)."""
-        import requests as requests_lib
-        repo_owner = "oooAHOYooo"
-        repo_name = "ahoy-little-platform"
-        github_token = os.getenv('GITHUB_TOKEN')
-        headers = {}
-        if github_token:
-            headers['Authorization'] = f'token {github_token}'
+        from services.release_info import latest_release
         try:
-            url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/releases/latest"
-            response = requests_lib.get(url, headers=headers, timeout=10)
-            if response.status_code != 200:
+            data = latest_release()
+            if not data:
                 return jsonify({'error': 'No release found'}), 404
-            data = response.json()
             version = data.get('tag_name', '').lstrip('v')
             published = data.get('published_at') or data.get('created_at') or ''
             # Prefer macOS zip: *-mac.zip or *arm64*.zip (arm64 first), then any .zip for mac
@@ -1047,11 +1036,12 @@ def create_app():
 
     # When spa-dist exists, serve SPA for all document GETs (Vue is the main web UI).
     _spa_dist_dir = Path(__file__).resolve().parent / "spa-dist"
+    _spa_index = StaticIndex(_spa_dist_dir, precompressed=True)
     _server_path_prefixes = (
         "api/", "static/", "assets/", "ops/", "downloads/", "admin", "checkout", "success",
         "healthz", "readyz", "refresh", "offline", "payments/", "sitemap", "robots.txt",
         "favicon.ico", "manifest.webmanifest", "googleb3a3eb3401de50dc.html",
-        "auth", "feedback", "contact", "cast", "debug",
+        "auth", "feedback", "contact", "cast", "debug", "proxy/", "img/", "feeds/",
     )
 
     @app.before_request
@@ -1063,7 +1053,7 @@ def create_app():
         path = (request.path or "").strip().strip("/")
         if any(path.startswith(p) or path == p.rstrip("/") for p in _server_path_prefixes):
             return
-        return send_from_directory(str(_spa_dist_dir), "index.html", mimetype="text/html")
+        return _spa_index.serve("index.html", request, mimetype="text/html", cache_control="no-cache")
 
     return app
 
@@ -1170,18 +1160,7 @@ def checkout_page():
     # For merch, ignore client-provided amount/title and look up from merch catalog.
     if kind == "merch" and item_id:
         try:
-            try:
-                merch_catalog = get_all_merch(ttl=600)
-            except Exception:
-                from storage import read_json
-                merch_catalog = read_json("data/merch.json", {"items": []}) or {}
-            items = merch_catalog.get("items") if isinstance(merch_catalog, dict) else []
-            found = None
-            if isinstance(items, list):
-                for it in items:
-                    if isinstance(it, dict) and str(it.get("id") or "") == str(item_id):
-                        found = it
-                        break
+            found = merch_checkout_index().get(item_id)
             if found:
                 # Check if item has already been purchased (1:1 nature - only one in stock)
                 try:
@@ -1202,14 +1181,14 @@ def checkout_page():
                     # Continue with checkout if we can't check (fail open for availability)
                 
                 # Respect item availability flags if present.
-                if found.get("available") is False:
+                if not found["available"]:
                     return render_template('checkout.html',
                                            error="This item is not available.",
                                            kind=kind,
                                            item_id=item_id,
                                            qty=qty,
                                            csrf_token=generate_csrf_token()), 400
-                unit = Decimal(str(found.get("price_usd") or "0")).quantize(Decimal("0.01"))
+                unit = found["unit_price"]
                 if unit <= 0:
                     return render_template('checkout.html',
                                            error="Invalid item price.",
@@ -1218,8 +1197,8 @@ def checkout_page():
                                            qty=qty,
                                            csrf_token=generate_csrf_token()), 400
                 amount = str(unit)  # unit price
-                title = str(found.get("name") or "Merch")[:120]
-                total = (unit * Decimal(str(max(1, qty)))).quantize(Decimal("0.01"))
+                title = found["name"] or "Merch"
+                total = CatalogIndex.total(found, qty)
             else:
                 # Item not found in catalog
                 current_app.logger.warning(f"Merch item not found: {item_id}")
@@ -1339,18 +1318,7 @@ def checkout_process():
     # Harden merch checkout: price/title must come from server-side merch catalog.
     if kind == "merch":
         try:
-            try:
-                merch_catalog = get_all_merch(ttl=600)
-            except Exception:
-                from storage import read_json
-                merch_catalog = read_json("data/merch.json", {"items": []}) or {}
-            items = merch_catalog.get("items") if isinstance(merch_catalog, dict) else []
-            found = None
-            if isinstance(items, list) and item_id:
-                for it in items:
-                    if isinstance(it, dict) and str(it.get("id") or "") == str(item_id):
-                        found = it
-                        break
+            found = merch_checkout_index().get(item_id)
             if not found:
                 return render_template("checkout.html",
                                        error="Invalid merch item.",
@@ -1377,7 +1345,7 @@ def checkout_process():
                 current_app.logger.warning(f"Error checking for existing purchase: {e}")
                 # Continue with checkout if we can't check (fail open for availability)
             
-            if found.get("available") is False:
+            if not found["available"]:
                 return render_template("checkout.html",
                                        error="This item is not available.",
                                        csrf_token=generate_csrf_token(),
@@ -1387,7 +1355,7 @@ def checkout_process():
 
             # For one-of-a-kind merch items, enforce quantity = 1
             qty = 1
-            unit = float(found.get("price_usd") or 0)
+            unit = float(found["unit_price"])
             if unit <= 0:
                 return render_template("checkout.html",
                                        error="Invalid item price.",
@@ -1433,6 +1401,8 @@ def checkout_process():
         s.flush()
         purchase_id = p.id
         s.commit()
+    if kind == 'merch':
+        mark_merch_purchased(item_id)
 
     # Create a Stripe Checkout Session and redirect user to Stripe-hosted checkout
     try:
@@ -1529,7 +1499,10 @@ def checkout_process():
                                        item_id=item_id or "",
                                        qty=qty), 400
             
-            unit_amount_cents = int(max(0, float(amount)) * 100)
+            if kind == "merch":
+                unit_amount_cents = found["unit_amount_cents"]  # exact cents from the catalog index
+            else:
+                unit_amount_cents = int(max(0, float(amount)) * 100)
             if unit_amount_cents <= 0:
                 current_app.logger.error(f"Invalid unit_amount_cents for {kind} purchase: {unit_amount_cents}")
                 return render_template("checkout.html",
@@ -1544,17 +1517,9 @@ def checkout_process():
             safe_title = (request.form.get("title") or "Ahoy Purchase").strip()[:120]
             if kind == "merch" and item_id:
                 try:
-                    try:
-                        merch_catalog = get_all_merch(ttl=600)
-                    except Exception:
-                        from storage import read_json
-                        merch_catalog = read_json("data/merch.json", {"items": []}) or {}
-                    items = merch_catalog.get("items") if isinstance(merch_catalog, dict) else []
-                    if isinstance(items, list):
-                        for it in items:
-                            if isinstance(it, dict) and str(it.get("id") or "") == str(item_id):
-                                safe_title = str(it.get("name") or safe_title).strip()[:120]
-                                break
+                    entry = merch_checkout_index().get(item_id)
+                    if entry:
+                        safe_title = entry["name"] or safe_title
                 except Exception:
                     pass
             # For merch, quantity is always 1 (one-of-a-kind)
@@ -1659,24 +1624,18 @@ def checkout_process():
                                 # Wallet was deducted but purchase not found - this is bad
                                 # Try to refund wallet (manual process needed)
                                 try:
-                                    from models import User, WalletTransaction
+                                    from services import wallet
                                     with get_session() as s2:
-                                        user = s2.query(User).filter(User.id == current_user.id).first()
-                                        if user:
-                                            user.wallet_balance += total_charge
-                                            refund_tx = WalletTransaction(
-                                                user_id=current_user.id,
-                                                type="refund",
-                                                amount=total_charge,
-                                                balance_before=float(balance_after),
-                                                balance_after=float(balance_after) + float(total_charge),
-                                                description=f"Refund: Purchase {purchase_id} not found",
-                                                reference_id=str(purchase_id),
-                                                reference_type="purchase",
-                                                created_at=datetime.utcnow(),
-                                            )
-                                            s2.add(refund_tx)
-                                            s2.commit()
+                                        wallet.credit(
+                                            s2,
+                                            current_user.id,
+                                            total_charge,
+                                            description=f"Refund: Purchase {purchase_id} not found",
+                                            reference_id=str(purchase_id),
+                                            reference_type="purchase",
+                                            type_="refund",
+                                        )
+                                        s2.commit()
                                 except Exception as refund_err:
                                     current_app.logger.error(f"Failed to refund wallet: {refund_err}")
                                 
@@ -2091,6 +2050,27 @@ def podcast_show_page(show_slug):
     }
     return render_template('podcast_show.html', show=show)
 
+@app.route('/feeds/podcasts/<show_slug>.xml')
+@limiter.exempt
+def podcast_feed(show_slug):
+    """RSS feed for one podcast show (paged with ?page=N), cached until the catalog changes"""
+    from flask import Response
+    from services import podcast_feed as feeds
+    feed = feeds.get_feed(show_slug, request.args.get('page', 1, type=int))
+    if feed is None:
+        abort(404)
+    use_gzip = 'gzip' in request.accept_encodings
+    data = feed.gzipped if use_gzip else feed.body
+    response = Response(data, mimetype='application/rss+xml')
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.set_etag(f'{feed.etag}-gz' if use_gzip else feed.etag)
+    if feed.last_modified:
+        response.last_modified = feed.last_modified
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response.make_conditional(request)
+
 @app.route('/events')
 def events_page():
     """Upcoming live Ahoy events (separate from /dashboard and /performances)."""
@@ -2135,9 +2115,10 @@ def performances():
 @app.route('/proxy/audio')
 @limiter.exempt
 def proxy_audio():
-    """Proxy audio files to bypass CORS on localhost testing"""
+    """Proxy audio files to bypass CORS on localhost testing (streamed, Range-aware)"""
     import requests as requests_lib
     from urllib.parse import unquote
+    from services import media_cache, media_proxy
 
     url = request.args.get('url')
     if not url:
@@ -2147,34 +2128,57 @@ def proxy_audio():
     url = unquote(url)
 
     # Security: only allow S3 and Google Storage URLs
-    if not (url.startswith('https://') and
-            ('s3' in url or 'storage.googleapis.com' in url or 'ahoycollection' in url)):
+    if not media_proxy.is_allowed_source(url):
         abort(403, 'Invalid audio source')
 
-    try:
-        # Fetch audio from external source
-        resp = requests_lib.get(url, timeout=30, stream=True)
-        resp.raise_for_status()
-
-        # Create response with audio data
-        response = make_response(resp.content)
-        response.headers['Content-Type'] = 'audio/mpeg'
-        response.headers['Content-Length'] = resp.headers.get('Content-Length', len(resp.content))
-        response.headers['Cache-Control'] = 'public, max-age=3600'
+    # Ranged requests (seeks, player buffering) are answered from the disk cache when possible
+    cache = media_cache.get_cache()
+    if cache is not None:
+        cached = cache.serve(url, request.headers, request.environ)
+        if cached is not None:
+            return cached
 
+    try:
+        return media_proxy.proxy(url, request.headers)
+    except media_proxy.ProxyBusy:
+        response = make_response('Audio proxy busy, retry shortly', 503)
+        response.headers['Retry-After'] = '2'
         return response
     except requests_lib.exceptions.RequestException as e:
         abort(502, f'Failed to fetch audio: {str(e)}')
 
-def _is_local_file_path(s):
-    """True if string looks like a local filesystem path (do not use as public image URL). URLs and /static/ are safe."""
-    if not s or not isinstance(s, str):
-        return False
-    s = s.strip()
-    # Public URLs and same-origin static paths are valid image URLs; do not replace
-    if s.startswith(('http://', 'https://', '/static/')):
-        return False
-    return any(s.startswith(p) or p in s for p in ('/var/', '/Users/', '/tmp/', 'TemporaryItems', 'Screenshot')) or s.endswith(('.png', '.jpg', '.jpeg'))
+@app.route('/img/<int:width>')
+def image_variant(width):
+    """Cover art / thumbnail resized to a width bucket, as AVIF/WebP/JPEG per Accept (immutable)"""
+    from flask import send_file
+    from services import image_variants
+
+    src = request.args.get('src')
+    if not src:
+        abort(400, 'Missing src parameter')
+    if not image_variants.is_allowed_source(src):
+        abort(403, 'Invalid image source')
+
+    store = image_variants.get_store()
+    if store is None:
+        return redirect(src)
+    # The variant is cached as immutable under the source's current hash, never the client's v
+    version = image_variants.source_version(src)
+    if request.args.get('v', '') != version:
+        return redirect(image_variants.variant_url(src, width))
+    fmt = image_variants.negotiate(request.headers.get('Accept', ''))
+    try:
+        variant = store.get(src, version, width, fmt)
+    except image_variants.SourceNotFound:
+        abort(404)
+    except image_variants.VariantError as e:
+        current_app.logger.warning(f"Image variant failed for {src}: {e}")
+        return redirect(src)
+
+    response = send_file(variant.path, mimetype=variant.mimetype, etag=variant.etag, conditional=True)
+    response.headers['Cache-Control'] = image_variants.CACHE_CONTROL
+    response.vary.add('Accept')
+    return response
 
 @app.route('/merch')
 def merch():
@@ -2193,39 +2197,8 @@ def merch():
 
 
 def _merch_catalog_and_purchased():
-    """Shared: load merch catalog (sanitized) and set of purchased item ids. Used by /merch and /api/merch."""
-    from storage import read_json
-    try:
-        merch_catalog = get_all_merch(ttl=600)
-    except Exception:
-        merch_catalog = read_json('data/merch.json', {"items": []}) or {}
-    items = merch_catalog.get('items') if isinstance(merch_catalog, dict) else []
-    if isinstance(items, list):
-        sanitized = []
-        for it in items:
-            if not isinstance(it, dict):
-                continue
-            it = dict(it)
-            if _is_local_file_path(it.get('image_url')):
-                it['image_url'] = '/static/img/default-cover.jpg'
-            if _is_local_file_path(it.get('image_url_back')):
-                it['image_url_back'] = None
-            if _is_local_file_path(it.get('name')):
-                it['name'] = it.get('id') or 'Item'
-            sanitized.append(it)
-        merch_catalog = dict(merch_catalog) if isinstance(merch_catalog, dict) else {}
-        merch_catalog['items'] = sanitized
-    purchased_item_ids = set()
-    try:
-        with get_session() as s:
-            purchases = s.query(Purchase).filter(
-                Purchase.type == "merch",
-                Purchase.item_id.isnot(None)
-            ).all()
-            purchased_item_ids = {str(p.item_id) for p in purchases if p.item_id}
-    except Exception as e:
-        current_app.logger.warning(f"Error querying purchased merch items: {e}")
-    return merch_catalog, purchased_item_ids
+    """Shared: cached sanitized merch catalog and set of purchased item ids. Used by /merch and /api/merch."""
+    return merch_catalog_and_purchased()
 
 
 @app.route('/api/merch')
@@ -3762,9 +3735,15 @@ def test_save():
         }), 500
 
 # Static files
+_static_index = StaticIndex(os.path.join(app.root_path, 'static'), precompressed=True)
+
+
 @app.route('/static/<path:filename>')
 def static_files(filename):
-    return send_from_directory('static', filename)
+    response = _static_index.serve(filename, request, max_age=app.get_send_file_max_age(filename))
+    if response is None:
+        abort(404)
+    return response
 
 def find_available_port(start_port=5001, end_port=5020):
     """Find an available port between start_port and end_port"""
@@ -4000,9 +3979,28 @@ def sitemap_page():
     return response
 
 @app.route('/sitemap.xml')
-def sitemap_xml():
-    """XML sitemap for search engines"""
-    return send_from_directory('static', 'sitemap.xml', mimetype='application/xml')
+@app.route('/sitemap-<int:page>.xml')
+def sitemap_xml(page=None):
+    """XML sitemap (or sitemap index and shards) for search engines, generated from the content catalog"""
+    from flask import Response
+    from services import sitemap
+    doc = sitemap.get_document('sitemap.xml' if page is None else f'sitemap-{page}.xml')
+    if doc is None:
+        abort(404)
+    use_gzip = 'gzip' in request.accept_encodings
+    etag = f'{doc.etag}-gz' if use_gzip else doc.etag
+    headers = {
+        'Cache-Control': 'public, max-age=3600',
+        'ETag': f'"{etag}"',
+        'Vary': 'Accept-Encoding',
+    }
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    data = doc.gzipped if use_gzip else doc.body
+    if use_gzip:
+        headers['Content-Encoding'] = 'gzip'
+    headers['Content-Length'] = str(len(data))
+    return Response(sitemap.stream(data), mimetype='application/xml', headers=headers)
 
 @app.route('/robots.txt')
 def robots_txt():
@@ -4044,143 +4042,6 @@ def contact_page():
     """Contact form page"""
     return render_template('contact.html')
 
-@app.route('/api/admin/stats', methods=['GET'])
-@login_required
-@_admin_session_required
-def admin_stats():
-    """Read-only admin stats (users + merch orders + analytics)."""
-    from db import get_session
-    from models import (
-        User, Purchase, PlayHistory, ListeningSession, ListeningTotal,
-        Bookmark, UserArtistFollow, Tip
-    )
-    from sqlalchemy import func
-    from datetime import datetime, timedelta, timezone
-
-    now = datetime.now(timezone.utc)
-    active_since = now - timedelta(days=30)
-    week_ago = now - timedelta(days=7)
-    day_ago = now - timedelta(days=1)
-
-    with get_session() as s:
-        # User stats
-        total_users = int(s.query(func.count(User.id)).scalar() or 0)
-        active_users = int(
-            s.query(func.count(User.id))
-            .filter(User.last_active_at.isnot(None))
-            .filter(User.last_active_at >= active_since)
-            .scalar()
-            or 0
-        )
-        new_users_7d = int(
-            s.query(func.count(User.id))
-            .filter(User.created_at >= week_ago)
-            .scalar() or 0
-        )
-        new_users_24h = int(
-            s.query(func.count(User.id))
-            .filter(User.created_at >= day_ago)
-            .scalar() or 0
-        )
-
-        # Order stats
-        total_orders = int(s.query(func.count(Purchase.id)).filter(Purchase.type == "merch").scalar() or 0)
-        pending_orders = int(
-            s.query(func.count(Purchase.id)).filter(Purchase.type == "merch", Purchase.status == "pending").scalar() or 0
-        )
-        paid_orders = int(
-            s.query(func.count(Purchase.id)).filter(Purchase.type == "merch", Purchase.status == "paid").scalar() or 0
-        )
-        fulfilled_orders = int(
-            s.query(func.count(Purchase.id)).filter(Purchase.type == "merch", Purchase.status == "fulfilled").scalar() or 0
-        )
-
-        # Play statistics
-        total_plays = int(s.query(func.count(PlayHistory.id)).scalar() or 0)
-        plays_7d = int(
-            s.query(func.count(PlayHistory.id))
-            .filter(PlayHistory.played_at >= week_ago)
-            .scalar() or 0
-        )
-        plays_24h = int(
-            s.query(func.count(PlayHistory.id))
-            .filter(PlayHistory.played_at >= day_ago)
-            .scalar() or 0
-        )
-        unique_tracks_played = int(
-            s.query(func.count(func.distinct(PlayHistory.media_id)))
-            .filter(PlayHistory.media_type == "track")
-            .scalar() or 0
-        )
-
-        # Listening time statistics
-        total_listening_seconds = int(
-            s.query(func.sum(ListeningTotal.total_seconds)).scalar() or 0
-        )
-        total_listening_hours = round(total_listening_seconds / 3600, 1)
-        
-        # Listening sessions
-        total_sessions = int(s.query(func.count(ListeningSession.id)).scalar() or 0)
-        sessions_7d = int(
-            s.query(func.count(ListeningSession.id))
-            .filter(ListeningSession.started_at >= week_ago)
-            .scalar() or 0
-        )
-        radio_sessions = int(
-            s.query(func.count(ListeningSession.id))
-            .filter(ListeningSession.source == "radio")
-            .scalar() or 0
-        )
-        manual_sessions = int(
-            s.query(func.count(ListeningSession.id))
-            .filter(ListeningSession.source == "manual")
-            .scalar() or 0
-        )
-
-        # Engagement stats
-        total_bookmarks = int(s.query(func.count(Bookmark.id)).scalar() or 0)
-        total_follows = int(s.query(func.count(UserArtistFollow.id)).scalar() or 0)
-        total_tips = int(s.query(func.count(Tip.id)).scalar() or 0)
-        total_tip_amount = float(
-            s.query(func.sum(Tip.amount)).scalar() or 0
-        )
-
-    return jsonify({
-        "users": {
-            "total": total_users,
-            "active_30d": active_users,
-            "new_7d": new_users_7d,
-            "new_24h": new_users_24h,
-        },
-        "orders": {
-            "total": total_orders,
-            "pending": pending_orders,
-            "paid": paid_orders,
-            "fulfilled": fulfilled_orders,
-        },
-        "plays": {
-            "total": total_plays,
-            "last_7d": plays_7d,
-            "last_24h": plays_24h,
-            "unique_tracks": unique_tracks_played,
-        },
-        "listening": {
-            "total_hours": total_listening_hours,
-            "total_seconds": total_listening_seconds,
-            "total_sessions": total_sessions,
-            "sessions_7d": sessions_7d,
-            "radio_sessions": radio_sessions,
-            "manual_sessions": manual_sessions,
-        },
-        "engagement": {
-            "bookmarks": total_bookmarks,
-            "follows": total_follows,
-            "tips": total_tips,
-            "tip_amount": round(total_tip_amount, 2),
-        },
-    })
-
-
 @app.route('/api/admin/analytics', methods=['GET'])
 @login_required
 @_admin_session_required
@@ -4188,15 +4049,15 @@ def admin_analytics():
     """Detailed analytics for admin dashboard."""
     from db import get_session
     from models import (
-        User, PlayHistory, ListeningSession, Bookmark,
+        User, PlayHistory, Bookmark,
         UserArtistFollow, Tip
     )
+    from services.rollups import rollup_summary, summary_value, rollup_daily_counts
     from sqlalchemy import func
     from datetime import datetime, timedelta, timezone
 
     now = datetime.now(timezone.utc)
-    week_ago = now - timedelta(days=7)
-    month_ago = now - timedelta(days=30)
+    day_ago = (now - timedelta(days=1)).replace(tzinfo=None)
 
     with get_session() as s:
         # Most active users (by play count)
@@ -4225,65 +4086,39 @@ def admin_analytics():
             func.count(PlayHistory.id).desc()
         ).limit(20).all()
 
-        # Plays over time (last 7 days)
+        # Plays over time (last 7 days): one GROUP BY day over the hourly rollups
+        first_day = (now - timedelta(days=6)).replace(hour=0, minute=0, second=0, microsecond=0)
+        plays_by_day = rollup_daily_counts(s, "plays", first_day.replace(tzinfo=None))
         daily_plays = []
         for i in range(7):
-            day_start = (now - timedelta(days=6-i)).replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = day_start + timedelta(days=1)
-            count = int(
-                s.query(func.count(PlayHistory.id))
-                .filter(PlayHistory.played_at >= day_start)
-                .filter(PlayHistory.played_at < day_end)
-                .scalar() or 0
-            )
+            day_start = first_day + timedelta(days=i)
             daily_plays.append({
                 "date": day_start.isoformat(),
-                "count": count
+                "count": plays_by_day.get(day_start.date().isoformat(), 0)
             })
 
-        # Listening time by source
-        radio_time = int(
-            s.query(func.sum(ListeningSession.seconds))
-            .filter(ListeningSession.source == "radio")
-            .scalar() or 0
-        )
-        manual_time = int(
-            s.query(func.sum(ListeningSession.seconds))
-            .filter(ListeningSession.source == "manual")
-            .scalar() or 0
-        )
+        # Listening time by source + recent plays, one pass over the rollups
+        rollups = rollup_summary(s, {"24h": day_ago})
+        radio_time = summary_value(rollups, "sessions", "total", dimension="radio")
+        manual_time = summary_value(rollups, "sessions", "total", dimension="manual")
+        recent_plays_24h = summary_value(rollups, "plays", "24h")
 
-        # User engagement breakdown
+        # User engagement breakdown + recent activity, one statement per table
         users_with_plays = int(
             s.query(func.count(func.distinct(PlayHistory.user_id))).scalar() or 0
         )
-        users_with_bookmarks = int(
-            s.query(func.count(func.distinct(Bookmark.user_id))).scalar() or 0
-        )
-        users_with_follows = int(
-            s.query(func.count(func.distinct(UserArtistFollow.user_id))).scalar() or 0
-        )
+        users_with_bookmarks, recent_bookmarks_24h = s.query(
+            func.count(func.distinct(Bookmark.user_id)),
+            func.count(Bookmark.id).filter(Bookmark.created_at >= day_ago),
+        ).one()
+        users_with_follows, recent_follows_24h = s.query(
+            func.count(func.distinct(UserArtistFollow.user_id)),
+            func.count(UserArtistFollow.id).filter(UserArtistFollow.created_at >= day_ago),
+        ).one()
         users_with_tips = int(
             s.query(func.count(func.distinct(Tip.user_id))).scalar() or 0
         )
 
-        # Recent activity (last 24h)
-        recent_plays_24h = int(
-            s.query(func.count(PlayHistory.id))
-            .filter(PlayHistory.played_at >= (now - timedelta(days=1)))
-            .scalar() or 0
-        )
-        recent_bookmarks_24h = int(
-            s.query(func.count(Bookmark.id))
-            .filter(Bookmark.created_at >= (now - timedelta(days=1)))
-            .scalar() or 0
-        )
-        recent_follows_24h = int(
-            s.query(func.count(UserArtistFollow.id))
-            .filter(UserArtistFollow.created_at >= (now - timedelta(days=1)))
-            .scalar() or 0
-        )
-
     return jsonify({
         "top_users": [
             {
@@ -4310,14 +4145,14 @@ def admin_analytics():
         },
         "user_engagement": {
             "users_with_plays": users_with_plays,
-            "users_with_bookmarks": users_with_bookmarks,
-            "users_with_follows": users_with_follows,
+            "users_with_bookmarks": int(users_with_bookmarks or 0),
+            "users_with_follows": int(users_with_follows or 0),
             "users_with_tips": users_with_tips,
         },
         "recent_24h": {
             "plays": recent_plays_24h,
-            "bookmarks": recent_bookmarks_24h,
-            "follows": recent_follows_24h,
+            "bookmarks": int(recent_bookmarks_24h or 0),
+            "follows": int(recent_follows_24h or 0),
         },
     })
 
@@ -4921,7 +4756,7 @@ def beta_signup():
         if not email or '@' not in email:
             return jsonify({"error": "Valid email is required"}), 400
             
-        from services.emailer import send_email
+        from services.mail_queue import send as send_email
         from db import get_session
         from flask_login import current_user
         
@@ -4969,6 +4804,8 @@ def beta_signup():
 # --- SPA (Vue) fallback: serve index.html for client routes; assets from spa-dist ---
 # Registered last so they only match when no other route does.
 _SPA_DIST = Path(__file__).resolve().parent / "spa-dist"
+_SPA_INDEX = StaticIndex(_SPA_DIST, precompressed=True)
+_SPA_ASSETS_INDEX = StaticIndex(_SPA_DIST / "assets", precompressed=True, hashed_names=True)
 
 
 def _spa_dist_ready():
@@ -4984,9 +4821,10 @@ def spa_assets(filename):
     assets_dir = _SPA_DIST / "assets"
     if not assets_dir.is_dir():
         abort(404)
-    response = send_from_directory(str(assets_dir), filename)
-    # Vite assets are hashed, so we can cache them for a long time (1 year)
-    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    # Vite assets are hashed, so the index caches them for a long time (1 year)
+    response = _SPA_ASSETS_INDEX.serve(filename, request)
+    if response is None:
+        abort(404)
     return response
 
 @app.route("/favicon.ico")
@@ -5025,14 +4863,16 @@ def spa_fallback(path):
         "api/", "static/", "assets/", "ops/", "downloads/", "admin", "checkout", "success",
         "healthz", "readyz", "refresh", "offline", "payments/", "sitemap", "robots.txt",
         "favicon.ico", "manifest.webmanifest", "googleb3a3eb3401de50dc.html",
-        "auth", "feedback", "contact", "cast", "debug",
+        "auth", "feedback", "contact", "cast", "debug", "proxy/", "img/", "feeds/",
     )
     path_lower = (path or "").strip().lower()
     if any(path_lower.startswith(p) or path_lower == p.rstrip("/") for p in server_prefixes):
         abort(404)
-    response = send_from_directory(str(_SPA_DIST), "index.html", mimetype="text/html")
     # SPA entry point should not be cached long, to ensure users get updates.
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+    response = _SPA_INDEX.serve("index.html", request, mimetype="text/html",
+                                cache_control="no-cache, no-store, must-revalidate")
+    if response is None:
+        abort(404)
     return response
 
 
@@ -1,8 +1,8 @@
 from flask import Blueprint, jsonify, request, current_app, make_response
 from flask_login import login_required, current_user
-from sqlalchemy import text
+from sqlalchemy import func, text
 from db import get_session
-from datetime import datetime
+from datetime import datetime, timedelta
 from models import (
     User, Tip, Purchase, Feedback, ArtistClaim, ArtistTip, AnalyticsEvent,
     Track, Show, ContentArtist, Event, ContentMerch, ContentVideo, WhatsNewItem,
@@ -19,19 +19,83 @@ def admin_only(f):
 
 @bp.route('/stats', methods=['GET'])
 def get_stats():
+    """Dashboard counts.
+
+    Time-bucketed counts (plays, sessions, sign-ups, orders by status) come
+    from the hourly rollups (services/rollups.py) in one conditional-aggregation
+    pass; current totals that rows can leave (users, bookmarks, follows) and
+    sums are queried live, one statement per table.
+    """
+    from datetime import timezone
+    from models import PlayHistory, ListeningTotal, Bookmark, UserArtistFollow
+    from services.rollups import rollup_summary, summary_value
+
+    now = datetime.now(timezone.utc)
+    active_since = now - timedelta(days=30)
+    week_ago = (now - timedelta(days=7)).replace(tzinfo=None)
+    day_ago = (now - timedelta(days=1)).replace(tzinfo=None)
+
     with get_session() as session:
-        user_count = session.query(User).count()
-        tip_count = session.query(Tip).count()
-        purchase_count = session.query(Purchase).count()
-        revenue = session.execute(text("SELECT SUM(total) FROM purchases WHERE status = 'paid'")).scalar() or 0
-        tip_total = session.execute(text("SELECT SUM(amount) FROM tips")).scalar() or 0
-        
+        rollups = rollup_summary(session, {"7d": week_ago, "24h": day_ago})
+
+        # Current users (a live count: deleted users drop out) and the active ones, in one pass
+        user_count, active_users = session.query(
+            func.count(User.id),
+            func.count(User.id).filter(User.last_active_at >= active_since),
+        ).one()
+        # One statement per table: count and sum in the same pass
+        tip_count, tip_total = session.query(
+            func.count(Tip.id), func.coalesce(func.sum(Tip.amount), 0)
+        ).one()
+        purchase_count, revenue = session.query(
+            func.count(Purchase.id),
+            func.coalesce(func.sum(Purchase.total).filter(Purchase.status == 'paid'), 0),
+        ).one()
+        unique_tracks_played = session.query(
+            func.count(func.distinct(PlayHistory.media_id))
+        ).filter(PlayHistory.media_type == 'track').scalar() or 0
+        total_listening_seconds = int(session.query(func.sum(ListeningTotal.total_seconds)).scalar() or 0)
+        total_bookmarks = session.query(func.count(Bookmark.id)).scalar() or 0
+        total_follows = session.query(func.count(UserArtistFollow.id)).scalar() or 0
+
     return jsonify({
-        'users': user_count,
-        'tips': tip_count,
-        'purchases': purchase_count,
+        'users': int(user_count or 0),
+        'tips': int(tip_count or 0),
+        'purchases': int(purchase_count or 0),
         'revenue': float(revenue),
-        'tip_total': float(tip_total)
+        'tip_total': float(tip_total),
+        'user_stats': {
+            'total': int(user_count or 0),
+            'active_30d': int(active_users or 0),
+            'new_7d': summary_value(rollups, 'new_users', '7d'),
+            'new_24h': summary_value(rollups, 'new_users', '24h'),
+        },
+        'orders': {
+            'total': summary_value(rollups, 'orders'),
+            'pending': summary_value(rollups, 'orders', dimension='pending'),
+            'paid': summary_value(rollups, 'orders', dimension='paid'),
+            'fulfilled': summary_value(rollups, 'orders', dimension='fulfilled'),
+        },
+        'plays': {
+            'total': summary_value(rollups, 'plays'),
+            'last_7d': summary_value(rollups, 'plays', '7d'),
+            'last_24h': summary_value(rollups, 'plays', '24h'),
+            'unique_tracks': int(unique_tracks_played),
+        },
+        'listening': {
+            'total_hours': round(total_listening_seconds / 3600, 1),
+            'total_seconds': total_listening_seconds,
+            'total_sessions': summary_value(rollups, 'sessions'),
+            'sessions_7d': summary_value(rollups, 'sessions', '7d'),
+            'radio_sessions': summary_value(rollups, 'sessions', dimension='radio'),
+            'manual_sessions': summary_value(rollups, 'sessions', dimension='manual'),
+        },
+        'engagement': {
+            'bookmarks': int(total_bookmarks),
+            'follows': int(total_follows),
+            'tips': int(tip_count or 0),
+            'tip_amount': round(float(tip_total), 2),
+        },
     })
 
 @bp.route('/activity', methods=['GET'])
@@ -158,23 +222,44 @@ def track_event():
         session.commit()
     return jsonify({'ok': True})
 
+HEATMAP_DEFAULT_DAYS = 30
+HEATMAP_MAX_DAYS = 366
+HEATMAP_MAX_LIMIT = 200
+
+
 @bp.route('/heatmap', methods=['GET'])
 def get_heatmap():
-    # Aggregated page views by path
+    """Top paths by page views over a bounded UTC date window.
+
+    Query params: ``start``/``end`` (YYYY-MM-DD, inclusive) or ``days``
+    (default 30, ending today), ``event_type`` (default page_view), ``limit``.
+    """
+    from services.rollups import top_paths, utcnow
+
+    today = utcnow().date()
+    try:
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else today
+        if request.args.get('start'):
+            start = datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+        else:
+            days = int(request.args.get('days', HEATMAP_DEFAULT_DAYS))
+            if days < 1:
+                return jsonify({'error': 'days must be at least 1'}), 400
+            start = end - timedelta(days=days - 1)
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({'error': 'Invalid date or number (dates are YYYY-MM-DD)'}), 400
+
+    if start > end:
+        return jsonify({'error': 'start must be on or before end'}), 400
+    if (end - start).days + 1 > HEATMAP_MAX_DAYS:
+        return jsonify({'error': f'Window too large (max {HEATMAP_MAX_DAYS} days)'}), 400
+    limit = max(1, min(limit, HEATMAP_MAX_LIMIT))
+    event_type = request.args.get('event_type', 'page_view')
+
     with get_session() as session:
-        # Group by path and count, filter by last 30 days
-        # SQLAlchemy simplified grouping
-        results = session.execute(text("""
-            SELECT path, COUNT(*) as count 
-            FROM analytics_events 
-            WHERE event_type = 'page_view' 
-            GROUP BY path 
-            ORDER BY count DESC 
-            LIMIT 50
-        """)).fetchall()
-        
-        heatmap_data = [{'path': r[0], 'count': r[1]} for r in results]
-        return jsonify(heatmap_data)
+        heatmap_data = top_paths(session, event_type, start, end, limit=limit)
+    return jsonify(heatmap_data)
 
 @bp.route('/users/<int:user_id>/toggle_status', methods=['POST'])
 def toggle_user_status(user_id):
@@ -195,32 +280,36 @@ def toggle_user_status(user_id):
 
 @bp.route('/users/export', methods=['GET'])
 def export_users_csv():
-    import csv
-    import io
-    from flask import make_response
-    
-    with get_session() as session:
-        users = session.query(User).order_by(User.created_at.desc()).all()
-        
-        si = io.StringIO()
-        cw = csv.writer(si)
-        cw.writerow(['ID', 'Email', 'Username', 'Joined', 'Is Admin', 'Status', 'Wallet Balance'])
-        
-        for u in users:
-            cw.writerow([
-                u.id, 
-                u.email, 
-                u.username or '', 
-                u.created_at.isoformat(), 
-                'Yes' if u.is_admin else 'No',
-                'Disabled' if u.disabled else 'Active',
-                u.wallet_balance
-            ])
-            
-        output = make_response(si.getvalue())
-        output.headers["Content-Disposition"] = "attachment; filename=users_export.csv"
-        output.headers["Content-type"] = "text/csv"
-        return output
+    """Stream all users as CSV (``?gzip=1`` compresses on the fly)."""
+    from sqlalchemy import select
+    from utils.streaming import EXPORT_YIELD_PER, csv_response
+
+    def rows():
+        # Opened lazily, once the response starts streaming; yield_per uses a
+        # server-side cursor on Postgres so rows are never all in memory.
+        with get_session() as session:
+            result = session.execute(
+                select(
+                    User.id, User.email, User.username, User.created_at,
+                    User.is_admin, User.disabled, User.wallet_balance,
+                ).order_by(User.created_at.desc()).execution_options(yield_per=EXPORT_YIELD_PER)
+            )
+            for u in result:
+                yield [
+                    u.id,
+                    u.email,
+                    u.username or '',
+                    u.created_at.isoformat(),
+                    'Yes' if u.is_admin else 'No',
+                    'Disabled' if u.disabled else 'Active',
+                    u.wallet_balance,
+                ]
+
+    return csv_response(
+        'users_export.csv',
+        ['ID', 'Email', 'Username', 'Joined', 'Is Admin', 'Status', 'Wallet Balance'],
+        rows(),
+    )
 
 # ---------------------------------------------------------------------------
 # Content CRUD (Tracks, Shows, Artists, Events, Merch, Videos, What's New)
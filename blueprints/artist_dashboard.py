@@ -16,8 +16,11 @@ import json
 import os
 import uuid
 
+from sqlalchemy import func
+
 from db import get_session
 from models import ArtistClaim, Tip, User, ListeningSession, UserArtistFollow, ArtistPayout
+from services.ledger import artist_balance
 
 bp = Blueprint("artist_dashboard", __name__, url_prefix="/artist-dashboard")
 
@@ -206,18 +209,19 @@ def api_artist_stats(artist_id):
         if not claim:
             return jsonify({'error': 'Unauthorized'}), 403
 
-        # Get earnings
-        tips = db_session.query(Tip).filter(Tip.artist_id == artist_id).all()
-        total_earnings = sum(float(t.artist_payout or t.amount) for t in tips)
-        total_boosts = len(tips)
-        pending_payout = total_earnings  # TODO: subtract completed payouts
+        # Get earnings (single ledger row)
+        balance = artist_balance(db_session, artist_id)
+        total_earnings = balance['total_earned']
+        total_boosts = balance['boost_count']
 
         # Get completed payouts
-        payouts = db_session.query(ArtistPayout).filter(
+        total_paid_out = db_session.query(
+            func.coalesce(func.sum(ArtistPayout.amount), 0)
+        ).filter(
             ArtistPayout.artist_id == artist_id,
             ArtistPayout.status == 'completed'
-        ).all()
-        total_paid_out = sum(float(p.amount) for p in payouts)
+        ).scalar()
+        total_paid_out = Decimal(str(total_paid_out))
         pending_payout = total_earnings - total_paid_out
 
         # Get follower count
@@ -248,15 +252,17 @@ def api_artist_stats(artist_id):
             total_listen_time = sum(s.seconds or 0 for s in sessions)
 
         # Recent boosts
-        recent_tips = sorted(tips, key=lambda t: t.created_at or datetime.min, reverse=True)[:10]
+        recent_tips = db_session.query(Tip).filter(
+            Tip.artist_id == artist_id
+        ).order_by(Tip.created_at.desc()).limit(10).all()
 
         return jsonify({
             'artist_id': artist_id,
             'artist_name': claim.artist_name,
             'earnings': {
-                'total': round(total_earnings, 2),
-                'pending_payout': round(pending_payout, 2),
-                'total_paid_out': round(total_paid_out, 2),
+                'total': float(total_earnings),
+                'pending_payout': float(pending_payout),
+                'total_paid_out': float(total_paid_out),
                 'boost_count': total_boosts,
             },
             'audience': {
@@ -7,6 +7,8 @@ from decimal import Decimal
 from datetime import datetime
 from db import get_session
 from models import Tip, User, UserArtistPosition, WalletTransaction
+from services import wallet, webhook_inbox
+from services.ledger import artist_balance, record_tip, user_boost_total
 from services.user_resolver import resolve_db_user_id
 from utils.fees import (
     PLATFORM_FEE_PERCENT,
@@ -186,7 +188,11 @@ def create_boost_session():
 
 @bp.route("/webhook", methods=["POST"])
 def stripe_webhook():
-    """Handle Stripe webhook events."""
+    """
+    Handle Stripe webhook events.
+    Verifies the signature, stores the event in the webhook inbox and returns
+    immediately; process_webhook_event records the boost from a worker.
+    """
     if not stripe.api_key:
         return jsonify({"error": "Stripe not configured"}), 500
 
@@ -214,7 +220,16 @@ def stripe_webhook():
         except stripe.error.SignatureVerificationError:
             return jsonify({"error": "Invalid signature"}), 400
 
-    # Handle the event
+    webhook_inbox.receive(current_app._get_current_object(), "payments", payload)
+    return jsonify({"status": "received"}), 200
+
+
+def process_webhook_event(event: dict) -> None:
+    """
+    Fulfil one inbox event: record a boost checkout as a Tip, update the
+    user's artist position and notify the artist.
+    Idempotent by checkout session id; raising schedules a retry.
+    """
     if event["type"] == "checkout.session.completed":
         session_data = event["data"]["object"]
         # Idempotency guard (stripe_checkout_session_id is unique)
@@ -222,7 +237,7 @@ def stripe_webhook():
             with get_session() as db_session:
                 existing = db_session.query(Tip).filter(Tip.stripe_checkout_session_id == session_data.get("id")).first()
                 if existing:
-                    return jsonify({"status": "received"}), 200
+                    return
         except Exception:
             pass
         metadata = session_data.get("metadata", {})
@@ -252,8 +267,9 @@ def stripe_webhook():
                 platform_revenue_str = fee_str
 
         if not all([artist_id, boost_amount_str, stripe_fee_str, platform_fee_str, total_paid_str]):
+            # Nothing to persist, and retrying will not help
             print(f"⚠️  Missing metadata in webhook: {metadata}")
-            return jsonify({"error": "Missing metadata"}), 400
+            return
 
         # Parse user_id (may be empty for guest tips)
         user_id = int(user_id_str) if user_id_str and user_id_str.isdigit() else None
@@ -278,6 +294,7 @@ def stripe_webhook():
                     created_at=tip_datetime,
                 )
                 db_session.add(tip)
+                record_tip(db_session, tip)
                 
                 # Update or create user artist position (use boost_amount, not net)
                 if user_id:
@@ -329,18 +346,17 @@ def stripe_webhook():
                     # Don't fail webhook if notification fails
                     import logging
                     logging.error(f"Failed to send boost notification: {notify_error}", exc_info=True)
-                
-                return jsonify({"status": "success"}), 200
 
         except Exception as e:
             print(f"❌ Error recording boost: {e}")
-            return jsonify({"error": str(e)}), 500
+            raise
 
     elif event["type"] == "payment_intent.succeeded":
         # Additional handling if needed
         pass
 
-    return jsonify({"status": "received"}), 200
+
+webhook_inbox.register_handler("payments", process_webhook_event)
 
 
 @bp.route("/success")
@@ -383,6 +399,7 @@ def payment_success():
                             created_at=datetime.utcnow(),
                         )
                         db_session.add(tip)
+                        record_tip(db_session, tip)
                         
                         if user_id:
                             update_user_artist_position(
@@ -500,12 +517,11 @@ def get_user_total_boosts():
 
     try:
         with get_session() as db_session:
-            tips = db_session.query(Tip).filter(Tip.user_id == user_id).all()
-            total = sum(float(tip.amount) for tip in tips)
-            is_supporter = total >= 10.0
+            total = user_boost_total(db_session, user_id)["total_boosted"]
+            is_supporter = total >= Decimal("10.00")
 
             return jsonify({
-                "total_boosts": round(total, 2),
+                "total_boosts": float(total),
                 "is_supporter": is_supporter,
             }), 200
     except Exception as e:
@@ -517,18 +533,14 @@ def get_artist_boosts(artist_id):
     """Get boost statistics for an artist."""
     try:
         with get_session() as db_session:
-            tips = db_session.query(Tip).filter(Tip.artist_id == str(artist_id)).all()
-            total_amount = sum(float(tip.amount) for tip in tips)
-            total_net = sum(float(tip.net_amount) for tip in tips if tip.net_amount)
-            total_payout = sum(float(tip.artist_payout) for tip in tips if tip.artist_payout)
-            boost_count = len(tips)
+            balance = artist_balance(db_session, artist_id)
 
             return jsonify({
                 "artist_id": artist_id,
-                "total_boosts": round(total_amount, 2),
-                "total_net": round(total_net, 2),
-                "total_payout": round(total_payout, 2),  # Total artist should receive
-                "boost_count": boost_count,
+                "total_boosts": float(balance["total_boosted"]),
+                "total_net": float(balance["total_net"]),
+                "total_payout": float(balance["total_payout"]),  # Total artist should receive
+                "boost_count": balance["boost_count"],
             }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -542,20 +554,18 @@ def get_artist_earnings(artist_id):
     """
     try:
         with get_session() as db_session:
-            tips = db_session.query(Tip).filter(Tip.artist_id == str(artist_id)).all()
-            
-            total_payout = sum(float(tip.artist_payout) for tip in tips if tip.artist_payout)
-            total_boosts = sum(float(tip.amount) for tip in tips)
-            boost_count = len(tips)
+            balance = artist_balance(db_session, artist_id)
             
             # Get recent tips
-            recent_tips = sorted(tips, key=lambda t: t.created_at or datetime.min, reverse=True)[:10]
+            recent_tips = db_session.query(Tip).filter(
+                Tip.artist_id == str(artist_id)
+            ).order_by(Tip.created_at.desc()).limit(10).all()
             
             return jsonify({
                 "artist_id": artist_id,
-                "total_earnings": round(total_payout, 2),  # Total amount artist should receive
-                "total_boosted": round(total_boosts, 2),  # Total amount users boosted
-                "boost_count": boost_count,
+                "total_earnings": float(balance["total_payout"]),  # Total amount artist should receive
+                "total_boosted": float(balance["total_boosted"]),  # Total amount users boosted
+                "boost_count": balance["boost_count"],
                 "recent_tips": [
                     {
                         "id": tip.id,
@@ -696,38 +706,18 @@ def fund_wallet():
 def deduct_wallet_balance(user_id: int, amount: Decimal, description: str = "Payment", reference_id: str = None, reference_type: str = "payment"):
     """
     Helper function to deduct from wallet balance.
+    One conditional UPDATE ... RETURNING (services/wallet.py), so concurrent
+    spends cannot overdraw the wallet.
     Returns (success: bool, error: str or None, balance_after: Decimal or None)
     """
     try:
         with get_session() as db_session:
-            user = db_session.query(User).filter(User.id == user_id).first()
-            if not user:
-                return False, "User not found", None
-
-            balance_before = Decimal(str(user.wallet_balance or 0))
-            
-            if balance_before < amount:
+            balance_after = wallet.debit(db_session, user_id, amount, description, reference_id, reference_type)
+            if balance_after is None:
+                if wallet.balance(db_session, user_id) is None:
+                    return False, "User not found", None
                 return False, "Insufficient wallet balance", None
-
-            # Deduct from wallet
-            balance_after = balance_before - amount
-            user.wallet_balance = balance_after
-
-            # Create transaction record
-            transaction = WalletTransaction(
-                user_id=user_id,
-                type="spend",
-                amount=amount,
-                balance_before=balance_before,
-                balance_after=balance_after,
-                description=description,
-                reference_id=reference_id,
-                reference_type=reference_type,
-                created_at=datetime.utcnow(),
-            )
-            db_session.add(transaction)
             db_session.commit()
-
             return True, None, balance_after
 
     except Exception as e:
@@ -763,8 +753,7 @@ def use_wallet():
     if not success:
         if error == "Insufficient wallet balance":
             with get_session() as db_session:
-                user = db_session.query(User).filter(User.id == user_id).first()
-                balance = float(user.wallet_balance or 0) if user else 0
+                balance = float(wallet.balance(db_session, user_id) or 0)
             return jsonify({
                 "error": error,
                 "balance": balance,
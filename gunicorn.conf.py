@@ -10,7 +10,10 @@ backlog = 2048
 
 # Worker processes
 workers = min(multiprocessing.cpu_count() * 2 + 1, 4)  # Max 4 workers for free tier
-worker_class = "sync"
+# Threaded workers: a long /proxy/audio stream holds one thread, not the whole
+# worker (the proxy itself is capped by AUDIO_PROXY_MAX_CONCURRENT per worker).
+worker_class = "gthread"
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
 worker_connections = 1000
 timeout = 120
 keepalive = 2
@@ -58,7 +61,7 @@ graceful_timeout = 30
 def on_starting(server):
     server.log.info("🚀 Starting Ahoy Indie Media with Gunicorn")
     server.log.info(f"📍 Binding to: {server.address}")
-    server.log.info(f"👥 Workers: {server.cfg.workers}")
+    server.log.info(f"👥 Workers: {server.cfg.workers} x {server.cfg.threads} threads")
     server.log.info(f"⏱️  Timeout: {server.cfg.timeout}s")
     server.log.info(f"🔄 Max requests per worker: {server.cfg.max_requests}")
 
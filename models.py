@@ -4,6 +4,7 @@ from sqlalchemy import (
     Column,
     Integer,
     String,
+    Date,
     DateTime,
     ForeignKey,
     UniqueConstraint,
@@ -13,6 +14,7 @@ from sqlalchemy import (
     BigInteger,
     Numeric,
     Float,
+    Text,
 )
 from sqlalchemy.orm import declarative_base, relationship
 import uuid
@@ -300,6 +302,42 @@ class UserArtistPosition(Base):
         self.last_tip = value
 
 
+class ArtistBalance(Base):
+    """
+    Running tip totals per artist, incremented by services/ledger.py in the
+    same transaction that records each Tip. Earnings endpoints read this one
+    row instead of summing every tip; scripts/reconcile_ledger.py checks it
+    against the tips table.
+    """
+    __tablename__ = 'artist_balances'
+
+    artist_id = Column(String(255), primary_key=True)  # Same key as Tip.artist_id
+    total_boosted = Column(Numeric(12, 2), nullable=False, default=0)  # sum(Tip.amount)
+    total_net = Column(Numeric(12, 2), nullable=False, default=0)  # sum(Tip.net_amount)
+    total_payout = Column(Numeric(12, 2), nullable=False, default=0)  # sum(Tip.artist_payout)
+    total_earned = Column(Numeric(12, 2), nullable=False, default=0)  # sum(artist_payout, falling back to amount)
+    boost_count = Column(Integer, nullable=False, default=0)
+    last_tip_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<ArtistBalance artist_id={self.artist_id} earned={self.total_earned} count={self.boost_count}>"
+
+
+class UserBoostTotal(Base):
+    """Running boost totals per user (supporter badge), maintained alongside ArtistBalance."""
+    __tablename__ = 'user_boost_totals'
+
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    total_boosted = Column(Numeric(12, 2), nullable=False, default=0)  # sum(Tip.amount)
+    boost_count = Column(Integer, nullable=False, default=0)
+    last_boost_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<UserBoostTotal user_id={self.user_id} total={self.total_boosted} count={self.boost_count}>"
+
+
 class Purchase(Base):
     __tablename__ = 'purchases'
 
@@ -314,6 +352,8 @@ class Purchase(Base):
     stripe_id = Column(String(255), nullable=True, index=True)
     status = Column(String(50), nullable=False, default="pending", index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # Set on every change (status, fulfillment); the orders rollup re-counts touched buckets
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True, index=True)
     
     # Shipping address fields
     shipping_name = Column(String(255), nullable=True)
@@ -384,8 +424,11 @@ class ArtistPayout(Base):
     id = Column(Integer, primary_key=True)
     artist_id = Column(String(255), nullable=False, index=True)  # Artist slug or ID
     amount = Column(Numeric(10, 2), nullable=False)  # Amount to pay out
-    status = Column(String(50), nullable=False, default="pending", index=True)  # pending, processing, completed, failed
+    status = Column(String(50), nullable=False, default="pending", index=True)  # pending (manual), queued, submitted, completed, failed
     stripe_transfer_id = Column(String(255), nullable=True, unique=True, index=True)  # Stripe Transfer ID if using Stripe Connect
+    idempotency_key = Column(String(100), nullable=True, unique=True, index=True)  # Derived from artist + covered tip ids (services/payout_executor.py)
+    retry_round = Column(Integer, nullable=False, default=0)  # Bumped when a failed transfer is queued again (new Stripe idempotency key)
+    stripe_destination = Column(String(255), nullable=True)  # Connected account the transfer is sent to
     stripe_payout_id = Column(String(255), nullable=True, index=True)  # Stripe Payout ID
     payment_method = Column(String(50), nullable=True)  # stripe_connect, manual, bank_transfer, etc.
     payment_reference = Column(String(255), nullable=True)  # Reference number for manual payments
@@ -407,6 +450,25 @@ class ArtistPayout(Base):
         )
 
 
+class PayoutTip(Base):
+    """
+    Link table: which tips a payout covers.
+    Normalized form of ArtistPayout.related_tip_ids, so pending tips can be
+    found with one anti-join instead of unpacking JSON arrays in Python.
+    """
+    __tablename__ = 'payout_tips'
+
+    payout_id = Column(Integer, ForeignKey('artist_payouts.id', ondelete='CASCADE'), primary_key=True)
+    tip_id = Column(Integer, ForeignKey('tips.id', ondelete='CASCADE'), primary_key=True)
+
+    __table_args__ = (
+        Index('ix_payout_tips_tip_id', 'tip_id'),
+    )
+
+    def __repr__(self) -> str:
+        return f"<PayoutTip payout_id={self.payout_id} tip_id={self.tip_id}>"
+
+
 class ArtistClaim(Base):
     """
     Links a user account to an artist profile.
@@ -720,12 +782,129 @@ class AnalyticsEvent(Base):
 
     __table_args__ = (
         Index('ix_analytics_events_type_created_at', 'event_type', 'created_at'),
+        # Covers windowed heatmap queries (filter by type + time, group by path)
+        Index('ix_analytics_events_type_created_at_path', 'event_type', 'created_at', 'path'),
     )
 
     def __repr__(self) -> str:
         return f"<AnalyticsEvent id={self.id} type={self.event_type} path={self.path}>"
 
 
+class AnalyticsDailyPath(Base):
+    """
+    Per-day event counts by path, materialized from analytics_events.
+    Rebuilt by services/rollups.py so the admin heatmap never scans raw events
+    for completed days.
+    """
+    __tablename__ = 'analytics_daily_paths'
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)  # UTC date
+    event_type = Column(String(50), nullable=False)
+    path = Column(String(255), nullable=False, default='')
+    count = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint('day', 'event_type', 'path', name='uq_analytics_daily_paths_day_type_path'),
+        Index('ix_analytics_daily_paths_type_day', 'event_type', 'day'),
+    )
+
+    def __repr__(self) -> str:
+        return f"<AnalyticsDailyPath day={self.day} type={self.event_type} path={self.path} count={self.count}>"
+
+
+class StatsRollup(Base):
+    """
+    Hourly pre-aggregated counters for the admin dashboard.
+    Rebuilt per bucket by services/rollups.py (cron + backfill script) so the
+    admin endpoints read a few small rows instead of scanning the event tables.
+    """
+    __tablename__ = 'stats_rollups'
+
+    id = Column(Integer, primary_key=True)
+    metric = Column(String(50), nullable=False)  # plays, sessions, new_users, orders
+    bucket_start = Column(DateTime, nullable=False)  # UTC, truncated to the hour
+    dimension = Column(String(50), nullable=False, default='')  # media_type, source, order status
+    count = Column(BigInteger, nullable=False, default=0)
+    total = Column(BigInteger, nullable=False, default=0)  # summed seconds (sessions only)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('metric', 'bucket_start', 'dimension', name='uq_stats_rollups_bucket'),
+        Index('ix_stats_rollups_metric_bucket_start', 'metric', 'bucket_start'),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<StatsRollup metric={self.metric} bucket={self.bucket_start} "
+            f"dimension={self.dimension} count={self.count}>"
+        )
+
+
+class RetentionWatermark(Base):
+    """
+    How far back an event table has been pruned by services/retention.py.
+    Rows older than ``pruned_before`` are gone, so rollup refreshes must not
+    rebuild buckets before it.
+    """
+    __tablename__ = 'retention_watermarks'
+
+    table_name = Column(String(64), primary_key=True)  # analytics_events, play_history, listening_sessions
+    pruned_before = Column(DateTime, nullable=False)  # UTC, first day of a month
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<RetentionWatermark table={self.table_name} pruned_before={self.pruned_before}>"
+
+
+class WebhookEvent(Base):
+    """
+    Durable inbox of received webhook events (services/webhook_inbox.py).
+    Keyed by (source, Stripe event id), so redeliveries are dropped on insert
+    while each endpoint keeps its own copy of an event sent to both; the
+    endpoint acknowledges as soon as the row is committed and workers do the
+    fulfilment afterwards, with retries.
+    """
+    __tablename__ = 'webhook_inbox'
+
+    source = Column(String(50), primary_key=True)  # handler that processes it: webhooks, payments
+    id = Column(String(255), primary_key=True)  # Stripe event id
+    event_type = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False)  # raw, signature-verified JSON body
+    status = Column(String(20), nullable=False, default='pending')  # pending, processing, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    received_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = Column(DateTime, nullable=True)  # set while a worker holds it
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_webhook_inbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self) -> str:
+        return f"<WebhookEvent id={self.id} type={self.event_type} status={self.status} attempts={self.attempts}>"
+
+
+class GcsSyncObject(Base):
+    """
+    Checkpoint for services/gcs_sync.py: the generation of each media blob
+    (and its .json sidecar) as of the last sync, so unchanged blobs are
+    skipped on the next run.
+    """
+    __tablename__ = 'gcs_sync_objects'
+
+    bucket = Column(String(255), primary_key=True)
+    name = Column(String(1024), primary_key=True)  # media blob path
+    generation = Column(BigInteger, nullable=False)
+    metadata_generation = Column(BigInteger, nullable=True)  # sidecar, if any
+    synced_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<GcsSyncObject {self.bucket}/{self.name} generation={self.generation}>"
+
+
 class BetaSignup(Base):
     """
     Tracks interest in the beta program.
@@ -4,6 +4,7 @@ from flask import Blueprint, jsonify, request, current_app
 import stripe
 from db import get_session
 from models import Tip
+from services.ledger import record_tip
 from datetime import datetime
 from services.user_resolver import resolve_db_user_id
 from utils.fees import calculate_boost_fees
@@ -135,6 +136,7 @@ def confirm_boost_record():
                 created_at=tip_datetime,
             )
             db_session.add(tip)
+            record_tip(db_session, tip)
             if user_id:
                 # Update portfolio position
                 from blueprints.payments import update_user_artist_position
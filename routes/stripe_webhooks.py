@@ -1,10 +1,14 @@
 import os
 import json
+import logging
 from decimal import Decimal
 from flask import Blueprint, request, jsonify, current_app
 import stripe
 from db import get_session
 from models import Tip, User, WalletTransaction
+from services import wallet, webhook_inbox
+from services.ledger import record_tip
+from services.merch_catalog import mark_purchased as mark_merch_purchased
 from datetime import datetime
 from decimal import Decimal
 from urllib import request as urlrequest
@@ -44,7 +48,8 @@ def _configure_stripe_from_config():
 def handle_stripe_webhook():
     """
     Stripe webhook endpoint. No auth required.
-    Focus on payment_intent.succeeded to record Boost.
+    Verifies the signature, stores the event in the webhook inbox and returns
+    immediately; process_event does the fulfilment from a worker.
     """
     _configure_stripe_from_config()
     payload = request.data
@@ -67,6 +72,17 @@ def handle_stripe_webhook():
         except stripe.error.SignatureVerificationError:
             return jsonify({"error": "Invalid signature"}), 400
 
+    webhook_inbox.receive(current_app._get_current_object(), "webhooks", payload)
+    return jsonify({"status": "ok"}), 200
+
+
+def process_event(event: dict) -> None:
+    """
+    Fulfil one inbox event: record boosts (payment_intent.succeeded and boost
+    checkouts), mark purchases paid and credit wallet funding.
+    Safe to re-run: every write is guarded by a Stripe id.
+    Raising schedules a retry.
+    """
     if event["type"] == "checkout.session.completed":
         session_data = event["data"]["object"]
         metadata = session_data.get("metadata", {}) or {}
@@ -84,28 +100,27 @@ def handle_stripe_webhook():
                     
                     with get_session() as db_session:
                         user = db_session.query(User).filter(User.id == user_id).first()
-                        if user:
-                            balance_before = Decimal(str(user.wallet_balance or 0))
-                            balance_after = balance_before + amount
-                            user.wallet_balance = balance_after
-                            
-                            # Create transaction record
-                            transaction = WalletTransaction(
-                                user_id=user_id,
-                                type="fund",
-                                amount=amount,
-                                balance_before=balance_before,
-                                balance_after=balance_after,
-                                description=f"Wallet funding via Stripe",
+                        already_credited = db_session.query(WalletTransaction.id).filter(
+                            WalletTransaction.reference_id == session_id,
+                            WalletTransaction.reference_type == "stripe_checkout",
+                            WalletTransaction.type == "fund",
+                        ).first()
+                        if already_credited:
+                            logging.info(f"Wallet funding already recorded for session {session_id}")
+                        elif user:
+                            # Atomic increment + transaction record (services/wallet.py)
+                            balance_after = wallet.credit(
+                                db_session,
+                                user_id,
+                                amount,
+                                description="Wallet funding via Stripe",
                                 reference_id=session_id,
                                 reference_type="stripe_checkout",
-                                created_at=datetime.utcnow(),
                             )
-                            db_session.add(transaction)
+                            balance_before = balance_after - amount
                             db_session.commit()
                             
                             # Log successful wallet funding
-                            import logging
                             logging.info(f"Wallet funded: user_id={user_id}, amount=${amount:.2f}, balance_before=${balance_before:.2f}, balance_after=${balance_after:.2f}, session_id={session_id}")
                             
                             # Send email notification
@@ -123,19 +138,16 @@ def handle_stripe_webhook():
                                 # Don't fail webhook if notification fails
                                 logging.error(f"Failed to send wallet funding notification: {notify_error}", exc_info=True)
                         else:
-                            import logging
                             logging.error(f"Wallet funding failed: User {user_id} not found for session {session_id}")
                 except Exception as e:
-                    # Log error but don't fail webhook
-                    import logging
-                    import traceback
+                    # Retried from the inbox
                     logging.error(f"Error processing wallet funding: {e}", exc_info=True)
-                    logging.error(f"Wallet funding error details: user_id={user_id_str}, amount={amount_str}, session_id={session_id}, traceback={traceback.format_exc()}")
+                    logging.error(f"Wallet funding error details: user_id={user_id_str}, amount={amount_str}, session_id={session_id}")
+                    raise
             else:
-                import logging
                 logging.warning(f"Wallet funding webhook missing required metadata: user_id={user_id_str}, amount={amount_str}, session_id={session_id}")
             
-            return jsonify({"status": "ok"}), 200
+            return
 
         purchase_id = metadata.get("purchase_id")
         purchase_type = (metadata.get("type") or "").strip()
@@ -168,6 +180,7 @@ def handle_stripe_webhook():
                         db_session.commit()
                         # Notify admins for non-tip purchases (merch, tickets, etc.)
                         if str(p.type or "").strip() == "merch":
+                            mark_merch_purchased(p.item_id)
                             _notify_admin("purchase.paid", {
                                 "purchase_id": p.id,
                                 "type": p.type,
@@ -201,7 +214,6 @@ def handle_stripe_webhook():
                                 )
                             except Exception as notify_error:
                                 # Don't fail webhook if notification fails
-                                import logging
                                 logging.error(f"Failed to send merch purchase notification: {notify_error}", exc_info=True)
             except Exception:
                 # Non-fatal for webhook: still allow boost record to proceed if applicable
@@ -225,7 +237,7 @@ def handle_stripe_webhook():
                     with get_session() as db_session:
                         existing = db_session.query(Tip).filter(Tip.stripe_checkout_session_id == session_data.get("id")).first()
                         if existing:
-                            return jsonify({"status": "ok"}), 200
+                            return
 
                         tip_datetime = datetime.utcnow()
                         tip = Tip(
@@ -244,6 +256,7 @@ def handle_stripe_webhook():
                             created_at=tip_datetime,
                         )
                         db_session.add(tip)
+                        record_tip(db_session, tip)
 
                         if user_id:
                             from blueprints.payments import update_user_artist_position
@@ -289,13 +302,12 @@ def handle_stripe_webhook():
                             )
                         except Exception as notify_error:
                             # Don't fail webhook if notification fails
-                            import logging
                             logging.error(f"Failed to send boost notification: {notify_error}", exc_info=True)
                             
-                except Exception as e:
-                    return jsonify({"error": str(e)}), 500
-
-        return jsonify({"status": "ok"}), 200
+                except Exception:
+                    logging.error(f"Error recording boost for session {session_data.get('id')}", exc_info=True)
+                    raise
+        return
 
     if event["type"] == "payment_intent.succeeded":
         intent = event["data"]["object"]
@@ -312,15 +324,16 @@ def handle_stripe_webhook():
         user_id = int(user_id_str) if user_id_str.isdigit() else None
 
         if not all([artist_id, boost_amount_str, platform_fee_str, total_paid_str]):
-            # Missing metadata; nothing to persist
-            return jsonify({"error": "Missing metadata"}), 400
+            # Missing metadata; nothing to persist (and retrying will not help)
+            logging.warning(f"payment_intent.succeeded {intent.get('id')} missing boost metadata")
+            return
 
         try:
             with get_session() as db_session:
                 # Idempotency by PaymentIntent id
                 existing = db_session.query(Tip).filter(Tip.stripe_payment_intent_id == intent.get("id")).first()
                 if existing:
-                    return jsonify({"status": "ok"}), 200
+                    return
 
                 tip_datetime = datetime.utcnow()
                 tip = Tip(
@@ -338,6 +351,7 @@ def handle_stripe_webhook():
                     created_at=tip_datetime,
                 )
                 db_session.add(tip)
+                record_tip(db_session, tip)
 
                 if user_id:
                     from blueprints.payments import update_user_artist_position
@@ -349,9 +363,11 @@ def handle_stripe_webhook():
                         db_session=db_session,
                     )
                 db_session.commit()
-        except Exception as e:
-            return jsonify({"error": str(e)}), 500
+        except Exception:
+            logging.error(f"Error recording boost for payment intent {intent.get('id')}", exc_info=True)
+            raise
 
-    return jsonify({"status": "ok"}), 200
+
+webhook_inbox.register_handler("webhooks", process_event)
 
 
@@ -27,29 +27,33 @@ from typing import List, Dict, Any, Optional
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from db import get_session
-from models import ArtistPayout, Tip
+from models import ArtistPayout
 from scripts.send_artist_payout import (
     _configure_stripe,
     _get_artist_name,
     _get_artist_stripe_account,
-    send_stripe_transfer,
-    get_pending_tips_for_artist
 )
-from datetime import datetime
+from services.payout_executor import DEFAULT_WORKERS, execute_payouts, queue_existing_payout
 
 
 def process_pending_payouts(
     dry_run: bool = False,
     auto_process: bool = False,
-    min_amount: Optional[Decimal] = None
+    min_amount: Optional[Decimal] = None,
+    max_workers: int = DEFAULT_WORKERS,
+    client=None
 ) -> Dict[str, Any]:
     """
     Process all pending payouts.
     
+    Stripe Connect payouts are queued and then sent in parallel by
+    services/payout_executor.py (idempotent, resumable).
+    
     Returns summary of processed, failed, and manual payouts.
     """
-    _configure_stripe()
-    stripe_configured = bool(os.getenv("STRIPE_SECRET_KEY") or os.getenv("STRIPE_SECRET_KEY_TEST"))
+    if client is None:
+        _configure_stripe()
+    stripe_configured = client is not None or bool(os.getenv("STRIPE_SECRET_KEY") or os.getenv("STRIPE_SECRET_KEY_TEST"))
     
     with get_session() as db_session:
         # Get all pending payouts
@@ -57,7 +61,8 @@ def process_pending_payouts(
             ArtistPayout.status == "pending"
         ).order_by(ArtistPayout.created_at).all()
         
-        if not pending_payouts:
+        # With --auto-process, carry on so interrupted Stripe payouts are resumed
+        if not pending_payouts and (dry_run or not auto_process):
             print("✅ No pending payouts to process")
             return {
                 "processed": [],
@@ -72,6 +77,7 @@ def process_pending_payouts(
         failed = []
         manual = []
         skipped = []
+        queued = {}
         
         for payout in pending_payouts:
             artist_id = payout.artist_id
@@ -107,38 +113,14 @@ def process_pending_payouts(
                 manual.append(payout_info)
                 continue
             
-            # Try Stripe Connect if available and auto_process is enabled
+            # Queue for Stripe Connect if available and auto_process is enabled
             if auto_process and stripe_account and stripe_configured:
-                print(f"💸 Processing {artist_name}: ${amount:.2f} via Stripe Connect...")
-                transfer_result = send_stripe_transfer(
-                    artist_id=artist_id,
-                    amount=amount,
-                    destination_account=stripe_account,
-                    description=f"Payout for {artist_name} (Payout ID: {payout.id})"
-                )
-                
-                if transfer_result.get("success"):
-                    # Update payout record
-                    payout.status = "completed"
-                    payout.stripe_transfer_id = transfer_result["transfer_id"]
-                    payout.completed_at = datetime.utcnow()
-                    payout.payment_method = "stripe_connect"
-                    db_session.commit()
-                    
-                    payout_info["method"] = "stripe_connect"
-                    payout_info["transfer_id"] = transfer_result["transfer_id"]
-                    processed.append(payout_info)
-                    print(f"✅ Processed ${amount:.2f} to {artist_name} (Transfer: {transfer_result['transfer_id']})")
+                if queue_existing_payout(db_session, payout, stripe_account):
+                    queued[payout.id] = payout_info
                 else:
-                    # Transfer failed
-                    payout.payment_method = "stripe_connect_failed"
-                    payout.notes = (payout.notes or "") + f"\nTransfer failed: {transfer_result.get('error')}"
-                    db_session.commit()
-                    
-                    payout_info["method"] = "stripe_connect_failed"
-                    payout_info["error"] = transfer_result.get("error")
-                    failed.append(payout_info)
-                    print(f"❌ Failed to process {artist_name}: {transfer_result.get('error')}")
+                    payout_info["reason"] = "Same tips already queued under another payout"
+                    skipped.append(payout_info)
+                    print(f"⏭️  Skipped {artist_name}: tips already queued for Stripe")
             else:
                 # No Stripe Connect or auto_process disabled
                 if not stripe_account:
@@ -150,6 +132,27 @@ def process_pending_payouts(
                 manual.append(payout_info)
                 print(f"📋 Manual payout needed: {artist_name} - ${amount:.2f}")
         
+        if auto_process and stripe_configured and not dry_run:
+            db_session.commit()
+            print(f"💸 Sending {len(queued)} payout(s) via Stripe Connect ({max_workers} in parallel)...")
+            # Also resumes payouts an interrupted run left queued/submitted
+            for outcome in execute_payouts(db_session, client=client, max_workers=max_workers):
+                payout_info = queued.get(outcome["payout_id"]) or {
+                    "payout_id": outcome["payout_id"],
+                    "artist_id": outcome["artist_id"],
+                    "artist_name": _get_artist_name(outcome["artist_id"]) or outcome["artist_id"],
+                    "amount": float(outcome["amount"]),
+                }
+                payout_info["method"] = "stripe_connect"
+                if outcome["status"] == "completed":
+                    payout_info["transfer_id"] = outcome["transfer_id"]
+                    processed.append(payout_info)
+                    print(f"✅ Processed ${payout_info['amount']:.2f} to {payout_info['artist_name']} (Transfer: {outcome['transfer_id']})")
+                else:
+                    payout_info["error"] = outcome["error"]
+                    failed.append(payout_info)
+                    print(f"❌ Failed to process {payout_info['artist_name']}: {outcome['error']}")
+        
         return {
             "processed": processed,
             "failed": failed,
@@ -163,6 +166,7 @@ def main():
     parser.add_argument("--dry-run", action="store_true", help="Preview what would be processed without actually doing it")
     parser.add_argument("--auto-process", action="store_true", help="Automatically process Stripe Connect transfers")
     parser.add_argument("--min-amount", type=float, help="Minimum amount to process (skip smaller payouts)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"Parallel Stripe transfers (default: {DEFAULT_WORKERS})")
     
     args = parser.parse_args()
     
@@ -176,7 +180,8 @@ def main():
     results = process_pending_payouts(
         dry_run=args.dry_run,
         auto_process=args.auto_process,
-        min_amount=min_amount_decimal
+        min_amount=min_amount_decimal,
+        max_workers=args.workers
     )
     
     # Print summary
@@ -10,6 +10,8 @@ pip install -r requirements.txt
 if command -v node >/dev/null 2>&1 && [ -f spa/package.json ]; then
   echo "Building Vue SPA (spa-dist)..."
   (cd spa && npm ci && npm run build)
+  echo "Precompressing spa-dist (.br/.gz)..."
+  python scripts/precompress_static.py spa-dist
 else
   echo "Node not found or spa/package.json missing; skipping SPA build (web will use server-rendered pages)."
 fi
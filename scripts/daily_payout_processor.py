@@ -15,6 +15,7 @@ Usage:
     python scripts/daily_payout_processor.py --dry-run  # Preview without processing
     python scripts/daily_payout_processor.py --min-amount 50.00  # Only process $50+
     python scripts/daily_payout_processor.py --auto-process  # Automatically send via Stripe
+    python scripts/daily_payout_processor.py --auto-process --workers 8  # More parallel transfers
 """
 import os
 import sys
@@ -27,7 +28,10 @@ from typing import List, Dict, Any, Optional
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from db import get_session
-from models import Tip, ArtistPayout
+from models import ArtistPayout
+from services import artist_directory
+from services.payouts import link_tips, match_artists, pending_tips, pending_totals
+from services.payout_executor import DEFAULT_WORKERS, execute_payouts, queue_payout
 from services.notifications import _get_admin_email
 from services.emailer import send_email, can_send_email
 import stripe
@@ -43,23 +47,11 @@ def _configure_stripe():
 
 
 def _get_artist_name(artist_id: str) -> Optional[str]:
-    """Get artist name from artists.json."""
+    """Get artist name from the artist directory."""
     try:
-        import json
-        from pathlib import Path
-        
-        artists_file = Path(__file__).parent.parent / 'static' / 'data' / 'artists.json'
-        if artists_file.exists():
-            with open(artists_file, 'r', encoding='utf-8') as f:
-                artists_data = json.load(f)
-                for artist in artists_data.get('artists', []):
-                    if (str(artist.get('id', '')) == str(artist_id) or
-                        artist.get('slug', '').lower() == str(artist_id).lower() or
-                        artist.get('name', '').lower() == str(artist_id).lower()):
-                        return artist.get('name')
+        return artist_directory.artist_name(artist_id)
     except Exception:
-        pass
-    return None
+        return None
 
 
 def _get_artist_stripe_account(artist_id: str) -> Optional[str]:
@@ -70,190 +62,57 @@ def _get_artist_stripe_account(artist_id: str) -> Optional[str]:
 
 
 def _get_artist_email(artist_id: str) -> Optional[str]:
-    """Get artist email from environment or artists.json."""
-    # Try environment variable first
-    env_key = f"ARTIST_EMAIL_{artist_id.upper().replace('-', '_').replace(' ', '_')}"
-    email = os.getenv(env_key) or os.getenv(env_key.lower())
-    if email:
-        return email.strip()
-    
-    # Try loading from artist data
-    try:
-        import json
-        from pathlib import Path
-        
-        artists_file = Path(__file__).parent.parent / 'static' / 'data' / 'artists.json'
-        if artists_file.exists():
-            with open(artists_file, 'r', encoding='utf-8') as f:
-                artists_data = json.load(f)
-                for artist in artists_data.get('artists', []):
-                    if (str(artist.get('id', '')) == str(artist_id) or
-                        artist.get('slug', '').lower() == str(artist_id).lower()):
-                        if 'email' in artist:
-                            return artist['email'].strip()
-    except Exception:
-        pass
-    
-    return None
-
-
-def get_pending_tips_for_artist(artist_id: str, db_session) -> List[Tip]:
-    """Get all tips that haven't been included in a completed payout."""
-    # Get all tips for this artist
-    # Use try/except to handle missing columns in older database schemas
-    try:
-        all_tips = db_session.query(Tip).filter(
-            Tip.artist_id == str(artist_id)
-        ).order_by(Tip.created_at).all()
-    except Exception as e:
-        # If there's a column error, try selecting only basic columns
-        # This handles cases where database hasn't been fully migrated
-        print(f"⚠️  Warning: Could not load tips with full model, trying basic query: {e}")
-        try:
-            from sqlalchemy import text
-            # Query using raw SQL to avoid model column issues
-            result = db_session.execute(
-                text("SELECT id, artist_id, amount, artist_payout, created_at FROM tips WHERE artist_id = :artist_id ORDER BY created_at"),
-                {"artist_id": str(artist_id)}
-            )
-            # Convert to Tip objects manually
-            all_tips = []
-            for row in result:
-                tip = Tip()
-                tip.id = row.id
-                tip.artist_id = row.artist_id
-                tip.amount = row.amount
-                tip.artist_payout = getattr(row, 'artist_payout', None) or row.amount
-                tip.created_at = row.created_at
-                all_tips.append(tip)
-        except Exception as e2:
-            # Final fallback: use only basic columns that should always exist
-            try:
-                from sqlalchemy import text
-                result = db_session.execute(
-                    text("SELECT id, artist_id, amount, created_at FROM tips WHERE artist_id = :artist_id ORDER BY created_at"),
-                    {"artist_id": str(artist_id)}
-                )
-                all_tips = []
-                for row in result:
-                    tip = Tip()
-                    tip.id = row.id
-                    tip.artist_id = row.artist_id
-                    tip.amount = row.amount
-                    tip.created_at = row.created_at
-                    # artist_payout defaults to amount if column doesn't exist
-                    tip.artist_payout = tip.amount
-                    all_tips.append(tip)
-            except Exception as e3:
-                print(f"⚠️  Could not load tips for {artist_id}: {e3}")
-                return []
-    
-    # Get all completed payouts and their related tip IDs
-    # Handle case where artist_payouts table doesn't exist yet
-    paid_tip_ids = set()
+    """Get artist email from environment or the artist directory."""
     try:
-        completed_payouts = db_session.query(ArtistPayout).filter(
-            ArtistPayout.artist_id == str(artist_id),
-            ArtistPayout.status == "completed"
-        ).all()
-        
-        # Collect all tip IDs that have been paid out
-        for payout in completed_payouts:
-            if payout.related_tip_ids:
-                paid_tip_ids.update(payout.related_tip_ids)
+        return artist_directory.artist_email(artist_id)
     except Exception:
-        # Table doesn't exist or other error - treat as no payouts completed yet
-        pass
-    
-    # Filter out tips that have been paid
-    pending_tips = [tip for tip in all_tips if tip.id not in paid_tip_ids]
-    return pending_tips
+        return None
 
 
 def load_all_artists():
-    """Load all artists from artists.json"""
+    """Load all artists from the artist directory."""
     try:
-        import json
-        from pathlib import Path
-        
-        artists_file = Path(__file__).parent.parent / 'static' / 'data' / 'artists.json'
-        if artists_file.exists():
-            with open(artists_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get('artists', [])
+        return artist_directory.all_artists()
     except Exception as e:
         print(f"⚠️  Error loading artists: {e}")
     return []
 
 
 def scan_pending_payouts(min_amount: Decimal = Decimal("0.01")) -> List[Dict[str, Any]]:
-    """Scan all artists and find pending payouts."""
+    """Scan all artists and find pending payouts (two queries, regardless of artist count)."""
     artists = load_all_artists()
     results = []
     
     with get_session() as db_session:
-        for artist in artists:
+        # Pending totals for every artist in one grouped anti-join
+        totals = pending_totals(db_session)
+        matches = [
+            (artist, identifier) for artist, identifier in match_artists(artists, totals)
+            if totals[identifier]['total'] >= min_amount
+        ]
+        tips_by_identifier = pending_tips(db_session, [identifier for _, identifier in matches])
+        
+        for artist, identifier in matches:
             artist_id = artist.get('id') or artist.get('slug') or artist.get('name', '')
             artist_name = artist.get('name', 'Unknown')
             artist_slug = artist.get('slug', '')
             
-            # Try multiple identifiers
-            identifiers = [str(artist_id), artist_slug, artist_name]
-            
-            pending_tips = []
-            for identifier in identifiers:
-                if identifier:
-                    tips = get_pending_tips_for_artist(identifier, db_session)
-                    if tips:
-                        pending_tips = tips
-                        break
-            
-            if pending_tips:
-                # Safely get amount, handling cases where artist_payout might not exist
-                total_pending = sum(
-                    Decimal(str(getattr(tip, 'artist_payout', None) or tip.amount)) 
-                    for tip in pending_tips
-                )
-                
-                if total_pending >= min_amount:
-                    results.append({
-                        'artist_id': artist_id,
-                        'artist_slug': artist_slug or artist_id,
-                        'artist_name': artist_name,
-                        'pending_tips': pending_tips,
-                        'total_pending': total_pending,
-                        'tip_count': len(pending_tips),
-                        'artist_email': _get_artist_email(artist_slug or artist_id),
-                        'stripe_account': _get_artist_stripe_account(artist_slug or artist_id)
-                    })
+            results.append({
+                'artist_id': artist_id,
+                'artist_slug': artist_slug or artist_id,
+                'artist_name': artist_name,
+                'pending_tips': tips_by_identifier[identifier],
+                'total_pending': totals[identifier]['total'],
+                'tip_count': totals[identifier]['tip_count'],
+                'artist_email': _get_artist_email(artist_slug or artist_id),
+                'stripe_account': _get_artist_stripe_account(artist_slug or artist_id)
+            })
     
     # Sort by total pending (highest first)
     results.sort(key=lambda x: x['total_pending'], reverse=True)
     return results
 
 
-def process_stripe_transfer(artist_id: str, artist_name: str, amount: Decimal, stripe_account: str) -> Dict[str, Any]:
-    """Process automatic payout via Stripe Connect Transfer."""
-    try:
-        transfer = stripe.Transfer.create(
-            amount=int(amount * 100),  # Convert to cents
-            currency="usd",
-            destination=stripe_account,
-            description=f"Payout to {artist_name}",
-        )
-        return {
-            "success": True,
-            "transfer_id": transfer.id,
-            "method": "stripe_connect"
-        }
-    except stripe.error.StripeError as e:
-        return {
-            "success": False,
-            "error": str(e),
-            "method": "stripe_connect"
-        }
-
-
 def create_payout_record(artist_id: str, amount: Decimal, tip_ids: List[int], payment_method: str, stripe_transfer_id: Optional[str] = None) -> ArtistPayout:
     """Create a payout record in the database."""
     with get_session() as db_session:
@@ -268,18 +127,28 @@ def create_payout_record(artist_id: str, amount: Decimal, tip_ids: List[int], pa
             completed_at=datetime.utcnow() if stripe_transfer_id else None
         )
         db_session.add(payout)
+        db_session.flush()
+        link_tips(db_session, payout.id, tip_ids)
         db_session.commit()
         db_session.refresh(payout)
         return payout
 
 
-def process_payouts(results: List[Dict[str, Any]], auto_process: bool = False, dry_run: bool = False) -> Dict[str, Any]:
-    """Process payouts for all artists with pending tips."""
+def process_payouts(results: List[Dict[str, Any]], auto_process: bool = False, dry_run: bool = False,
+                    max_workers: int = DEFAULT_WORKERS, client=None) -> Dict[str, Any]:
+    """
+    Process payouts for all artists with pending tips.
+
+    Stripe Connect payouts are queued first and then sent in parallel by
+    services/payout_executor.py, which also resumes payouts left queued or
+    submitted by an earlier run.
+    """
     processed = []
     failed = []
     manual = []
     
-    stripe_configured = _configure_stripe()
+    stripe_configured = _configure_stripe() or client is not None
+    queued = {}
     
     for result in results:
         artist_id = result['artist_slug']
@@ -308,37 +177,12 @@ def process_payouts(results: List[Dict[str, Any]], auto_process: bool = False, d
             manual.append(payout_info)
             continue
         
-        # Try automatic Stripe Connect if available and auto_process is enabled
+        # Queue automatic Stripe Connect payouts if available and auto_process is enabled
         if auto_process and stripe_account and stripe_configured:
-            transfer_result = process_stripe_transfer(artist_id, artist_name, amount, stripe_account)
-            
-            if transfer_result['success']:
-                # Create completed payout record
-                payout = create_payout_record(
-                    artist_id=artist_id,
-                    amount=amount,
-                    tip_ids=tip_ids,
-                    payment_method="stripe_connect",
-                    stripe_transfer_id=transfer_result['transfer_id']
-                )
-                payout_info['method'] = 'stripe_connect'
+            with get_session() as db_session:
+                payout = queue_payout(db_session, artist_id, amount, tip_ids, stripe_account)
                 payout_info['payout_id'] = payout.id
-                payout_info['transfer_id'] = transfer_result['transfer_id']
-                processed.append(payout_info)
-                print(f"✅ Processed ${amount:.2f} to {artist_name} via Stripe Connect (Transfer: {transfer_result['transfer_id']})")
-            else:
-                # Stripe transfer failed, create pending record for manual processing
-                payout = create_payout_record(
-                    artist_id=artist_id,
-                    amount=amount,
-                    tip_ids=tip_ids,
-                    payment_method="stripe_connect_failed"
-                )
-                payout_info['method'] = 'stripe_connect_failed'
-                payout_info['payout_id'] = payout.id
-                payout_info['error'] = transfer_result['error']
-                failed.append(payout_info)
-                print(f"❌ Failed to process ${amount:.2f} to {artist_name}: {transfer_result['error']}")
+            queued[payout_info['payout_id']] = payout_info
         else:
             # Create pending payout record for manual processing
             payout = create_payout_record(
@@ -352,6 +196,29 @@ def process_payouts(results: List[Dict[str, Any]], auto_process: bool = False, d
             manual.append(payout_info)
             print(f"📋 Created pending payout record for {artist_name}: ${amount:.2f} (Payout ID: {payout.id})")
     
+    if auto_process and stripe_configured and not dry_run:
+        with get_session() as db_session:
+            outcomes = execute_payouts(db_session, client=client, max_workers=max_workers)
+        
+        for outcome in outcomes:
+            # Payouts resumed from an earlier run have no scan result
+            payout_info = queued.get(outcome['payout_id']) or {
+                'artist_id': outcome['artist_id'],
+                'artist_name': _get_artist_name(outcome['artist_id']) or outcome['artist_id'],
+                'amount': outcome['amount'],
+                'tip_count': 0,
+                'payout_id': outcome['payout_id'],
+            }
+            payout_info['method'] = 'stripe_connect'
+            payout_info['transfer_id'] = outcome['transfer_id']
+            payout_info['error'] = outcome['error']
+            if outcome['status'] == 'completed':
+                processed.append(payout_info)
+                print(f"✅ Processed ${payout_info['amount']:.2f} to {payout_info['artist_name']} via Stripe Connect (Transfer: {outcome['transfer_id']})")
+            else:
+                failed.append(payout_info)
+                print(f"❌ Failed to process ${payout_info['amount']:.2f} to {payout_info['artist_name']}: {outcome['error']}")
+    
     return {
         'processed': processed,
         'failed': failed,
@@ -518,6 +385,7 @@ def main():
     parser.add_argument("--dry-run", action="store_true", help="Preview without processing")
     parser.add_argument("--min-amount", type=float, default=0.01, help="Minimum amount to process (default: 0.01)")
     parser.add_argument("--auto-process", action="store_true", help="Automatically process Stripe Connect payouts")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"Parallel Stripe transfers (default: {DEFAULT_WORKERS})")
     
     args = parser.parse_args()
     
@@ -528,6 +396,11 @@ def main():
     
     if not results:
         print("✅ No artists with pending payouts found!")
+        if args.dry_run or not args.auto_process:
+            return
+        # Still resume Stripe payouts an interrupted run left queued/submitted
+        processing_results = process_payouts([], auto_process=True, max_workers=args.workers)
+        print(f"\n📊 Resumed: {len(processing_results['processed'])} processed, {len(processing_results['failed'])} failed")
         return
     
     print(f"💰 Found {len(results)} artist(s) with pending payouts:\n")
@@ -539,7 +412,8 @@ def main():
         print("🔍 DRY RUN MODE - Preview only\n")
         processing_results = process_payouts(results, auto_process=False, dry_run=True)
     else:
-        processing_results = process_payouts(results, auto_process=args.auto_process, dry_run=False)
+        processing_results = process_payouts(results, auto_process=args.auto_process, dry_run=False,
+                                             max_workers=args.workers)
     
     # Send summary email
     send_summary_email(results, processing_results)
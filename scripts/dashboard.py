@@ -25,6 +25,8 @@ from models import (
     ArtistPayout, Tip, Purchase, WalletTransaction, User,
     PlayHistory, ListeningSession, Bookmark, UserArtistFollow
 )
+from services import artist_directory
+from services.payouts import pending_totals
 
 
 class Colors:
@@ -76,13 +78,9 @@ def load_json_data(filename: str, default=None):
 def get_artist_name(artist_id: str) -> str:
     """Get artist name from artist_id."""
     try:
-        artists_data = load_json_data('artists.json', {'artists': []})
-        for artist in artists_data.get('artists', []):
-            if artist.get('slug') == artist_id or artist.get('id') == artist_id:
-                return artist.get('name', artist_id)
+        return artist_directory.artist_name(artist_id) or artist_id
     except Exception:
-        pass
-    return artist_id
+        return artist_id
 
 
 def get_database_stats() -> Dict:
@@ -375,35 +373,11 @@ def show_recent_wallet_transactions(limit: int = 20):
 def show_artist_summary():
     """Show summary by artist (pending tips)."""
     with get_session() as db_session:
-        # Get all tips grouped by artist
-        tips = db_session.query(Tip).all()
-        
-        # Get completed payouts
-        completed_payouts = db_session.query(ArtistPayout).filter(
-            ArtistPayout.status == 'completed'
-        ).all()
-        
-        # Track paid tip IDs
-        paid_tip_ids = set()
-        for payout in completed_payouts:
-            if payout.related_tip_ids:
-                paid_tip_ids.update(payout.related_tip_ids)
-        
-        # Group by artist
-        artist_data = {}
-        for tip in tips:
-            if tip.id in paid_tip_ids:
-                continue  # Already paid
-            
-            if tip.artist_id not in artist_data:
-                artist_data[tip.artist_id] = {
-                    'artist_id': tip.artist_id,
-                    'count': 0,
-                    'total': Decimal('0'),
-                }
-            
-            artist_data[tip.artist_id]['count'] += 1
-            artist_data[tip.artist_id]['total'] += Decimal(str(tip.artist_payout or tip.amount))
+        # Pending totals per artist in one grouped anti-join
+        artist_data = {
+            artist_id: {'artist_id': artist_id, 'count': info['tip_count'], 'total': info['total']}
+            for artist_id, info in pending_totals(db_session).items()
+        }
         
         if not artist_data:
             return "  ✅ No pending tips for any artist"
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Process Stripe webhook events waiting in the webhook inbox.
+
+The webhook endpoints store events and acknowledge Stripe immediately; the
+web process's worker threads normally fulfil them within moments. This
+sweep catches everything else: retries whose backoff has elapsed, and events
+a restarted web worker never got to.
+
+Usage:
+    python scripts/drain_webhook_inbox.py                  # process everything due (run from cron)
+    python scripts/drain_webhook_inbox.py --workers 4      # in parallel
+    python scripts/drain_webhook_inbox.py --retry-failed   # requeue events that exhausted their retries first
+"""
+import os
+import sys
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("WEBHOOK_WORKERS", "0")  # this process drains synchronously
+
+from app import app  # registers the inbox handlers
+from db import get_session
+from services.webhook_inbox import drain, requeue_failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process pending Stripe webhook events")
+    parser.add_argument("--limit", type=int, default=500, help="Maximum events to process (default: 500)")
+    parser.add_argument("--workers", type=int, default=1, help="Events processed in parallel (default: 1)")
+    parser.add_argument("--retry-failed", action="store_true", help="Requeue events that exhausted their retries")
+
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.retry_failed:
+            with get_session() as db_session:
+                requeued = requeue_failed(db_session)
+            print(f"🔁 Requeued {requeued} failed event(s)")
+
+        counts = drain(limit=args.limit, max_workers=args.workers)
+
+    if not counts:
+        print("✅ Webhook inbox is empty")
+        return
+    print("📬 Webhook inbox drained:")
+    for status, count in sorted(counts.items()):
+        print(f"   {status}: {count}")
+    if counts.get("failed"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
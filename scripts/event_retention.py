@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Retention maintenance for analytics_events, play_history and listening_sessions.
+
+Creates upcoming monthly partitions (Postgres), summarizes months past the
+retention window into the rollup tables, then drops their partitions
+(Postgres) or archives the rows to .jsonl.gz and deletes them (SQLite).
+
+Usage:
+    python scripts/event_retention.py                        # keep EVENT_RETENTION_MONTHS (default 13)
+    python scripts/event_retention.py --keep-months 6
+    python scripts/event_retention.py --table play_history --dry-run
+    python scripts/event_retention.py --archive-dir /mnt/archive/events
+    python scripts/event_retention.py --no-archive           # delete without archiving (SQLite)
+"""
+import os
+import sys
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.retention import (
+    DEFAULT_ARCHIVE_DIR, DEFAULT_KEEP_MONTHS, RETENTION_SPECS, run_retention,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune and partition high-volume event tables")
+    parser.add_argument("--keep-months", type=int, default=DEFAULT_KEEP_MONTHS,
+                        help=f"Months of raw rows to keep, including the current one (default: {DEFAULT_KEEP_MONTHS})")
+    parser.add_argument("--table", action="append", choices=sorted(RETENTION_SPECS.keys()),
+                        help="Only maintain this table (repeatable)")
+    parser.add_argument("--archive-dir", type=str, default=DEFAULT_ARCHIVE_DIR,
+                        help="Where unpartitioned tables archive pruned rows")
+    parser.add_argument("--no-archive", action="store_true", help="Delete pruned rows without archiving")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be pruned without changing anything")
+
+    args = parser.parse_args()
+
+    if args.keep_months < 1:
+        print("❌ --keep-months must be at least 1")
+        sys.exit(1)
+
+    print(f"🗄️  Event retention: keeping {args.keep_months} month(s){' (dry run)' if args.dry_run else ''}")
+
+    reports = run_retention(
+        keep_months=args.keep_months,
+        tables=args.table,
+        archive_dir=None if args.no_archive else args.archive_dir,
+        dry_run=args.dry_run,
+    )
+
+    for report in reports:
+        print(f"\n📋 {report['table']} (cutoff {report['cutoff']:%Y-%m-%d})")
+        for name in report.get('partitions_created', []):
+            print(f"   ➕ created partition {name}")
+        for name in report['partitions_dropped']:
+            print(f"   {'would drop' if args.dry_run else '🗑️  dropped'} partition {name}")
+        if report['rows_archived']:
+            print(f"   📦 archived {report['rows_archived']} row(s)")
+        if report['rows_deleted']:
+            print(f"   🗑️  deleted {report['rows_deleted']} row(s)")
+
+    print("\n✅ Done")
+
+
+if __name__ == "__main__":
+    main()
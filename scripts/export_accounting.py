@@ -21,396 +21,516 @@ Usage:
     # Platform revenue
     python scripts/export_accounting.py --type platform-revenue --year 2024 --format csv
 
-    # All reports at once
+    # All reports at once (one pass over each table)
     python scripts/export_accounting.py --type all --year 2024 --format csv
+
+Rows are streamed from server-side cursors (yield_per) and written to the CSV
+as they arrive, so year-end exports run in constant memory. Revenue rows from
+tips, purchases and wallet funding are merged by date on the fly.
 """
 import os
 import sys
 import argparse
 import csv
+import heapq
+from abc import ABC, abstractmethod
 from decimal import Decimal
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from collections import defaultdict
 
+from sqlalchemy import select
+
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from db import get_session
-from models import Tip, ArtistPayout, Purchase, WalletTransaction, User
+from models import Tip, ArtistPayout, Purchase, WalletTransaction
+from services import artist_directory
+from utils.streaming import EXPORT_YIELD_PER
+
+REPORT_TYPES = ['revenue', 'expenses', 'artist-1099', 'platform-revenue']
 
 
 def get_artist_name(artist_id: str) -> str:
-    """Get artist name from artists.json."""
+    """Get artist name from the artist directory."""
     try:
-        from app import load_json_data
-        artists_data = load_json_data('artists.json', {'artists': []})
-        for artist in artists_data.get('artists', []):
-            if (str(artist.get('id', '')) == str(artist_id) or
-                artist.get('slug', '').lower() == str(artist_id).lower() or
-                artist.get('name', '').lower() == str(artist_id).lower()):
-                return artist.get('name', artist_id)
+        return artist_directory.artist_name(artist_id) or artist_id
     except Exception:
-        pass
-    return artist_id
+        return artist_id
 
 
-def export_revenue(year: int, output_file: Optional[str] = None) -> str:
-    """Export all revenue (tips, purchases, wallet funding) for a year."""
-    start_date = datetime(year, 1, 1)
-    end_date = datetime(year + 1, 1, 1)
-    
-    with get_session() as db_session:
-        rows = []
-        
-        # Tips/Boosts
-        tips = db_session.query(Tip).filter(
-            Tip.created_at >= start_date,
-            Tip.created_at < end_date
-        ).order_by(Tip.created_at).all()
-        
-        for tip in tips:
-            rows.append({
-                'Date': tip.created_at.strftime('%Y-%m-%d'),
-                'Type': 'Boost/Tip',
-                'Description': f"Boost to {get_artist_name(tip.artist_id)}",
-                'Gross Revenue': float(tip.total_paid or tip.amount),
-                'Stripe Fee': float(tip.stripe_fee or 0),
-                'Platform Revenue': float(tip.platform_revenue or 0),
-                'Artist Payout': float(tip.artist_payout or tip.amount),
-                'Stripe Session ID': tip.stripe_checkout_session_id or '',
-                'Payment Intent ID': tip.stripe_payment_intent_id or '',
-                'User ID': tip.user_id or '',
-                'Artist ID': tip.artist_id,
-            })
-        
-        # Merch Purchases
-        purchases = db_session.query(Purchase).filter(
-            Purchase.created_at >= start_date,
-            Purchase.created_at < end_date,
-            Purchase.status == 'paid'
-        ).order_by(Purchase.created_at).all()
-        
-        for purchase in purchases:
-            rows.append({
-                'Date': purchase.created_at.strftime('%Y-%m-%d'),
-                'Type': 'Merch Purchase',
-                'Description': f"Merch purchase #{purchase.id}",
-                'Gross Revenue': float(purchase.total),
-                'Stripe Fee': 0,  # Fees already included in tip records if applicable
-                'Platform Revenue': float(purchase.total),  # Assuming 100% of merch is platform revenue
-                'Artist Payout': 0,
-                'Stripe Session ID': purchase.stripe_id or '',
-                'Payment Intent ID': '',
-                'User ID': purchase.user_id or '',
-                'Artist ID': '',
-            })
-        
-        # Wallet Funding
-        wallet_funding = db_session.query(WalletTransaction).filter(
-            WalletTransaction.created_at >= start_date,
-            WalletTransaction.created_at < end_date,
-            WalletTransaction.type == 'fund'
-        ).order_by(WalletTransaction.created_at).all()
-        
-        for tx in wallet_funding:
-            rows.append({
-                'Date': tx.created_at.strftime('%Y-%m-%d'),
-                'Type': 'Wallet Funding',
-                'Description': f"Wallet funding for user {tx.user_id}",
-                'Gross Revenue': float(tx.amount),
-                'Stripe Fee': 0,  # Fees paid at funding time
-                'Platform Revenue': 0,  # Not revenue until spent
-                'Artist Payout': 0,
-                'Stripe Session ID': tx.reference_id if tx.reference_type == 'stripe_checkout' else '',
-                'Payment Intent ID': '',
-                'User ID': tx.user_id,
-                'Artist ID': '',
-            })
-        
-        # Sort by date
-        rows.sort(key=lambda x: x['Date'])
-        
-        # Write to CSV
-        if not output_file:
-            output_file = f"revenue_{year}.csv"
-        
-        with open(output_file, 'w', newline='') as f:
-            if rows:
-                writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-                writer.writeheader()
-                writer.writerows(rows)
-                
-                # Add summary
-                total_revenue = sum(r['Gross Revenue'] for r in rows)
-                total_fees = sum(r['Stripe Fee'] for r in rows)
-                total_platform = sum(r['Platform Revenue'] for r in rows)
-                
-                writer.writerow({})
-                writer.writerow({
-                    'Date': 'TOTAL',
-                    'Type': '',
-                    'Description': '',
-                    'Gross Revenue': total_revenue,
-                    'Stripe Fee': total_fees,
-                    'Platform Revenue': total_platform,
-                    'Artist Payout': 0,
-                    'Stripe Session ID': '',
-                    'Payment Intent ID': '',
-                    'User ID': '',
-                    'Artist ID': '',
-                })
-        
-        print(f"✅ Exported {len(rows)} revenue transactions to {output_file}")
-        if rows:
-            total = sum(r['Gross Revenue'] for r in rows)
-            print(f"   Total Revenue: ${total:,.2f}")
-        
-        return output_file
+# ---------------------------------------------------------------------------
+# Row sources: Core queries streamed with yield_per, ordered by their date
+# ---------------------------------------------------------------------------
 
+def _stream(session, stmt):
+    return session.execute(stmt.execution_options(yield_per=EXPORT_YIELD_PER))
 
-def export_expenses(year: int, output_file: Optional[str] = None) -> str:
-    """Export all expenses (artist payouts, Stripe fees) for a year."""
-    start_date = datetime(year, 1, 1)
-    end_date = datetime(year + 1, 1, 1)
-    
-    with get_session() as db_session:
-        rows = []
-        
-        # Artist Payouts
-        payouts = db_session.query(ArtistPayout).filter(
-            ArtistPayout.completed_at >= start_date,
-            ArtistPayout.completed_at < end_date,
-            ArtistPayout.status == 'completed'
-        ).order_by(ArtistPayout.completed_at).all()
-        
-        for payout in payouts:
-            artist_name = get_artist_name(payout.artist_id)
-            rows.append({
-                'Date': payout.completed_at.strftime('%Y-%m-%d') if payout.completed_at else '',
-                'Type': 'Artist Payout',
-                'Description': f"Payout to {artist_name}",
-                'Amount': float(payout.amount),
-                'Payment Method': payout.payment_method or 'manual',
-                'Stripe Transfer ID': payout.stripe_transfer_id or '',
-                'Payment Reference': payout.payment_reference or '',
-                'Artist ID': payout.artist_id,
-                'Payout ID': payout.id,
-            })
-        
-        # Stripe Fees (from tips)
-        tips = db_session.query(Tip).filter(
-            Tip.created_at >= start_date,
-            Tip.created_at < end_date
-        ).all()
-        
-        total_stripe_fees = sum(float(tip.stripe_fee or 0) for tip in tips)
-        if total_stripe_fees > 0:
-            rows.append({
-                'Date': f"{year} Summary",
+
+def iter_tips(session, start_date: datetime, end_date: datetime):
+    return _stream(session, select(
+        Tip.created_at, Tip.amount, Tip.total_paid, Tip.stripe_fee, Tip.platform_revenue,
+        Tip.artist_payout, Tip.stripe_checkout_session_id, Tip.stripe_payment_intent_id,
+        Tip.user_id, Tip.artist_id,
+    ).where(
+        Tip.created_at >= start_date,
+        Tip.created_at < end_date
+    ).order_by(Tip.created_at, Tip.id))
+
+
+def iter_purchases(session, start_date: datetime, end_date: datetime):
+    return _stream(session, select(
+        Purchase.id, Purchase.created_at, Purchase.total, Purchase.stripe_id, Purchase.user_id,
+    ).where(
+        Purchase.created_at >= start_date,
+        Purchase.created_at < end_date,
+        Purchase.status == 'paid'
+    ).order_by(Purchase.created_at, Purchase.id))
+
+
+def iter_wallet_funding(session, start_date: datetime, end_date: datetime):
+    return _stream(session, select(
+        WalletTransaction.created_at, WalletTransaction.amount, WalletTransaction.user_id,
+        WalletTransaction.reference_id, WalletTransaction.reference_type,
+    ).where(
+        WalletTransaction.created_at >= start_date,
+        WalletTransaction.created_at < end_date,
+        WalletTransaction.type == 'fund'
+    ).order_by(WalletTransaction.created_at, WalletTransaction.id))
+
+
+def iter_payouts(session, start_date: datetime, end_date: datetime):
+    return _stream(session, select(
+        ArtistPayout.id, ArtistPayout.artist_id, ArtistPayout.amount, ArtistPayout.completed_at,
+        ArtistPayout.payment_method, ArtistPayout.stripe_transfer_id, ArtistPayout.payment_reference,
+    ).where(
+        ArtistPayout.completed_at >= start_date,
+        ArtistPayout.completed_at < end_date,
+        ArtistPayout.status == 'completed'
+    ).order_by(ArtistPayout.completed_at, ArtistPayout.id))
+
+
+SOURCES = {
+    'tip': iter_tips,
+    'purchase': iter_purchases,
+    'wallet': iter_wallet_funding,
+}
+
+
+def _tagged(kind: str, rows: Iterable) -> Iterator[Tuple[str, Any]]:
+    for row in rows:
+        yield kind, row
+
+
+def _day(item: Tuple[str, Any]) -> str:
+    return item[1].created_at.strftime('%Y-%m-%d')
+
+
+# ---------------------------------------------------------------------------
+# Reports: consume rows as they stream past and write them immediately
+# ---------------------------------------------------------------------------
+
+class CsvReport(ABC):
+    """
+    A CSV written incrementally: header before the first row, TOTAL row on
+    close. Rows go to a temp file that ``close`` renames into place, so a
+    failed export never leaves a truncated report at ``output_file``.
+    """
+    name = ''
+    default_filename = ''
+    fieldnames: List[str] = []
+    sources: Tuple[str, ...] = ()
+
+    def __init__(self, year: int, output_file: Optional[str] = None):
+        self.year = year
+        self.output_file = output_file or self.default_filename.format(year=year)
+        self.tmp_file = f"{self.output_file}.tmp.{os.getpid()}"
+        self.file = open(self.tmp_file, 'w', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=self.fieldnames)
+        self.count = 0
+
+    def write(self, row: Dict[str, Any]) -> None:
+        if not self.count:
+            self.writer.writeheader()
+        self.writer.writerow(row)
+        self.count += 1
+
+    def handle(self, kind: str, row) -> None:
+        getattr(self, kind)(row)
+
+    def finish(self) -> None:
+        """Write rows that can only be produced once every source row was seen."""
+
+    @abstractmethod
+    def total_row(self) -> Dict[str, Any]:
+        """The TOTAL row appended after the data rows."""
+
+    @abstractmethod
+    def summary(self) -> None:
+        """Print the report's totals to stdout."""
+
+    def close(self) -> str:
+        self.finish()
+        if self.count:
+            self.writer.writerow({})
+            self.writer.writerow(self.total_row())
+        self.file.close()
+        os.replace(self.tmp_file, self.output_file)
+        self.summary()
+        return self.output_file
+
+    def discard(self) -> None:
+        """Drop the partial output of a failed export."""
+        self.file.close()
+        try:
+            os.remove(self.tmp_file)
+        except OSError:
+            pass
+
+
+class RevenueReport(CsvReport):
+    """All revenue (tips, purchases, wallet funding), in date order."""
+    name = 'revenue'
+    default_filename = 'revenue_{year}.csv'
+    fieldnames = ['Date', 'Type', 'Description', 'Gross Revenue', 'Stripe Fee', 'Platform Revenue',
+                  'Artist Payout', 'Stripe Session ID', 'Payment Intent ID', 'User ID', 'Artist ID']
+    sources = ('tip', 'purchase', 'wallet')
+
+    def __init__(self, year: int, output_file: Optional[str] = None):
+        super().__init__(year, output_file)
+        self.total_revenue = 0
+        self.total_fees = 0
+        self.total_platform = 0
+
+    def write(self, row: Dict[str, Any]) -> None:
+        super().write(row)
+        self.total_revenue += row['Gross Revenue']
+        self.total_fees += row['Stripe Fee']
+        self.total_platform += row['Platform Revenue']
+
+    def tip(self, tip) -> None:
+        self.write({
+            'Date': tip.created_at.strftime('%Y-%m-%d'),
+            'Type': 'Boost/Tip',
+            'Description': f"Boost to {get_artist_name(tip.artist_id)}",
+            'Gross Revenue': float(tip.total_paid or tip.amount),
+            'Stripe Fee': float(tip.stripe_fee or 0),
+            'Platform Revenue': float(tip.platform_revenue or 0),
+            'Artist Payout': float(tip.artist_payout or tip.amount),
+            'Stripe Session ID': tip.stripe_checkout_session_id or '',
+            'Payment Intent ID': tip.stripe_payment_intent_id or '',
+            'User ID': tip.user_id or '',
+            'Artist ID': tip.artist_id,
+        })
+
+    def purchase(self, purchase) -> None:
+        self.write({
+            'Date': purchase.created_at.strftime('%Y-%m-%d'),
+            'Type': 'Merch Purchase',
+            'Description': f"Merch purchase #{purchase.id}",
+            'Gross Revenue': float(purchase.total),
+            'Stripe Fee': 0,  # Fees already included in tip records if applicable
+            'Platform Revenue': float(purchase.total),  # Assuming 100% of merch is platform revenue
+            'Artist Payout': 0,
+            'Stripe Session ID': purchase.stripe_id or '',
+            'Payment Intent ID': '',
+            'User ID': purchase.user_id or '',
+            'Artist ID': '',
+        })
+
+    def wallet(self, tx) -> None:
+        self.write({
+            'Date': tx.created_at.strftime('%Y-%m-%d'),
+            'Type': 'Wallet Funding',
+            'Description': f"Wallet funding for user {tx.user_id}",
+            'Gross Revenue': float(tx.amount),
+            'Stripe Fee': 0,  # Fees paid at funding time
+            'Platform Revenue': 0,  # Not revenue until spent
+            'Artist Payout': 0,
+            'Stripe Session ID': tx.reference_id if tx.reference_type == 'stripe_checkout' else '',
+            'Payment Intent ID': '',
+            'User ID': tx.user_id,
+            'Artist ID': '',
+        })
+
+    def total_row(self) -> Dict[str, Any]:
+        return {
+            'Date': 'TOTAL',
+            'Type': '',
+            'Description': '',
+            'Gross Revenue': self.total_revenue,
+            'Stripe Fee': self.total_fees,
+            'Platform Revenue': self.total_platform,
+            'Artist Payout': 0,
+            'Stripe Session ID': '',
+            'Payment Intent ID': '',
+            'User ID': '',
+            'Artist ID': '',
+        }
+
+    def summary(self) -> None:
+        print(f"✅ Exported {self.count} revenue transactions to {self.output_file}")
+        if self.count:
+            print(f"   Total Revenue: ${self.total_revenue:,.2f}")
+
+
+class ExpenseReport(CsvReport):
+    """Artist payouts, plus the year's Stripe fees as one summary row."""
+    name = 'expenses'
+    default_filename = 'expenses_{year}.csv'
+    fieldnames = ['Date', 'Type', 'Description', 'Amount', 'Payment Method', 'Stripe Transfer ID',
+                  'Payment Reference', 'Artist ID', 'Payout ID']
+    sources = ('tip', 'payout')
+
+    def __init__(self, year: int, output_file: Optional[str] = None):
+        super().__init__(year, output_file)
+        self.total_expenses = 0
+        self.total_stripe_fees = 0
+
+    def write(self, row: Dict[str, Any]) -> None:
+        super().write(row)
+        self.total_expenses += row['Amount']
+
+    def tip(self, tip) -> None:
+        self.total_stripe_fees += float(tip.stripe_fee or 0)
+
+    def payout(self, payout) -> None:
+        self.write({
+            'Date': payout.completed_at.strftime('%Y-%m-%d') if payout.completed_at else '',
+            'Type': 'Artist Payout',
+            'Description': f"Payout to {get_artist_name(payout.artist_id)}",
+            'Amount': float(payout.amount),
+            'Payment Method': payout.payment_method or 'manual',
+            'Stripe Transfer ID': payout.stripe_transfer_id or '',
+            'Payment Reference': payout.payment_reference or '',
+            'Artist ID': payout.artist_id,
+            'Payout ID': payout.id,
+        })
+
+    def finish(self) -> None:
+        if self.total_stripe_fees > 0:
+            self.write({
+                'Date': f"{self.year} Summary",
                 'Type': 'Stripe Processing Fees',
-                'Description': f"Total Stripe fees for {year}",
-                'Amount': total_stripe_fees,
+                'Description': f"Total Stripe fees for {self.year}",
+                'Amount': self.total_stripe_fees,
                 'Payment Method': 'stripe_fee',
                 'Stripe Transfer ID': '',
-                'Payment Reference': f"Sum of all transaction fees",
+                'Payment Reference': "Sum of all transaction fees",
                 'Artist ID': '',
                 'Payout ID': '',
             })
-        
-        # Write to CSV
-        if not output_file:
-            output_file = f"expenses_{year}.csv"
-        
-        with open(output_file, 'w', newline='') as f:
-            if rows:
-                writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-                writer.writeheader()
-                writer.writerows(rows)
-                
-                # Add summary
-                total_expenses = sum(r['Amount'] for r in rows)
-                writer.writerow({})
-                writer.writerow({
-                    'Date': 'TOTAL',
-                    'Type': '',
-                    'Description': '',
-                    'Amount': total_expenses,
-                    'Payment Method': '',
-                    'Stripe Transfer ID': '',
-                    'Payment Reference': '',
-                    'Artist ID': '',
-                    'Payout ID': '',
-                })
-        
-        print(f"✅ Exported {len(rows)} expense transactions to {output_file}")
-        if rows:
-            total = sum(r['Amount'] for r in rows)
-            print(f"   Total Expenses: ${total:,.2f}")
-        
-        return output_file
 
+    def total_row(self) -> Dict[str, Any]:
+        return {
+            'Date': 'TOTAL',
+            'Type': '',
+            'Description': '',
+            'Amount': self.total_expenses,
+            'Payment Method': '',
+            'Stripe Transfer ID': '',
+            'Payment Reference': '',
+            'Artist ID': '',
+            'Payout ID': '',
+        }
 
-def export_artist_1099(year: int, output_file: Optional[str] = None) -> str:
-    """Export artist 1099-NEC data (total paid to each artist)."""
-    start_date = datetime(year, 1, 1)
-    end_date = datetime(year + 1, 1, 1)
-    
-    with get_session() as db_session:
-        # Get all completed payouts for the year
-        payouts = db_session.query(ArtistPayout).filter(
-            ArtistPayout.completed_at >= start_date,
-            ArtistPayout.completed_at < end_date,
-            ArtistPayout.status == 'completed'
-        ).all()
-        
-        # Group by artist
-        artist_totals = defaultdict(lambda: {'amount': Decimal('0'), 'payouts': []})
-        for payout in payouts:
-            artist_totals[payout.artist_id]['amount'] += payout.amount
-            artist_totals[payout.artist_id]['payouts'].append(payout)
-        
-        rows = []
-        for artist_id, data in sorted(artist_totals.items()):
-            artist_name = get_artist_name(artist_id)
-            rows.append({
+    def summary(self) -> None:
+        print(f"✅ Exported {self.count} expense transactions to {self.output_file}")
+        if self.count:
+            print(f"   Total Expenses: ${self.total_expenses:,.2f}")
+
+
+class Artist1099Report(CsvReport):
+    """Total paid to each artist (1099-NEC). Holds one running total per artist, not per payout."""
+    name = 'artist-1099'
+    default_filename = 'artist_1099_{year}.csv'
+    fieldnames = ['Artist ID', 'Artist Name', 'Total Paid', 'Number of Payouts', 'Requires 1099-NEC']
+    sources = ('payout',)
+
+    def __init__(self, year: int, output_file: Optional[str] = None):
+        super().__init__(year, output_file)
+        self.artist_totals = defaultdict(lambda: {'amount': Decimal('0'), 'payouts': 0})
+        self.total_paid = 0
+        self.total_payouts = 0
+        self.requires_1099 = 0
+
+    def payout(self, payout) -> None:
+        self.artist_totals[payout.artist_id]['amount'] += payout.amount
+        self.artist_totals[payout.artist_id]['payouts'] += 1
+
+    def finish(self) -> None:
+        for artist_id, data in sorted(self.artist_totals.items()):
+            requires = float(data['amount']) >= 600
+            self.write({
                 'Artist ID': artist_id,
-                'Artist Name': artist_name,
+                'Artist Name': get_artist_name(artist_id),
                 'Total Paid': float(data['amount']),
-                'Number of Payouts': len(data['payouts']),
-                'Requires 1099-NEC': 'Yes' if float(data['amount']) >= 600 else 'No',
+                'Number of Payouts': data['payouts'],
+                'Requires 1099-NEC': 'Yes' if requires else 'No',
             })
-        
-        # Write to CSV
-        if not output_file:
-            output_file = f"artist_1099_{year}.csv"
-        
-        with open(output_file, 'w', newline='') as f:
-            if rows:
-                writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-                writer.writeheader()
-                writer.writerows(rows)
-                
-                # Add summary
-                total_paid = sum(r['Total Paid'] for r in rows)
-                requires_1099 = sum(1 for r in rows if r['Requires 1099-NEC'] == 'Yes')
-                writer.writerow({})
-                writer.writerow({
-                    'Artist ID': 'TOTAL',
-                    'Artist Name': '',
-                    'Total Paid': total_paid,
-                    'Number of Payouts': sum(r['Number of Payouts'] for r in rows),
-                    'Requires 1099-NEC': f"{requires_1099} artists require 1099-NEC",
-                })
-        
-        print(f"✅ Exported 1099 data for {len(rows)} artists to {output_file}")
-        if rows:
-            total = sum(r['Total Paid'] for r in rows)
-            print(f"   Total Paid to Artists: ${total:,.2f}")
-            requires_1099 = sum(1 for r in rows if r['Requires 1099-NEC'] == 'Yes')
-            print(f"   Artists Requiring 1099-NEC: {requires_1099}")
-        
-        return output_file
+            self.total_paid += float(data['amount'])
+            self.total_payouts += data['payouts']
+            self.requires_1099 += int(requires)
 
+    def total_row(self) -> Dict[str, Any]:
+        return {
+            'Artist ID': 'TOTAL',
+            'Artist Name': '',
+            'Total Paid': self.total_paid,
+            'Number of Payouts': self.total_payouts,
+            'Requires 1099-NEC': f"{self.requires_1099} artists require 1099-NEC",
+        }
 
-def export_platform_revenue(year: int, output_file: Optional[str] = None) -> str:
-    """Export platform revenue (your net income)."""
+    def summary(self) -> None:
+        print(f"✅ Exported 1099 data for {self.count} artists to {self.output_file}")
+        if self.count:
+            print(f"   Total Paid to Artists: ${self.total_paid:,.2f}")
+            print(f"   Artists Requiring 1099-NEC: {self.requires_1099}")
+
+
+class PlatformRevenueReport(CsvReport):
+    """Platform revenue (your net income): tip platform fees and merch, in date order."""
+    name = 'platform-revenue'
+    default_filename = 'platform_revenue_{year}.csv'
+    fieldnames = ['Date', 'Type', 'Description', 'Amount', 'Stripe Session ID']
+    sources = ('tip', 'purchase')
+
+    def __init__(self, year: int, output_file: Optional[str] = None):
+        super().__init__(year, output_file)
+        self.total_platform_revenue = Decimal('0')
+
+    def tip(self, tip) -> None:
+        platform_rev = tip.platform_revenue or Decimal('0')
+        self.total_platform_revenue += platform_rev
+        self.write({
+            'Date': tip.created_at.strftime('%Y-%m-%d'),
+            'Type': 'Platform Fee',
+            'Description': f"Platform fee from boost to {get_artist_name(tip.artist_id)}",
+            'Amount': float(platform_rev),
+            'Stripe Session ID': tip.stripe_checkout_session_id or '',
+        })
+
+    def purchase(self, purchase) -> None:
+        # Merch revenue (assuming 100% is platform revenue)
+        self.total_platform_revenue += purchase.total
+        self.write({
+            'Date': purchase.created_at.strftime('%Y-%m-%d'),
+            'Type': 'Merch Revenue',
+            'Description': f"Merch purchase #{purchase.id}",
+            'Amount': float(purchase.total),
+            'Stripe Session ID': purchase.stripe_id or '',
+        })
+
+    def total_row(self) -> Dict[str, Any]:
+        return {
+            'Date': 'TOTAL',
+            'Type': '',
+            'Description': '',
+            'Amount': float(self.total_platform_revenue),
+            'Stripe Session ID': '',
+        }
+
+    def summary(self) -> None:
+        print(f"✅ Exported platform revenue to {self.output_file}")
+        print(f"   Total Platform Revenue: ${float(self.total_platform_revenue):,.2f}")
+
+
+REPORTS = {cls.name: cls for cls in (RevenueReport, ExpenseReport, Artist1099Report, PlatformRevenueReport)}
+
+
+def run_reports(year: int, outputs: Dict[str, Optional[str]]) -> Dict[str, str]:
+    """
+    Write the reports in ``outputs`` ({report type: output file or None}) in
+    one pass over each table they need.
+
+    Tips, purchases and wallet funding are merged by date into a single
+    stream (the revenue report's order); completed payouts follow. Each row
+    is handed to every report that consumes it and written straight out.
+    """
     start_date = datetime(year, 1, 1)
     end_date = datetime(year + 1, 1, 1)
-    
-    with get_session() as db_session:
-        rows = []
-        
-        # Platform revenue from tips
-        tips = db_session.query(Tip).filter(
-            Tip.created_at >= start_date,
-            Tip.created_at < end_date
-        ).all()
-        
-        total_platform_revenue = Decimal('0')
-        for tip in tips:
-            platform_rev = tip.platform_revenue or Decimal('0')
-            total_platform_revenue += platform_rev
-            
-            rows.append({
-                'Date': tip.created_at.strftime('%Y-%m-%d'),
-                'Type': 'Platform Fee',
-                'Description': f"Platform fee from boost to {get_artist_name(tip.artist_id)}",
-                'Amount': float(platform_rev),
-                'Stripe Session ID': tip.stripe_checkout_session_id or '',
-            })
-        
-        # Merch revenue (assuming 100% is platform revenue)
-        purchases = db_session.query(Purchase).filter(
-            Purchase.created_at >= start_date,
-            Purchase.created_at < end_date,
-            Purchase.status == 'paid'
-        ).all()
-        
-        for purchase in purchases:
-            total_platform_revenue += purchase.total
-            rows.append({
-                'Date': purchase.created_at.strftime('%Y-%m-%d'),
-                'Type': 'Merch Revenue',
-                'Description': f"Merch purchase #{purchase.id}",
-                'Amount': float(purchase.total),
-                'Stripe Session ID': purchase.stripe_id or '',
-            })
-        
-        # Write to CSV
-        if not output_file:
-            output_file = f"platform_revenue_{year}.csv"
-        
-        with open(output_file, 'w', newline='') as f:
-            if rows:
-                writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-                writer.writeheader()
-                writer.writerows(rows)
-                
-                # Add summary
-                writer.writerow({})
-                writer.writerow({
-                    'Date': 'TOTAL',
-                    'Type': '',
-                    'Description': '',
-                    'Amount': float(total_platform_revenue),
-                    'Stripe Session ID': '',
-                })
-        
-        print(f"✅ Exported platform revenue to {output_file}")
-        print(f"   Total Platform Revenue: ${float(total_platform_revenue):,.2f}")
-        
-        return output_file
+    reports = [REPORTS[report_type](year, output_file) for report_type, output_file in outputs.items()]
+    wanted = {kind for report in reports for kind in report.sources}
+
+    try:
+        with get_session() as db_session:
+            streams = [
+                _tagged(kind, source(db_session, start_date, end_date))
+                for kind, source in SOURCES.items() if kind in wanted
+            ]
+            consumers = {kind: [r for r in reports if kind in r.sources] for kind in wanted}
+            for kind, row in heapq.merge(*streams, key=_day):
+                for report in consumers[kind]:
+                    report.handle(kind, row)
+
+            if 'payout' in wanted:
+                for row in iter_payouts(db_session, start_date, end_date):
+                    for report in consumers['payout']:
+                        report.handle('payout', row)
+        return {report.name: report.close() for report in reports}
+    except BaseException:
+        for report in reports:
+            report.discard()
+        raise
+
+
+def export_revenue(year: int, output_file: Optional[str] = None) -> str:
+    """Export all revenue (tips, purchases, wallet funding) for a year."""
+    return run_reports(year, {'revenue': output_file})['revenue']
+
+
+def export_expenses(year: int, output_file: Optional[str] = None) -> str:
+    """Export all expenses (artist payouts, Stripe fees) for a year."""
+    return run_reports(year, {'expenses': output_file})['expenses']
+
+
+def export_artist_1099(year: int, output_file: Optional[str] = None) -> str:
+    """Export artist 1099-NEC data (total paid to each artist)."""
+    return run_reports(year, {'artist-1099': output_file})['artist-1099']
+
+
+def export_platform_revenue(year: int, output_file: Optional[str] = None) -> str:
+    """Export platform revenue (your net income)."""
+    return run_reports(year, {'platform-revenue': output_file})['platform-revenue']
+
+
+def output_path(report_type: str, year: int, output_dir: str = '.') -> str:
+    """Default file for ``report_type`` under ``output_dir``."""
+    return os.path.join(output_dir, REPORTS[report_type].default_filename.format(year=year))
+
+
+def export_all(year: int, output_dir: str = '.') -> Dict[str, str]:
+    """Export every report, reading each table once."""
+    return run_reports(year, {report_type: output_path(report_type, year, output_dir)
+                              for report_type in REPORT_TYPES})
 
 
 def main():
     parser = argparse.ArgumentParser(description="Export accounting data for tax-ready reports")
-    parser.add_argument("--type", choices=['revenue', 'expenses', 'artist-1099', 'platform-revenue', 'all'],
+    parser.add_argument("--type", choices=REPORT_TYPES + ['all'],
                        required=True, help="Type of report to generate")
     parser.add_argument("--year", type=int, default=datetime.now().year, help="Year to export (default: current year)")
     parser.add_argument("--format", choices=['csv', 'excel'], default='csv', help="Output format (default: csv)")
     parser.add_argument("--output-dir", default='.', help="Output directory (default: current directory)")
     
     args = parser.parse_args()
+    os.makedirs(args.output_dir, exist_ok=True)
     
     if args.type == 'all':
         print(f"📊 Generating all accounting reports for {args.year}...\n")
-        export_revenue(args.year, os.path.join(args.output_dir, f"revenue_{args.year}.csv"))
-        print()
-        export_expenses(args.year, os.path.join(args.output_dir, f"expenses_{args.year}.csv"))
-        print()
-        export_artist_1099(args.year, os.path.join(args.output_dir, f"artist_1099_{args.year}.csv"))
-        print()
-        export_platform_revenue(args.year, os.path.join(args.output_dir, f"platform_revenue_{args.year}.csv"))
+        export_all(args.year, args.output_dir)
         print("\n✅ All reports generated!")
-    elif args.type == 'revenue':
-        export_revenue(args.year)
+        return
+    output_file = output_path(args.type, args.year, args.output_dir)
+    if args.type == 'revenue':
+        export_revenue(args.year, output_file)
     elif args.type == 'expenses':
-        export_expenses(args.year)
+        export_expenses(args.year, output_file)
     elif args.type == 'artist-1099':
-        export_artist_1099(args.year)
+        export_artist_1099(args.year, output_file)
     elif args.type == 'platform-revenue':
-        export_platform_revenue(args.year)
+        export_platform_revenue(args.year, output_file)
 
 
 if __name__ == "__main__":
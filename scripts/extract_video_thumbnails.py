@@ -1,12 +1,22 @@
 #!/usr/bin/env python3
 """
 Extract thumbnails from videos that don't have them or have broken (404) thumbnails.
-Downloads a small portion of the video, extracts a frame, and caches it locally.
+Seeks into the video (ffmpeg reads only the range around that point), grabs one
+frame and writes it locally in several widths: AVIF and WebP where this ffmpeg
+can encode them, JPEG always.
+
+Shows and videos come from the database content tables (content_shows,
+content_videos) and from static/data/shows.json / videos.json when present;
+the thumbnail fields are written back to both. Videos sharing a URL are
+extracted once (files are named by ``get_video_hash``). Thumbnail checks run
+concurrently on one pooled session and up to --jobs ffmpeg processes run at a
+time.
 
 Usage:
     python scripts/extract_video_thumbnails.py              # Only process empty thumbnails
     python scripts/extract_video_thumbnails.py --check-urls # Also check if existing thumbnails are 404
     python scripts/extract_video_thumbnails.py --force      # Regenerate ALL thumbnails
+    python scripts/extract_video_thumbnails.py --jobs 8 --no-db
 """
 
 import argparse
@@ -14,12 +24,14 @@ import json
 import os
 import subprocess
 import sys
-import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 import hashlib
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
     REQUESTS_AVAILABLE = True
 except ImportError:
     REQUESTS_AVAILABLE = False
@@ -29,6 +41,21 @@ PROJECT_ROOT = Path(__file__).parent.parent
 SHOWS_JSON = PROJECT_ROOT / "static" / "data" / "shows.json"
 VIDEOS_JSON = PROJECT_ROOT / "static" / "data" / "videos.json"
 THUMBNAILS_DIR = PROJECT_ROOT / "static" / "thumbnails"
+THUMBNAILS_URL = "/static/thumbnails"
+
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# Output widths; the largest JPEG becomes the item's ``thumbnail``
+THUMBNAIL_WIDTHS = (320, 640, 1280)
+PRIMARY_WIDTH = 1280
+# Preferred first: (extension, ffmpeg encoder, encoder args)
+THUMBNAIL_FORMATS = (
+    ("avif", "libaom-av1", ["-c:v", "libaom-av1", "-still-picture", "1", "-crf", "32", "-cpu-used", "6"]),
+    ("webp", "libwebp", ["-c:v", "libwebp", "-quality", "80"]),
+    ("jpg", "mjpeg", ["-c:v", "mjpeg", "-q:v", "3"]),
+)
+CHECK_WORKERS = 16
+DEFAULT_JOBS = max(1, min(4, (os.cpu_count() or 2) // 2))
 
 
 def ensure_thumbnails_dir():
@@ -37,13 +64,23 @@ def ensure_thumbnails_dir():
     return THUMBNAILS_DIR
 
 
-def check_thumbnail_accessible(thumbnail_url, timeout=10):
+def make_session(workers=CHECK_WORKERS):
+    """Pooled session shared by the thumbnail checks."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def check_thumbnail_accessible(thumbnail_url, timeout=10, session=None):
     """
     Check if a thumbnail URL is accessible (not 404).
 
     Args:
         thumbnail_url: URL to check (or local path starting with /static/)
         timeout: Request timeout in seconds
+        session: requests session to reuse (default: module-level requests)
 
     Returns:
         True if accessible, False if 404 or unreachable
@@ -62,261 +99,313 @@ def check_thumbnail_accessible(thumbnail_url, timeout=10):
         return True  # Assume valid if we can't check
 
     try:
-        response = requests.head(thumbnail_url, timeout=timeout, allow_redirects=True)
+        response = (session or requests).head(thumbnail_url, timeout=timeout, allow_redirects=True)
         return response.status_code == 200
     except requests.RequestException:
         return False
 
 
+def check_thumbnails(urls, workers=CHECK_WORKERS, timeout=10):
+    """Check many thumbnail URLs concurrently; returns {url: accessible}."""
+    urls = list(dict.fromkeys(u for u in urls if u))
+    if not urls:
+        return {}
+    session = make_session(workers) if REQUESTS_AVAILABLE else None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda u: check_thumbnail_accessible(u, timeout, session), urls)
+        return dict(zip(urls, results))
+
+
 def get_video_hash(video_url):
     """Generate a hash from video URL for consistent naming"""
     return hashlib.md5(video_url.encode()).hexdigest()[:12]
 
 
-def extract_thumbnail_from_video(video_url, output_path, seek_seconds=5):
+@lru_cache(maxsize=1)
+def available_formats():
+    """Thumbnail formats this ffmpeg can encode (JPEG is always kept)."""
+    try:
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"],
+                                capture_output=True, text=True, timeout=30)
+        encoders = result.stdout
+    except (OSError, subprocess.SubprocessError):
+        encoders = ""
+    return tuple(fmt for fmt in THUMBNAIL_FORMATS if fmt[0] == "jpg" or f" {fmt[1]} " in encoders)
+
+
+def thumbnail_filename(video_hash, width, ext):
+    return f"{video_hash}-{width}.{ext}"
+
+
+def build_ffmpeg_command(video_url, outputs, seek_seconds=5):
+    """
+    One ffmpeg run that decodes a single frame and writes every output.
+
+    ``outputs`` is a list of (width, encoder args, path). ``-ss`` goes before
+    ``-i`` so it is an input option: ffmpeg seeks in the source (an HTTP range
+    request for remote files) instead of decoding up to that point.
+    """
+    split = "".join(f"[s{i}]" for i in range(len(outputs)))
+    scales = ";".join(
+        f"[s{i}]scale='min({width},iw)':-2[o{i}]" for i, (width, _, _) in enumerate(outputs)
+    )
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-ss", str(seek_seconds),
+        "-i", video_url,
+        "-an", "-sn", "-dn",
+        "-filter_complex", f"[0:v]split={len(outputs)}{split};{scales}",
+    ]
+    for i, (_, codec_args, path) in enumerate(outputs):
+        cmd += ["-map", f"[o{i}]", "-frames:v", "1", *codec_args, "-y", str(path)]
+    return cmd
+
+
+def variants_for(video_hash, formats=None):
+    """Existing thumbnail files for ``video_hash``: {ext: {width: url}}."""
+    variants = {}
+    for ext, _, _ in formats or THUMBNAIL_FORMATS:
+        for width in THUMBNAIL_WIDTHS:
+            name = thumbnail_filename(video_hash, width, ext)
+            path = THUMBNAILS_DIR / name
+            if path.exists() and path.stat().st_size > 0:
+                variants.setdefault(ext, {})[str(width)] = f"{THUMBNAILS_URL}/{name}"
+    return variants
+
+
+def extract_thumbnail_from_video(video_url, video_hash, seek_seconds=5, formats=None):
     """
-    Extract a thumbnail from a video URL using ffmpeg.
-    Downloads a small portion and extracts a frame.
-    
+    Extract every thumbnail size/format for a video using ffmpeg.
+
     Args:
         video_url: URL to the video
-        output_path: Path where thumbnail should be saved
+        video_hash: get_video_hash(video_url); names the output files
         seek_seconds: How many seconds into the video to extract (default 5)
-    
+        formats: THUMBNAIL_FORMATS entries to write (default: available_formats())
+
     Returns:
-        True if successful, False otherwise
+        {ext: {width: url}} of the files written, or None on failure
     """
+    formats = formats or available_formats()
+    thumbnails_dir = ensure_thumbnails_dir()
+    outputs, finals = [], []
+    for ext, _, codec_args in formats:
+        for width in THUMBNAIL_WIDTHS:
+            final = thumbnails_dir / thumbnail_filename(video_hash, width, ext)
+            part = thumbnails_dir / f".{final.stem}.part.{ext}"
+            outputs.append((width, codec_args, part))
+            finals.append((part, final))
     try:
-        # Use ffmpeg to extract a frame from the video
-        # -ss: seek to position
-        # -i: input URL
-        # -vframes 1: extract only 1 frame
-        # -q:v 2: high quality JPEG
-        # -y: overwrite output file
-        cmd = [
-            "ffmpeg",
-            "-ss", str(seek_seconds),  # Seek to 5 seconds (or 10% if we know duration)
-            "-i", video_url,
-            "-vframes", "1",  # Extract only 1 frame
-            "-q:v", "2",  # High quality (2 is best quality for JPEG)
-            "-vf", "scale=1280:-1",  # Scale to max width 1280, maintain aspect ratio
-            "-y",  # Overwrite output file
-            str(output_path)
-        ]
-        
-        # Run ffmpeg, capturing stderr for error messages
         result = subprocess.run(
-            cmd,
+            build_ffmpeg_command(video_url, outputs, seek_seconds),
             capture_output=True,
             text=True,
-            timeout=60  # 60 second timeout
+            timeout=120,
         )
-        
-        if result.returncode == 0 and output_path.exists():
-            file_size = output_path.stat().st_size
-            if file_size > 0:
-                print(f"✓ Extracted thumbnail: {output_path.name} ({file_size} bytes)")
-                return True
-            else:
-                print(f"✗ Thumbnail file is empty: {output_path}")
-                return False
-        else:
+        ok = result.returncode == 0 and all(p.exists() and p.stat().st_size > 0 for p, _ in finals)
+        if not ok:
             print(f"✗ ffmpeg failed for {video_url}")
             if result.stderr:
                 print(f"  Error: {result.stderr[:200]}")
-            return False
-            
+            return None
+        for part, final in finals:
+            os.replace(part, final)
+        print(f"✓ Extracted thumbnails: {video_hash} ({len(finals)} files)")
+        return variants_for(video_hash, formats)
     except subprocess.TimeoutExpired:
         print(f"✗ Timeout extracting thumbnail from {video_url}")
-        return False
+        return None
     except FileNotFoundError:
         print("✗ ffmpeg not found. Please install ffmpeg:")
         print("  macOS: brew install ffmpeg")
         print("  Linux: apt-get install ffmpeg or yum install ffmpeg")
         print("  Windows: Download from https://ffmpeg.org/download.html")
-        return False
+        return None
     except Exception as e:
         print(f"✗ Error extracting thumbnail: {e}")
-        return False
-
-
-def process_shows_json(check_urls=False, force=False):
-    """
-    Process shows.json and extract thumbnails for videos without them.
-
-    Args:
-        check_urls: If True, also check if existing thumbnail URLs are 404
-        force: If True, regenerate ALL thumbnails regardless of existing ones
-    """
-    if not SHOWS_JSON.exists():
-        print(f"✗ {SHOWS_JSON} not found")
-        return False
-
-    with open(SHOWS_JSON, 'r', encoding='utf-8') as f:
+        return None
+    finally:
+        for part, _ in finals:
+            if part.exists():
+                part.unlink()
+
+
+def primary_thumbnail(variants):
+    jpegs = variants.get("jpg") or {}
+    return jpegs.get(str(PRIMARY_WIDTH)) or (jpegs[max(jpegs, key=int)] if jpegs else None)
+
+
+# ---------------------------------------------------------------------------
+# Items: one per show/video record, from JSON files and the database
+# ---------------------------------------------------------------------------
+
+def _item(kind, record_id, video_url, thumbnail, ref=None):
+    return {
+        "kind": kind,
+        "id": record_id or "unknown",
+        "video_url": video_url,
+        "thumbnail": (thumbnail or "").strip(),
+        "ref": ref,  # the JSON object to update, or None for DB rows
+    }
+
+
+def load_json_items(path, list_key, kind):
+    """(data, items) for a shows.json / videos.json file, or (None, []) if missing."""
+    if not path.exists():
+        print(f"⊘ {path} not found")
+        return None, []
+    with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
-
-    updated = False
-    thumbnails_dir = ensure_thumbnails_dir()
-    checked_count = 0
-    broken_count = 0
-
-    for show in data.get("shows", []):
-        video_url = show.get("video_url") or show.get("trailer_url")
-        thumbnail = show.get("thumbnail", "").strip()
-        show_id = show.get("id", "unknown")
-        title = show.get("title", show_id)[:50]
-
-        # Skip if no video URL
-        if not video_url:
-            continue
-
-        needs_thumbnail = False
-
-        if force:
-            # Force mode: regenerate all
-            needs_thumbnail = True
-            print(f"[FORCE] {title}")
-        elif not thumbnail:
-            # No thumbnail defined
-            needs_thumbnail = True
-            print(f"[EMPTY] {title}")
-        elif check_urls:
-            # Check if existing thumbnail is accessible
-            checked_count += 1
-            print(f"Checking [{show_id}] {title}...", end=" ", flush=True)
-            if check_thumbnail_accessible(thumbnail):
-                print("OK")
-                continue
-            else:
-                print("BROKEN (404)")
-                broken_count += 1
-                needs_thumbnail = True
-
-        if not needs_thumbnail:
-            continue
-
-        # Generate thumbnail filename
-        video_hash = get_video_hash(video_url)
-        thumbnail_filename = f"{show_id}_{video_hash}.jpg"
-        thumbnail_path = thumbnails_dir / thumbnail_filename
-        relative_path = f"/static/thumbnails/{thumbnail_filename}"
-
-        # Skip if local thumbnail already exists (unless force mode)
-        if thumbnail_path.exists() and not force:
-            print(f"  ⊘ Local thumbnail exists: {thumbnail_filename}")
-            if show.get("thumbnail") != relative_path:
-                show["thumbnail"] = relative_path
-                updated = True
-            continue
-
-        # Extract thumbnail
-        print(f"  Extracting from: {video_url[:80]}...")
-
-        if extract_thumbnail_from_video(video_url, thumbnail_path):
-            show["thumbnail"] = relative_path
-            updated = True
+    items = []
+    for obj in data.get(list_key, []):
+        if kind == "show":
+            video_url = obj.get("video_url") or obj.get("trailer_url")
+        elif obj.get("status") == "available":
+            video_url = obj.get("url")
         else:
-            print(f"  Failed to extract thumbnail")
-
-    if check_urls and checked_count > 0:
-        print(f"\nChecked {checked_count} thumbnails, {broken_count} broken")
-
-    # Save updated JSON
-    if updated:
-        with open(SHOWS_JSON, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        print(f"\n✓ Updated {SHOWS_JSON}")
-        return True
-
-    return False
-
-
-def process_videos_json(check_urls=False, force=False):
+            video_url = None
+        if video_url:
+            items.append(_item(kind, obj.get("id"), video_url, obj.get("thumbnail"), ref=obj))
+    return data, items
+
+
+def load_db_items():
+    """Items for every show and available video in the content tables."""
+    from db import get_session
+    from models import ContentVideo, Show
+
+    items = []
+    with get_session() as session:
+        for s in session.query(Show).order_by(Show.position):
+            video_url = s.video_url or s.trailer_url
+            if video_url:
+                items.append(_item("show", s.show_id, video_url, s.thumbnail))
+        for v in session.query(ContentVideo).filter(ContentVideo.status == "available").order_by(ContentVideo.position):
+            if v.url:
+                items.append(_item("video", v.video_id, v.url, v.thumbnail))
+    return items
+
+
+def select_items(items, check_urls=False, force=False, workers=CHECK_WORKERS):
+    """Items that need a thumbnail; with check_urls, existing ones are HEAD-checked concurrently."""
+    if force:
+        return list(items)
+    selected = [it for it in items if not it["thumbnail"]]
+    if check_urls:
+        existing = [it for it in items if it["thumbnail"]]
+        accessible = check_thumbnails([it["thumbnail"] for it in existing], workers=workers)
+        broken = [it for it in existing if not accessible.get(it["thumbnail"])]
+        print(f"Checked {len(accessible)} thumbnails, {len(broken)} broken")
+        selected += broken
+    return selected
+
+
+def extract_all(items, force=False, jobs=DEFAULT_JOBS, seek_seconds=5):
     """
-    Process videos.json and extract thumbnails for videos without them.
-
-    Args:
-        check_urls: If True, also check if existing thumbnail URLs are 404
-        force: If True, regenerate ALL thumbnails regardless of existing ones
+    Extract thumbnails once per distinct video (by get_video_hash), up to
+    ``jobs`` ffmpeg processes at a time. Returns {video_hash: variants}.
     """
-    if not VIDEOS_JSON.exists():
-        print(f"⊘ {VIDEOS_JSON} not found, skipping")
-        return False
-
-    with open(VIDEOS_JSON, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    updated = False
-    thumbnails_dir = ensure_thumbnails_dir()
-    checked_count = 0
-    broken_count = 0
-
-    for video in data.get("videos", []):
-        video_url = video.get("url")
-        thumbnail = video.get("thumbnail", "").strip()
-        video_id = video.get("id", "unknown")
-        title = video.get("title", video_id)[:50]
-
-        # Skip if no video URL or status is not available
-        if not video_url or video.get("status") != "available":
-            continue
-
-        needs_thumbnail = False
-
-        if force:
-            needs_thumbnail = True
-            print(f"[FORCE] {title}")
-        elif not thumbnail:
-            needs_thumbnail = True
-            print(f"[EMPTY] {title}")
-        elif check_urls:
-            checked_count += 1
-            print(f"Checking [{video_id}] {title}...", end=" ", flush=True)
-            if check_thumbnail_accessible(thumbnail):
-                print("OK")
-                continue
-            else:
-                print("BROKEN (404)")
-                broken_count += 1
-                needs_thumbnail = True
-
-        if not needs_thumbnail:
+    urls = {}
+    for it in items:
+        urls.setdefault(get_video_hash(it["video_url"]), it["video_url"])
+
+    results, todo = {}, []
+    formats = available_formats()
+    for video_hash, url in urls.items():
+        existing = variants_for(video_hash, formats)
+        if not force and primary_thumbnail(existing):
+            print(f"  ⊘ Local thumbnails exist: {video_hash}")
+            results[video_hash] = existing
+        else:
+            todo.append((video_hash, url))
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {
+            video_hash: pool.submit(extract_thumbnail_from_video, url, video_hash, seek_seconds, formats)
+            for video_hash, url in todo
+        }
+        for video_hash, future in futures.items():
+            variants = future.result()
+            if variants:
+                results[video_hash] = variants
+    return results
+
+
+def apply_results(items, results):
+    """Set thumbnail (largest JPEG) and thumbnail_variants on each item; returns the changed items."""
+    changed = []
+    for it in items:
+        variants = results.get(get_video_hash(it["video_url"]))
+        if not variants:
             continue
-
-        # Generate thumbnail filename
-        video_hash = get_video_hash(video_url)
-        thumbnail_filename = f"{video_id}_{video_hash}.jpg"
-        thumbnail_path = thumbnails_dir / thumbnail_filename
-        relative_path = f"/static/thumbnails/{thumbnail_filename}"
-
-        # Skip if local thumbnail already exists (unless force mode)
-        if thumbnail_path.exists() and not force:
-            print(f"  ⊘ Local thumbnail exists: {thumbnail_filename}")
-            if video.get("thumbnail") != relative_path:
-                video["thumbnail"] = relative_path
-                updated = True
+        thumbnail = primary_thumbnail(variants)
+        ref = it["ref"]
+        if ref is not None and ref.get("thumbnail") == thumbnail and ref.get("thumbnail_variants") == variants:
             continue
+        it["thumbnail"] = thumbnail
+        it["variants"] = variants
+        if ref is not None:
+            ref["thumbnail"] = thumbnail
+            ref["thumbnail_variants"] = variants
+        changed.append(it)
+    return changed
+
+
+def save_db_thumbnails(items):
+    """Write thumbnail + thumbnail_variants (in extra_fields) to content_shows / content_videos."""
+    from db import get_session
+    from models import ContentVideo, Show
+
+    by_kind = {"show": {}, "video": {}}
+    for it in items:
+        by_kind[it["kind"]][it["id"]] = it
+    count = 0
+    with get_session() as session:
+        for model, key, pending in ((Show, Show.show_id, by_kind["show"]),
+                                    (ContentVideo, ContentVideo.video_id, by_kind["video"])):
+            if not pending:
+                continue
+            for row in session.query(model).filter(key.in_(list(pending))):
+                it = pending[getattr(row, key.key)]
+                row.thumbnail = it["thumbnail"]
+                extra = dict(row.extra_fields or {})
+                extra["thumbnail_variants"] = it["variants"]
+                row.extra_fields = extra
+                count += 1
+    return count
 
-        # Extract thumbnail
-        print(f"  Extracting from: {video_url[:80]}...")
 
-        if extract_thumbnail_from_video(video_url, thumbnail_path):
-            video["thumbnail"] = relative_path
-            updated = True
-        else:
-            print(f"  Failed to extract thumbnail")
+def save_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    print(f"✓ Updated {path}")
 
-    if check_urls and checked_count > 0:
-        print(f"\nChecked {checked_count} thumbnails, {broken_count} broken")
 
-    # Save updated JSON
-    if updated:
-        with open(VIDEOS_JSON, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        print(f"\n✓ Updated {VIDEOS_JSON}")
-        return True
-
-    return False
+def process_thumbnails(check_urls=False, force=False, jobs=DEFAULT_JOBS, use_db=True, check_workers=CHECK_WORKERS):
+    """
+    Run the whole pipeline over the JSON files and (unless ``use_db`` is
+    False) the database. Returns the number of records updated.
+    """
+    shows_data, show_items = load_json_items(SHOWS_JSON, "shows", "show")
+    videos_data, video_items = load_json_items(VIDEOS_JSON, "videos", "video")
+    db_items = load_db_items() if use_db else []
+    items = show_items + video_items + db_items
+
+    selected = select_items(items, check_urls=check_urls, force=force, workers=check_workers)
+    print(f"{len(selected)} of {len(items)} records need thumbnails "
+          f"({len({get_video_hash(it['video_url']) for it in selected})} distinct videos)")
+    if not selected:
+        return 0
+
+    changed = apply_results(selected, extract_all(selected, force=force, jobs=jobs))
+    if any(it["ref"] is not None and it["kind"] == "show" for it in changed):
+        save_json(SHOWS_JSON, shows_data)
+    if any(it["ref"] is not None and it["kind"] == "video" for it in changed):
+        save_json(VIDEOS_JSON, videos_data)
+    db_changed = [it for it in changed if it["ref"] is None]
+    if db_changed:
+        print(f"✓ Updated {save_db_thumbnails(db_changed)} database rows")
+    return len(changed)
 
 
 def main():
@@ -334,6 +423,17 @@ def main():
         action="store_true",
         help="Regenerate ALL thumbnails, even existing ones"
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Concurrent ffmpeg processes (default {DEFAULT_JOBS})"
+    )
+    parser.add_argument(
+        "--no-db",
+        action="store_true",
+        help="Only process the JSON files, not the database content tables"
+    )
     args = parser.parse_args()
 
     print("=" * 60)
@@ -364,23 +464,16 @@ def main():
         print("    Linux: apt-get install ffmpeg")
         sys.exit(1)
 
-    print("✓ ffmpeg found")
+    print(f"✓ ffmpeg found (formats: {', '.join(f[0] for f in available_formats())})")
     print()
 
-    # Process both JSON files
-    print("Processing shows.json...")
-    print("-" * 40)
-    shows_updated = process_shows_json(check_urls=args.check_urls, force=args.force)
-
-    print()
-    print("Processing videos.json...")
-    print("-" * 40)
-    videos_updated = process_videos_json(check_urls=args.check_urls, force=args.force)
+    updated = process_thumbnails(check_urls=args.check_urls, force=args.force,
+                                 jobs=args.jobs, use_db=not args.no_db)
 
     print()
     print("=" * 60)
-    if shows_updated or videos_updated:
-        print("✓ Thumbnail extraction complete!")
+    if updated:
+        print(f"✓ Thumbnail extraction complete! ({updated} records updated)")
         print("  Local thumbnails saved to: static/thumbnails/")
         print("  These load instantly for end users.")
     else:
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Write .br and .gz siblings next to compressible build output.
+
+services/static_files.py serves these to clients that accept them instead
+of compressing the same bytes on every response. Run after the SPA build
+(scripts/build_with_spa.sh does). Files already up to date are skipped, a
+sibling is only kept when it is smaller than the original, and .br needs the
+``brotli`` package (installed with Flask-Compress).
+
+Usage:
+    python scripts/precompress_static.py                    # spa-dist
+    python scripts/precompress_static.py spa-dist static/css static/js
+    python scripts/precompress_static.py --min-size 2048
+"""
+import os
+import sys
+import gzip
+import argparse
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli ships with Flask-Compress
+    brotli = None
+
+COMPRESSIBLE = ('.js', '.mjs', '.css', '.html', '.svg', '.json', '.webmanifest', '.map', '.txt', '.xml', '.wasm')
+DEFAULT_MIN_SIZE = 1024
+
+
+def _compressors():
+    yield '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+def precompress_file(path, min_size=DEFAULT_MIN_SIZE):
+    """Write the missing or stale siblings of ``path``; returns the suffixes written."""
+    st = os.stat(path)
+    if st.st_size < min_size:
+        return []
+    data = None
+    written = []
+    for suffix, compress in _compressors():
+        target = path + suffix
+        try:
+            if os.stat(target).st_mtime >= st.st_mtime:
+                continue
+        except OSError:
+            pass
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        packed = compress(data)
+        if len(packed) >= len(data):
+            if os.path.exists(target):
+                os.remove(target)
+            continue
+        tmp = f'{target}.tmp.{os.getpid()}'
+        with open(tmp, 'wb') as f:
+            f.write(packed)
+        os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp, target)
+        written.append(suffix)
+    return written
+
+
+def precompress_tree(root, min_size=DEFAULT_MIN_SIZE):
+    """Precompress every compressible file under ``root``; returns stats."""
+    stats = {'files': 0, 'written': 0}
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for name in filenames:
+            if not name.lower().endswith(COMPRESSIBLE):
+                continue
+            stats['files'] += 1
+            stats['written'] += len(precompress_file(os.path.join(dirpath, name), min_size))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompress static build output (.br/.gz)")
+    parser.add_argument("dirs", nargs="*", default=["spa-dist"], help="Directories to process (default: spa-dist)")
+    parser.add_argument("--min-size", type=int, default=DEFAULT_MIN_SIZE,
+                        help=f"Skip files smaller than this many bytes (default: {DEFAULT_MIN_SIZE})")
+    args = parser.parse_args()
+
+    if brotli is None:
+        print("brotli not installed: writing .gz only")
+    for root in args.dirs:
+        if not os.path.isdir(root):
+            print(f"Skipping {root}: not a directory")
+            continue
+        stats = precompress_tree(root, args.min_size)
+        print(f"{root}: {stats['files']} compressible files, {stats['written']} siblings written")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
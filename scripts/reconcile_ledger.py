@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Verify the tip ledger (artist_balances, user_boost_totals) against raw tips.
+
+Recomputes every artist's and user's totals from the tips table and reports
+any field that differs from the ledger. With --fix, the drifted rows are
+rewritten from the recomputed totals. Tips recorded while the check runs can
+show up as transient drift; re-run before fixing.
+
+Usage:
+    python scripts/reconcile_ledger.py          # report only (exit 1 on drift)
+    python scripts/reconcile_ledger.py --fix    # rewrite drifted rows
+"""
+import os
+import sys
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import get_session
+from services.ledger import reconcile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile the tip ledger against raw tips")
+    parser.add_argument("--fix", action="store_true", help="Rewrite drifted ledger rows from the tips table")
+
+    args = parser.parse_args()
+
+    print("🔍 Reconciling tip ledger against tips...\n")
+
+    with get_session() as db_session:
+        report = reconcile(db_session, fix=args.fix)
+
+    drift = report['artists'] + report['users']
+    if not drift:
+        print("✅ Ledger matches tips")
+        return
+
+    for label, mismatches in (("Artist balances", report['artists']), ("User boost totals", report['users'])):
+        if not mismatches:
+            continue
+        print(f"⚠️  {label}: {len(mismatches)} mismatch(es)")
+        for m in mismatches:
+            print(f"   {m['key']}.{m['field']}: ledger={m['ledger']} expected={m['expected']}")
+        print()
+
+    if args.fix:
+        print(f"✅ Rewrote {len({m['key'] for m in report['artists']}) + len({m['key'] for m in report['users']})} ledger row(s)")
+    else:
+        print("❌ Ledger drift found (run with --fix to repair)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
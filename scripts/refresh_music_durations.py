@@ -1,29 +1,143 @@
+#!/usr/bin/env python3
+"""
+Refresh track durations by probing the audio files over HTTP.
+
+Only the start of each file is fetched (a Range request for HEAD_BYTES),
+plus the last TAIL_BYTES when the format keeps what mutagen needs at the
+end (Ogg's final page, an MP4 ``moov`` atom, ...). When a leading ID3v2 tag
+(embedded cover art) leaves less than MIN_AUDIO_BYTES of audio in the head,
+HEAD_BYTES are also fetched from the end of the tag. The probe bytes are
+laid out in a sparse file object of the real file size, so bitrate-based
+estimates (CBR MP3) still see the full length. Probes run concurrently on
+one pooled session.
+
+Durations are written to ``content_tracks.duration_seconds`` and, with
+--input, to that music.json as well.
+
+Usage:
+    python scripts/refresh_music_durations.py                      # tracks missing a duration
+    python scripts/refresh_music_durations.py --force --workers 16
+    python scripts/refresh_music_durations.py --input dev/legacy_json/music.json
+    python scripts/refresh_music_durations.py --dry-run --max-tracks 5
+"""
 import argparse
+import io
 import json
 import os
-import tempfile
-from typing import Any, Dict, List, Optional
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 from mutagen import File as MutagenFile
 
+# Allow running from project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HEAD_BYTES = 256 * 1024
+TAIL_BYTES = 512 * 1024
+MIN_AUDIO_BYTES = 64 * 1024  # audio wanted after a leading ID3 tag
+DEFAULT_WORKERS = 8
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+class SparseFile(io.RawIOBase):
+    """
+    Read-only file of ``size`` bytes holding ``head`` at 0, ``tail`` at the
+    end and each ``(offset, bytes)`` of ``pieces`` in between; zeros elsewhere.
+    """
+
+    def __init__(self, size: int, head: bytes, tail: bytes = b"", pieces: List[Tuple[int, bytes]] = ()):
+        self.size = size
+        self.pieces = [(0, head), *pieces, (size - len(tail), tail)]
+        self.pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
 
-DEFAULT_INPUT = os.path.join("static", "data", "music.json")
+    def tell(self) -> int:
+        return self.pos
 
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.pos, io.SEEK_END: self.size}[whence]
+        self.pos = max(0, base + offset)
+        return self.pos
 
-def download_to_temp(url: str, timeout: float) -> str:
-    response = requests.get(url, stream=True, timeout=timeout)
-    response.raise_for_status()
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".bin") as tmp:
-        for chunk in response.iter_content(chunk_size=1024 * 1024):
-            if chunk:
-                tmp.write(chunk)
-        return tmp.name
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
 
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.size - self.pos
+        start, end = self.pos, min(self.size, self.pos + size)
+        if start >= end:
+            return b""
+        out = bytearray(end - start)
+        for offset, data in self.pieces:
+            lo, hi = max(start, offset), min(end, offset + len(data))
+            if lo < hi:
+                out[lo - start:hi - start] = data[lo - offset:hi - offset]
+        self.pos = end
+        return bytes(out)
 
-def get_duration_seconds(file_path: str) -> Optional[int]:
-    audio = MutagenFile(file_path)
-    if not audio or not getattr(audio, "info", None):
+
+def make_session(workers: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def fetch_range(session: requests.Session, url: str, range_value: str, limit: int,
+                timeout: float) -> Tuple[bytes, Optional[int]]:
+    """
+    GET one byte range; returns (bytes, total file size).
+
+    An origin that ignores Range (200) is read only up to ``limit`` bytes.
+    """
+    with session.get(url, headers={"Range": range_value}, stream=True, timeout=timeout) as response:
+        if response.status_code == 416:
+            return b"", 0
+        response.raise_for_status()
+        total = None
+        match = _CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+        if response.status_code == 206 and match:
+            total = int(match.group(3))
+        elif response.headers.get("Content-Length", "").isdigit():
+            total = int(response.headers["Content-Length"])
+        if response.status_code == 200 and not range_value.startswith("bytes=0-"):
+            return b"", total  # the start of the body is not the range we asked for
+        data = bytearray()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            data.extend(chunk)
+            if len(data) >= limit:
+                break
+        return bytes(data[:limit]), total
+
+
+def id3_size(head: bytes) -> int:
+    """Bytes taken by a leading ID3v2 tag (header, body and footer), or 0 if there is none."""
+    if len(head) < 10 or head[:3] != b"ID3" or any(b & 0x80 for b in head[6:10]):
+        return 0
+    body = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]  # synchsafe
+    return 10 + body + (10 if head[5] & 0x10 else 0)
+
+
+def duration_from(fileobj: io.RawIOBase) -> Optional[int]:
+    try:
+        audio = MutagenFile(fileobj)
+    except Exception:
+        return None
+    if audio is None or not getattr(audio, "info", None):  # untagged files are falsy
         return None
     length = getattr(audio.info, "length", None)
     if not length or length <= 0:
@@ -31,6 +145,28 @@ def get_duration_seconds(file_path: str) -> Optional[int]:
     return int(round(length))
 
 
+def probe_duration(session: requests.Session, url: str, timeout: float) -> Optional[int]:
+    """Duration in seconds from the head (and, if needed, tail) of the file at ``url``."""
+    head, size = fetch_range(session, url, f"bytes=0-{HEAD_BYTES - 1}", HEAD_BYTES, timeout)
+    if not head:
+        return None
+    size = size or len(head)
+    pieces = []
+    audio_start = id3_size(head)
+    if audio_start and len(head) - audio_start < MIN_AUDIO_BYTES and audio_start < size:
+        audio, _ = fetch_range(session, url, f"bytes={audio_start}-{audio_start + HEAD_BYTES - 1}",
+                               HEAD_BYTES, timeout)
+        pieces.append((audio_start, audio))
+    covered = max([len(head)] + [offset + len(data) for offset, data in pieces])
+    duration = duration_from(SparseFile(size, head, pieces=pieces))
+    if duration or size <= covered:
+        return duration
+    tail, _ = fetch_range(session, url, f"bytes=-{TAIL_BYTES}", TAIL_BYTES, timeout)
+    if not tail:
+        return None
+    return duration_from(SparseFile(size, head, tail[-(size - covered):], pieces))
+
+
 def choose_audio_url(track: Dict[str, Any]) -> Optional[str]:
     return track.get("audio_url") or track.get("preview_url")
 
@@ -41,51 +177,89 @@ def refresh_durations(
     force: bool,
     max_tracks: Optional[int],
     dry_run: bool,
-) -> Dict[str, int]:
+    workers: int = DEFAULT_WORKERS,
+    session: Optional[requests.Session] = None,
+) -> Dict[str, Any]:
+    """
+    Probe durations for ``tracks`` concurrently, updating each dict in place
+    (unless ``dry_run``). The returned stats include ``durations``: track id
+    -> seconds for every track that was updated.
+    """
     updated = 0
     skipped = 0
     failed = 0
-    processed = 0
-
-    for track in tracks:
-        if max_tracks is not None and processed >= max_tracks:
-            break
-        processed += 1
-
-        current = int(track.get("duration_seconds") or 0)
-        if current > 0 and not force:
+    selected = tracks if max_tracks is None else tracks[:max_tracks]
+    todo = []
+    for track in selected:
+        if int(track.get("duration_seconds") or 0) > 0 and not force:
             skipped += 1
-            continue
-
-        url = choose_audio_url(track)
-        if not url:
+        elif not choose_audio_url(track):
             failed += 1
-            continue
-
-        tmp_path = None
-        try:
-            tmp_path = download_to_temp(url, timeout)
-            duration = get_duration_seconds(tmp_path)
-            if duration:
-                if not dry_run:
-                    track["duration_seconds"] = duration
-                updated += 1
-            else:
+        else:
+            todo.append(track)
+
+    session = session or make_session(workers)
+    durations: Dict[str, int] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(probe_duration, session, choose_audio_url(track), timeout): track
+            for track in todo
+        }
+        for future in as_completed(futures):
+            track = futures[future]
+            try:
+                duration = future.result()
+            except Exception:
+                duration = None
+            if not duration:
                 failed += 1
-        except Exception:
-            failed += 1
-        finally:
-            if tmp_path and os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+                continue
+            if not dry_run:
+                track["duration_seconds"] = duration
+            updated += 1
+            if track.get("id"):
+                durations[str(track["id"])] = duration
 
     return {
         "updated": updated,
         "skipped": skipped,
         "failed": failed,
-        "processed": processed,
+        "processed": len(selected),
+        "durations": durations,
     }
 
 
+def load_db_tracks() -> List[Dict[str, Any]]:
+    from db import get_session
+    from models import Track
+
+    with get_session() as session:
+        rows = session.query(
+            Track.track_id, Track.audio_url, Track.preview_url, Track.duration_seconds
+        ).order_by(Track.position).all()
+    return [
+        {"id": r.track_id, "audio_url": r.audio_url, "preview_url": r.preview_url,
+         "duration_seconds": r.duration_seconds}
+        for r in rows
+    ]
+
+
+def save_db_durations(durations: Dict[str, int]) -> int:
+    """Write durations to content_tracks in one transaction; returns rows changed."""
+    if not durations:
+        return 0
+    from db import get_session
+    from models import Track
+
+    changed = 0
+    with get_session() as session:
+        for track in session.query(Track).filter(Track.track_id.in_(list(durations))):
+            if track.duration_seconds != durations[track.track_id]:
+                track.duration_seconds = durations[track.track_id]
+                changed += 1
+    return changed
+
+
 def load_music(path: str) -> Dict[str, Any]:
     with open(path, "r", encoding="utf-8") as handle:
         return json.load(handle)
@@ -99,9 +273,12 @@ def save_music(path: str, data: Dict[str, Any]) -> None:
 
 def main() -> None:
     parser = argparse.ArgumentParser(
-        description="Refresh duration_seconds in static/data/music.json by scanning audio URLs."
+        description="Refresh track duration_seconds by probing audio URLs with partial downloads."
+    )
+    parser.add_argument(
+        "--input", default=None,
+        help="music.json to probe and update (default: tracks from the database)",
     )
-    parser.add_argument("--input", default=DEFAULT_INPUT, help="Path to music.json")
     parser.add_argument(
         "--timeout", type=float, default=30.0, help="HTTP timeout per request in seconds"
     )
@@ -114,13 +291,23 @@ def main() -> None:
         default=None,
         help="Limit number of tracks processed",
     )
+    parser.add_argument(
+        "--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent probes"
+    )
+    parser.add_argument(
+        "--no-db", action="store_true", help="Do not write durations to the database"
+    )
     parser.add_argument("--dry-run", action="store_true", help="Do not write changes")
     args = parser.parse_args()
 
-    data = load_music(args.input)
-    tracks = data.get("tracks", [])
-    if not isinstance(tracks, list):
-        raise ValueError("music.json is missing a tracks list")
+    data = None
+    if args.input:
+        data = load_music(args.input)
+        tracks = data.get("tracks", [])
+        if not isinstance(tracks, list):
+            raise ValueError("music.json is missing a tracks list")
+    else:
+        tracks = load_db_tracks()
 
     stats = refresh_durations(
         tracks=tracks,
@@ -128,15 +315,19 @@ def main() -> None:
         force=args.force,
         max_tracks=args.max_tracks,
         dry_run=args.dry_run,
+        workers=args.workers,
     )
 
+    stats["db_rows"] = 0
     if not args.dry_run:
-        save_music(args.input, data)
+        if data is not None:
+            save_music(args.input, data)
+        if not args.no_db:
+            stats["db_rows"] = save_db_durations(stats["durations"])
 
     print(
-        "Done. processed={processed} updated={updated} skipped={skipped} failed={failed}".format(
-            **stats
-        )
+        "Done. processed={processed} updated={updated} skipped={skipped} failed={failed} "
+        "db_rows={db_rows}".format(**stats)
     )
 
 
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Refresh the hourly admin-dashboard rollups (stats_rollups) and the per-day
+analytics path counts (analytics_daily_paths).
+
+Rebuilds pre-aggregated plays / listening sessions / new users / merch orders
+so /api/admin/stats and /api/admin/analytics read a handful of rows instead of
+counting the raw tables, and daily page-view counts for /api/admin/heatmap.
+
+Usage:
+    python scripts/refresh_rollups.py                    # trailing window (run from cron)
+    python scripts/refresh_rollups.py --backfill         # rebuild full history
+    python scripts/refresh_rollups.py --since 2025-01-01 # rebuild from a date
+    python scripts/refresh_rollups.py --metric plays --metric orders
+    python scripts/refresh_rollups.py --backfill --metric paths
+"""
+import os
+import sys
+import argparse
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.rollups import ROLLUP_METRICS, refresh_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh admin dashboard rollups")
+    parser.add_argument("--backfill", action="store_true", help="Rebuild rollups for the full history")
+    parser.add_argument("--since", type=str, help="Rebuild buckets from this date (YYYY-MM-DD, UTC)")
+    parser.add_argument("--metric", action="append", choices=ROLLUP_METRICS,
+                        help="Only refresh this metric (repeatable)")
+
+    args = parser.parse_args()
+
+    since = None
+    if args.since:
+        try:
+            since = datetime.strptime(args.since, "%Y-%m-%d")
+        except ValueError:
+            print(f"❌ Invalid --since date: {args.since} (expected YYYY-MM-DD)")
+            sys.exit(1)
+
+    mode = "full backfill" if args.backfill else (f"since {since:%Y-%m-%d}" if since else "trailing window")
+    print(f"📊 Refreshing rollups ({mode})...")
+
+    written = refresh_rollups(since=since, full=args.backfill, metrics=args.metric)
+
+    for metric, rows in written.items():
+        print(f"   {metric}: {rows} bucket(s)")
+    print("✅ Done")
+
+
+if __name__ == "__main__":
+    main()
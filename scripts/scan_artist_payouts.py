@@ -3,7 +3,7 @@
 Scan all artists and identify who needs to be paid out.
 
 This script:
-1. Loads all artists from artists.json
+1. Loads all artists from the artist directory
 2. Checks database for pending tips for each artist
 3. Calculates total unpaid amounts
 4. Shows which artists need payouts
@@ -16,61 +16,30 @@ import os
 import sys
 import argparse
 from decimal import Decimal
-from collections import defaultdict
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from db import get_session
-from models import Tip, ArtistPayout
+from services import artist_directory
+from services.payouts import match_artists, pending_tips, pending_totals
 
 
 def load_artists():
-    """Load all artists from artists.json"""
+    """Load all artists from the artist directory."""
     try:
-        import json
-        from pathlib import Path
-        
-        artists_file = Path(__file__).parent.parent / 'static' / 'data' / 'artists.json'
-        if artists_file.exists():
-            with open(artists_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get('artists', [])
+        return artist_directory.all_artists()
     except Exception as e:
         print(f"⚠️  Error loading artists: {e}")
     return []
 
 
-def get_pending_tips_for_artist(artist_id: str, db_session):
-    """Get all tips that haven't been included in a completed payout."""
-    # Get all tips for this artist
-    all_tips = db_session.query(Tip).filter(
-        Tip.artist_id == str(artist_id)
-    ).order_by(Tip.created_at).all()
-    
-    # Get all completed payouts and their related tip IDs
-    completed_payouts = db_session.query(ArtistPayout).filter(
-        ArtistPayout.artist_id == str(artist_id),
-        ArtistPayout.status == "completed"
-    ).all()
-    
-    # Collect all tip IDs that have been paid out
-    paid_tip_ids = set()
-    for payout in completed_payouts:
-        if payout.related_tip_ids:
-            paid_tip_ids.update(payout.related_tip_ids)
-    
-    # Filter out tips that have been paid
-    pending_tips = [tip for tip in all_tips if tip.id not in paid_tip_ids]
-    return pending_tips
-
-
 def scan_all_artists(min_amount: Decimal = Decimal("0.01")):
     """Scan all artists and find pending payouts."""
     artists = load_artists()
     
     if not artists:
-        print("❌ No artists found in artists.json")
+        print("❌ No artists found")
         return
     
     print(f"🔍 Scanning {len(artists)} artists for pending payouts...\n")
@@ -78,38 +47,25 @@ def scan_all_artists(min_amount: Decimal = Decimal("0.01")):
     results = []
     
     with get_session() as db_session:
-        for artist in artists:
+        # Pending totals for every artist in one grouped anti-join
+        totals = pending_totals(db_session)
+        matches = [
+            (artist, identifier) for artist, identifier in match_artists(artists, totals)
+            if totals[identifier]['total'] >= min_amount
+        ]
+        tips_by_identifier = pending_tips(db_session, [identifier for _, identifier in matches])
+        
+        for artist, identifier in matches:
             artist_id = artist.get('id') or artist.get('slug') or artist.get('name', '')
-            artist_name = artist.get('name', 'Unknown')
-            artist_slug = artist.get('slug', '')
-            
-            # Try multiple identifiers
-            identifiers = [str(artist_id), artist_slug, artist_name]
-            
-            pending_tips = []
-            for identifier in identifiers:
-                if identifier:
-                    tips = get_pending_tips_for_artist(identifier, db_session)
-                    if tips:
-                        pending_tips = tips
-                        break
             
-            if pending_tips:
-                # Calculate total pending amount
-                total_pending = sum(
-                    Decimal(str(tip.artist_payout or tip.amount)) 
-                    for tip in pending_tips
-                )
-                
-                if total_pending >= min_amount:
-                    results.append({
-                        'artist_id': artist_id,
-                        'artist_slug': artist_slug or artist_id,
-                        'artist_name': artist_name,
-                        'pending_tips': pending_tips,
-                        'total_pending': total_pending,
-                        'tip_count': len(pending_tips)
-                    })
+            results.append({
+                'artist_id': artist_id,
+                'artist_slug': artist.get('slug', '') or artist_id,
+                'artist_name': artist.get('name', 'Unknown'),
+                'pending_tips': tips_by_identifier[identifier],
+                'total_pending': totals[identifier]['total'],
+                'tip_count': totals[identifier]['tip_count']
+            })
     
     # Sort by total pending (highest first)
     results.sort(key=lambda x: x['total_pending'], reverse=True)
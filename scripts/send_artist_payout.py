@@ -33,6 +33,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from db import get_session
 from models import Tip, ArtistPayout, User
+from services import artist_directory
+from services.payouts import link_tips, pending_tips as pending_tips_by_artist
 import stripe
 
 
@@ -47,18 +49,11 @@ def _configure_stripe():
 
 
 def _get_artist_name(artist_id: str) -> Optional[str]:
-    """Get artist name from artists.json."""
+    """Get artist name from the artist directory."""
     try:
-        from app import load_json_data
-        artists_data = load_json_data('artists.json', {'artists': []})
-        for artist in artists_data.get('artists', []):
-            if (str(artist.get('id', '')) == str(artist_id) or
-                artist.get('slug', '').lower() == str(artist_id).lower() or
-                artist.get('name', '').lower() == str(artist_id).lower()):
-                return artist.get('name')
+        return artist_directory.artist_name(artist_id)
     except Exception:
-        pass
-    return None
+        return None
 
 
 def _get_artist_stripe_account(artist_id: str) -> Optional[str]:
@@ -73,26 +68,7 @@ def _get_artist_stripe_account(artist_id: str) -> Optional[str]:
 
 def get_pending_tips_for_artist(artist_id: str, db_session) -> List[Tip]:
     """Get all tips that haven't been included in a completed payout."""
-    # Get all tips for this artist
-    all_tips = db_session.query(Tip).filter(
-        Tip.artist_id == str(artist_id)
-    ).order_by(Tip.created_at).all()
-    
-    # Get all completed payouts and their related tip IDs
-    completed_payouts = db_session.query(ArtistPayout).filter(
-        ArtistPayout.artist_id == str(artist_id),
-        ArtistPayout.status == "completed"
-    ).all()
-    
-    # Collect all tip IDs that have been paid out
-    paid_tip_ids = set()
-    for payout in completed_payouts:
-        if payout.related_tip_ids:
-            paid_tip_ids.update(payout.related_tip_ids)
-    
-    # Filter out tips that have been paid
-    pending_tips = [tip for tip in all_tips if tip.id not in paid_tip_ids]
-    return pending_tips
+    return pending_tips_by_artist(db_session, [artist_id]).get(str(artist_id), [])
 
 
 def create_payout(
@@ -114,6 +90,8 @@ def create_payout(
             created_at=datetime.utcnow()
         )
         db_session.add(payout)
+        db_session.flush()
+        link_tips(db_session, payout.id, tip_ids or [])
         db_session.commit()
         db_session.refresh(payout)
         return payout
@@ -6,35 +6,28 @@ Fetches latest release assets and updates downloads template
 
 import os
 import sys
-import json
 import re
 import urllib.request
 import urllib.parse
 from pathlib import Path
 from typing import List, Dict, Any
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services import release_info
+
 
 def fetch_latest_release(repo: str, token: str = None) -> Dict[str, Any]:
     """Fetch latest release data from GitHub API"""
-    url = f"https://api.github.com/repos/{repo}/releases/latest"
-    
-    headers = {
-        "Accept": "application/vnd.github.v3+json",
-        "User-Agent": "AhoyIndieMedia-DownloadsUpdater"
-    }
-    
-    if token:
-        headers["Authorization"] = f"token {token}"
-    
-    request = urllib.request.Request(url, headers=headers)
-    
     try:
-        with urllib.request.urlopen(request) as response:
-            data = json.loads(response.read().decode())
-            return data
-    except urllib.error.HTTPError as e:
+        release, _, _ = release_info.fetch_latest_release(repo, token=token)
+    except release_info.ReleaseFetchError as e:
         print(f"Error fetching release: {e}")
         sys.exit(1)
+    if not release:
+        print(f"Error fetching release: no release found for {repo}")
+        sys.exit(1)
+    return release
 
 
 def parse_checksums(checksums_content: str) -> Dict[str, str]:
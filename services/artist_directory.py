@@ -0,0 +1,100 @@
+"""Artist directory: O(1) lookups of artist names and contact info.
+
+Tips, payouts and notifications refer to an artist by whatever identifier
+the checkout used -- the artist id, the slug or the display name. The
+directory indexes the content_db artist list (DB, with the legacy JSON
+fallback) under all three once, so a lookup is a dict hit instead of
+re-reading and scanning artists.json per event.
+
+The index is kept for as long as content_db keeps returning the same cached
+artist list, so it is rebuilt after that list's TTL or a
+``content_db.invalidate_cache()``. It lives in its own slot rather than in
+content_db's cache, whose ``content_version()`` must only move when content
+changes. Used by the web process (services/notifications.py) and the
+payout/accounting scripts.
+"""
+import os
+from typing import Any, Dict, List, Optional
+
+from services import content_db
+
+_directory: Optional['ArtistDirectory'] = None
+
+
+def _env_key(prefix: str, identifier: str) -> str:
+    return f"{prefix}_{identifier.upper().replace('-', '_').replace(' ', '_')}"
+
+
+def _env(prefix: str, identifier: str) -> Optional[str]:
+    key = _env_key(prefix, identifier)
+    value = os.getenv(key) or os.getenv(key.lower())
+    return value.strip() if value else None
+
+
+class ArtistDirectory:
+    """Artist dicts (content_db shape) indexed by id, lowercased slug and lowercased name."""
+
+    def __init__(self, artists: List[Dict[str, Any]]):
+        self.artists = artists
+        self._index: Dict[str, Dict[str, Any]] = {}
+        for artist in artists:
+            # First artist to claim a key wins, as with the old linear scans.
+            for key in (str(artist.get('id', '')), str(artist.get('slug') or '').lower(),
+                        str(artist.get('name') or '').lower()):
+                if key:
+                    self._index.setdefault(key, artist)
+
+    def __len__(self) -> int:
+        return len(self.artists)
+
+    def get(self, artist_id) -> Optional[Dict[str, Any]]:
+        """The artist known by ``artist_id`` (id, slug or name), or None."""
+        if artist_id is None:
+            return None
+        key = str(artist_id)
+        return self._index.get(key) or self._index.get(key.lower())
+
+    def name(self, artist_id) -> Optional[str]:
+        artist = self.get(artist_id)
+        return artist.get('name') if artist else None
+
+    def email(self, artist_id) -> Optional[str]:
+        """
+        Contact email: ARTIST_EMAIL_<ID> from the environment, else the
+        artist's ``email`` field, else ARTIST_EMAIL_<SLUG>.
+        """
+        artist_id = str(artist_id or '')
+        if not artist_id:
+            return None
+        email = _env('ARTIST_EMAIL', artist_id)
+        if email:
+            return email
+        artist = self.get(artist_id)
+        if not artist:
+            return None
+        if artist.get('email'):
+            return str(artist['email']).strip()
+        slug = artist.get('slug') or ''
+        return _env('ARTIST_EMAIL', slug) if slug else None
+
+
+def get_directory(ttl: int = 600) -> ArtistDirectory:
+    """The directory for content_db's current artist list (cached for ``ttl`` seconds)."""
+    global _directory
+    artists = content_db.get_artists_list(ttl)
+    directory = _directory
+    if directory is None or directory.artists is not artists:
+        directory = _directory = ArtistDirectory(artists)
+    return directory
+
+
+def all_artists() -> List[Dict[str, Any]]:
+    return get_directory().artists
+
+
+def artist_name(artist_id) -> Optional[str]:
+    return get_directory().name(artist_id)
+
+
+def artist_email(artist_id) -> Optional[str]:
+    return get_directory().email(artist_id)
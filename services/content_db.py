@@ -13,6 +13,7 @@ import logging
 from time import time as _now
 
 from db import get_session
+from services.image_variants import srcset
 from storage import read_json
 from models import (
     Track, Show, ContentArtist, ContentArtistAlbum, ContentArtistAlbumTrack,
@@ -38,32 +39,54 @@ def _load_fallback_json(filename, default=None):
 # In-memory cache (same pattern as the old _json_data_cache)
 # ---------------------------------------------------------------------------
 _cache = {}
+_version = 0
 
 
 def _cached(key, ttl, fn):
     """Return cached result or call fn() and cache it."""
+    global _version
     now = _now()
     if key in _cache:
         val, ts = _cache[key]
         if now - ts < ttl:
             return val
     val = fn()
+    if key not in _cache or _cache[key][0] != val:
+        _version += 1
     _cache[key] = (val, now)
     return val
 
 
 def invalidate_cache(key=None):
     """Clear one key or the entire content cache."""
+    global _version
+    _version += 1
     if key:
         _cache.pop(key, None)
     else:
         _cache.clear()
 
 
+def content_version():
+    """Counter bumped whenever a cached query returns different content (or the cache is invalidated)."""
+    return _version
+
+
 # ---------------------------------------------------------------------------
 # Serializers: DB row -> dict matching original JSON shape
 # ---------------------------------------------------------------------------
 
+def _add_srcsets(d, *fields):
+    """Add '<field>_srcset' (resized /img/ variants) for each image field; IMAGE_SRCSET=0 turns this off."""
+    if os.getenv('IMAGE_SRCSET', '1') == '0':
+        return d
+    for field in fields:
+        value = srcset(d.get(field))
+        if value:
+            d[f'{field}_srcset'] = value
+    return d
+
+
 def _serialize_track(t):
     """Convert a Track row to a dict matching music.json track objects."""
     d = {
@@ -94,7 +117,7 @@ def _serialize_track(t):
     # Merge any extra fields from the catch-all column
     if t.extra_fields:
         d.update(t.extra_fields)
-    return d
+    return _add_srcsets(d, 'cover_art')
 
 
 def _serialize_show(s):
@@ -119,7 +142,7 @@ def _serialize_show(s):
         d['trailer_url'] = s.trailer_url
     if s.extra_fields:
         d.update(s.extra_fields)
-    return d
+    return _add_srcsets(d, 'thumbnail')
 
 
 def _serialize_artist(a, albums_map, shows_map, tracks_map):
@@ -204,7 +227,9 @@ def _serialize_artist(a, albums_map, shows_map, tracks_map):
     if a.extra_fields:
         d.update(a.extra_fields)
 
-    return d
+    for alb in d.get('albums', []):
+        _add_srcsets(alb, 'cover_art')
+    return _add_srcsets(d, 'image')
 
 
 def _serialize_podcast_show(ps, episodes):
@@ -289,7 +314,7 @@ def _serialize_video(v):
     }
     if v.extra_fields:
         d.update(v.extra_fields)
-    return d
+    return _add_srcsets(d, 'thumbnail')
 
 
 # ---------------------------------------------------------------------------
@@ -8,6 +8,8 @@ import requests
 
 log = logging.getLogger(__name__)
 
+RESEND_URL = "https://api.resend.com/emails"
+
 
 def _from_email() -> str:
     sender = (os.getenv("SUPPORT_EMAIL") or "").strip()
@@ -28,22 +30,19 @@ def can_send_email() -> bool:
     return bool(os.getenv("SMTP_HOST") and os.getenv("SMTP_USER") and (os.getenv("SMTP_PASS") or os.getenv("SMTP_PASSWORD")))
 
 
-def send_email(to_email: str, subject: str, text: str, html: Optional[str] = None) -> Dict[str, Any]:
-    """Send transactional email via Resend (preferred) or SMTP.
+class ResendTransport:
+    """Resend API over one pooled ``requests.Session`` (keep-alive between messages)."""
 
-    Returns a dict with keys: ok (bool), provider (str), detail (str|dict).
-    Never raises unless requests/smtplib unexpectedly explode beyond our catches.
-    """
-    to_email = (to_email or "").strip()
-    if not to_email:
-        return {"ok": False, "provider": "none", "detail": "missing_to_email"}
+    provider = "resend"
 
-    resend_key = os.getenv("RESEND_API_KEY")
-    if resend_key:
+    def __init__(self, api_key: str):
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"})
+
+    def send(self, to_email: str, subject: str, text: str, html: Optional[str] = None) -> Dict[str, Any]:
         try:
-            r = requests.post(
-                "https://api.resend.com/emails",
-                headers={"Authorization": f"Bearer {resend_key}", "Content-Type": "application/json"},
+            r = self.session.post(
+                RESEND_URL,
                 json={
                     "from": _from_email(),
                     "to": [to_email],
@@ -56,22 +55,75 @@ def send_email(to_email: str, subject: str, text: str, html: Optional[str] = Non
             if r.ok:
                 return {"ok": True, "provider": "resend", "detail": r.json() if r.content else {"status": r.status_code}}
             return {"ok": False, "provider": "resend", "detail": {"status": r.status_code, "body": (r.text[:500] if r.text else "")}}
+        except requests.RequestException as e:
+            return {"ok": False, "provider": "resend", "detail": {"error": str(e), "retryable": True}}
         except Exception as e:
             return {"ok": False, "provider": "resend", "detail": str(e)}
 
-    # SMTP fallback
-    smtp_host = os.getenv("SMTP_HOST")
-    smtp_user = os.getenv("SMTP_USER")
-    smtp_pass = os.getenv("SMTP_PASS") or os.getenv("SMTP_PASSWORD")
-    smtp_port = int(os.getenv("SMTP_PORT") or "587")
-    smtp_tls = (os.getenv("SMTP_TLS", "true").lower() != "false")
+    def close(self) -> None:
+        self.session.close()
 
-    if not (smtp_host and smtp_user and smtp_pass):
-        log.error(
-            "Email sending is disabled: missing RESEND_API_KEY or incomplete SMTP config (need SMTP_HOST, SMTP_USER, SMTP_PASS)."
-        )
-        return {"ok": False, "provider": "smtp", "detail": "smtp_not_configured"}
 
+class SmtpTransport:
+    """
+    SMTP with one persistent connection.
+
+    The connection (and STARTTLS + login) is opened on the first message and
+    reused until ``close()``; if the server dropped it in the meantime the
+    message is retried once on a fresh connection.
+    """
+
+    provider = "smtp"
+
+    def __init__(self, host: str, port: int, user: str, password: str, tls: bool = True):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.tls = tls
+        self.server: Optional[smtplib.SMTP] = None
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=10)
+        if self.tls:
+            server.starttls()
+        server.login(self.user, self.password)
+        return server
+
+    def send(self, to_email: str, subject: str, text: str, html: Optional[str] = None) -> Dict[str, Any]:
+        msg = build_message(to_email, subject, text, html)
+        for attempt in (1, 2):
+            try:
+                if self.server is None:
+                    self.server = self._connect()
+                self.server.send_message(msg)
+                return {"ok": True, "provider": "smtp", "detail": "sent"}
+            except smtplib.SMTPServerDisconnected as e:
+                self.server = None
+                if attempt == 2:
+                    return {"ok": False, "provider": "smtp", "detail": {"error": str(e), "retryable": True}}
+            except smtplib.SMTPRecipientsRefused as e:
+                return {"ok": False, "provider": "smtp", "detail": {"error": str(e)}}
+            except smtplib.SMTPResponseException as e:
+                # 4xx replies are transient by definition; the connection is still usable.
+                if e.smtp_code < 400 or e.smtp_code >= 500:
+                    return {"ok": False, "provider": "smtp", "detail": {"status": e.smtp_code, "error": str(e)}}
+                return {"ok": False, "provider": "smtp", "detail": {"status": e.smtp_code, "error": str(e), "retryable": True}}
+            except (OSError, smtplib.SMTPException) as e:
+                self.close()
+                return {"ok": False, "provider": "smtp", "detail": {"error": str(e), "retryable": True}}
+        return {"ok": False, "provider": "smtp", "detail": "unreachable"}
+
+    def close(self) -> None:
+        server, self.server = self.server, None
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                server.close()
+
+
+def build_message(to_email: str, subject: str, text: str, html: Optional[str] = None) -> EmailMessage:
     msg = EmailMessage()
     msg["Subject"] = subject
     msg["From"] = _from_email()
@@ -79,14 +131,68 @@ def send_email(to_email: str, subject: str, text: str, html: Optional[str] = Non
     msg.set_content(text)
     if html:
         msg.add_alternative(html, subtype="html")
+    return msg
 
+
+def get_transport():
+    """Transport for the configured provider (Resend preferred, then SMTP), or None."""
+    resend_key = os.getenv("RESEND_API_KEY")
+    if resend_key:
+        return ResendTransport(resend_key)
+
+    smtp_host = os.getenv("SMTP_HOST")
+    smtp_user = os.getenv("SMTP_USER")
+    smtp_pass = os.getenv("SMTP_PASS") or os.getenv("SMTP_PASSWORD")
+    if not (smtp_host and smtp_user and smtp_pass):
+        return None
+    return SmtpTransport(
+        smtp_host,
+        int(os.getenv("SMTP_PORT") or "587"),
+        smtp_user,
+        smtp_pass,
+        tls=(os.getenv("SMTP_TLS", "true").lower() != "false"),
+    )
+
+
+def send_email(to_email: str, subject: str, text: str, html: Optional[str] = None, transport=None) -> Dict[str, Any]:
+    """Send transactional email via Resend (preferred) or SMTP.
+
+    Blocks until the provider answers. Request handlers should go through
+    services.mail_queue (or services.notifications) instead. Pass
+    ``transport`` to reuse an open connection across messages; without one a
+    connection is opened and closed for this message only.
+
+    Returns a dict with keys: ok (bool), provider (str), detail (str|dict).
+    Never raises unless requests/smtplib unexpectedly explode beyond our catches.
+    """
+    to_email = (to_email or "").strip()
+    if not to_email:
+        return {"ok": False, "provider": "none", "detail": "missing_to_email"}
+
+    if transport is not None:
+        return transport.send(to_email, subject, text, html)
+
+    transport = get_transport()
+    if transport is None:
+        log.error(
+            "Email sending is disabled: missing RESEND_API_KEY or incomplete SMTP config (need SMTP_HOST, SMTP_USER, SMTP_PASS)."
+        )
+        return {"ok": False, "provider": "smtp", "detail": "smtp_not_configured"}
     try:
-        with smtplib.SMTP(smtp_host, smtp_port, timeout=10) as server:
-            if smtp_tls:
-                server.starttls()
-            server.login(smtp_user, smtp_pass)
-            server.send_message(msg)
-        return {"ok": True, "provider": "smtp", "detail": "sent"}
-    except Exception as e:
-        return {"ok": False, "provider": "smtp", "detail": str(e)}
+        return transport.send(to_email, subject, text, html)
+    finally:
+        transport.close()
 
+
+def is_retryable(result: Dict[str, Any]) -> bool:
+    """True for failures worth retrying later: rate limits, 5xx/4xx-transient replies, dropped connections."""
+    detail = result.get("detail")
+    if not isinstance(detail, dict):
+        return False
+    if detail.get("retryable"):
+        return True
+    status = detail.get("status")
+    body = str(detail.get("body", ""))
+    if status == 429 or "rate_limit" in body.lower() or "429" in body:
+        return True
+    return result.get("provider") == "resend" and isinstance(status, int) and status >= 500
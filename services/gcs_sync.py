@@ -1,86 +1,190 @@
+"""
+Sync podcast episodes from a GCS bucket into content_podcast_episodes.
+
+Files are organized as::
+
+    prefix/show-slug/episode-id.mp3
+    prefix/show-slug/episode-id.mp3.json  <- Metadata (optional)
+
+The listing is read a page at a time. Each media blob's generation (and its
+sidecar's) is compared with the gcs_sync_objects checkpoint from the last
+run; unchanged blobs are skipped, so a nightly sync only downloads and
+writes what changed. Sidecars of changed blobs are downloaded concurrently,
+and each page ends with one bulk ``INSERT ... ON CONFLICT`` for the episodes,
+one for the checkpoints, and a commit (an interrupted sync resumes where it
+stopped).
+"""
 import os
 import json
 import logging
-from google.cloud import storage
-from db import get_session
-from models import PodcastShow, PodcastEpisode, ContentVideo
-import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from db import get_session, engine
+from models import PodcastEpisode, GcsSyncObject
 
 logger = logging.getLogger(__name__)
 
-def sync_from_gcs(bucket_name, prefix="podcasts/"):
+PAGE_SIZE = 500
+METADATA_WORKERS = 8
+MEDIA_EXTENSIONS = (".mp3", ".mp4", ".mov", ".wav")
+# Columns refreshed when an episode already exists (show, artwork and
+# position are kept as first imported or edited since).
+EPISODE_UPDATE_COLUMNS = ("title", "description", "date", "audio_url")
+
+
+def _insert(model):
+    if engine.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(model.__table__)
+
+
+def _bulk_upsert(session, model, rows, index_elements, update_columns):
+    """One INSERT ... ON CONFLICT DO UPDATE for ``rows`` (no duplicate keys)."""
+    if not rows:
+        return
+    stmt = _insert(model).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(index_elements),
+        set_={col: stmt.excluded[col] for col in update_columns},
+    )
+    session.execute(stmt)
+
+
+def _read_metadata(blob) -> Dict[str, Any]:
+    try:
+        return json.loads(blob.download_as_text())
+    except Exception as e:
+        logger.warning(f"Failed to parse metadata for {blob.name}: {e}")
+        return {}
+
+
+def _episode_row(bucket_name, prefix, media_blob, metadata) -> Optional[Dict[str, Any]]:
+    # Expecting prefix/show-slug/episode-id.extension
+    parts = media_blob.name[len(prefix):].strip("/").split("/")
+    if len(parts) < 2:
+        return None
+    episode_id = parts[-1].rsplit(".", 1)[0]
+    updated = getattr(media_blob, "updated", None)
+    return {
+        "episode_id": episode_id,
+        "show_slug": parts[0],
+        "title": metadata.get("title", episode_id.replace("-", " ").title()),
+        "description": metadata.get("description", ""),
+        "date": metadata.get("date", updated.strftime("%Y-%m-%d") if updated else ""),
+        "audio_url": f"https://storage.googleapis.com/{bucket_name}/{media_blob.name}",
+        "artwork": metadata.get("artwork", ""),
+        "position": metadata.get("position", 0),
+    }
+
+
+def _split_page(blobs, carried):
     """
-    Prototype: Syncs content metadata from a GCS bucket.
-    Assumes files are organized as:
-    prefix/show-slug/episode-id.mp3
-    prefix/show-slug/episode-id.mp3.json  <- Metadata
+    Media blobs and sidecars of one listing page. A media blob whose sidecar
+    could still be on the next page (names sort ``x.mp3`` < ``x.mp3.json``)
+    is returned in ``carry`` instead.
+    """
+    media = dict(carried)
+    sidecars = {}
+    last_name = ""
+    for blob in blobs:
+        last_name = max(last_name, blob.name)
+        if blob.name.endswith(".json"):
+            sidecars[blob.name[:-5]] = blob
+        elif blob.name.lower().endswith(MEDIA_EXTENSIONS):
+            media[blob.name] = blob
+    carry = {
+        name: blob for name, blob in media.items()
+        if name not in sidecars and last_name < name + ".json"
+    }
+    ready = {name: blob for name, blob in media.items() if name not in carry}
+    return ready, sidecars, carry
+
+
+def _sync_batch(session, pool, bucket_name, prefix, media, sidecars, full, stats):
+    """Upsert the changed episodes among ``media`` and checkpoint them."""
+    if not media:
+        return
+    seen = {}
+    if not full:
+        rows = session.query(
+            GcsSyncObject.name, GcsSyncObject.generation, GcsSyncObject.metadata_generation
+        ).filter(
+            GcsSyncObject.bucket == bucket_name,
+            GcsSyncObject.name.in_(list(media)),
+        )
+        seen = {r.name: (r.generation, r.metadata_generation) for r in rows}
+
+    changed = []
+    for name, blob in media.items():
+        sidecar = sidecars.get(name)
+        version = (blob.generation, sidecar.generation if sidecar is not None else None)
+        if seen.get(name) == version:
+            stats["skipped"] += 1
+        else:
+            changed.append((blob, sidecar, version))
+    if not changed:
+        return
+
+    with_sidecar = [sidecar for _, sidecar, _ in changed if sidecar is not None]
+    metadata = dict(zip((s.name for s in with_sidecar), pool.map(_read_metadata, with_sidecar)))
+    stats["metadata_fetched"] += len(with_sidecar)
+
+    episodes = {}
+    checkpoints = []
+    now = datetime.utcnow()
+    for blob, sidecar, (generation, metadata_generation) in changed:
+        row = _episode_row(bucket_name, prefix, blob, metadata.get(sidecar.name, {}) if sidecar is not None else {})
+        if row is not None:
+            episodes[row["episode_id"]] = row  # last one wins, as the old per-row upsert did
+        checkpoints.append({
+            "bucket": bucket_name, "name": blob.name, "generation": generation,
+            "metadata_generation": metadata_generation, "synced_at": now,
+        })
+
+    _bulk_upsert(session, PodcastEpisode, list(episodes.values()), ["episode_id"], EPISODE_UPDATE_COLUMNS)
+    _bulk_upsert(session, GcsSyncObject, checkpoints, ["bucket", "name"],
+                 ("generation", "metadata_generation", "synced_at"))
+    session.commit()
+    stats["upserted"] += len(episodes)
+
+
+def sync_from_gcs(bucket_name, prefix="podcasts/", client=None, page_size=PAGE_SIZE,
+                  workers=METADATA_WORKERS, full=False) -> Dict[str, int]:
+    """
+    Incrementally sync episodes under ``prefix`` in ``bucket_name``.
+
+    Args:
+        client: google.cloud.storage.Client (or compatible); created if omitted
+        page_size: blobs per listing page (and per bulk upsert)
+        workers: concurrent sidecar downloads
+        full: ignore the checkpoint and rewrite every episode
+
+    Returns:
+        stats: pages, listed, skipped, metadata_fetched, upserted
     """
+    stats = {"pages": 0, "listed": 0, "skipped": 0, "metadata_fetched": 0, "upserted": 0}
     try:
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
-        blobs = list(client.list_blobs(bucket, prefix=prefix))
-        
-        # Group blobs by their "base" path (everything before .json if it's a json file)
-        media_files = {}
-        metadata_files = {}
-        
-        for blob in blobs:
-            if blob.name.endswith(".json"):
-                base = blob.name[:-5]
-                metadata_files[base] = blob
-            elif blob.name.lower().endswith((".mp3", ".mp4", ".mov", ".wav")):
-                media_files[blob.name] = blob
-        
-        with get_session() as session:
-            for media_path, media_blob in media_files.items():
-                # Extract show_slug and episode_id from path
-                # Expecting prefix/show-slug/episode-id.extension
-                parts = media_path[len(prefix):].strip("/").split("/")
-                if len(parts) < 2:
-                    continue
-                
-                show_slug = parts[0]
-                filename = parts[-1]
-                episode_id = filename.rsplit(".", 1)[0]
-                
-                # Check if we have metadata
-                metadata = {}
-                if media_path in metadata_files:
-                    try:
-                        content = metadata_files[media_path].download_as_text()
-                        metadata = json.loads(content)
-                    except Exception as e:
-                        logger.warning(f"Failed to parse metadata for {media_path}: {e}")
-                
-                # Default values if metadata is missing
-                title = metadata.get("title", episode_id.replace("-", " ").title())
-                description = metadata.get("description", "")
-                date = metadata.get("date", media_blob.updated.strftime("%Y-%m-%d") if media_blob.updated else "")
-                
-                # Upsert Podcast Episode
-                existing_ep = session.query(PodcastEpisode).filter_by(episode_id=episode_id).first()
-                if existing_ep:
-                    existing_ep.title = title
-                    existing_ep.description = description
-                    existing_ep.date = date
-                    # Only update audio_url if metadata provides it, or use GCS public URL if allowed
-                    # For prototype, we use the GCS blob public URL if available
-                    existing_ep.audio_url = f"https://storage.googleapis.com/{bucket_name}/{media_path}"
-                else:
-                    new_ep = PodcastEpisode(
-                        episode_id=episode_id,
-                        show_slug=show_slug,
-                        title=title,
-                        description=description,
-                        date=date,
-                        audio_url=f"https://storage.googleapis.com/{bucket_name}/{media_path}",
-                        artwork=metadata.get("artwork", ""),
-                        position=metadata.get("position", 0)
-                    )
-                    session.add(new_ep)
-            
-            session.commit()
-            logger.info("GCS Sync completed successfully.")
+        if client is None:
+            from google.cloud import storage
+            client = storage.Client()
+        pages = client.list_blobs(bucket_name, prefix=prefix, page_size=page_size).pages
+
+        carry: Dict[str, Any] = {}
+        with get_session() as session, ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for page in pages:
+                blobs: List[Any] = list(page)
+                stats["pages"] += 1
+                stats["listed"] += len(blobs)
+                media, sidecars, carry = _split_page(blobs, carry)
+                _sync_batch(session, pool, bucket_name, prefix, media, sidecars, full, stats)
+            _sync_batch(session, pool, bucket_name, prefix, carry, {}, full, stats)
+
+        logger.info("GCS Sync completed successfully: %s", stats)
+        return stats
 
     except Exception as e:
         logger.error(f"GCS Sync failed: {e}")
@@ -91,6 +195,6 @@ if __name__ == "__main__":
     bucket = os.getenv("AHOY_GCS_BUCKET")
     if bucket:
         print(f"Starting GCS sync for bucket: {bucket}")
-        sync_from_gcs(bucket)
+        print(sync_from_gcs(bucket, full=os.getenv("GCS_SYNC_FULL") == "1"))
     else:
         print("AHOY_GCS_BUCKET not set. Skipping sync test.")
@@ -0,0 +1,326 @@
+"""Resized, re-encoded variants of cover art and thumbnails (/img/<width>).
+
+``/img/<width>?src=<image>`` answers with ``src`` scaled down to a width
+bucket (WIDTHS) in the best format the client accepts: AVIF, then WebP, then
+JPEG (PNG when the image has transparency). Each variant is generated once,
+stored on disk under the SHA-256 of its bytes, and served with an immutable
+Cache-Control plus ``Vary: Accept``.
+
+Immutable is safe because the URL changes with the source: local ``/static/``
+files get a ``v=`` content hash in their variant URLs (``variant_url``), and
+remote images (cover art on GCS/S3, YouTube thumbnails, ...) are versioned
+by their URL already. The route recomputes the hash and redirects a request
+whose ``v`` doesn't match to the current URL, so a stale or made-up ``v``
+never gets cached as immutable or generates a variant of its own.
+
+Layout under IMAGE_VARIANT_DIR::
+
+    index/<sha(src, v, width, format)>.json   -> name and mimetype of the variant
+    files/<sha(bytes)[:20]>.<ext>             the variant
+
+Both are written to a temp name and renamed, so gunicorn workers share the
+directory. Hits bump the variant's mtime; once a process may have pushed the
+directory past IMAGE_VARIANT_MAX_MB (default 256) it deletes the
+least-recently-used variants down to 90% (an index entry whose file is gone
+is regenerated on demand). Only ``/static/`` images and https images on IMAGE_VARIANT_HOSTS
+are resized; serializers in content_db call ``srcset`` for the image fields.
+Without Pillow (or with IMAGE_VARIANT_MAX_MB=0), ``get_store`` is None and
+the route redirects to the original.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from threading import Lock
+from typing import Dict, NamedTuple, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+import requests
+from werkzeug.security import safe_join
+
+try:
+    from PIL import Image, ImageOps, features
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+WIDTHS = (160, 320, 640, 960, 1280)
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+MAX_SOURCE_BYTES = 15 * 1024 * 1024
+EVICT_TO = 0.9  # fraction of max_bytes left after an eviction pass
+FETCH_TIMEOUT = (5, 20)
+STATIC_ROOT = Path(__file__).resolve().parent.parent / 'static'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.avif')
+DEFAULT_HOSTS = (
+    'storage.googleapis.com', '.amazonaws.com', 'i.ytimg.com', 'f4.bcbits.com', '.imgix.net',
+    '.mzstatic.com', 'm.media-amazon.com', 'uploads-ssl.webflow.com', 'ahoy.ooo',
+)
+
+# format -> (mimetype, extension, Pillow save options)
+FORMATS: Dict[str, Tuple[str, str, dict]] = {
+    'avif': ('image/avif', 'avif', {'quality': 55, 'speed': 6}),
+    'webp': ('image/webp', 'webp', {'quality': 78, 'method': 4}),
+    'jpeg': ('image/jpeg', 'jpg', {'quality': 80, 'optimize': True, 'progressive': True}),
+    'png': ('image/png', 'png', {'optimize': True}),
+}
+
+
+class SourceNotFound(Exception):
+    """The source image does not exist (local file missing or origin 404)."""
+
+
+class VariantError(Exception):
+    """The source could not be fetched or decoded."""
+
+
+class Variant(NamedTuple):
+    path: str
+    mimetype: str
+    etag: str
+
+
+def _sha(*parts: str) -> str:
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def _allowed_hosts():
+    configured = os.getenv('IMAGE_VARIANT_HOSTS')
+    if configured:
+        return tuple(h.strip().lower() for h in configured.split(',') if h.strip())
+    return DEFAULT_HOSTS
+
+
+def _local_path(src: str) -> Optional[str]:
+    """Filesystem path for a ``/static/...`` image, or None if it is not one."""
+    if not src.startswith('/static/') or not src.lower().endswith(IMAGE_EXTENSIONS):
+        return None
+    return safe_join(str(STATIC_ROOT), src[len('/static/'):].split('?', 1)[0])
+
+
+def is_allowed_source(src: Optional[str]) -> bool:
+    """Local /static/ images, or https images on an allowed host (``.example.com`` matches subdomains)."""
+    if not src:
+        return False
+    if src.startswith('/static/'):
+        return _local_path(src) is not None
+    parts = urlsplit(src)
+    if parts.scheme != 'https' or not parts.hostname:
+        return False
+    host = parts.hostname.lower()
+    return any(host == h or (h.startswith('.') and host.endswith(h)) for h in _allowed_hosts())
+
+
+def bucket(width: int) -> int:
+    """Smallest width bucket >= ``width`` (the largest bucket beyond that)."""
+    for w in WIDTHS:
+        if width <= w:
+            return w
+    return WIDTHS[-1]
+
+
+def negotiate(accept: str) -> str:
+    """Best output format for an ``Accept`` header (``encode`` swaps JPEG for PNG on transparent images)."""
+    accept = (accept or '').lower()
+    if PIL_AVAILABLE and 'image/avif' in accept and features.check('avif'):
+        return 'avif'
+    if PIL_AVAILABLE and 'image/webp' in accept and features.check('webp'):
+        return 'webp'
+    return 'jpeg'
+
+
+_versions: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+
+def source_version(src: str) -> str:
+    """Content hash of a local image (memoized on mtime/size); '' for remote sources."""
+    path = _local_path(src)
+    if not path:
+        return ''
+    try:
+        st = os.stat(path)
+    except OSError:
+        return ''
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _versions.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    with open(path, 'rb') as f:
+        version = hashlib.sha256(f.read()).hexdigest()[:12]
+    _versions[path] = (stamp, version)
+    return version
+
+
+def variant_url(src: str, width: int) -> str:
+    url = f'/img/{bucket(width)}?src={quote(src, safe="")}'
+    version = source_version(src)
+    return f'{url}&v={version}' if version else url
+
+
+def srcset(src: Optional[str], widths=WIDTHS) -> Optional[str]:
+    """``srcset`` value for an image field, or None if the image can't be resized here."""
+    if not src or not is_allowed_source(src):
+        return None
+    return ', '.join(f'{variant_url(src, w)} {w}w' for w in widths)
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def encode(data: bytes, width: int, fmt: str) -> Tuple[bytes, str]:
+    """Scale image bytes down to ``width`` (never up) and encode; returns (bytes, format used)."""
+    try:
+        img = Image.open(io.BytesIO(data))
+        img = ImageOps.exif_transpose(img)
+    except Exception as e:
+        raise VariantError(f'cannot decode image: {e}') from e
+    if img.mode == 'P':
+        img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+    has_alpha = img.mode in ('RGBA', 'LA')
+    if fmt == 'jpeg' and has_alpha:
+        fmt = 'png'
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+    if img.width > width:
+        img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+    out = io.BytesIO()
+    img.save(out, format=fmt.upper(), **FORMATS[fmt][2])
+    return out.getvalue(), fmt
+
+
+class VariantStore:
+    """Generated variants under ``root``, shared by every worker process."""
+
+    def __init__(self, root: str, max_bytes: int, session: Optional[requests.Session] = None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.session = session or requests.Session()
+        self._written = 0  # bytes this process wrote since the last size scan
+        self._size_estimate: Optional[int] = None
+        self._evict_lock = Lock()
+
+    def _index_path(self, src: str, version: str, width: int, fmt: str) -> str:
+        return os.path.join(self.root, 'index', _sha(src, version, str(width), fmt) + '.json')
+
+    def _read_source(self, src: str) -> bytes:
+        path = _local_path(src)
+        if path is not None:
+            try:
+                with open(path, 'rb') as f:
+                    return f.read(MAX_SOURCE_BYTES + 1)
+            except FileNotFoundError:
+                raise SourceNotFound(src)
+        try:
+            with self.session.get(src, stream=True, timeout=FETCH_TIMEOUT) as resp:
+                if resp.status_code in (403, 404, 410):
+                    raise SourceNotFound(src)
+                resp.raise_for_status()
+                data = bytearray()
+                for chunk in resp.iter_content(64 * 1024):
+                    data.extend(chunk)
+                    if len(data) > MAX_SOURCE_BYTES:
+                        break
+                return bytes(data)
+        except requests.RequestException as e:
+            raise VariantError(f'cannot fetch {src}: {e}') from e
+
+    def get(self, src: str, version: str, width: int, fmt: str) -> Variant:
+        """The variant of ``src`` at bucket(width) in ``fmt``, generating it on first use."""
+        width = bucket(width)
+        index_path = self._index_path(src, version, width, fmt)
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            path = os.path.join(self.root, 'files', entry['name'])
+            os.utime(path)  # hit: mark as recently used
+            return Variant(path, entry['mimetype'], entry['name'].split('.')[0])
+        except (OSError, ValueError, KeyError):
+            pass
+
+        data = self._read_source(src)
+        if len(data) > MAX_SOURCE_BYTES:
+            raise VariantError(f'{src} is larger than {MAX_SOURCE_BYTES} bytes')
+        body, fmt_used = encode(data, width, fmt)
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        mimetype, ext, _ = FORMATS[fmt_used]
+        name = f'{digest}.{ext}'
+        path = os.path.join(self.root, 'files', name)
+        if not os.path.exists(path):
+            _atomic_write(path, body)
+        _atomic_write(index_path, json.dumps({'name': name, 'mimetype': mimetype}).encode('utf-8'))
+        self._note_written(len(body))
+        return Variant(path, mimetype, digest)
+
+    def _note_written(self, nbytes: int) -> None:
+        self._written += nbytes
+        if self._size_estimate is None or self._size_estimate + self._written > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> int:
+        """Delete least-recently-used variants until under EVICT_TO * max_bytes. Returns bytes freed."""
+        with self._evict_lock:
+            files = []
+            total = 0
+            directory = os.path.join(self.root, 'files')
+            for name in os.listdir(directory) if os.path.isdir(directory) else ():
+                path = os.path.join(directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+            freed = 0
+            if total > self.max_bytes:
+                target = self.max_bytes * EVICT_TO
+                for _, size, path in sorted(files):
+                    if total - freed <= target:
+                        break
+                    try:
+                        os.unlink(path)
+                        freed += size
+                    except OSError:
+                        pass
+            self._size_estimate = total - freed
+            self._written = 0
+            return freed
+
+
+_store: Optional[VariantStore] = None
+_store_pid: Optional[int] = None
+_store_lock = Lock()
+
+
+def get_store() -> Optional[VariantStore]:
+    """This process's store, or None when Pillow is not installed or IMAGE_VARIANT_MAX_MB is 0."""
+    global _store, _store_pid
+    if not PIL_AVAILABLE:
+        return None
+    try:
+        max_mb = int(os.getenv('IMAGE_VARIANT_MAX_MB', '256'))
+    except ValueError:
+        max_mb = 256
+    if max_mb <= 0:
+        return None
+    with _store_lock:
+        if _store is None or _store_pid != os.getpid():
+            root = os.getenv('IMAGE_VARIANT_DIR') or os.path.join(tempfile.gettempdir(), 'ahoy-image-variants')
+            _store, _store_pid = VariantStore(root, max_mb * 1024 * 1024), os.getpid()
+        return _store
@@ -0,0 +1,182 @@
+"""Tip ledger: running per-artist and per-user boost totals.
+
+Every code path that records a Tip calls ``record_tip`` before committing, so
+artist_balances / user_boost_totals move in the same transaction as the tip
+itself. The increments are single atomic upserts (INSERT ... ON CONFLICT DO
+UPDATE SET x = x + excluded.x), so concurrent webhooks for the same artist
+cannot lose updates. Amounts stay Decimal end to end.
+
+``reconcile`` recomputes the totals from the tips table and reports (and
+optionally repairs) drift; scripts/reconcile_ledger.py wraps it.
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import ArtistBalance, Tip, UserBoostTotal
+
+ZERO = Decimal('0.00')
+
+ARTIST_FIELDS = ('total_boosted', 'total_net', 'total_payout', 'total_earned', 'boost_count')
+USER_FIELDS = ('total_boosted', 'boost_count')
+
+
+def _dec(value) -> Decimal:
+    return Decimal(str(value)) if value is not None else ZERO
+
+
+def _money(value) -> Decimal:
+    return _dec(value).quantize(Decimal('0.01'))
+
+
+def _upsert_increment(session, model, key: Dict[str, Any], increments: Dict[str, Any], overwrite: Dict[str, Any]):
+    """Atomically add ``increments`` to the row identified by ``key`` (creating it if missing)."""
+    table = model.__table__
+    insert = pg_insert if session.get_bind().dialect.name == 'postgresql' else sqlite_insert
+    stmt = insert(table).values(**key, **increments, **overwrite)
+    set_ = {col: table.c[col] + stmt.excluded[col] for col in increments}
+    set_.update({col: stmt.excluded[col] for col in overwrite})
+    session.execute(stmt.on_conflict_do_update(index_elements=list(key), set_=set_))
+
+
+def record_tip(session, tip: Tip) -> None:
+    """Add ``tip`` to the artist and user ledgers (call before committing the tip)."""
+    amount = _dec(tip.amount)
+    payout = _dec(tip.artist_payout)
+    when = tip.created_at or datetime.utcnow()
+    now = datetime.utcnow()
+
+    _upsert_increment(
+        session, ArtistBalance,
+        key={'artist_id': str(tip.artist_id)},
+        increments={
+            'total_boosted': amount,
+            'total_net': _dec(tip.net_amount),
+            'total_payout': payout,
+            'total_earned': payout if payout else amount,
+            'boost_count': 1,
+        },
+        overwrite={'last_tip_at': when, 'updated_at': now},
+    )
+    if tip.user_id:
+        _upsert_increment(
+            session, UserBoostTotal,
+            key={'user_id': tip.user_id},
+            increments={'total_boosted': amount, 'boost_count': 1},
+            overwrite={'last_boost_at': when, 'updated_at': now},
+        )
+
+
+def artist_balance(session, artist_id: str) -> Dict[str, Any]:
+    """Ledger totals for one artist (zeros if it has no tips)."""
+    row = session.get(ArtistBalance, str(artist_id))
+    values = {field: (getattr(row, field) if row else 0) for field in ARTIST_FIELDS}
+    values = {k: (int(v) if k == 'boost_count' else _money(v)) for k, v in values.items()}
+    values['last_tip_at'] = row.last_tip_at if row else None
+    return values
+
+
+def user_boost_total(session, user_id: int) -> Dict[str, Any]:
+    """Ledger totals for one user (zeros if they never boosted)."""
+    row = session.get(UserBoostTotal, user_id)
+    return {
+        'total_boosted': _money(row.total_boosted if row else 0),
+        'boost_count': int(row.boost_count) if row else 0,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Reconciliation
+# ---------------------------------------------------------------------------
+
+def expected_artist_balances(session) -> Dict[str, Dict[str, Any]]:
+    """Artist totals recomputed from tips (one GROUP BY)."""
+    rows = session.query(
+        Tip.artist_id,
+        func.coalesce(func.sum(Tip.amount), 0),
+        func.coalesce(func.sum(Tip.net_amount), 0),
+        func.coalesce(func.sum(Tip.artist_payout), 0),
+        func.coalesce(func.sum(func.coalesce(func.nullif(Tip.artist_payout, 0), Tip.amount)), 0),
+        func.count(Tip.id),
+        func.max(Tip.created_at),
+    ).group_by(Tip.artist_id).all()
+    return {
+        artist_id: {
+            'total_boosted': _money(boosted), 'total_net': _money(net), 'total_payout': _money(payout),
+            'total_earned': _money(earned), 'boost_count': int(count), 'last_tip_at': last,
+        }
+        for artist_id, boosted, net, payout, earned, count, last in rows
+    }
+
+
+def expected_user_totals(session) -> Dict[int, Dict[str, Any]]:
+    """User totals recomputed from tips (one GROUP BY)."""
+    rows = session.query(
+        Tip.user_id, func.coalesce(func.sum(Tip.amount), 0), func.count(Tip.id), func.max(Tip.created_at),
+    ).filter(Tip.user_id.isnot(None)).group_by(Tip.user_id).all()
+    return {
+        user_id: {'total_boosted': _money(total), 'boost_count': int(count), 'last_boost_at': last}
+        for user_id, total, count, last in rows
+    }
+
+
+def _diff(model, key_name, fields, expected, session) -> List[Dict[str, Any]]:
+    """Field-level differences between ledger rows and ``expected``."""
+    actual = {getattr(row, key_name): row for row in session.query(model).all()}
+    mismatches = []
+    for key in sorted(set(expected) | set(actual), key=str):
+        want = expected.get(key)
+        have = actual.get(key)
+        for field in fields:
+            want_value = want[field] if want else (0 if field == 'boost_count' else ZERO)
+            have_value = getattr(have, field) if have is not None else None
+            if have_value is not None:
+                have_value = int(have_value) if field == 'boost_count' else _money(have_value)
+            if have_value != want_value:
+                mismatches.append({'key': key, 'field': field, 'ledger': have_value, 'expected': want_value})
+    return mismatches
+
+
+def _rebuild(session, model, key_name, expected, keys) -> None:
+    """Overwrite ledger rows for ``keys`` with recomputed totals (deleting rows with no tips)."""
+    now = datetime.utcnow()
+    for key in keys:
+        row = session.get(model, key)
+        want = expected.get(key)
+        if want is None:
+            if row is not None:
+                session.delete(row)
+            continue
+        if row is None:
+            row = model(**{key_name: key})
+            session.add(row)
+        for field, value in want.items():
+            setattr(row, field, value)
+        row.updated_at = now
+
+
+def reconcile(session, fix: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Compare the ledger with totals recomputed from tips.
+
+    Returns:
+        dict: {'artists': [...], 'users': [...]} mismatches as
+        {'key', 'field', 'ledger', 'expected'}; with ``fix=True`` the
+        affected rows are rewritten from the recomputed totals.
+    """
+    expected_artists = expected_artist_balances(session)
+    expected_users = expected_user_totals(session)
+    report = {
+        'artists': _diff(ArtistBalance, 'artist_id', ARTIST_FIELDS, expected_artists, session),
+        'users': _diff(UserBoostTotal, 'user_id', USER_FIELDS, expected_users, session),
+    }
+    if fix:
+        _rebuild(session, ArtistBalance, 'artist_id', expected_artists,
+                 {m['key'] for m in report['artists']})
+        _rebuild(session, UserBoostTotal, 'user_id', expected_users,
+                 {m['key'] for m in report['users']})
+    return report
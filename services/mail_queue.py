@@ -0,0 +1,243 @@
+"""Outbound mail queue: deliver email from a background worker, off the request path.
+
+``send`` puts the message on an in-process queue and returns immediately;
+one worker thread per process delivers queued messages in batches over a
+single transport -- a persistent SMTP connection (STARTTLS + login once) or
+a keep-alive ``requests.Session`` for Resend -- instead of a new connection
+per message. The connection is closed after IDLE_TIMEOUT without mail.
+
+Rate limits and transient failures (see ``emailer.is_retryable``) are
+retried with jittered exponential backoff by re-scheduling the message;
+the worker keeps sending other mail in the meantime. Permanent failures and
+messages out of attempts are logged and dropped.
+
+The queue lives in memory: mail still queued when the process dies is lost,
+which matches the old best-effort behaviour. An atexit hook flushes the
+queue so CLI scripts that notify and exit still deliver. Set
+MAIL_QUEUE_SYNC=true to make ``send`` wait for delivery and return the
+provider's result.
+"""
+import atexit
+import heapq
+import itertools
+import logging
+import os
+import random
+import time
+from threading import Condition, Event, Lock, Thread
+from typing import Any, Callable, Dict, List, Optional
+
+from services.emailer import get_transport, is_retryable, send_email
+
+log = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+IDLE_TIMEOUT = 30.0  # seconds without mail before the connection is closed
+MAX_ATTEMPTS = 6
+BASE_BACKOFF = 1.0  # seconds; doubled per attempt
+MAX_BACKOFF = 60.0
+FLUSH_AT_EXIT = 10.0
+
+QUEUED = {"ok": True, "provider": "queue", "detail": "queued"}
+
+
+def _backoff(attempts: int) -> float:
+    delay = min(MAX_BACKOFF, BASE_BACKOFF * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class MailQueue:
+    """Delayed-message heap drained by one daemon worker thread."""
+
+    def __init__(self, transport_factory: Callable[[], Any] = get_transport,
+                 batch_size: int = BATCH_SIZE, idle_timeout: float = IDLE_TIMEOUT,
+                 backoff: Callable[[int], float] = _backoff):
+        self.transport_factory = transport_factory
+        self.batch_size = batch_size
+        self.idle_timeout = idle_timeout
+        self.backoff = backoff
+        self._heap: List[tuple] = []  # (due, seq, job)
+        self._seq = itertools.count()
+        self._cond = Condition()
+        self._unfinished = 0
+        self._thread: Optional[Thread] = None
+        self._stopping = False
+        self._transport = None
+
+    def put(self, to_email: str, subject: str, text: str, html: Optional[str] = None,
+            max_attempts: int = MAX_ATTEMPTS) -> Dict[str, Any]:
+        """Queue one message. Returns the job; ``job['done']`` is set once it is delivered or given up."""
+        job = {
+            "to": to_email, "subject": subject, "text": text, "html": html,
+            "attempts": 0, "max_attempts": max(1, max_attempts),
+            "result": None, "done": Event(),
+        }
+        with self._cond:
+            self._ensure_worker()
+            self._unfinished += 1
+            heapq.heappush(self._heap, (time.monotonic(), next(self._seq), job))
+            self._cond.notify()
+        return job
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued message is delivered or dropped. False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._unfinished:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Flush, then stop the worker and close the connection."""
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return flushed
+
+    def __len__(self) -> int:
+        with self._cond:
+            return self._unfinished
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = Thread(target=self._run, name="mail-queue", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self) -> Optional[List[Dict[str, Any]]]:
+        """Due jobs (up to batch_size); [] after idle_timeout without any; None when stopping."""
+        with self._cond:
+            idle_until = time.monotonic() + self.idle_timeout
+            while True:
+                if self._stopping and not self._heap:
+                    return None
+                now = time.monotonic()
+                if self._heap and self._heap[0][0] <= now:
+                    batch = []
+                    while self._heap and self._heap[0][0] <= now and len(batch) < self.batch_size:
+                        batch.append(heapq.heappop(self._heap)[2])
+                    return batch
+                if now >= idle_until:
+                    return []
+                wake = idle_until if not self._heap else min(idle_until, self._heap[0][0])
+                self._cond.wait(wake - now)
+
+    def _finish(self, job: Dict[str, Any], result: Dict[str, Any]) -> None:
+        job["result"] = result
+        job["done"].set()
+        with self._cond:
+            self._unfinished -= 1
+            self._cond.notify_all()
+
+    def _deliver(self, job: Dict[str, Any]) -> None:
+        if self._transport is None:
+            self._transport = self.transport_factory()
+        if self._transport is None:
+            self._finish(job, {"ok": False, "provider": "none", "detail": "email_not_configured"})
+            return
+        job["attempts"] += 1
+        try:
+            result = send_email(job["to"], job["subject"], job["text"], job["html"], transport=self._transport)
+        except Exception as e:
+            log.exception("Mail to %s: transport error", job["to"])
+            self._close_transport()
+            result = {"ok": False, "provider": "none", "detail": {"error": str(e), "retryable": True}}
+
+        if result.get("ok"):
+            if job["attempts"] > 1:
+                log.info("Email sent successfully after %s retry(ies)", job["attempts"] - 1)
+            self._finish(job, result)
+        elif is_retryable(result) and job["attempts"] < job["max_attempts"]:
+            delay = self.backoff(job["attempts"])
+            log.info("Email to %s failed (%s), retrying in %.2fs (attempt %s/%s)",
+                     job["to"], result.get("detail"), delay, job["attempts"], job["max_attempts"])
+            with self._cond:
+                heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), job))
+        else:
+            log.error("Email to %s failed after %s attempt(s): %s", job["to"], job["attempts"], result)
+            self._finish(job, result)
+
+    def _close_transport(self) -> None:
+        transport, self._transport = self._transport, None
+        if transport is not None:
+            try:
+                transport.close()
+            except Exception:
+                log.debug("Error closing mail transport", exc_info=True)
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                self._close_transport()
+                return
+            if not batch:
+                self._close_transport()
+                continue
+            for job in batch:
+                try:
+                    self._deliver(job)
+                except Exception as e:
+                    log.exception("Mail to %s: worker error", job["to"])
+                    self._finish(job, {"ok": False, "provider": "none", "detail": str(e)})
+
+
+_queue: Optional[MailQueue] = None
+_queue_pid: Optional[int] = None
+_queue_lock = Lock()
+
+
+def get_queue() -> MailQueue:
+    """Per-process queue, created lazily (gunicorn preloads the app, then forks)."""
+    global _queue, _queue_pid
+    with _queue_lock:
+        if _queue is None or _queue_pid != os.getpid():
+            _queue = MailQueue()
+            _queue_pid = os.getpid()
+        return _queue
+
+
+def _sync() -> bool:
+    return os.getenv("MAIL_QUEUE_SYNC", "false").lower() in ("1", "true", "yes")
+
+
+def send(to_email: str, subject: str, text: str, html: Optional[str] = None,
+         max_attempts: int = MAX_ATTEMPTS, wait: Optional[bool] = None,
+         timeout: Optional[float] = 60.0) -> Dict[str, Any]:
+    """
+    Queue an email for background delivery.
+
+    Returns:
+        dict: ok/provider/detail. Without ``wait`` (or MAIL_QUEUE_SYNC) this
+        is ``{"ok": True, "provider": "queue", "detail": "queued"}``;
+        with it, the provider's result once delivery finished or was given up.
+    """
+    to_email = (to_email or "").strip()
+    if not to_email:
+        return {"ok": False, "provider": "none", "detail": "missing_to_email"}
+    job = get_queue().put(to_email, subject, text, html, max_attempts=max_attempts)
+    if not (_sync() if wait is None else wait):
+        return dict(QUEUED)
+    if not job["done"].wait(timeout):
+        return {"ok": False, "provider": "queue", "detail": "timeout"}
+    return job["result"]
+
+
+def flush(timeout: Optional[float] = None) -> bool:
+    """Wait for this process's queued mail to be delivered (or dropped)."""
+    with _queue_lock:
+        queue = _queue if _queue_pid == os.getpid() else None
+    return True if queue is None else queue.flush(timeout)
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    if not flush(FLUSH_AT_EXIT):
+        log.warning("Exiting with undelivered mail still queued")
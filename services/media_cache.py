@@ -0,0 +1,293 @@
+"""On-disk LRU cache of proxied media, in chunk-aligned byte ranges.
+
+/proxy/audio asks the cache first for ranged requests (which is what audio
+elements send). A track is cut into CHUNK_SIZE pieces; each piece is
+fetched from the origin once with a Range request and stored as its own
+file, keyed by the URL and the origin's ETag, so a changed file never
+serves stale bytes. A hit answers 206 straight from disk: when the range
+runs to the end of a chunk the open file goes out through
+``wsgi.file_wrapper`` (sendfile under gunicorn). A response never spans
+more than one chunk; players simply ask for the next range.
+
+Layout under MEDIA_CACHE_DIR::
+
+    meta/<sha(url)>.json              size, ETag, content type; revalidated
+                                      with a HEAD after META_TTL
+    chunks/<sha(url + etag)>/<n>      chunk n
+
+Files are written to a temp name and moved into place with ``os.replace``,
+so gunicorn workers share the directory without locks (at worst two
+workers fetch the same chunk once). Hits bump the file's mtime; when a
+process has written enough to possibly exceed MEDIA_CACHE_MAX_MB it scans
+the directory and deletes least-recently-used chunks down to 90%.
+
+Misses fetch from the origin while holding one of media_proxy's slots
+(AUDIO_PROXY_MAX_CONCURRENT), like a proxied stream; with none free the
+request falls through to the proxy, which answers 503.
+
+Anything the cache can't answer (no Range header, a stale If-Range, an
+origin without ETag/Content-Length, a cache directory that can't be
+written) returns None and the caller proxies
+as before. MEDIA_CACHE_MAX_MB=0 turns the cache off.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from threading import Lock
+from typing import Any, Dict, Mapping, Optional
+
+from flask import Response
+from werkzeug.http import parse_range_header
+from werkzeug.wsgi import wrap_file
+
+from services import media_proxy
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+META_TTL = 3600  # seconds before size/ETag are re-checked with a HEAD
+EVICT_TO = 0.9  # fraction of max_bytes left after an eviction pass
+READ_BLOCK = 64 * 1024
+
+
+def _sha(value: str) -> str:
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _read_exact(path: str, offset: int, length: int):
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while length > 0:
+            block = f.read(min(READ_BLOCK, length))
+            if not block:
+                return
+            length -= len(block)
+            yield block
+
+
+class MediaCache:
+    """Chunk store rooted at ``root``, bounded to roughly ``max_bytes``."""
+
+    def __init__(self, root: str, max_bytes: int, chunk_size: int = CHUNK_SIZE,
+                 meta_ttl: float = META_TTL, session=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.meta_ttl = meta_ttl
+        self.session = session
+        self._written = 0  # bytes this process wrote since the last size scan
+        self._size_estimate: Optional[int] = None
+        self._evict_lock = Lock()
+
+    # -- origin ------------------------------------------------------------
+
+    def _http(self):
+        return self.session or media_proxy.get_session()
+
+    def _meta_path(self, url: str) -> str:
+        return os.path.join(self.root, 'meta', _sha(url) + '.json')
+
+    def chunk_path(self, url: str, etag: str, index: int) -> str:
+        return os.path.join(self.root, 'chunks', _sha(url + '\n' + etag), str(index))
+
+    def meta(self, url: str) -> Optional[Dict[str, Any]]:
+        """Size / ETag / content type of ``url``, from disk or a HEAD request."""
+        path = self._meta_path(url)
+        try:
+            if time.time() - os.path.getmtime(path) < self.meta_ttl:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except (OSError, ValueError):
+            pass
+        try:
+            with media_proxy.slot():
+                head = self._http().head(url, allow_redirects=True,
+                                         timeout=(media_proxy.CONNECT_TIMEOUT, media_proxy.READ_TIMEOUT))
+        except media_proxy.ProxyBusy:
+            return None
+        except Exception as e:
+            logger.warning("media cache: HEAD %s failed: %s", url, e)
+            return None
+        etag = head.headers.get('ETag')
+        length = head.headers.get('Content-Length')
+        if head.status_code != 200 or not etag or not (length or '').isdigit() or etag.startswith('W/'):
+            return None  # can't key or range-fetch it safely
+        meta = {
+            'url': url,
+            'etag': etag,
+            'size': int(length),
+            'content_type': head.headers.get('Content-Type') or media_proxy.DEFAULT_CONTENT_TYPE,
+        }
+        try:
+            _atomic_write(path, json.dumps(meta).encode('utf-8'))
+        except OSError as e:
+            logger.warning("media cache: writing %s failed: %s", path, e)
+            return None
+        return meta
+
+    def _forget(self, url: str) -> None:
+        try:
+            os.unlink(self._meta_path(url))
+        except OSError:
+            pass
+
+    def chunk(self, url: str, meta: Dict[str, Any], index: int) -> Optional[str]:
+        """Path of chunk ``index``, fetching it from the origin on a miss."""
+        path = self.chunk_path(url, meta['etag'], index)
+        try:
+            os.utime(path)  # hit: mark as recently used
+            return path
+        except FileNotFoundError:
+            pass
+
+        start = index * self.chunk_size
+        end = min(start + self.chunk_size, meta['size']) - 1
+        try:
+            with media_proxy.slot():
+                resp = self._http().get(
+                    url,
+                    headers={'Range': f'bytes={start}-{end}', 'If-Range': meta['etag']},
+                    timeout=(media_proxy.CONNECT_TIMEOUT, media_proxy.READ_TIMEOUT),
+                )
+        except media_proxy.ProxyBusy:
+            return None
+        except Exception as e:
+            logger.warning("media cache: fetch %s chunk %s failed: %s", url, index, e)
+            return None
+        expected = f"bytes {start}-{end}/{meta['size']}"
+        if (resp.status_code != 206 or resp.headers.get('ETag') != meta['etag']
+                or resp.headers.get('Content-Range') != expected or len(resp.content) != end - start + 1):
+            # The file changed (or the origin ignored the range): re-learn it next time.
+            self._forget(url)
+            return None
+        try:
+            _atomic_write(path, resp.content)
+        except OSError as e:  # disk full, read-only mount: proxy instead
+            logger.warning("media cache: writing %s failed: %s", path, e)
+            return None
+        self._note_written(len(resp.content))
+        return path
+
+    # -- eviction ------------------------------------------------------------
+
+    def _note_written(self, nbytes: int) -> None:
+        self._written += nbytes
+        if self._size_estimate is None or self._size_estimate + self._written > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> int:
+        """Delete least-recently-used chunks until under EVICT_TO * max_bytes. Returns bytes freed."""
+        with self._evict_lock:
+            files = []
+            total = 0
+            for dirpath, _, filenames in os.walk(os.path.join(self.root, 'chunks')):
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, path))
+                    total += st.st_size
+            freed = 0
+            if total > self.max_bytes:
+                target = self.max_bytes * EVICT_TO
+                for _, size, path in sorted(files):
+                    if total - freed <= target:
+                        break
+                    try:
+                        os.unlink(path)
+                        freed += size
+                    except OSError:
+                        pass
+            self._size_estimate = total - freed
+            self._written = 0
+            return freed
+
+    # -- serving -------------------------------------------------------------
+
+    def serve(self, url: str, request_headers: Mapping[str, str], environ) -> Optional[Response]:
+        """A 206/416 answer for a ranged request from cached chunks, or None to proxy instead."""
+        ranges = parse_range_header(request_headers.get('Range'))
+        if ranges is None or len(ranges.ranges) != 1:
+            return None
+        meta = self.meta(url)
+        if meta is None:
+            return None
+        if_range = request_headers.get('If-Range')
+        if if_range and if_range != meta['etag']:
+            return None  # client's copy is stale: it needs the full new body
+        size = meta['size']
+        bounds = ranges.range_for_length(size)
+        if bounds is None:
+            response = Response(status=416)
+            response.headers['Content-Range'] = f'bytes */{size}'
+            return response
+
+        start, stop = bounds
+        index = start // self.chunk_size
+        path = self.chunk(url, meta, index)
+        if path is None:
+            return None
+        chunk_start = index * self.chunk_size
+        chunk_stop = min(chunk_start + self.chunk_size, size)
+        stop = min(stop, chunk_stop)
+
+        if stop == chunk_stop:
+            try:
+                f = open(path, 'rb')
+            except OSError:  # evicted by another worker since the lookup
+                return None
+            f.seek(start - chunk_start)
+            body = wrap_file(environ, f)
+            response = Response(body, status=206, direct_passthrough=True)
+        else:
+            response = Response(_read_exact(path, start - chunk_start, stop - start), status=206)
+        response.headers['Content-Type'] = meta['content_type']
+        response.headers['Content-Length'] = str(stop - start)
+        response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+        response.headers['Accept-Ranges'] = 'bytes'
+        response.headers['ETag'] = meta['etag']
+        response.headers['Cache-Control'] = 'public, max-age=3600'
+        return response
+
+
+_cache: Optional[MediaCache] = None
+_cache_pid: Optional[int] = None
+_cache_lock = Lock()
+
+
+def get_cache() -> Optional[MediaCache]:
+    """This process's cache, or None when MEDIA_CACHE_MAX_MB is 0."""
+    global _cache, _cache_pid
+    try:
+        max_mb = int(os.getenv('MEDIA_CACHE_MAX_MB', '512'))
+    except ValueError:
+        max_mb = 512
+    if max_mb <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache_pid != os.getpid():
+            root = os.getenv('MEDIA_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'ahoy-media-cache')
+            _cache = MediaCache(root, max_mb * 1024 * 1024)
+            _cache_pid = os.getpid()
+        return _cache
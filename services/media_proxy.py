@@ -0,0 +1,144 @@
+"""Streaming proxy for remote audio (/proxy/audio).
+
+The upstream body is relayed in CHUNK_SIZE pieces as it arrives instead of
+being read into memory first, and the client's Range / If-Range headers are
+forwarded, so seeking in the player fetches only the bytes it needs: a
+ranged request comes back as 206 with the origin's Content-Range.
+
+Upstream connections come from one pooled ``requests.Session`` per process.
+Each proxied stream holds a worker thread for as long as the client reads,
+so at most AUDIO_PROXY_MAX_CONCURRENT streams (default 2) run per process;
+beyond that the proxy answers 503 with Retry-After instead of queueing and
+starving page requests. The media cache's origin fetches on a miss take a
+slot too (``slot()``).
+"""
+import logging
+import os
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Lock
+from typing import Iterator, Mapping, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from flask import Response
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+DEFAULT_CONTENT_TYPE = 'audio/mpeg'
+
+# Request headers passed to the origin and response headers passed back.
+FORWARD_REQUEST_HEADERS = ('Range', 'If-Range', 'If-None-Match', 'If-Modified-Since')
+FORWARD_RESPONSE_HEADERS = (
+    'Content-Length', 'Content-Range', 'Accept-Ranges', 'ETag', 'Last-Modified',
+)
+
+_session: Optional[requests.Session] = None
+_slots: Optional[BoundedSemaphore] = None
+_pid: Optional[int] = None
+_init_lock = Lock()
+
+
+class ProxyBusy(Exception):
+    """Every proxy slot in this process is streaming."""
+
+
+def is_allowed_source(url: str) -> bool:
+    """Only S3 and Google Storage (and the Ahoy collection bucket) over HTTPS."""
+    return url.startswith('https://') and (
+        's3' in url or 'storage.googleapis.com' in url or 'ahoycollection' in url
+    )
+
+
+def max_concurrent() -> int:
+    try:
+        return max(1, int(os.getenv('AUDIO_PROXY_MAX_CONCURRENT', '2')))
+    except ValueError:
+        return 2
+
+
+def _init() -> None:
+    """Per-process session and slots (gunicorn preloads the app, then forks)."""
+    global _session, _slots, _pid
+    with _init_lock:
+        if _pid != os.getpid():
+            slots = max_concurrent()
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=slots)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session, _slots, _pid = session, BoundedSemaphore(slots), os.getpid()
+
+
+def get_session() -> requests.Session:
+    _init()
+    return _session
+
+
+@contextmanager
+def slot():
+    """
+    Hold one proxy slot for origin work done outside ``proxy``.
+
+    Raises:
+        ProxyBusy: no free slot in this process
+    """
+    _init()
+    slots = _slots
+    if not slots.acquire(blocking=False):
+        raise ProxyBusy()
+    try:
+        yield
+    finally:
+        slots.release()
+
+
+def _relay(upstream: requests.Response) -> Iterator[bytes]:
+    for chunk in upstream.iter_content(CHUNK_SIZE):
+        if chunk:
+            yield chunk
+
+
+def proxy(url: str, request_headers: Mapping[str, str]) -> Response:
+    """
+    Fetch ``url`` and stream it back, honouring Range.
+
+    Raises:
+        ProxyBusy: no free slot in this process
+        requests.RequestException: the origin could not be reached or
+            answered with an error (other than 304/416, which are relayed)
+    """
+    _init()
+    slots = _slots
+    if not slots.acquire(blocking=False):
+        raise ProxyBusy()
+    upstream = None
+    try:
+        headers = {h: request_headers[h] for h in FORWARD_REQUEST_HEADERS if request_headers.get(h)}
+        upstream = _session.get(url, headers=headers, stream=True, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        if upstream.status_code not in (304, 416):
+            upstream.raise_for_status()
+    except BaseException:
+        if upstream is not None:
+            upstream.close()
+        slots.release()
+        raise
+
+    def release():
+        upstream.close()
+        slots.release()
+
+    body = _relay(upstream) if upstream.status_code in (200, 206) else iter(())
+    response = Response(body, status=upstream.status_code)
+    response.call_on_close(release)
+    response.headers['Content-Type'] = upstream.headers.get('Content-Type') or DEFAULT_CONTENT_TYPE
+    for name in FORWARD_RESPONSE_HEADERS:
+        if name in upstream.headers:
+            response.headers[name] = upstream.headers[name]
+    response.headers.setdefault('Accept-Ranges', 'bytes')
+    response.headers['Cache-Control'] = 'public, max-age=3600'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,196 @@
+"""Merch catalog and purchased-item set for /merch and /api/merch, cached per process.
+
+Every merch piece is one of a kind, so the store page needs the catalog and
+the ids of items that already have a purchase row. Both are cached here so a
+page view does no database reads:
+
+- the sanitized catalog is rebuilt only when content_db hands back a new
+  merch result (its TTL expired or the content cache was invalidated);
+- the purchased set comes from one ``SELECT DISTINCT item_id`` and is then
+  kept current by ``mark_purchased`` at the points that create or pay for a
+  merch purchase. ``invalidate_purchased`` bumps the version and forces a
+  reload. Other worker processes catch up within PURCHASED_TTL; the
+  checkout itself still checks the purchases table before selling an item.
+
+Checkout resolves items through ``checkout_index()``: the catalog keyed by
+item id with the unit price, Stripe amount and quantity-tier totals worked
+out once per catalog version, so pricing an item is a dict lookup.
+"""
+import logging
+from decimal import Decimal, InvalidOperation
+from threading import Lock
+from time import time as _now
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from sqlalchemy import select
+
+from db import get_session
+from models import Purchase
+from services.content_db import get_all_merch
+from storage import read_json
+
+logger = logging.getLogger(__name__)
+
+PURCHASED_TTL = 300  # seconds; bounds staleness across worker processes
+DEFAULT_IMAGE = '/static/img/default-cover.jpg'
+CENTS = Decimal('0.01')
+QTY_TIERS = 10  # totals precomputed for quantities 1..QTY_TIERS
+
+_lock = Lock()
+_catalog: Tuple[Any, Dict[str, Any]] = (None, {'items': []})  # (content_db result, sanitized copy)
+_purchased: Optional[FrozenSet[str]] = None
+_purchased_at = 0.0
+_purchased_version = 0
+_index: Tuple[Any, Optional['CatalogIndex']] = (None, None)  # (content_db result, index)
+_index_version = 0
+
+
+def is_local_file_path(s) -> bool:
+    """True if string looks like a local filesystem path (do not use as public image URL). URLs and /static/ are safe."""
+    if not s or not isinstance(s, str):
+        return False
+    s = s.strip()
+    # Public URLs and same-origin static paths are valid image URLs; do not replace
+    if s.startswith(('http://', 'https://', '/static/')):
+        return False
+    return any(s.startswith(p) or p in s for p in ('/var/', '/Users/', '/tmp/', 'TemporaryItems', 'Screenshot')) or s.endswith(('.png', '.jpg', '.jpeg'))
+
+
+def sanitize_catalog(merch_catalog) -> Dict[str, Any]:
+    """Copy of the catalog with local file paths replaced by safe defaults."""
+    items = merch_catalog.get('items') if isinstance(merch_catalog, dict) else []
+    if not isinstance(items, list):
+        return merch_catalog if isinstance(merch_catalog, dict) else {'items': []}
+    sanitized = []
+    for it in items:
+        if not isinstance(it, dict):
+            continue
+        it = dict(it)
+        if is_local_file_path(it.get('image_url')):
+            it['image_url'] = DEFAULT_IMAGE
+        if is_local_file_path(it.get('image_url_back')):
+            it['image_url_back'] = None
+        if is_local_file_path(it.get('name')):
+            it['name'] = it.get('id') or 'Item'
+        sanitized.append(it)
+    merch_catalog = dict(merch_catalog)
+    merch_catalog['items'] = sanitized
+    return merch_catalog
+
+
+def catalog() -> Dict[str, Any]:
+    """Sanitized merch catalog; shared between requests, do not mutate."""
+    global _catalog
+    source = get_all_merch(ttl=600)
+    cached_source, sanitized = _catalog
+    if source is not cached_source:
+        sanitized = sanitize_catalog(source)
+        _catalog = (source, sanitized)
+    return sanitized
+
+
+class CatalogIndex:
+    """Merch items by id with checkout pricing precomputed, stamped with the catalog version."""
+
+    def __init__(self, items, version: int):
+        self.version = version
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        for it in items if isinstance(items, list) else []:
+            if not isinstance(it, dict) or not it.get('id'):
+                continue
+            try:
+                unit = Decimal(str(it.get('price_usd') or '0')).quantize(CENTS)
+            except InvalidOperation:
+                unit = Decimal('0.00')
+            self.entries.setdefault(str(it['id']), {
+                'item': it,
+                'name': str(it.get('name') or '').strip()[:120],
+                'available': it.get('available') is not False,
+                'unit_price': unit,
+                'unit_amount_cents': int(unit * 100),
+                'totals': {qty: (unit * qty).quantize(CENTS) for qty in range(1, QTY_TIERS + 1)},
+            })
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, item_id) -> Optional[Dict[str, Any]]:
+        return self.entries.get(str(item_id)) if item_id else None
+
+    @staticmethod
+    def total(entry: Dict[str, Any], qty: int) -> Decimal:
+        qty = max(1, int(qty))
+        return entry['totals'].get(qty) or (entry['unit_price'] * qty).quantize(CENTS)
+
+
+def checkout_index() -> CatalogIndex:
+    """Index of the current merch catalog, rebuilt only when content_db returns a new result."""
+    global _index, _index_version
+    source = get_all_merch(ttl=600)
+    cached_source, index = _index
+    if index is None or source is not cached_source:
+        items = source.get('items') if isinstance(source, dict) else None
+        if not items:
+            # Same last resort as the old per-request fallback.
+            items = (read_json('data/merch.json', {'items': []}) or {}).get('items')
+        with _lock:
+            _index_version += 1
+            index = CatalogIndex(items, _index_version)
+            _index = (source, index)
+    return index
+
+
+def _load_purchased() -> FrozenSet[str]:
+    with get_session() as s:
+        rows = s.execute(
+            select(Purchase.item_id).where(
+                Purchase.type == 'merch', Purchase.item_id.isnot(None)
+            ).distinct()
+        ).scalars()
+        return frozenset(str(item_id) for item_id in rows if item_id)
+
+
+def purchased_item_ids(ttl: int = PURCHASED_TTL) -> FrozenSet[str]:
+    """Ids of merch items that already have a purchase (any status)."""
+    global _purchased, _purchased_at
+    with _lock:
+        if _purchased is not None and _now() - _purchased_at < ttl:
+            return _purchased
+        version = _purchased_version
+    loaded = _load_purchased()
+    with _lock:
+        # A purchase marked while we were loading may be missing from ``loaded``;
+        # don't cache it then, the next read reloads.
+        if version == _purchased_version:
+            _purchased, _purchased_at = loaded, _now()
+    return loaded
+
+
+def mark_purchased(item_id) -> None:
+    """Add ``item_id`` to the cached set (call once its purchase row is committed)."""
+    global _purchased, _purchased_version
+    if not item_id:
+        return
+    with _lock:
+        if _purchased is not None:
+            _purchased = _purchased | {str(item_id)}
+        _purchased_version += 1
+
+
+def invalidate_purchased() -> None:
+    """Drop the cached set; the next read reloads it from the database."""
+    global _purchased, _purchased_at, _purchased_version
+    with _lock:
+        _purchased = None
+        _purchased_at = 0.0
+        _purchased_version += 1
+
+
+def catalog_and_purchased() -> Tuple[Dict[str, Any], FrozenSet[str]]:
+    """Shared: sanitized merch catalog and set of purchased item ids. Used by /merch and /api/merch."""
+    try:
+        purchased = purchased_item_ids()
+    except Exception as e:
+        logger.warning(f"Error querying purchased merch items: {e}")
+        purchased = frozenset()
+    return catalog(), purchased
@@ -2,16 +2,16 @@
 Notification service for boosts and merch purchases.
 Sends email notifications to admins and optionally to artists.
 
-Unified notification system with rate limiting and retry logic.
+Unified notification system; delivery (with rate limiting and retry logic)
+runs in the background mail queue, see services/mail_queue.py.
 """
 import os
-import time
-import random
 import logging
 from decimal import Decimal
 from datetime import datetime
 from typing import Optional, Dict, Any
-from services.emailer import send_email, can_send_email
+from services import artist_directory, mail_queue
+from services.emailer import can_send_email
 
 log = logging.getLogger(__name__)
 
@@ -47,60 +47,29 @@ def send_email_with_retry(
     max_retries: int = 5
 ) -> Dict[str, Any]:
     """
-    Send email with retry logic for rate limiting (429 errors).
-    
-    Implements exponential backoff with jitter:
-    - Retry delays: 0.7s, 1.2s, 2.0s, 3.5s, 5.0s
-    - Adds random jitter +/- 0.2s to avoid thundering herd
-    - Never throws exceptions; returns ok=False on failure
-    
+    Queue an email for background delivery with retries (services.mail_queue).
+
+    Returns as soon as the message is queued; the mail worker sends it over a
+    reused connection and retries rate limits (429) and transient failures
+    with jittered exponential backoff, so request handlers never wait on the
+    mail provider. Never throws exceptions.
+
     Args:
         to_email: Recipient email address
         subject: Email subject
         text: Plain text email body
         html: Optional HTML email body
         max_retries: Maximum number of retry attempts (default: 5)
-    
+
     Returns:
-        Dict with keys: ok (bool), provider (str), detail (str|dict)
+        Dict with keys: ok (bool), provider (str), detail (str|dict).
+        ok=True means queued (or sent, with MAIL_QUEUE_SYNC=true).
     """
-    retry_delays = [0.7, 1.2, 2.0, 3.5, 5.0]
-    
-    for attempt in range(max_retries + 1):
-        result = send_email(to_email, subject, text, html)
-        
-        # Success - return immediately
-        if result.get("ok"):
-            if attempt > 0:
-                log.info(f"Email sent successfully after {attempt} retry(ies)")
-            return result
-        
-        # Check if it's a rate limit error (429)
-        detail = result.get("detail", {})
-        is_rate_limit = False
-        
-        if isinstance(detail, dict):
-            status = detail.get("status")
-            body = detail.get("body", "")
-            if status == 429 or "rate_limit" in str(body).lower() or "429" in str(body):
-                is_rate_limit = True
-        
-        # If not rate limit or last attempt, return error
-        if not is_rate_limit or attempt >= max_retries:
-            if attempt > 0:
-                log.warning(f"Email send failed after {attempt} retries: {result}")
-            return result
-        
-        # Calculate delay with jitter
-        base_delay = retry_delays[min(attempt, len(retry_delays) - 1)]
-        jitter = random.uniform(-0.2, 0.2)
-        delay = max(0.1, base_delay + jitter)  # Ensure at least 0.1s
-        
-        log.info(f"Rate limit hit (429), retrying in {delay:.2f}s (attempt {attempt + 1}/{max_retries})")
-        time.sleep(delay)
-    
-    # Should never reach here, but return last result
-    return result
+    try:
+        return mail_queue.send(to_email, subject, text, html, max_attempts=max_retries + 1)
+    except Exception as e:
+        log.exception("Failed to queue email")
+        return {"ok": False, "provider": "queue", "detail": str(e)}
 
 
 def notify_admin(
@@ -187,47 +156,14 @@ def notify_user(
 
 def _get_artist_email(artist_id: str) -> Optional[str]:
     """
-    Get artist email from environment variable mapping.
-    Format: ARTIST_EMAIL_<artist_id>=email@example.com
-    Or from a JSON file mapping (future enhancement).
+    Get artist email: ARTIST_EMAIL_<artist_id> (e.g. ARTIST_EMAIL_ROB_MEGLIO=rob@example.com),
+    else the artist's record in the artist directory.
     """
-    # Try environment variable first (e.g., ARTIST_EMAIL_rob-meglio=rob@example.com)
-    env_key = f"ARTIST_EMAIL_{artist_id.upper().replace('-', '_').replace(' ', '_')}"
-    email = os.getenv(env_key) or os.getenv(env_key.lower())
-    if email:
-        return email.strip()
-    
-    # Try loading from artist data if available
     try:
-        import json
-        from pathlib import Path
-        
-        # Load artists.json directly
-        artists_file = Path(__file__).parent.parent / 'static' / 'data' / 'artists.json'
-        if artists_file.exists():
-            with open(artists_file, 'r', encoding='utf-8') as f:
-                artists_data = json.load(f)
-            
-            for artist in artists_data.get('artists', []):
-                artist_slug = artist.get('slug', '').lower()
-                artist_name = artist.get('name', '').lower()
-                artist_id_lower = artist_id.lower()
-                
-                if (artist_slug == artist_id_lower or 
-                    artist_name == artist_id_lower or 
-                    str(artist.get('id', '')).lower() == artist_id_lower):
-                    # Check if artist has email in their data
-                    if 'email' in artist:
-                        return artist['email'].strip()
-                    # Check environment variable with slug
-                    slug_key = f"ARTIST_EMAIL_{artist_slug.upper().replace('-', '_')}"
-                    email = os.getenv(slug_key) or os.getenv(slug_key.lower())
-                    if email:
-                        return email.strip()
+        return artist_directory.artist_email(artist_id)
     except Exception as e:
         log.debug(f"Could not load artist email for {artist_id}: {e}")
-    
-    return None
+        return None
 
 
 def notify_boost_received(
@@ -0,0 +1,258 @@
+"""Parallel, idempotent Stripe Connect payout executor.
+
+Each automatic payout is an ArtistPayout row moving through a durable state
+machine:
+
+    queued -> submitted -> completed
+                        -> failed     (Stripe rejected the transfer)
+
+``queue_payout`` writes the row (and its payout_tips links, which take the
+tips out of the pending set) before any money moves. ``execute_payouts``
+marks the rows submitted and commits, then sends the transfers from a
+bounded thread pool; results are written back from the calling thread as
+each transfer finishes, so worker threads never touch the database.
+
+The payout's key is derived from the artist and the covered tip-id set and
+is the Stripe transfer_group; the idempotency key adds the retry round
+(``stripe_key``). Before every create the transfer is looked up by
+transfer_group, which does not change between rounds, so a transfer Stripe
+made but never confirmed (a timeout, a lost response, an earlier round) is
+found even after the 24h idempotency window. A run that crashes after
+submitting leaves rows in ``queued``/``submitted`` for the next run.
+Rate-limit and connection errors are retried with exponential backoff; if
+retries run out the row stays ``submitted``, since the transfer may exist.
+
+Anything with a ``create_transfer``/``find_transfer`` pair can stand in for
+``StripeTransferClient`` (tests use a local fake).
+"""
+import hashlib
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import stripe
+
+from models import ArtistPayout, PayoutTip
+from services.payouts import link_tips
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 1.0  # seconds; doubled on every retry
+MAX_DELAY = 30.0
+
+RESUMABLE_STATUSES = ('queued', 'submitted')
+
+
+class TransferError(Exception):
+    """Stripe refused the transfer; retrying the same request will not help."""
+
+
+class RetryableTransferError(TransferError):
+    """Rate limit or connection problem; the same request may be retried."""
+
+
+class StripeTransferClient:
+    """Thin wrapper over ``stripe.Transfer`` mapping errors onto the executor's."""
+
+    def create_transfer(self, amount_cents: int, destination: str, idempotency_key: str,
+                        transfer_group: str, description: str, metadata: Dict[str, str]) -> str:
+        try:
+            transfer = stripe.Transfer.create(
+                amount=amount_cents,
+                currency="usd",
+                destination=destination,
+                description=description,
+                transfer_group=transfer_group,
+                metadata=metadata,
+                idempotency_key=idempotency_key,
+            )
+        except (stripe.error.RateLimitError, stripe.error.APIConnectionError) as e:
+            raise RetryableTransferError(str(e)) from e
+        except stripe.error.StripeError as e:
+            raise TransferError(str(e)) from e
+        return transfer.id
+
+    def find_transfer(self, transfer_group: str) -> Optional[str]:
+        try:
+            transfers = stripe.Transfer.list(transfer_group=transfer_group, limit=1)
+        except (stripe.error.RateLimitError, stripe.error.APIConnectionError) as e:
+            raise RetryableTransferError(str(e)) from e
+        except stripe.error.StripeError as e:
+            raise TransferError(str(e)) from e
+        data = transfers.data
+        return data[0].id if data else None
+
+
+def payout_idempotency_key(artist_id: str, tip_ids: Iterable[int]) -> str:
+    """Stable key for paying ``artist_id`` for exactly this set of tips."""
+    material = f"{artist_id}:" + ",".join(str(t) for t in sorted({int(t) for t in tip_ids}))
+    return "payout-" + hashlib.sha256(material.encode("utf-8")).hexdigest()[:40]
+
+
+def stripe_key(payout: ArtistPayout) -> str:
+    """Idempotency key sent to Stripe for the payout's current round (the transfer_group is the bare key)."""
+    return f"{payout.idempotency_key}-r{payout.retry_round or 0}"
+
+
+def queue_payout(session, artist_id: str, amount: Decimal, tip_ids: List[int],
+                 destination: str) -> ArtistPayout:
+    """
+    Queue a Stripe payout covering ``tip_ids`` (committed by the caller).
+
+    The same tip set always maps to the same row: a queued/submitted/completed
+    row is returned unchanged, a failed one is queued again under a new retry
+    round (Stripe caches failed responses per idempotency key).
+    """
+    key = payout_idempotency_key(artist_id, tip_ids)
+    payout = session.query(ArtistPayout).filter(ArtistPayout.idempotency_key == key).first()
+    if payout is not None:
+        if payout.status == 'failed':
+            payout.status = 'queued'
+            payout.retry_round = (payout.retry_round or 0) + 1
+            payout.stripe_destination = destination
+        return payout
+
+    payout = ArtistPayout(
+        artist_id=str(artist_id),
+        amount=amount,
+        status='queued',
+        payment_method='stripe_connect',
+        idempotency_key=key,
+        retry_round=0,
+        stripe_destination=destination,
+        related_tip_ids=list(tip_ids),
+        created_at=datetime.utcnow(),
+    )
+    session.add(payout)
+    session.flush()
+    link_tips(session, payout.id, tip_ids)
+    return payout
+
+
+def queue_existing_payout(session, payout: ArtistPayout, destination: str) -> bool:
+    """
+    Move a manual 'pending' record onto the Stripe queue.
+
+    Returns False if the same tip set is already queued under another row.
+    """
+    tip_ids = [row.tip_id for row in session.query(PayoutTip.tip_id).filter(PayoutTip.payout_id == payout.id)]
+    if not tip_ids:
+        tip_ids = [int(t) for t in (payout.related_tip_ids or [])]
+    key = payout_idempotency_key(payout.artist_id, tip_ids) if tip_ids else f"payout-id-{payout.id}"
+    other = session.query(ArtistPayout.id).filter(
+        ArtistPayout.idempotency_key == key, ArtistPayout.id != payout.id
+    ).first()
+    if other is not None:
+        return False
+    payout.idempotency_key = key
+    payout.status = 'queued'
+    payout.payment_method = 'stripe_connect'
+    payout.stripe_destination = destination
+    return True
+
+
+def with_backoff(fn: Callable[[], Any], max_retries: int = DEFAULT_MAX_RETRIES,
+                 base_delay: float = DEFAULT_BASE_DELAY, sleep: Callable[[float], None] = time.sleep) -> Any:
+    """Call ``fn``, retrying RetryableTransferError with jittered exponential backoff."""
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except RetryableTransferError:
+            if attempt >= max_retries:
+                raise
+            delay = min(MAX_DELAY, base_delay * (2 ** attempt))
+            sleep(delay * random.uniform(0.5, 1.0))
+            attempt += 1
+
+
+def _send(client, job: Dict[str, Any], max_retries: int, base_delay: float, sleep) -> Dict[str, Any]:
+    """Worker: find (or send) one transfer. Plain dicts in and out, no ORM objects."""
+    try:
+        transfer_id = with_backoff(lambda: client.find_transfer(job['group']), max_retries, base_delay, sleep)
+        if transfer_id is None:
+            transfer_id = with_backoff(
+                lambda: client.create_transfer(
+                    amount_cents=job['amount_cents'],
+                    destination=job['destination'],
+                    idempotency_key=job['key'],
+                    transfer_group=job['group'],
+                    description=job['description'],
+                    metadata={'payout_id': str(job['payout_id']), 'artist_id': job['artist_id']},
+                ),
+                max_retries, base_delay, sleep,
+            )
+        return {'status': 'completed', 'transfer_id': transfer_id, 'error': None}
+    except RetryableTransferError as e:
+        # Stripe may have made the transfer: the next run looks it up before sending
+        return {'status': 'submitted', 'transfer_id': None, 'error': f"Retries exhausted: {e}"}
+    except TransferError as e:
+        return {'status': 'failed', 'transfer_id': None, 'error': str(e)}
+
+
+def execute_payouts(session, client=None, payout_ids: Optional[Iterable[int]] = None,
+                    max_workers: int = DEFAULT_WORKERS, max_retries: int = DEFAULT_MAX_RETRIES,
+                    base_delay: float = DEFAULT_BASE_DELAY,
+                    sleep: Callable[[float], None] = time.sleep) -> List[Dict[str, Any]]:
+    """
+    Send every queued/submitted payout (or just ``payout_ids``) to Stripe.
+
+    Returns:
+        list: one dict per payout with payout_id, artist_id, amount, status
+        ('completed', 'failed' or 'submitted' when retries ran out),
+        transfer_id and error.
+    """
+    client = client or StripeTransferClient()
+    query = session.query(ArtistPayout).filter(ArtistPayout.status.in_(RESUMABLE_STATUSES))
+    if payout_ids is not None:
+        query = query.filter(ArtistPayout.id.in_(list(payout_ids)))
+    payouts = {p.id: p for p in query.order_by(ArtistPayout.id).all()}
+    if not payouts:
+        return []
+
+    # Durable before any transfer is attempted: a crash from here on resumes.
+    now = datetime.utcnow()
+    jobs = []
+    for payout in payouts.values():
+        jobs.append({
+            'payout_id': payout.id,
+            'artist_id': payout.artist_id,
+            'amount_cents': int((Decimal(str(payout.amount)) * 100).to_integral_value()),
+            'destination': payout.stripe_destination,
+            'key': stripe_key(payout),
+            'group': payout.idempotency_key,
+            'description': f"Payout to {payout.artist_id} (Payout ID: {payout.id})",
+        })
+        payout.status = 'submitted'
+        payout.processed_at = now
+    session.commit()
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {pool.submit(_send, client, job, max_retries, base_delay, sleep): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            outcome = future.result()
+            payout = payouts[job['payout_id']]
+            payout.status = outcome['status']
+            if outcome['status'] == 'completed':
+                payout.stripe_transfer_id = outcome['transfer_id']
+                payout.completed_at = datetime.utcnow()
+            else:
+                payout.notes = ((payout.notes or "") + f"\nTransfer {outcome['status']}: {outcome['error']}")[-1000:]
+                logger.warning("payout %s %s: %s", payout.id, outcome['status'], outcome['error'])
+            session.commit()
+            results.append({
+                'payout_id': payout.id,
+                'artist_id': payout.artist_id,
+                'amount': Decimal(str(payout.amount)),
+                **outcome,
+            })
+    results.sort(key=lambda r: r['payout_id'])
+    return results
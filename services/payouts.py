@@ -0,0 +1,91 @@
+"""Pending artist payouts, computed set-based.
+
+A tip is pending until a completed ArtistPayout -- or one the Stripe payout
+executor has queued or submitted -- covers it through the payout_tips link
+table. Pending totals for every artist come from one grouped
+anti-join over tips, instead of loading each artist's tips and payouts and
+unpacking related_tip_ids in Python.
+
+Used by scripts/daily_payout_processor.py, scripts/scan_artist_payouts.py,
+scripts/send_artist_payout.py and scripts/dashboard.py.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import exists, func
+
+from models import ArtistPayout, PayoutTip, Tip
+
+# Payout states that claim their tips. Manual 'pending' records and 'failed'
+# transfers leave the tips owed (and eligible for the next run).
+CLAIMED_STATUSES = ('queued', 'submitted', 'completed')
+
+# What the artist receives for a tip (older rows predate artist_payout).
+TIP_PAYOUT_AMOUNT = func.coalesce(Tip.artist_payout, Tip.amount)
+
+
+def _paid():
+    """Correlated EXISTS: the tip is linked to a completed or in-flight payout."""
+    return exists().where(
+        PayoutTip.tip_id == Tip.id,
+        PayoutTip.payout_id == ArtistPayout.id,
+        ArtistPayout.status.in_(CLAIMED_STATUSES),
+    )
+
+
+def pending_totals(session, artist_ids: Optional[Iterable[str]] = None,
+                   min_amount: Optional[Decimal] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Pending payout totals per tips.artist_id, in one query.
+
+    Returns:
+        dict: {artist_id: {'total': Decimal, 'tip_count': int}}
+    """
+    total = func.sum(TIP_PAYOUT_AMOUNT)
+    query = session.query(Tip.artist_id, total, func.count(Tip.id)).filter(~_paid())
+    if artist_ids is not None:
+        query = query.filter(Tip.artist_id.in_([str(a) for a in artist_ids]))
+    query = query.group_by(Tip.artist_id)
+    if min_amount is not None:
+        query = query.having(total >= min_amount)
+    return {
+        artist_id: {'total': Decimal(str(amount or 0)), 'tip_count': int(count)}
+        for artist_id, amount, count in query.all()
+    }
+
+
+def pending_tips(session, artist_ids: Iterable[str]) -> Dict[str, List[Tip]]:
+    """Pending Tip rows for ``artist_ids`` (oldest first), in one query."""
+    artist_ids = [str(a) for a in artist_ids]
+    by_artist: Dict[str, List[Tip]] = defaultdict(list)
+    if not artist_ids:
+        return by_artist
+    tips = session.query(Tip).filter(
+        Tip.artist_id.in_(artist_ids), ~_paid()
+    ).order_by(Tip.artist_id, Tip.created_at, Tip.id).all()
+    for tip in tips:
+        by_artist[tip.artist_id].append(tip)
+    return by_artist
+
+
+def match_artists(artists: Iterable[Dict[str, Any]], totals: Dict[str, Any]) -> List[Tuple[Dict[str, Any], str]]:
+    """
+    Resolve artists.json entries to the tips.artist_id their pending tips are under.
+
+    Tips may be keyed by an artist's id, slug or name; as before, the first of
+    those with pending tips wins. Artists without pending tips are dropped.
+    """
+    matches = []
+    for artist in artists:
+        artist_id = artist.get('id') or artist.get('slug') or artist.get('name', '')
+        for identifier in (str(artist_id), artist.get('slug', ''), artist.get('name', 'Unknown')):
+            if identifier and identifier in totals:
+                matches.append((artist, identifier))
+                break
+    return matches
+
+
+def link_tips(session, payout_id: int, tip_ids: Iterable[int]) -> None:
+    """Record that ``payout_id`` covers ``tip_ids`` (call before committing the payout)."""
+    session.add_all([PayoutTip(payout_id=payout_id, tip_id=int(tip_id)) for tip_id in set(tip_ids)])
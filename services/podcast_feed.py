@@ -0,0 +1,210 @@
+"""Per-show podcast RSS feeds (/feeds/podcasts/<slug>.xml).
+
+Built from ``content_db.get_all_podcasts()`` (the same data as
+/podcasts/<slug>): RSS 2.0 with the iTunes tags podcast apps read, newest
+episode first. Long-running shows are paged, PODCAST_FEED_PAGE_SIZE
+(default 100) episodes per page (?page=2, ...), with RFC 5005
+``atom:link`` first/next/previous/last links so clients can walk the
+archive.
+
+Podcast apps poll often, so a request should cost a dict lookup:
+
+- Each rendered page (plain and gzipped bytes, ETag, Last-Modified) is
+  cached until ``content_db.content_version()`` changes.
+- On a re-render, the ``<item>`` XML of episodes whose dict is unchanged is
+  reused, so a new episode only renders one item.
+- The ETag is a hash of the bytes, so re-rendering unchanged content keeps
+  answering 304 to clients that already have it.
+- Last-Modified is when this process first rendered the page's current
+  bytes, not the newest episode date: episode dates are day precision, so
+  a same-day change would look unmodified to If-Modified-Since clients.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+from xml.sax.saxutils import escape, quoteattr
+
+from config import get_base_url
+from services import content_db
+from services.sitemap import latest
+
+ITUNES_NS = 'http://www.itunes.com/dtds/podcast-1.0.dtd'
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+AUTHOR = 'Ahoy Indie Media'
+DEFAULT_ARTWORK = '/static/img/default-cover.jpg'
+ENCLOSURE_TYPES = {'.mp3': 'audio/mpeg', '.m4a': 'audio/mp4', '.mp4': 'video/mp4',
+                   '.mov': 'video/quicktime', '.wav': 'audio/wav', '.ogg': 'audio/ogg'}
+
+
+def page_size() -> int:
+    try:
+        return max(1, int(os.getenv('PODCAST_FEED_PAGE_SIZE', '100')))
+    except ValueError:
+        return 100
+
+
+class Feed(NamedTuple):
+    body: bytes
+    gzipped: bytes
+    etag: str
+    last_modified: Optional[datetime]
+
+
+def feed_path(slug: str) -> str:
+    return f'/feeds/podcasts/{quote(slug)}.xml'
+
+
+def _absolute(base: str, url: Optional[str]) -> str:
+    url = (url or '').strip()
+    return base + url if url.startswith('/') else url
+
+
+def _date(value: Any) -> Optional[datetime]:
+    day = latest([value])
+    return datetime.strptime(day, '%Y-%m-%d').replace(tzinfo=timezone.utc) if day else None
+
+
+def _duration(ep: Dict[str, Any]) -> str:
+    seconds = ep.get('duration_seconds') or 0
+    if seconds:
+        return str(int(seconds))
+    return str(ep.get('duration') or '')
+
+
+def render_item(slug: str, ep: Dict[str, Any], base: str) -> str:
+    """The ``<item>`` element for one episode dict (get_all_podcasts shape)."""
+    guid = f"{slug}/{ep.get('id', '')}"
+    parts = [
+        '<item>',
+        f"<title>{escape(ep.get('title') or ep.get('id') or '')}</title>",
+        f'<guid isPermaLink="false">{escape(guid)}</guid>',
+        f"<link>{escape(base + '/podcasts/' + quote(slug))}</link>",
+    ]
+    if ep.get('description'):
+        parts.append(f"<description>{escape(ep['description'])}</description>")
+    published = _date(ep.get('date'))
+    if published:
+        parts.append(f'<pubDate>{format_datetime(published)}</pubDate>')
+    audio = _absolute(base, ep.get('audio_url'))
+    if audio:
+        kind = ENCLOSURE_TYPES.get(os.path.splitext(audio.split('?', 1)[0])[1].lower(), 'audio/mpeg')
+        parts.append(f'<enclosure url={quoteattr(audio)} length="0" type="{kind}"/>')
+    duration = _duration(ep)
+    if duration:
+        parts.append(f'<itunes:duration>{escape(duration)}</itunes:duration>')
+    if ep.get('artwork'):
+        parts.append(f"<itunes:image href={quoteattr(_absolute(base, ep['artwork']))}/>")
+    parts.append('</item>')
+    return ''.join(parts)
+
+
+def _sorted_episodes(show: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # Newest first; undated episodes keep their catalog order at the end
+    episodes = list(show.get('episodes') or [])
+    return sorted(episodes, key=lambda ep: latest([ep.get('date')]) or '', reverse=True)
+
+
+class FeedCache:
+    """Rendered feed pages and episode items, per process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages: Dict[Tuple[str, int, str], Tuple[int, Feed]] = {}
+        self._items: Dict[Tuple[str, str, str], Tuple[Dict[str, Any], str]] = {}
+
+    def _item(self, slug: str, ep: Dict[str, Any], base: str) -> str:
+        key = (base, slug, str(ep.get('id', '')))
+        cached = self._items.get(key)
+        if cached is not None and cached[0] == ep:
+            return cached[1]
+        xml = render_item(slug, ep, base)
+        self._items[key] = (dict(ep), xml)
+        return xml
+
+    def render(self, show: Dict[str, Any], page: int, base: str) -> Optional[Feed]:
+        slug = show['slug']
+        episodes = _sorted_episodes(show)
+        size = page_size()
+        pages = max(1, -(-len(episodes) // size))
+        if page < 1 or page > pages:
+            return None
+        chunk = episodes[(page - 1) * size:page * size]
+
+        self_url = base + feed_path(slug)
+
+        def page_url(n):
+            return self_url if n == 1 else f'{self_url}?page={n}'
+
+        title = show.get('title') or slug.replace('-', ' ').title()
+        modified = _date(latest([show.get('last_updated')] + [ep.get('date') for ep in episodes]))
+
+        head = [
+            '<?xml version="1.0" encoding="UTF-8"?>\n',
+            f'<rss version="2.0" xmlns:itunes="{ITUNES_NS}" xmlns:atom="{ATOM_NS}">\n<channel>\n',
+            f'<title>{escape(title)}</title>\n',
+            f"<link>{escape(base + '/podcasts/' + quote(slug))}</link>\n",
+            f"<description>{escape(show.get('description') or title)}</description>\n",
+            '<language>en</language>\n',
+            f'<itunes:author>{AUTHOR}</itunes:author>\n',
+            f"<itunes:image href={quoteattr(_absolute(base, show.get('artwork') or DEFAULT_ARTWORK))}/>\n",
+            f'<atom:link rel="self" type="application/rss+xml" href={quoteattr(page_url(page))}/>\n',
+        ]
+        if modified:
+            head.append(f'<lastBuildDate>{format_datetime(modified)}</lastBuildDate>\n')
+        if pages > 1:
+            links = [('first', 1), ('last', pages)]
+            if page > 1:
+                links.append(('previous', page - 1))
+            if page < pages:
+                links.append(('next', page + 1))
+            head += [f'<atom:link rel="{rel}" href={quoteattr(page_url(n))}/>\n' for rel, n in links]
+
+        with self._lock:
+            items = [self._item(slug, ep, base) + '\n' for ep in chunk]
+        body = (''.join(head) + ''.join(items) + '</channel>\n</rss>\n').encode('utf-8')
+        return Feed(body, gzip.compress(body, compresslevel=9, mtime=0),
+                    hashlib.sha256(body).hexdigest()[:32], datetime.now(timezone.utc).replace(microsecond=0))
+
+    def get(self, slug: str, page: int = 1) -> Optional[Feed]:
+        """Page ``page`` of ``slug``'s feed, or None for an unknown show or page."""
+        shows = content_db.get_all_podcasts().get('shows', [])
+        version = content_db.content_version()
+        base = get_base_url()
+        key = (slug, page, base)
+        with self._lock:
+            cached = self._pages.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        show = next((s for s in shows if s.get('slug') == slug), None)
+        if show is None:
+            return None
+        feed = self.render(show, page, base)
+        if feed is not None:
+            if cached is not None and cached[1].etag == feed.etag:
+                feed = cached[1]  # same bytes: keep their Last-Modified
+            with self._lock:
+                self._pages[key] = (version, feed)
+        return feed
+
+
+_cache: Optional[FeedCache] = None
+_cache_pid: Optional[int] = None
+_cache_lock = threading.Lock()
+
+
+def get_feed_cache() -> FeedCache:
+    global _cache, _cache_pid
+    with _cache_lock:
+        if _cache is None or _cache_pid != os.getpid():
+            _cache, _cache_pid = FeedCache(), os.getpid()
+        return _cache
+
+
+def get_feed(slug: str, page: int = 1) -> Optional[Feed]:
+    """Cached RSS page for the podcast show ``slug`` (see FeedCache.get)."""
+    return get_feed_cache().get(slug, page)
@@ -0,0 +1,165 @@
+"""Latest GitHub release metadata for /downloads and /api/downloads/latest.
+
+Page views never wait on GitHub. Each process keeps the last release it saw
+and serves it; once it is older than RELEASE_CACHE_TTL a background thread
+re-fetches it with ``If-None-Match``, so an unchanged release costs a 304
+(which GitHub does not count against the rate limit). When GitHub is slow,
+down or throttling, the stale copy keeps being served and the next attempt
+is pushed back (to X-RateLimit-Reset when rate limited).
+
+Only a process's very first lookup waits, for at most FIRST_FETCH_WAIT
+seconds; if the fetch is slower the page renders without it (local builds)
+and the release shows up once the fetch lands.
+
+scripts/update_downloads_page.py uses ``fetch_latest_release`` directly.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+GITHUB_API = 'https://api.github.com'
+DEFAULT_REPO = 'oooAHOYooo/ahoy-little-platform'
+REQUEST_TIMEOUT = (3, 10)
+FIRST_FETCH_WAIT = 2.0  # seconds
+ERROR_RETRY = 60  # seconds before retrying after a failed fetch
+
+
+class ReleaseFetchError(Exception):
+    """GitHub could not be reached or answered with an error."""
+
+    def __init__(self, message: str, retry_at: Optional[float] = None):
+        super().__init__(message)
+        self.retry_at = retry_at
+
+
+def cache_ttl() -> int:
+    try:
+        return max(0, int(os.getenv('RELEASE_CACHE_TTL', '600')))
+    except ValueError:
+        return 600
+
+
+def fetch_latest_release(repo: str, token: Optional[str] = None, etag: Optional[str] = None,
+                         session=None, api_base: Optional[str] = None,
+                         timeout=REQUEST_TIMEOUT) -> Tuple[Optional[Dict[str, Any]], Optional[str], bool]:
+    """
+    GET /repos/<repo>/releases/latest.
+
+    Returns:
+        (release, etag, modified): ``modified`` is False on a 304 (``release``
+        is None then: keep the copy you have). A repo with no release gives
+        (None, None, True).
+
+    Raises:
+        ReleaseFetchError: network error, rate limit or any other status
+    """
+    url = f"{(api_base or os.getenv('GITHUB_API_URL') or GITHUB_API).rstrip('/')}/repos/{repo}/releases/latest"
+    headers = {
+        'Accept': 'application/vnd.github.v3+json',
+        'User-Agent': 'AhoyIndieMedia-Downloads',
+    }
+    if token:
+        headers['Authorization'] = f'token {token}'
+    if etag:
+        headers['If-None-Match'] = etag
+    try:
+        response = (session or requests).get(url, headers=headers, timeout=timeout)
+    except requests.RequestException as e:
+        raise ReleaseFetchError(f'GitHub request failed: {e}')
+
+    if response.status_code == 304:
+        return None, etag, False
+    if response.status_code == 200:
+        return response.json(), response.headers.get('ETag'), True
+    if response.status_code == 404:
+        return None, None, True
+    retry_at = None
+    if response.status_code in (403, 429) and response.headers.get('X-RateLimit-Remaining') == '0':
+        try:
+            retry_at = float(response.headers.get('X-RateLimit-Reset', ''))
+        except ValueError:
+            pass
+    raise ReleaseFetchError(f'GitHub returned {response.status_code}', retry_at=retry_at)
+
+
+class ReleaseCache:
+    """The latest release of one repo, refreshed in the background."""
+
+    def __init__(self, repo: str = DEFAULT_REPO, ttl: Optional[int] = None, token: Optional[str] = None,
+                 fetch=fetch_latest_release, first_wait: float = FIRST_FETCH_WAIT):
+        self.repo = repo
+        self.ttl = cache_ttl() if ttl is None else ttl
+        self.token = token
+        self.first_wait = first_wait
+        self._fetch = fetch
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._release: Optional[Dict[str, Any]] = None
+        self._etag: Optional[str] = None
+        self._next_refresh = 0.0
+        self._refreshing = False
+        self.last_error: Optional[str] = None
+
+    def refresh(self) -> None:
+        """Fetch now (conditional on the cached ETag); on failure keep the cached release."""
+        try:
+            release, etag, modified = self._fetch(self.repo, token=self.token, etag=self._etag,
+                                                  session=self._session)
+            with self._lock:
+                if modified:
+                    self._release, self._etag = release, etag
+                self._next_refresh = time.time() + self.ttl
+                self.last_error = None
+        except Exception as e:
+            retry_at = getattr(e, 'retry_at', None)
+            logger.warning("GitHub release fetch for %s failed: %s", self.repo, e)
+            with self._lock:
+                self._next_refresh = max(retry_at or 0, time.time() + ERROR_RETRY)
+                self.last_error = str(e)
+        finally:
+            with self._lock:
+                self._refreshing = False
+            self._loaded.set()
+
+    def _start_refresh(self) -> bool:
+        with self._lock:
+            if self._refreshing or time.time() < self._next_refresh:
+                return False
+            self._refreshing = True
+        threading.Thread(target=self.refresh, name='release-refresh', daemon=True).start()
+        return True
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        """The cached release (possibly stale) or None; never waits on GitHub after the first lookup."""
+        self._start_refresh()
+        if not self._loaded.is_set():
+            self._loaded.wait(self.first_wait)
+        return self._release
+
+
+_caches: Dict[str, ReleaseCache] = {}
+_caches_pid: Optional[int] = None
+_caches_lock = threading.Lock()
+
+
+def get_release_cache(repo: str = DEFAULT_REPO) -> ReleaseCache:
+    global _caches, _caches_pid
+    with _caches_lock:
+        if _caches_pid != os.getpid():
+            _caches, _caches_pid = {}, os.getpid()
+        cache = _caches.get(repo)
+        if cache is None:
+            cache = _caches[repo] = ReleaseCache(repo, token=os.getenv('GITHUB_TOKEN'))
+        return cache
+
+
+def latest_release(repo: str = DEFAULT_REPO) -> Optional[Dict[str, Any]]:
+    """Latest release JSON of ``repo`` from this process's cache, or None."""
+    return get_release_cache(repo).get()
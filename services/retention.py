@@ -0,0 +1,273 @@
+"""Retention for the high-volume event tables.
+
+analytics_events, play_history and listening_sessions only keep the last
+``EVENT_RETENTION_MONTHS`` months of raw rows. Older months are first
+summarized into the rollup tables (services/rollups.py), then removed:
+
+- Postgres: the tables are range-partitioned by month (alembic 0028), so a
+  month is dropped by detaching its partition. Upcoming partitions are
+  created ahead of time by the same maintenance run.
+- SQLite (and unpartitioned Postgres): rows are archived to gzipped JSON
+  lines under ``EVENT_ARCHIVE_DIR`` and deleted.
+
+Each pruned table records a watermark in ``retention_watermarks`` that the
+rollup refresh respects, so the summaries of pruned months are never rebuilt
+from an empty table. scripts/event_retention.py runs this daily.
+"""
+import gzip
+import json
+import logging
+import os
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+
+from db import get_session
+from models import AnalyticsEvent, PlayHistory, ListeningSession, RetentionWatermark
+from services.rollups import (
+    DAILY_PATHS_METRIC, pruned_before, refresh_daily_paths, refresh_metric, utcnow,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEEP_MONTHS = int(os.getenv('EVENT_RETENTION_MONTHS', '13'))
+DEFAULT_ARCHIVE_DIR = os.getenv(
+    'EVENT_ARCHIVE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'archive', 'events'),
+)
+# Monthly partitions created ahead of the current month.
+PARTITIONS_AHEAD = 2
+
+# table -> model, partition/time column and the rollups summarizing it.
+RETENTION_SPECS = {
+    'analytics_events': {
+        'model': AnalyticsEvent,
+        'time': AnalyticsEvent.created_at,
+        'rollups': [DAILY_PATHS_METRIC],
+    },
+    'play_history': {
+        'model': PlayHistory,
+        'time': PlayHistory.played_at,
+        'rollups': ['plays'],
+    },
+    'listening_sessions': {
+        'model': ListeningSession,
+        'time': ListeningSession.started_at,
+        'rollups': ['sessions'],
+        'aware': True,
+    },
+}
+
+
+def month_start(dt) -> datetime:
+    """First instant (naive UTC) of the month containing ``dt``."""
+    return datetime(dt.year, dt.month, 1)
+
+
+def add_months(dt: datetime, months: int) -> datetime:
+    index = dt.year * 12 + (dt.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def retention_cutoff(keep_months: int, now: Optional[datetime] = None) -> datetime:
+    """Start of the oldest month kept (the current month counts as one)."""
+    return add_months(month_start(now or utcnow()), -(keep_months - 1))
+
+
+def _time_bound(dt: datetime, aware: bool) -> datetime:
+    """Comparison bound for a naive or timezone-aware time column."""
+    return dt.replace(tzinfo=timezone.utc) if aware else dt
+
+
+def _partition_bound(month: datetime, aware: bool) -> str:
+    return f"{month:%Y-%m-%d %H:%M:%S}+00" if aware else f"{month:%Y-%m-%d %H:%M:%S}"
+
+
+def is_partitioned(session, table: str) -> bool:
+    """True when ``table`` is a Postgres partitioned (parent) table."""
+    if session.get_bind().dialect.name != 'postgresql':
+        return False
+    relkind = session.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {'table': table}
+    ).scalar()
+    return relkind == 'p'
+
+
+def list_partitions(session, table: str) -> List[str]:
+    """Names of the monthly partitions of ``table`` (excluding the default partition)."""
+    rows = session.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(:table)
+    """), {'table': table}).fetchall()
+    prefix = f"{table}_p"
+    return sorted(r[0] for r in rows if r[0].startswith(prefix) and r[0][len(prefix):].isdigit())
+
+
+def ensure_partitions(session, table: str, ahead: int = PARTITIONS_AHEAD) -> List[str]:
+    """Create monthly partitions of ``table`` through ``ahead`` months from now; return the new ones."""
+    spec = RETENTION_SPECS[table]
+    existing = set(list_partitions(session, table))
+    created = []
+    current = month_start(utcnow())
+    for offset in range(ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(table, month)
+        if name in existing:
+            continue
+        session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{_partition_bound(month, spec.get('aware', False))}') "
+            f"TO ('{_partition_bound(add_months(month, 1), spec.get('aware', False))}')"
+        ))
+        created.append(name)
+    return created
+
+
+def summarize(session, table: str, since: Optional[datetime], until: datetime) -> None:
+    """Rebuild the rollups covering ``table`` rows in [since, until) before they are removed."""
+    for metric in RETENTION_SPECS[table]['rollups']:
+        if metric == DAILY_PATHS_METRIC:
+            refresh_daily_paths(session, since=since, until=until)
+        else:
+            refresh_metric(session, metric, since=since, until=until)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return str(value)
+
+
+def archive_path(archive_dir: str, table: str, month: str, until: datetime) -> str:
+    """Archive file for ``table``'s rows from ``month`` (YYYY-MM) pruned by the run with cutoff ``until``."""
+    return os.path.join(archive_dir, table, f"{table}-{month}.before-{until:%Y-%m}.jsonl.gz")
+
+
+def _discard_uncommitted(archive_dir: str, table: str, watermark: Optional[datetime]) -> None:
+    # A run that archived but never committed left files (or temp files)
+    # tagged with a cutoff past the watermark; its rows are still in the
+    # table and will be archived again, so drop them.
+    directory = os.path.join(archive_dir, table)
+    committed = f"{watermark:%Y-%m}" if watermark is not None else ''
+    for name in os.listdir(directory):
+        _, sep, tag = name.partition('.before-')
+        if sep and tag[:7] > committed:
+            os.remove(os.path.join(directory, name))
+
+
+def archive_rows(session, table: str, until: datetime, archive_dir: str,
+                 watermark: Optional[datetime] = None) -> int:
+    """Write ``table`` rows older than ``until`` to monthly .jsonl.gz files; return rows written.
+
+    Files are named by month and cutoff (``archive_path``) and written whole
+    via a temp file, so rerunning after a failed commit replaces them instead
+    of archiving the same rows twice. ``watermark`` is the table's committed
+    ``pruned_before``.
+    """
+    spec = RETENTION_SPECS[table]
+    model = spec['model']
+    time_col = spec['time']
+    bound = _time_bound(until, spec.get('aware', False))
+
+    columns = [c.name for c in model.__table__.columns]
+    os.makedirs(os.path.join(archive_dir, table), exist_ok=True)
+    _discard_uncommitted(archive_dir, table, watermark)
+    handles = {}
+    written = 0
+    try:
+        rows = session.query(model).filter(time_col < bound).order_by(time_col).yield_per(1000)
+        for row in rows:
+            when = getattr(row, time_col.key)
+            key = f"{when:%Y-%m}"
+            if key not in handles:
+                tmp = f"{archive_path(archive_dir, table, key, until)}.tmp.{os.getpid()}"
+                handles[key] = (tmp, gzip.open(tmp, 'wt', encoding='utf-8'))
+            handles[key][1].write(json.dumps({c: getattr(row, c) for c in columns}, default=_json_default))
+            handles[key][1].write('\n')
+            written += 1
+    except BaseException:
+        for tmp, handle in handles.values():
+            handle.close()
+            os.remove(tmp)
+        raise
+    for key, (tmp, handle) in handles.items():
+        handle.close()
+        os.replace(tmp, archive_path(archive_dir, table, key, until))
+    return written
+
+
+def prune_table(session, table: str, cutoff: datetime, archive_dir: Optional[str] = DEFAULT_ARCHIVE_DIR,
+                dry_run: bool = False) -> Dict:
+    """Summarize and remove ``table`` rows older than ``cutoff`` (floored to the month).
+
+    Returns a report dict: {'table', 'cutoff', 'partitions_dropped', 'rows_archived', 'rows_deleted'}.
+    Runs in the caller's transaction so the rollups, the removal and the new
+    watermark commit together.
+    """
+    spec = RETENTION_SPECS[table]
+    time_col = spec['time']
+    cutoff = month_start(cutoff)
+    report = {'table': table, 'cutoff': cutoff, 'partitions_dropped': [], 'rows_archived': 0, 'rows_deleted': 0}
+
+    watermark = pruned_before(session, table)
+    if watermark is not None and watermark >= cutoff:
+        return report
+
+    partitioned = is_partitioned(session, table)
+    doomed = [
+        name for name in (list_partitions(session, table) if partitioned else [])
+        if datetime.strptime(name.rsplit('_p', 1)[1], '%Y%m') < cutoff
+    ]
+    report['partitions_dropped'] = doomed
+    if dry_run:
+        return report
+
+    summarize(session, table, watermark, cutoff)
+
+    for name in doomed:
+        session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        session.execute(text(f"DROP TABLE {name}"))
+
+    if not partitioned and archive_dir:
+        report['rows_archived'] = archive_rows(session, table, cutoff, archive_dir, watermark=watermark)
+
+    # Unpartitioned tables, and on Postgres any stragglers in the default partition.
+    bound = _time_bound(cutoff, spec.get('aware', False))
+    report['rows_deleted'] = session.query(spec['model']).filter(time_col < bound).delete(synchronize_session=False)
+
+    mark = session.get(RetentionWatermark, table)
+    if mark is None:
+        session.add(RetentionWatermark(table_name=table, pruned_before=cutoff, updated_at=utcnow()))
+    else:
+        mark.pruned_before = cutoff
+        mark.updated_at = utcnow()
+    return report
+
+
+def run_retention(keep_months: int = DEFAULT_KEEP_MONTHS, tables: Optional[Iterable[str]] = None,
+                  archive_dir: Optional[str] = DEFAULT_ARCHIVE_DIR, dry_run: bool = False) -> List[Dict]:
+    """Create upcoming partitions and prune every table past ``keep_months``; return per-table reports."""
+    if keep_months < 1:
+        raise ValueError("keep_months must be at least 1")
+    cutoff = retention_cutoff(keep_months)
+    reports = []
+    for table in (tables or RETENTION_SPECS.keys()):
+        with get_session() as session:
+            created = []
+            if not dry_run and is_partitioned(session, table):
+                created = ensure_partitions(session, table)
+            report = prune_table(session, table, cutoff, archive_dir=archive_dir, dry_run=dry_run)
+            report['partitions_created'] = created
+        logger.info("Retention %s: %s", table, report)
+        reports.append(report)
+    return reports
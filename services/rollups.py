@@ -0,0 +1,382 @@
+"""Hourly rollups backing the admin dashboard.
+
+The admin stats/analytics endpoints used to COUNT(*) over play_history,
+listening_sessions, users and purchases on every refresh. Instead they read
+pre-aggregated rows from ``stats_rollups``: one row per (metric, UTC hour,
+dimension).
+
+Buckets are rebuilt wholesale (delete + insert in one transaction), so
+refreshing a window twice is harmless. scripts/refresh_rollups.py runs the
+trailing-window refresh on a schedule and backfills history with --backfill.
+
+The admin heatmap reads ``analytics_daily_paths`` (one row per UTC day, event
+type and path), refreshed the same way under the ``paths`` metric name.
+
+Once services/retention.py has pruned a source table, the rollups are the
+only record of the pruned months: refreshes never touch buckets before the
+table's retention watermark.
+"""
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, func, literal, literal_column, or_, union_all
+
+from db import get_session
+from models import (
+    StatsRollup, AnalyticsDailyPath, AnalyticsEvent, RetentionWatermark,
+    PlayHistory, ListeningSession, User, Purchase,
+)
+
+logger = logging.getLogger(__name__)
+
+# Window rebuilt by the scheduled refresh; comfortably wider than the cron
+# interval so late writes and a skipped run are picked up.
+REFRESH_LOOKBACK = timedelta(hours=3)
+
+# metric -> how it is aggregated from its source table.
+#   time:      column deciding the hour bucket
+#   dimension: column grouped alongside the bucket (omitted -> '')
+#   total:     column summed into StatsRollup.total (omitted -> 0)
+#   touched:   column set when a row changes after creation; buckets holding
+#              rows touched inside the refresh window are rebuilt as well
+#   aware:     time column is timezone-aware (timestamptz on Postgres)
+#   filters:   extra WHERE clauses
+ROLLUP_SPECS = {
+    'plays': {
+        'time': PlayHistory.played_at,
+        'dimension': PlayHistory.media_type,
+    },
+    'sessions': {
+        'time': ListeningSession.started_at,
+        'dimension': ListeningSession.source,
+        'total': ListeningSession.seconds,
+        'touched': ListeningSession.ended_at,
+        'aware': True,
+    },
+    'new_users': {
+        'time': User.created_at,
+    },
+    'orders': {
+        'time': Purchase.created_at,
+        'dimension': Purchase.status,
+        'touched': Purchase.updated_at,
+        'filters': (Purchase.type == 'merch',),
+    },
+}
+
+# Per-day analytics path counts (analytics_daily_paths), refreshed alongside
+# the hourly metrics.
+DAILY_PATHS_METRIC = 'paths'
+ROLLUP_METRICS = list(ROLLUP_SPECS.keys()) + [DAILY_PATHS_METRIC]
+
+
+def utcnow() -> datetime:
+    """Naive UTC now (rollup buckets are stored naive UTC)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def floor_hour(dt: datetime) -> datetime:
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def _day_bucket(column, dialect: str):
+    """SQL expression truncating a naive UTC ``column`` to its date."""
+    if dialect == 'postgresql':
+        return func.date_trunc(literal_column("'day'"), column)
+    return func.date(column)
+
+
+def _hour_bucket(column, dialect: str, aware: bool = False):
+    """SQL expression truncating ``column`` to its UTC hour.
+
+    Arguments are inlined rather than bound so the SELECT and GROUP BY render
+    identical expressions (Postgres rejects them otherwise).
+    """
+    if dialect == 'postgresql':
+        if aware:
+            column = func.timezone(literal_column("'UTC'"), column)
+        return func.date_trunc(literal_column("'hour'"), column)
+    return func.strftime(literal_column("'%Y-%m-%d %H:00:00'"), column)
+
+
+def _as_bucket(value) -> datetime:
+    """Normalize a bucket value (datetime on Postgres, text on SQLite) to naive UTC."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _bound(dt: datetime, aware: bool) -> datetime:
+    """Comparison bound for a naive or timezone-aware time column."""
+    return dt.replace(tzinfo=timezone.utc) if aware else dt
+
+
+def _window_filter(time_col, start: datetime, end: Optional[datetime], aware: bool):
+    clauses = [time_col >= _bound(start, aware)]
+    if end is not None:
+        clauses.append(time_col < _bound(end, aware))
+    return and_(*clauses)
+
+
+def pruned_before(session, table_name: str) -> Optional[datetime]:
+    """Retention watermark for ``table_name`` (None if it was never pruned)."""
+    row = session.query(RetentionWatermark.pruned_before).filter(
+        RetentionWatermark.table_name == table_name
+    ).first()
+    return row[0] if row else None
+
+
+def _clamp_since(session, table_name: str, since: Optional[datetime]) -> Optional[datetime]:
+    """Raise ``since`` to the retention watermark so pruned buckets are kept."""
+    watermark = pruned_before(session, table_name)
+    if watermark is None:
+        return since
+    return watermark if since is None or since < watermark else since
+
+
+def refresh_metric(session, metric: str, since: Optional[datetime] = None,
+                   until: Optional[datetime] = None) -> int:
+    """Rebuild ``metric`` buckets in [since, until) and return rows written.
+
+    ``since=None`` rebuilds the full history that is still in the source table.
+    Both bounds are floored to the hour so only complete buckets are replaced.
+    """
+    spec = ROLLUP_SPECS[metric]
+    aware = spec.get('aware', False)
+    time_col = spec['time']
+    dim_col = spec.get('dimension')
+    total_col = spec.get('total')
+    touched_col = spec.get('touched')
+    dialect = session.get_bind().dialect.name
+
+    since = _clamp_since(session, time_col.table.name, since)
+    since = floor_hour(since) if since is not None else None
+    until = floor_hour(until) if until is not None else None
+
+    bucket = _hour_bucket(time_col, dialect, aware)
+    base_filters = list(spec.get('filters', ()))
+
+    # Rows created before the window but changed inside it (order fulfilled,
+    # session ended) invalidate their original bucket.
+    extra_buckets: List[datetime] = []
+    if since is not None and touched_col is not None:
+        touched = session.query(bucket).filter(
+            *base_filters,
+            touched_col >= _bound(since, aware),
+            time_col < _bound(since, aware),
+        ).distinct().all()
+        extra_buckets = sorted({_as_bucket(row[0]) for row in touched if row[0] is not None})
+
+    windows = [_window_filter(time_col, b, b + timedelta(hours=1), aware) for b in extra_buckets]
+    if since is not None or until is not None:
+        windows.append(_window_filter(time_col, since or datetime.min, until, aware))
+
+    columns = [bucket.label('bucket')]
+    group_by = [bucket]
+    if dim_col is not None:
+        columns.append(func.coalesce(dim_col, '').label('dimension'))
+        group_by.append(dim_col)
+    columns.append(func.count().label('count'))
+    if total_col is not None:
+        columns.append(func.coalesce(func.sum(total_col), 0).label('total'))
+
+    query = session.query(*columns).filter(*base_filters)
+    if windows:
+        query = query.filter(or_(*windows))
+    rows = query.group_by(*group_by).all()
+
+    # Replace the affected buckets.
+    delete_q = session.query(StatsRollup).filter(StatsRollup.metric == metric)
+    bucket_windows = [StatsRollup.bucket_start.in_(extra_buckets)] if extra_buckets else []
+    if since is not None or until is not None:
+        bucket_windows.append(_window_filter(StatsRollup.bucket_start, since or datetime.min, until, False))
+    if bucket_windows:
+        delete_q = delete_q.filter(or_(*bucket_windows))
+    delete_q.delete(synchronize_session=False)
+
+    now = utcnow()
+    merged: Dict[tuple, List[int]] = {}
+    for row in rows:
+        if row.bucket is None:
+            continue
+        key = (_as_bucket(row.bucket), (row.dimension if dim_col is not None else '') or '')
+        acc = merged.setdefault(key, [0, 0])
+        acc[0] += int(row.count or 0)
+        acc[1] += int(row.total or 0) if total_col is not None else 0
+
+    session.add_all([
+        StatsRollup(
+            metric=metric,
+            bucket_start=bucket_start,
+            dimension=dimension[:50],
+            count=count,
+            total=total,
+            updated_at=now,
+        )
+        for (bucket_start, dimension), (count, total) in merged.items()
+    ])
+    return len(merged)
+
+
+def refresh_daily_paths(session, since: Optional[datetime] = None,
+                        until: Optional[datetime] = None) -> int:
+    """Rebuild analytics_daily_paths for the days in [since, until) and return rows written.
+
+    Bounds are floored to the day, so a refresh shortly after midnight still
+    completes the previous day. ``since=None`` rebuilds the full history that
+    is still in analytics_events.
+    """
+    dialect = session.get_bind().dialect.name
+    since = _clamp_since(session, AnalyticsEvent.__tablename__, since)
+    start = since.replace(hour=0, minute=0, second=0, microsecond=0) if since is not None else None
+    end = until.replace(hour=0, minute=0, second=0, microsecond=0) if until is not None else None
+
+    day = _day_bucket(AnalyticsEvent.created_at, dialect)
+    path = func.coalesce(AnalyticsEvent.path, '')
+    query = session.query(
+        day.label('day'), AnalyticsEvent.event_type, path.label('path'), func.count().label('count'),
+    )
+    if start is not None or end is not None:
+        query = query.filter(_window_filter(AnalyticsEvent.created_at, start or datetime.min, end, False))
+    rows = query.group_by(day, AnalyticsEvent.event_type, path).all()
+
+    delete_q = session.query(AnalyticsDailyPath)
+    if start is not None:
+        delete_q = delete_q.filter(AnalyticsDailyPath.day >= start.date())
+    if end is not None:
+        delete_q = delete_q.filter(AnalyticsDailyPath.day < end.date())
+    delete_q.delete(synchronize_session=False)
+
+    merged: Dict[tuple, int] = {}
+    for row in rows:
+        if row.day is None:
+            continue
+        key = (_as_bucket(row.day).date(), row.event_type, (row.path or '')[:255])
+        merged[key] = merged.get(key, 0) + int(row.count or 0)
+
+    session.add_all([
+        AnalyticsDailyPath(day=d, event_type=event_type, path=p, count=count)
+        for (d, event_type, p), count in merged.items()
+    ])
+    return len(merged)
+
+
+def refresh_rollups(since: Optional[datetime] = None, full: bool = False,
+                    metrics: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """Refresh rollups for ``metrics`` (default: all) and return rows written per metric.
+
+    Without arguments rebuilds the trailing REFRESH_LOOKBACK window (cron mode);
+    ``full=True`` rebuilds everything.
+    """
+    if not full and since is None:
+        since = utcnow() - REFRESH_LOOKBACK
+    written = {}
+    for metric in (metrics or ROLLUP_METRICS):
+        with get_session() as session:
+            if metric == DAILY_PATHS_METRIC:
+                written[metric] = refresh_daily_paths(session, since=None if full else since)
+            else:
+                written[metric] = refresh_metric(session, metric, since=None if full else since)
+        logger.info("Refreshed %s rollups (%d rows)", metric, written[metric])
+    return written
+
+
+# ---------------------------------------------------------------------------
+# Readers used by the admin endpoints
+# ---------------------------------------------------------------------------
+
+def rollup_summary(session, windows: Optional[Dict[str, datetime]] = None) -> Dict[str, Dict[str, Dict[str, int]]]:
+    """Summarize every metric in one pass over stats_rollups.
+
+    Returns {metric: {dimension: {'count': n, 'total': n, <window>: n}}} where
+    each named window in ``windows`` (e.g. {'7d': week_ago}) adds the count of
+    buckets starting at or after that time, via COUNT ... FILTER (WHERE ...).
+    """
+    windows = windows or {}
+    columns = [
+        StatsRollup.metric,
+        StatsRollup.dimension,
+        func.coalesce(func.sum(StatsRollup.count), 0),
+        func.coalesce(func.sum(StatsRollup.total), 0),
+    ]
+    for since in windows.values():
+        columns.append(func.coalesce(
+            func.sum(StatsRollup.count).filter(StatsRollup.bucket_start >= floor_hour(since)), 0
+        ))
+    rows = session.query(*columns).group_by(StatsRollup.metric, StatsRollup.dimension).all()
+
+    summary: Dict[str, Dict[str, Dict[str, int]]] = {}
+    for metric, dimension, count, total, *windowed in rows:
+        values = {'count': int(count or 0), 'total': int(total or 0)}
+        values.update({name: int(v or 0) for name, v in zip(windows.keys(), windowed)})
+        summary.setdefault(metric, {})[dimension or ''] = values
+    return summary
+
+
+def summary_value(summary, metric: str, key: str = 'count', dimension: Optional[str] = None) -> int:
+    """Pick one number out of rollup_summary(); sums dimensions unless one is given."""
+    by_dimension = summary.get(metric, {})
+    if dimension is not None:
+        return by_dimension.get(dimension, {}).get(key, 0)
+    return sum(v.get(key, 0) for v in by_dimension.values())
+
+
+def rollup_daily_counts(session, metric: str, since: datetime) -> Dict[str, int]:
+    """Return {'YYYY-MM-DD': count} for ``metric`` from ``since`` onwards (one GROUP BY day)."""
+    if session.get_bind().dialect.name == 'postgresql':
+        day = func.date_trunc(literal_column("'day'"), StatsRollup.bucket_start)
+    else:
+        day = func.date(StatsRollup.bucket_start)
+    rows = session.query(day, func.sum(StatsRollup.count)).filter(
+        StatsRollup.metric == metric,
+        StatsRollup.bucket_start >= since,
+    ).group_by(day).all()
+    return {_as_bucket(d).date().isoformat(): int(count or 0) for d, count in rows if d is not None}
+
+
+def top_paths(session, event_type: str, start: date, end: date, limit: int = 50) -> List[Dict]:
+    """Top paths by event count for the UTC days ``start``..``end`` (inclusive).
+
+    Completed days come from analytics_daily_paths; today's partial day is
+    counted live from analytics_events, a range scan on the
+    (event_type, created_at, path) index. Both halves are merged in one
+    statement.
+    """
+    today = utcnow().date()
+    parts = []
+    last_materialized = min(end, today - timedelta(days=1))
+    if start <= last_materialized:
+        parts.append(
+            session.query(
+                AnalyticsDailyPath.path.label('path'),
+                AnalyticsDailyPath.count.label('count'),
+            ).filter(
+                AnalyticsDailyPath.event_type == event_type,
+                AnalyticsDailyPath.day >= start,
+                AnalyticsDailyPath.day <= last_materialized,
+            )
+        )
+    if end >= today:
+        live_start = datetime.combine(max(start, today), datetime.min.time())
+        parts.append(
+            session.query(
+                func.coalesce(AnalyticsEvent.path, '').label('path'),
+                literal(1).label('count'),
+            ).filter(
+                AnalyticsEvent.event_type == event_type,
+                AnalyticsEvent.created_at >= live_start,
+                AnalyticsEvent.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()),
+            )
+        )
+    if not parts:
+        return []
+
+    combined = union_all(*[p.statement for p in parts]).subquery()
+    total = func.sum(combined.c.count).label('count')
+    rows = session.query(combined.c.path, total).group_by(combined.c.path).order_by(
+        total.desc(), combined.c.path
+    ).limit(limit).all()
+    return [{'path': p or None, 'count': int(c or 0)} for p, c in rows]
@@ -0,0 +1,222 @@
+"""XML sitemap generated from the content catalog (services/content_db).
+
+Lists the top-level pages plus one URL per artist, podcast show, event and
+What's New month. ``lastmod`` comes from content timestamps (track and
+album dates roll up into their artist page and /music). Past MAX_URLS the
+URLs are sharded into /sitemap-<n>.xml files and /sitemap.xml becomes a
+sitemap index.
+
+The encoded documents (plain and gzipped) are built once per
+``content_db.content_version()`` and public origin, so crawler requests
+only copy cached bytes.
+"""
+import gzip
+import hashlib
+import re
+import threading
+from datetime import date
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from config import get_base_url
+from services import content_db
+
+MAX_URLS = 50000  # per file, the sitemaps.org limit
+STREAM_CHUNK = 64 * 1024
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+# (path, changefreq, priority); lastmod for the hubs comes from their content
+STATIC_PAGES = [
+    ('/', 'daily', '1.0'),
+    ('/music', 'daily', '0.9'),
+    ('/shows', 'daily', '0.9'),
+    ('/artists', 'daily', '0.9'),
+    ('/podcasts', 'daily', '0.8'),
+    ('/events', 'weekly', '0.8'),
+    ('/whats-new', 'weekly', '0.7'),
+    ('/cast', 'weekly', '0.8'),
+    ('/downloads', 'weekly', '0.7'),
+    ('/privacy', 'monthly', '0.3'),
+    ('/terms', 'monthly', '0.3'),
+    ('/security', 'monthly', '0.3'),
+]
+
+_DATE = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+
+
+class Url(NamedTuple):
+    path: str
+    lastmod: Optional[str] = None
+    changefreq: Optional[str] = None
+    priority: Optional[str] = None
+
+
+class Document(NamedTuple):
+    body: bytes
+    gzipped: bytes
+    etag: str
+
+
+def _date(value: Any) -> Optional[str]:
+    """YYYY-MM-DD from a content date string (ISO or date-prefixed), or None."""
+    m = _DATE.match(str(value or '').strip())
+    if not m:
+        return None
+    try:
+        return date(int(m.group(1)), int(m.group(2)), int(m.group(3))).isoformat()
+    except ValueError:
+        return None
+
+
+def latest(values: Iterable[Any]) -> Optional[str]:
+    """Most recent parseable date among ``values``, ignoring future dates (upcoming events)."""
+    today = date.today().isoformat()
+    dates = [d for d in (_date(v) for v in values) if d and d <= today]
+    return max(dates) if dates else None
+
+
+def _artist_slug(artist: Dict[str, Any]) -> str:
+    # Same slug artist_profile matches on
+    return artist.get('slug') or artist.get('name', '').lower().replace(' ', '-')
+
+
+def catalog() -> Dict[str, Any]:
+    """The content the sitemap is built from (content_db's cached queries)."""
+    return {
+        'tracks': content_db.get_tracks_list(),
+        'shows': content_db.get_shows_list(),
+        'artists': content_db.get_artists_list(),
+        'podcasts': content_db.get_all_podcasts().get('shows', []),
+        'events': content_db.get_all_events().get('events', []),
+        'whats_new': content_db.get_all_whats_new().get('updates', {}),
+    }
+
+
+def build_urls(content: Dict[str, Any]) -> List[Url]:
+    """Every sitemap URL (paths, not yet absolute) for ``content``."""
+    track_dates: Dict[str, List[Any]] = {}
+    for t in content['tracks']:
+        track_dates.setdefault(t.get('artist_slug') or '', []).extend(
+            (t.get('added_date'), t.get('date_added')))
+
+    artists = []
+    for a in content['artists']:
+        slug = _artist_slug(a)
+        if not slug:
+            continue
+        dates = [a.get('updated_at'), a.get('created_at')]
+        dates += [alb.get('release_date') for alb in a.get('albums', [])]
+        dates += [t.get('added_date') for t in a.get('tracks', [])]
+        dates += track_dates.get(slug, [])
+        artists.append(Url(f'/artist/{quote(slug)}', latest(dates), 'weekly', '0.7'))
+
+    podcasts = []
+    for p in content['podcasts']:
+        if not p.get('slug'):
+            continue
+        dates = [p.get('last_updated')] + [ep.get('date') for ep in p.get('episodes', [])]
+        podcasts.append(Url(f"/podcasts/{quote(p['slug'])}", latest(dates), 'weekly', '0.6'))
+
+    events = [
+        Url(f"/events/{quote(str(e['id']), safe='')}", latest([e.get('updated_at'), e.get('date')]), 'weekly', '0.5')
+        for e in content['events'] if e.get('id')
+    ]
+
+    months = []
+    for year, year_data in (content['whats_new'] or {}).items():
+        if not isinstance(year_data, dict):
+            continue
+        for month, sections in year_data.items():
+            if not isinstance(sections, dict):
+                continue
+            dates = [item.get('date') for section in sections.values() if isinstance(section, dict)
+                     for item in section.get('items', [])]
+            months.append(Url(f'/whats-new/{quote(str(year))}/{quote(str(month).lower())}',
+                              latest(dates), 'monthly', '0.5'))
+
+    hub_lastmod = {
+        '/music': latest(d for t in content['tracks'] for d in (t.get('added_date'), t.get('date_added'))),
+        '/shows': latest(s.get('published_date') for s in content['shows']),
+        '/artists': latest(u.lastmod for u in artists),
+        '/podcasts': latest(u.lastmod for u in podcasts),
+        '/whats-new': latest(u.lastmod for u in months),
+    }
+    hub_lastmod['/'] = latest(hub_lastmod.values())
+    pages = [Url(path, hub_lastmod.get(path), freq, priority) for path, freq, priority in STATIC_PAGES]
+    return pages + artists + podcasts + events + months
+
+
+def _url_xml(base: str, url: Url) -> str:
+    parts = [f'<url><loc>{escape(base + url.path)}</loc>']
+    if url.lastmod:
+        parts.append(f'<lastmod>{url.lastmod}</lastmod>')
+    if url.changefreq:
+        parts.append(f'<changefreq>{url.changefreq}</changefreq>')
+    if url.priority:
+        parts.append(f'<priority>{url.priority}</priority>')
+    parts.append('</url>')
+    return ''.join(parts)
+
+
+def _document(xml: str) -> Document:
+    body = xml.encode('utf-8')
+    return Document(body, gzip.compress(body, compresslevel=9, mtime=0),
+                    hashlib.sha256(body).hexdigest()[:32])
+
+
+def render(urls: List[Url], base: str, max_urls: int = MAX_URLS) -> Dict[str, Document]:
+    """
+    Encode ``urls`` as sitemap documents keyed by file name.
+
+    One file gives {'sitemap.xml': urlset}; more gives a sitemap index under
+    'sitemap.xml' plus 'sitemap-1.xml', 'sitemap-2.xml', ...
+    """
+    head = '<?xml version="1.0" encoding="UTF-8"?>\n'
+    shards = [urls[i:i + max_urls] for i in range(0, len(urls), max_urls)] or [[]]
+
+    def urlset(shard):
+        return (f'{head}<urlset xmlns="{XMLNS}">\n'
+                + ''.join(_url_xml(base, u) + '\n' for u in shard) + '</urlset>\n')
+
+    if len(shards) == 1:
+        return {'sitemap.xml': _document(urlset(shards[0]))}
+
+    documents = {}
+    index = [f'{head}<sitemapindex xmlns="{XMLNS}">\n']
+    for n, shard in enumerate(shards, start=1):
+        name = f'sitemap-{n}.xml'
+        documents[name] = _document(urlset(shard))
+        index.append(f'<sitemap><loc>{escape(f"{base}/{name}")}</loc>')
+        lastmod = latest(u.lastmod for u in shard)
+        if lastmod:
+            index.append(f'<lastmod>{lastmod}</lastmod>')
+        index.append('</sitemap>\n')
+    index.append('</sitemapindex>\n')
+    documents['sitemap.xml'] = _document(''.join(index))
+    return documents
+
+
+_cached: Optional[Tuple[Tuple[int, str], Dict[str, Document]]] = None
+_cached_lock = threading.Lock()
+
+
+def get_documents() -> Dict[str, Document]:
+    """This process's sitemap documents, rebuilt when the content version or origin changes."""
+    global _cached
+    content = catalog()  # refreshes expired content_db entries before the version is read
+    key = (content_db.content_version(), get_base_url())
+    with _cached_lock:
+        if _cached is None or _cached[0] != key:
+            _cached = (key, render(build_urls(content), key[1]))
+        return _cached[1]
+
+
+def get_document(name: str) -> Optional[Document]:
+    """The document served as /<name>, or None."""
+    return get_documents().get(name)
+
+
+def stream(data: bytes, chunk_size: int = STREAM_CHUNK):
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
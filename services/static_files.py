@@ -0,0 +1,174 @@
+"""Static file serving from an in-memory metadata index.
+
+Used for /static, the spa-dist assets and index.html, and the desktop
+downloads instead of ``send_from_directory``. Each ``StaticIndex`` keeps
+size, mtime and ETag per file (plus which precompressed siblings exist) and
+re-stats a file only after STATIC_INDEX_TTL seconds, so a request normally
+costs one dict lookup and an ``open``.
+
+- Precompressed: for indexes created with ``precompressed=True`` a client
+  that accepts it gets ``<file>.br`` or ``<file>.gz`` (written at build time
+  by scripts/precompress_static.py) with Content-Encoding set, so
+  Flask-Compress leaves it alone. A sibling older than its source is ignored.
+- Caching: in an index created with ``hashed_names=True`` (the Vite build
+  output, whose filenames carry a content hash) hashed names get
+  ``immutable``. Other trees such as /static hold hand-named files that are
+  replaced in place, so the caller passes ``max_age``. Everything gets an
+  ETag and Last-Modified, and conditional requests answer 304.
+- Range: identity responses honour single ``Range`` / ``If-Range`` requests
+  (resumable installer downloads); the body is streamed through
+  ``wsgi.file_wrapper``.
+"""
+import mimetypes
+import os
+import re
+from time import time as _now
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from werkzeug.security import safe_join
+from werkzeug.utils import get_content_type
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
+
+# (Content-Encoding, file suffix), in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Vite/Rollup output: AboutView-C8Pko-gq.js, index-BxY3k9aZ.css
+_HASHED = re.compile(r'-([A-Za-z0-9_-]{8,})\.[A-Za-z0-9]+$')
+
+
+def index_ttl() -> float:
+    try:
+        return max(0.0, float(os.getenv('STATIC_INDEX_TTL', '60')))
+    except ValueError:
+        return 60.0
+
+
+def is_hashed(filename: str) -> bool:
+    """True for content-hashed build output, which can be cached forever."""
+    m = _HASHED.search(filename)
+    return bool(m) and any(c.isdigit() or c.isupper() for c in m.group(1))
+
+
+def guess_mimetype(filename: str) -> str:
+    mimetype, encoding = mimetypes.guess_type(filename)
+    if encoding:
+        # foo.tar.gz is a gzip file to download, not a tar sent with Content-Encoding
+        return {'gzip': 'application/gzip', 'bzip2': 'application/x-bzip2',
+                'xz': 'application/x-xz'}.get(encoding, 'application/octet-stream')
+    return mimetype or 'application/octet-stream'
+
+
+class FileMeta(NamedTuple):
+    path: str
+    size: int
+    mtime: float
+    etag: str
+    mimetype: str
+    encodings: Tuple[Tuple[str, str, int], ...]  # (coding, path, size)
+
+
+def _etag(st: os.stat_result) -> str:
+    return f'{st.st_mtime_ns:x}-{st.st_size:x}'
+
+
+class StaticIndex:
+    """Metadata for the files under one directory, filled on first request."""
+
+    def __init__(self, root, precompressed: bool = False, ttl: Optional[float] = None,
+                 hashed_names: bool = False):
+        self.root = str(root)
+        self.precompressed = precompressed
+        self.hashed_names = hashed_names
+        self.ttl = index_ttl() if ttl is None else ttl
+        self._entries: Dict[str, Tuple[FileMeta, float]] = {}
+
+    def _stat(self, path: str) -> Optional[FileMeta]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if not os.path.isfile(path):
+            return None
+        encodings = []
+        if self.precompressed:
+            for coding, suffix in ENCODINGS:
+                try:
+                    sibling = os.stat(path + suffix)
+                except OSError:
+                    continue
+                if sibling.st_mtime >= st.st_mtime:
+                    encodings.append((coding, path + suffix, sibling.st_size))
+        return FileMeta(path, st.st_size, st.st_mtime, _etag(st), guess_mimetype(path), tuple(encodings))
+
+    def lookup(self, filename: str) -> Optional[FileMeta]:
+        """Metadata for ``filename`` (relative to root), or None if missing or outside the root."""
+        path = safe_join(self.root, filename)
+        if path is None:
+            return None
+        now = _now()
+        entry = self._entries.get(path)
+        if entry is not None and now - entry[1] < self.ttl:
+            return entry[0]
+        meta = self._stat(path)
+        if meta is None:
+            self._entries.pop(path, None)
+        else:
+            self._entries[path] = (meta, now)
+        return meta
+
+    def forget(self, filename: str) -> None:
+        path = safe_join(self.root, filename)
+        if path is not None:
+            self._entries.pop(path, None)
+
+    def serve(self, filename: str, request, as_attachment: bool = False, mimetype: Optional[str] = None,
+              cache_control: Optional[str] = None, max_age: Optional[int] = None) -> Optional[Response]:
+        """
+        Response for ``filename``, or None if it doesn't exist. An
+        unsatisfiable Range raises RequestedRangeNotSatisfiable (416).
+
+        ``cache_control`` is used verbatim; otherwise hashed names in a
+        ``hashed_names`` index are immutable and the rest get ``max_age``
+        (or no-cache when None).
+        """
+        meta = self.lookup(filename)
+        if meta is None:
+            return None
+
+        coding, path, size = None, meta.path, meta.size
+        if meta.encodings and not request.range:
+            for candidate, candidate_path, candidate_size in meta.encodings:
+                if request.accept_encodings[candidate]:
+                    coding, path, size = candidate, candidate_path, candidate_size
+                    break
+
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.forget(filename)
+            return None
+        response = Response(wrap_file(request.environ, f), direct_passthrough=True,
+                            content_type=get_content_type(mimetype or meta.mimetype, 'utf-8'))
+        response.content_length = size
+        response.last_modified = meta.mtime
+        response.set_etag(meta.etag if coding is None else f'{meta.etag}-{coding}')
+        if coding is not None:
+            response.headers['Content-Encoding'] = coding
+        else:
+            response.accept_ranges = 'bytes'
+        if meta.encodings:
+            response.vary.add('Accept-Encoding')
+        if as_attachment:
+            response.headers.set('Content-Disposition', 'attachment', filename=os.path.basename(meta.path))
+
+        if cache_control:
+            response.headers['Cache-Control'] = cache_control
+        elif self.hashed_names and is_hashed(filename):
+            response.headers['Cache-Control'] = IMMUTABLE
+        elif max_age:
+            response.headers['Cache-Control'] = f'public, max-age={max_age}'
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+
+        return response.make_conditional(request.environ, accept_ranges=coding is None, complete_length=size)
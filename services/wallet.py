@@ -0,0 +1,91 @@
+"""Wallet debits and credits as single atomic UPDATEs.
+
+A spend is one conditional statement:
+
+    UPDATE users SET wallet_balance = wallet_balance - :amount
+    WHERE id = :user_id AND wallet_balance >= :amount
+    RETURNING wallet_balance
+
+so the balance check and the write happen under the row lock the UPDATE
+takes; two concurrent spends can no longer both pass a check made in Python.
+The WalletTransaction row is added to the same session, so it commits (or
+rolls back) together with the balance change. Callers own the transaction.
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import select, update
+
+from models import User, WalletTransaction
+
+CENTS = Decimal('0.01')
+
+users = User.__table__
+
+
+def _apply(session, user_id: int, delta: Decimal, guard=None) -> Optional[Decimal]:
+    """Add ``delta`` to the balance (subject to ``guard``); new balance, or None if no row matched."""
+    stmt = update(users).where(users.c.id == user_id)
+    if guard is not None:
+        stmt = stmt.where(guard)
+    stmt = stmt.values(wallet_balance=users.c.wallet_balance + delta).returning(users.c.wallet_balance)
+    balance = session.execute(stmt).scalar_one_or_none()
+    return Decimal(str(balance)).quantize(CENTS) if balance is not None else None
+
+
+def _record(session, user_id, type_, amount, balance_after, balance_before, description, reference_id, reference_type):
+    session.add(WalletTransaction(
+        user_id=user_id,
+        type=type_,
+        amount=amount,
+        balance_before=balance_before,
+        balance_after=balance_after,
+        description=description,
+        reference_id=reference_id,
+        reference_type=reference_type,
+        created_at=datetime.utcnow(),
+    ))
+
+
+def debit(session, user_id: int, amount: Decimal, description: str = "Payment",
+          reference_id: Optional[str] = None, reference_type: Optional[str] = "payment",
+          type_: str = "spend") -> Optional[Decimal]:
+    """
+    Take ``amount`` from the wallet if the balance covers it.
+
+    Returns:
+        Decimal: balance after the debit, or None if the balance is
+        insufficient or the user does not exist (see ``balance``).
+    """
+    amount = Decimal(str(amount)).quantize(CENTS)
+    balance_after = _apply(session, user_id, -amount, guard=users.c.wallet_balance >= amount)
+    if balance_after is None:
+        return None
+    _record(session, user_id, type_, amount, balance_after, balance_after + amount,
+            description, reference_id, reference_type)
+    return balance_after
+
+
+def credit(session, user_id: int, amount: Decimal, description: str = "Wallet funding",
+           reference_id: Optional[str] = None, reference_type: Optional[str] = None,
+           type_: str = "fund") -> Optional[Decimal]:
+    """
+    Add ``amount`` to the wallet.
+
+    Returns:
+        Decimal: balance after the credit, or None if the user does not exist.
+    """
+    amount = Decimal(str(amount)).quantize(CENTS)
+    balance_after = _apply(session, user_id, amount)
+    if balance_after is None:
+        return None
+    _record(session, user_id, type_, amount, balance_after, balance_after - amount,
+            description, reference_id, reference_type)
+    return balance_after
+
+
+def balance(session, user_id: int) -> Optional[Decimal]:
+    """Current balance, or None if the user does not exist."""
+    value = session.execute(select(users.c.wallet_balance).where(users.c.id == user_id)).scalar_one_or_none()
+    return Decimal(str(value)).quantize(CENTS) if value is not None else None
@@ -0,0 +1,230 @@
+"""Durable inbox for Stripe webhook events.
+
+The webhook endpoints only verify the signature, insert the raw event into
+``webhook_inbox`` (keyed by source and Stripe event id, so redeliveries are
+dropped while an event sent to both endpoints is processed by each) and
+return 200. Fulfilment -- tips, positions, wallet credits,
+notification emails -- runs afterwards:
+
+- ``dispatch`` hands the event to a small per-process thread pool
+  (WEBHOOK_WORKERS threads, default 2; 0 disables it), so bursts of
+  webhooks are acknowledged at insert speed;
+- ``drain`` processes everything due, and scripts/drain_webhook_inbox.py
+  runs it on a schedule to pick up retries and anything a restarted worker
+  dropped.
+
+A worker claims an event with a conditional UPDATE (pending -> processing),
+so each event is processed by one worker at a time. Failures go back to
+pending with exponential backoff; after MAX_ATTEMPTS the event is marked
+failed for manual review. Handlers must be idempotent: an event can run
+again if a worker dies after fulfilment but before marking it done.
+
+Handlers are registered per source by the modules that own the endpoints
+(routes/stripe_webhooks.py -> 'webhooks', blueprints/payments.py ->
+'payments') and receive the event as a plain dict.
+"""
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from db import get_session
+from models import WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 8
+BASE_BACKOFF = timedelta(seconds=30)  # doubled per attempt
+MAX_BACKOFF = timedelta(hours=1)
+# A 'processing' row older than this belongs to a worker that died.
+STALE_LOCK = timedelta(minutes=10)
+
+inbox = WebhookEvent.__table__
+
+_handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = Lock()
+
+
+def register_handler(source: str, handler: Callable[[Dict[str, Any]], None]) -> None:
+    """Process events enqueued under ``source`` with ``handler(event_dict)``."""
+    _handlers[source] = handler
+
+
+def event_id_for(event: Dict[str, Any], payload: bytes) -> str:
+    """The Stripe event id; unsigned local test payloads without one get a content hash."""
+    return event.get('id') or 'evt_local_' + hashlib.sha256(payload).hexdigest()[:32]
+
+
+def enqueue(session, event_id: str, source: str, event_type: str, payload: str) -> bool:
+    """Insert the event unless ``source`` already has it. Returns True if it is new."""
+    insert = pg_insert if session.get_bind().dialect.name == 'postgresql' else sqlite_insert
+    now = datetime.utcnow()
+    stmt = insert(inbox).values(
+        id=event_id, source=source, event_type=event_type or '', payload=payload,
+        status='pending', attempts=0, received_at=now, next_attempt_at=now,
+    ).on_conflict_do_nothing(index_elements=['source', 'id'])
+    return session.execute(stmt).rowcount == 1
+
+
+def _backoff(attempts: int) -> timedelta:
+    return min(MAX_BACKOFF, BASE_BACKOFF * (2 ** max(0, attempts - 1)))
+
+
+def _row(source: str, event_id: str):
+    return (inbox.c.source == source) & (inbox.c.id == event_id)
+
+
+def _claim(session, source: str, event_id: str, now: datetime) -> bool:
+    """pending (and due) or stale processing -> processing, atomically."""
+    stmt = update(inbox).where(
+        _row(source, event_id),
+        or_(
+            (inbox.c.status == 'pending') & (inbox.c.next_attempt_at <= now),
+            (inbox.c.status == 'processing') & (inbox.c.locked_at < now - STALE_LOCK),
+        ),
+    ).values(status='processing', locked_at=now, attempts=inbox.c.attempts + 1)
+    return session.execute(stmt).rowcount == 1
+
+
+def process(source: str, event_id: str) -> Optional[str]:
+    """
+    Claim and run ``source``'s copy of one event.
+
+    Returns:
+        str: resulting status ('done', 'pending' for a scheduled retry,
+        'failed'), or None if another worker holds it or it is not due.
+    """
+    now = datetime.utcnow()
+    with get_session() as session:
+        if not _claim(session, source, event_id, now):
+            return None
+        session.commit()
+        row = session.execute(
+            select(inbox.c.payload, inbox.c.attempts).where(_row(source, event_id))
+        ).one()
+
+    handler = _handlers.get(source)
+    try:
+        if handler is None:
+            raise LookupError(f"No webhook handler registered for source {source!r}")
+        handler(json.loads(row.payload))
+    except Exception as e:
+        logger.exception("webhook %s/%s failed (attempt %s)", source, event_id, row.attempts)
+        failed = row.attempts >= MAX_ATTEMPTS
+        status = 'failed' if failed else 'pending'
+        with get_session() as session:
+            session.execute(update(inbox).where(_row(source, event_id)).values(
+                status=status,
+                locked_at=None,
+                last_error=f"{type(e).__name__}: {e}"[:4000],
+                next_attempt_at=datetime.utcnow() + _backoff(row.attempts),
+            ))
+        return status
+
+    with get_session() as session:
+        session.execute(update(inbox).where(_row(source, event_id)).values(
+            status='done', locked_at=None, last_error=None, processed_at=datetime.utcnow(),
+        ))
+    return 'done'
+
+
+def due_events(session, limit: int = 500) -> List[Tuple[str, str]]:
+    """(source, event id) of events ready to run (pending and due, or abandoned mid-processing), oldest first."""
+    now = datetime.utcnow()
+    return [tuple(row) for row in session.execute(
+        select(inbox.c.source, inbox.c.id).where(or_(
+            (inbox.c.status == 'pending') & (inbox.c.next_attempt_at <= now),
+            (inbox.c.status == 'processing') & (inbox.c.locked_at < now - STALE_LOCK),
+        )).order_by(inbox.c.received_at).limit(limit)
+    )]
+
+
+def drain(limit: int = 500, max_workers: int = 1) -> Dict[str, int]:
+    """Process every due event (up to ``limit``). Returns counts per resulting status."""
+    with get_session() as session:
+        events = due_events(session, limit)
+    counts: Dict[str, int] = {}
+    if max_workers > 1:
+        app = current_app._get_current_object() if has_app_context() else None
+
+        def run(key):
+            if app is None:
+                return process(*key)
+            with app.app_context():
+                return process(*key)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(run, events))
+    else:
+        results = [process(source, event_id) for source, event_id in events]
+    for status in results:
+        key = status or 'skipped'
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def requeue_failed(session) -> int:
+    """Give events that exhausted their retries another round. Returns how many."""
+    return session.execute(update(inbox).where(inbox.c.status == 'failed').values(
+        status='pending', attempts=0, next_attempt_at=datetime.utcnow(),
+    )).rowcount
+
+
+def _worker_count() -> int:
+    try:
+        return max(0, int(os.getenv('WEBHOOK_WORKERS', '2')))
+    except ValueError:
+        return 2
+
+
+def _get_pool() -> Optional[ThreadPoolExecutor]:
+    """Per-process pool, created lazily (gunicorn preloads the app, then forks)."""
+    global _pool, _pool_pid
+    workers = _worker_count()
+    if not workers:
+        return None
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='webhook-inbox')
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def dispatch(app, source: str, event_id: str) -> bool:
+    """Process ``source``'s ``event_id`` in the background; False if in-process workers are disabled."""
+    pool = _get_pool()
+    if pool is None:
+        return False
+
+    def run():
+        with app.app_context():
+            try:
+                process(source, event_id)
+            except Exception:
+                logger.exception("webhook %s/%s: worker error", source, event_id)
+
+    pool.submit(run)
+    return True
+
+
+def receive(app, source: str, payload: bytes) -> str:
+    """Endpoint side: store a signature-verified payload and hand it to a worker. Returns the event id."""
+    event = json.loads(payload)
+    event_id = event_id_for(event, payload)
+    with get_session() as session:
+        is_new = enqueue(session, event_id, source, event.get('type'), payload.decode('utf-8'))
+        session.commit()
+    if is_new:
+        dispatch(app, source, event_id)
+    return event_id
@@ -2,14 +2,12 @@ import json, os, threading
 _lock = threading.RLock()
 
 def read_json(path, default):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    if not os.path.exists(path):
-        return default
-    with _lock, open(path, "r", encoding="utf-8") as f:
-        try:
+    # No lock needed: write_json swaps files in atomically with os.replace.
+    try:
+        with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
-        except Exception:
-            return default
+    except Exception:
+        return default
 
 def write_json(path, obj):
     os.makedirs(os.path.dirname(path), exist_ok=True)
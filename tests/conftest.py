@@ -5,6 +5,12 @@ Pytest configuration and fixtures for Ahoy Indie Media tests
 
 import pytest
 import os
+import re
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from contextlib import contextmanager
+from email import message_from_bytes
 from decimal import Decimal
 from datetime import datetime
 
@@ -13,6 +19,7 @@ os.environ['AHOY_ENV'] = 'test'
 os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
 os.environ['SECRET_KEY'] = 'test-secret-key-for-testing-only'
 os.environ['WTF_CSRF_ENABLED'] = 'false'
+os.environ['WEBHOOK_WORKERS'] = '0'  # tests drain the webhook inbox synchronously
 
 from app import create_app
 from db import engine, SessionFactory, get_session
@@ -40,6 +47,27 @@ def app():
         Base.metadata.drop_all(engine)
 
 
+@pytest.fixture
+def count_queries():
+    """Context manager factory counting SQL statements executed on the shared engine."""
+    from sqlalchemy import event
+
+    @contextmanager
+    def _count():
+        statements = []
+
+        def _before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', _before_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', _before_execute)
+
+    return _count
+
+
 @pytest.fixture
 def client(app):
     """Create test client."""
@@ -105,7 +133,9 @@ def authenticated_client(app, client, test_user):
 
 @pytest.fixture
 def sample_tip(db_session, test_user):
-    """Create a sample tip record."""
+    """Create a sample tip record (and its ledger entry, as the payment handlers do)."""
+    from services.ledger import record_tip
+
     tip = Tip(
         user_id=test_user.id,
         artist_id='test-artist',
@@ -120,6 +150,256 @@ def sample_tip(db_session, test_user):
         created_at=datetime.utcnow(),
     )
     db_session.add(tip)
+    record_tip(db_session, tip)
     db_session.commit()
     db_session.refresh(tip)
     return tip
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Minimal local SMTP server (EHLO, AUTH, MAIL/RCPT/DATA, RSET, NOOP, QUIT).
+
+    Records every delivered message and the number of connections opened, so
+    tests can check connection reuse. ``fail_next`` holds reply lines sent
+    instead of the 250 after DATA (e.g. "451 try again").
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _FakeSMTPHandler)
+        self.messages = []
+        self.connections = 0
+        self.logins = 0
+        self.fail_next = []
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+class _FakeSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode('ascii'))
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply('220 fake-smtp ready')
+        mail_from, rcpts = None, []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+            verb = line.split(' ', 1)[0].upper()
+            if verb == 'EHLO':
+                self.reply('250-fake-smtp')
+                self.reply('250 AUTH PLAIN LOGIN')
+            elif verb == 'HELO':
+                self.reply('250 fake-smtp')
+            elif verb == 'AUTH':
+                with server.lock:
+                    server.logins += 1
+                self.reply('235 2.7.0 Authentication successful')
+            elif verb == 'MAIL':
+                mail_from, rcpts = line[10:].strip('<> '), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                rcpts.append(line[8:].strip('<> '))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(data[1:] if data.startswith(b'..') else data)
+                with server.lock:
+                    failure = server.fail_next.pop(0) if server.fail_next else None
+                    if failure is None:
+                        server.messages.append({
+                            'from': mail_from,
+                            'to': rcpts,
+                            'message': message_from_bytes(b''.join(lines)),
+                        })
+                self.reply(failure or '250 OK queued')
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    """Run a FakeSMTPServer and point the SMTP settings at it."""
+    server = FakeSMTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.delenv('RESEND_API_KEY', raising=False)
+    monkeypatch.setenv('SMTP_HOST', '127.0.0.1')
+    monkeypatch.setenv('SMTP_PORT', str(server.port))
+    monkeypatch.setenv('SMTP_USER', 'mailer')
+    monkeypatch.setenv('SMTP_PASS', 'secret')
+    monkeypatch.setenv('SMTP_TLS', 'false')
+    monkeypatch.setenv('SUPPORT_EMAIL', 'support@ahoy.test')
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class FakeMediaServer(ThreadingHTTPServer):
+    """
+    Local HTTP origin for media tests: serves ``files`` (path -> bytes) with
+    ETag / If-None-Match, single-range Range and If-Range support, and
+    records each request as (method, path, headers).
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _FakeMediaHandler)
+        self.files = {}
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def url(self, path):
+        return f'http://127.0.0.1:{self.server_address[1]}{path}'
+
+    @staticmethod
+    def etag(data):
+        import hashlib
+        return '"' + hashlib.md5(data).hexdigest() + '"'
+
+
+class _FakeMediaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self._serve(body=False)
+
+    def do_GET(self):
+        self._serve(body=True)
+
+    def _serve(self, body):
+        server = self.server
+        path = self.path.split('?', 1)[0]
+        with server.lock:
+            server.requests.append((self.command, path, dict(self.headers)))
+        data = server.files.get(path)
+        if data is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        etag = server.etag(data)
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        size = len(data)
+        start, end, status = 0, size - 1, 200
+        range_header = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        if range_header and (not if_range or if_range == etag):
+            m = re.match(r'bytes=(\d*)-(\d*)$', range_header.strip())
+            if m and (m.group(1) or m.group(2)):
+                if m.group(1):
+                    start = int(m.group(1))
+                    end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+                else:
+                    start = max(0, size - int(m.group(2)))
+                if start >= size or start > end:
+                    self.send_response(416)
+                    self.send_header('Content-Range', f'bytes */{size}')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                status = 206
+        chunk = data[start:end + 1]
+        self.send_response(status)
+        self.send_header('Content-Type', 'audio/mpeg')
+        self.send_header('Content-Length', str(len(chunk)))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', etag)
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.end_headers()
+        if body:
+            self.wfile.write(chunk)
+
+
+@pytest.fixture
+def media_server():
+    """Run a FakeMediaServer on localhost."""
+    server = FakeMediaServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class FakeBlob:
+    """Minimal google.cloud.storage.Blob: name, generation, updated, download_as_text."""
+
+    def __init__(self, storage, name, data, generation):
+        self._storage = storage
+        self.name = name
+        self.data = data
+        self.generation = generation
+        self.updated = datetime(2026, 1, 1)
+
+    def download_as_text(self):
+        with self._storage.lock:
+            self._storage.downloads.append(self.name)
+        return self.data.decode('utf-8') if isinstance(self.data, bytes) else self.data
+
+
+class _FakePages:
+    def __init__(self, blobs, page_size):
+        self.pages = (blobs[i:i + page_size] for i in range(0, len(blobs), page_size))
+
+
+class FakeStorageClient:
+    """
+    In-memory stand-in for google.cloud.storage.Client: ``put`` objects, list
+    them sorted and paged like GCS, and record ``downloads`` and ``listings``.
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.downloads = []
+        self.listings = []
+        self.lock = threading.Lock()
+        self._generation = 1000
+
+    def put(self, name, data=b''):
+        self._generation += 1
+        self.objects[name] = FakeBlob(self, name, data, self._generation)
+        return self.objects[name]
+
+    def delete(self, name):
+        self.objects.pop(name, None)
+
+    def list_blobs(self, bucket_or_name, prefix='', page_size=1000):
+        self.listings.append((bucket_or_name, prefix, page_size))
+        blobs = [self.objects[n] for n in sorted(self.objects) if n.startswith(prefix)]
+        return _FakePages(blobs, page_size)
+
+
+@pytest.fixture
+def gcs_client():
+    return FakeStorageClient()
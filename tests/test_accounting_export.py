@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Accounting export tests for Ahoy Indie Media
+
+Tests cover:
+- Streamed revenue/expense/1099/platform reports (scripts/export_accounting.py)
+- --type all reads each table once
+"""
+
+import pytest
+import csv
+from decimal import Decimal
+from datetime import datetime
+
+from models import Tip, Purchase, WalletTransaction, ArtistPayout
+
+
+@pytest.fixture
+def ledger(db_session, test_user):
+    """A year of mixed activity, inserted out of date order."""
+    db_session.add_all([
+        Tip(user_id=test_user.id, artist_id='ahoy-band', amount=Decimal('10.00'), total_paid=Decimal('11.50'),
+            stripe_fee=Decimal('0.75'), platform_revenue=Decimal('0.75'), artist_payout=Decimal('10.00'),
+            created_at=datetime(2024, 3, 2, 12)),
+        Tip(user_id=None, artist_id='sea-shanty', amount=Decimal('5.00'), stripe_fee=Decimal('0.45'),
+            platform_revenue=Decimal('0.38'), created_at=datetime(2024, 1, 5, 9)),
+        Tip(artist_id='ahoy-band', amount=Decimal('99.00'), created_at=datetime(2023, 12, 31, 23)),
+        Purchase(type='merch', user_id=test_user.id, amount=Decimal('20.00'), total=Decimal('22.00'),
+                 status='paid', created_at=datetime(2024, 2, 1)),
+        Purchase(type='merch', amount=Decimal('20.00'), total=Decimal('22.00'), status='pending',
+                 created_at=datetime(2024, 2, 1)),
+        WalletTransaction(user_id=test_user.id, type='fund', amount=Decimal('25.00'), balance_before=Decimal('0'),
+                          balance_after=Decimal('25.00'), reference_id='cs_wallet', reference_type='stripe_checkout',
+                          created_at=datetime(2024, 3, 2, 8)),
+        ArtistPayout(artist_id='ahoy-band', amount=Decimal('400.00'), status='completed', payment_method='manual',
+                     created_at=datetime(2024, 6, 1), completed_at=datetime(2024, 6, 1)),
+        ArtistPayout(artist_id='ahoy-band', amount=Decimal('300.00'), status='completed',
+                     payment_method='stripe_connect', stripe_transfer_id='tr_1',
+                     created_at=datetime(2024, 9, 1), completed_at=datetime(2024, 9, 1)),
+        ArtistPayout(artist_id='sea-shanty', amount=Decimal('50.00'), status='pending',
+                     created_at=datetime(2024, 9, 1)),
+    ])
+    db_session.commit()
+
+
+def _read(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+class TestAccountingExport:
+    """Test scripts/export_accounting.py."""
+
+    def test_revenue_is_merged_by_date(self, db_session, ledger, tmp_path):
+        from scripts.export_accounting import export_revenue
+        rows = _read(export_revenue(2024, str(tmp_path / 'revenue.csv')))
+
+        assert [(r['Date'], r['Type']) for r in rows[:4]] == [
+            ('2024-01-05', 'Boost/Tip'),
+            ('2024-02-01', 'Merch Purchase'),
+            ('2024-03-02', 'Boost/Tip'),
+            ('2024-03-02', 'Wallet Funding'),
+        ]
+        assert rows[-1]['Date'] == 'TOTAL'
+        assert float(rows[-1]['Gross Revenue']) == pytest.approx(5.00 + 22.00 + 11.50 + 25.00)
+
+    def test_expenses_and_1099(self, db_session, ledger, tmp_path):
+        from scripts.export_accounting import export_artist_1099, export_expenses
+        expenses = _read(export_expenses(2024, str(tmp_path / 'expenses.csv')))
+        assert [r['Type'] for r in expenses[:3]] == ['Artist Payout', 'Artist Payout', 'Stripe Processing Fees']
+        assert float(expenses[2]['Amount']) == pytest.approx(1.20)
+
+        artists = _read(export_artist_1099(2024, str(tmp_path / '1099.csv')))
+        assert artists[0]['Artist ID'] == 'ahoy-band'
+        assert artists[0]['Number of Payouts'] == '2'
+        assert artists[0]['Requires 1099-NEC'] == 'Yes'
+        assert artists[-1]['Requires 1099-NEC'] == '1 artists require 1099-NEC'
+
+    def test_all_matches_single_reports_in_one_pass(self, db_session, ledger, tmp_path, count_queries):
+        from scripts import export_accounting
+
+        single = tmp_path / 'single'
+        single.mkdir()
+        for report_type in export_accounting.REPORT_TYPES:
+            filename = export_accounting.REPORTS[report_type].default_filename.format(year=2024)
+            export_accounting.run_reports(2024, {report_type: str(single / filename)})
+
+        combined = tmp_path / 'all'
+        combined.mkdir()
+        with count_queries() as statements:
+            outputs = export_accounting.export_all(2024, str(combined))
+
+        assert len([s for s in statements if s.lstrip().upper().startswith('SELECT')]) == 4
+        for report_type, path in outputs.items():
+            filename = export_accounting.REPORTS[report_type].default_filename.format(year=2024)
+            assert open(path).read() == open(single / filename).read()
+
+    def test_empty_year_writes_empty_files(self, db_session, tmp_path):
+        from scripts.export_accounting import export_platform_revenue
+        path = export_platform_revenue(2020, str(tmp_path / 'platform.csv'))
+        assert open(path).read() == ''
+
+    def test_failed_export_leaves_no_partial_file(self, db_session, ledger, tmp_path, monkeypatch):
+        from scripts import export_accounting
+
+        def broken(*args):
+            yield from ()
+            raise RuntimeError('connection lost')
+
+        monkeypatch.setitem(export_accounting.SOURCES, 'wallet', broken)
+        with pytest.raises(RuntimeError):
+            export_accounting.export_revenue(2024, str(tmp_path / 'revenue.csv'))
+        assert list(tmp_path.iterdir()) == []
+
+    def test_output_dir_applies_to_single_reports(self, db_session, ledger, tmp_path, monkeypatch):
+        from scripts import export_accounting
+        monkeypatch.setattr('sys.argv', ['export_accounting.py', '--type', 'expenses', '--year', '2024',
+                                         '--output-dir', str(tmp_path / 'out')])
+        export_accounting.main()
+        assert [p.name for p in (tmp_path / 'out').iterdir()] == ['expenses_2024.csv']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Admin dashboard tests for Ahoy Indie Media
+
+Tests cover:
+- Rollup refresh (services/rollups.py)
+- /api/admin/stats and /api/admin/analytics payloads
+- Query counts stay constant as the event tables grow
+- /api/admin/heatmap time windows
+- Streaming /api/admin/users/export
+"""
+
+import csv
+import gzip
+import io
+import pytest
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from flask_login import login_user
+from models import User, PlayHistory, ListeningSession, Purchase, Bookmark, Tip, AnalyticsEvent
+from services.rollups import refresh_rollups
+
+
+@pytest.fixture
+def main_app(app):
+    """The module-level app: admin stats/analytics routes are registered on it, not in create_app()."""
+    from app import app as module_app
+    module_app.config.update({'TESTING': True, 'WTF_CSRF_ENABLED': False})
+    return module_app
+
+
+@pytest.fixture
+def admin_user(db_session):
+    """Create an admin user."""
+    user = User(
+        email='admin@example.com',
+        username='admin',
+        password_hash='x',
+        is_admin=True,
+        created_at=datetime.utcnow(),
+    )
+    db_session.add(user)
+    db_session.commit()
+    db_session.refresh(user)
+    return user
+
+
+@pytest.fixture
+def admin_client(main_app, admin_user):
+    """Client with an authenticated admin session."""
+    client = main_app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(admin_user.id)
+        sess['user_id'] = admin_user.id
+    return client
+
+
+def _seed_activity(db_session, user, plays):
+    """Add ``plays`` track plays plus one session, order, bookmark and tip."""
+    now = datetime.utcnow()
+    for i in range(plays):
+        db_session.add(PlayHistory(
+            user_id=user.id,
+            media_id=f'song_{i % 3}',
+            media_type='track',
+            played_at=now - timedelta(hours=i),
+        ))
+    db_session.add(ListeningSession(
+        user_id=user.id,
+        media_type='track',
+        media_id='song_0',
+        started_at=datetime.now(timezone.utc) - timedelta(hours=2),
+        ended_at=datetime.now(timezone.utc) - timedelta(hours=1),
+        seconds=3600,
+        source='radio',
+    ))
+    db_session.add(Purchase(type='merch', item_id='tee', amount=Decimal('20.00'),
+                            total=Decimal('20.00'), status='paid', created_at=now))
+    db_session.add(Bookmark(user_id=user.id, media_id=f'song_{plays}', media_type='track', created_at=now))
+    db_session.add(Tip(user_id=user.id, artist_id='test-artist', amount=Decimal('5.00'), created_at=now))
+    db_session.commit()
+
+
+def _call_admin_stats(app, user, count_queries):
+    """Invoke the /api/admin/stats view (admin blueprint) directly."""
+    with app.test_request_context('/api/admin/stats'):
+        login_user(user)
+        with count_queries() as statements:
+            response = app.view_functions['admin.get_stats']()
+        return response.get_json(), len(statements)
+
+
+class TestRollups:
+    """Test rollup refresh and backfill."""
+
+    def test_backfill_and_refresh_are_idempotent(self, main_app, db_session, admin_user, count_queries):
+        """Refreshing the same window twice gives the same totals."""
+        _seed_activity(db_session, admin_user, plays=5)
+        refresh_rollups(full=True)
+        first, _ = _call_admin_stats(main_app, admin_user, count_queries)
+        refresh_rollups()
+        second, _ = _call_admin_stats(main_app, admin_user, count_queries)
+
+        assert first == second
+        assert first['plays']['total'] == 5
+        assert first['orders']['paid'] == 1
+        assert first['listening']['radio_sessions'] == 1
+        assert first['user_stats']['total'] == 1
+
+    def test_user_total_is_live(self, main_app, db_session, admin_user, count_queries):
+        """Deleted users drop out of the total even though their sign-up stays in the rollups."""
+        other = User(email='gone@example.com', username='gone', password_hash='x', created_at=datetime.utcnow())
+        db_session.add(other)
+        db_session.commit()
+        refresh_rollups(full=True)
+        db_session.delete(other)
+        db_session.commit()
+
+        data, _ = _call_admin_stats(main_app, admin_user, count_queries)
+        assert data['users'] == 1
+        assert data['user_stats']['total'] == 1
+        assert data['user_stats']['new_24h'] == 2
+
+    def test_refresh_picks_up_late_payment(self, main_app, db_session, admin_user, count_queries):
+        """An order paid long after checkout started leaves the pending count on the next refresh."""
+        db_session.add(Purchase(type='merch', item_id='tee', amount=Decimal('20.00'), total=Decimal('20.00'),
+                                status='pending', created_at=datetime.utcnow() - timedelta(hours=6)))
+        db_session.commit()
+        refresh_rollups(full=True)
+        order = db_session.query(Purchase).first()
+        order.status = 'paid'
+        db_session.commit()
+
+        refresh_rollups()
+        data, _ = _call_admin_stats(main_app, admin_user, count_queries)
+        assert data['orders']['pending'] == 0
+        assert data['orders']['paid'] == 1
+
+    def test_refresh_picks_up_status_change(self, main_app, db_session, admin_user, count_queries):
+        """An order fulfilled after its bucket was rolled up is re-counted."""
+        _seed_activity(db_session, admin_user, plays=1)
+        refresh_rollups(full=True)
+        order = db_session.query(Purchase).first()
+        order.status = 'fulfilled'
+        order.fulfilled_at = datetime.utcnow()
+        db_session.commit()
+
+        refresh_rollups()
+        data, _ = _call_admin_stats(main_app, admin_user, count_queries)
+        assert data['orders']['paid'] == 0
+        assert data['orders']['fulfilled'] == 1
+
+
+class TestAdminQueryCounts:
+    """Dashboard endpoints issue a fixed, small number of statements."""
+
+    def test_admin_stats_query_count(self, main_app, db_session, admin_user, count_queries):
+        """/api/admin/stats does not scale its round-trips with data volume."""
+        _seed_activity(db_session, admin_user, plays=2)
+        refresh_rollups(full=True)
+        _, small = _call_admin_stats(main_app, admin_user, count_queries)
+
+        _seed_activity(db_session, admin_user, plays=40)
+        refresh_rollups(full=True)
+        data, large = _call_admin_stats(main_app, admin_user, count_queries)
+
+        assert small == large
+        assert large <= 8
+        assert data['plays']['total'] == 42
+        assert data['engagement']['tips'] == 2
+
+    def test_admin_analytics_query_count(self, admin_client, db_session, admin_user, count_queries):
+        """admin_analytics returns 7 daily buckets from a bounded number of statements."""
+        _seed_activity(db_session, admin_user, plays=30)
+        refresh_rollups(full=True)
+
+        with count_queries() as statements:
+            response = admin_client.get('/api/admin/analytics')
+        assert response.status_code == 200
+        data = response.get_json()
+
+        assert len(statements) <= 10
+        assert len(data['daily_plays']) == 7
+        assert sum(d['count'] for d in data['daily_plays']) == 30
+        assert data['listening_by_source']['radio_seconds'] == 3600
+        assert data['user_engagement']['users_with_bookmarks'] == 1
+
+    def test_blueprint_stats_query_count(self, admin_client, db_session, admin_user, count_queries):
+        """/api/admin/stats aggregates each table in one statement."""
+        _seed_activity(db_session, admin_user, plays=3)
+
+        with count_queries() as statements:
+            response = admin_client.get('/api/admin/stats')
+        assert response.status_code == 200
+        data = response.get_json()
+
+        # user loader + rollups + one statement per live table
+        assert len(statements) <= 9
+        assert data['revenue'] == 20.0
+        assert data['tip_total'] == 5.0
+
+
+class TestHeatmap:
+    """Test the windowed heatmap endpoint."""
+
+    def _seed_page_views(self, db_session):
+        now = datetime.utcnow()
+        for days_ago, path, n in [(0, '/radio', 2), (1, '/radio', 1), (1, '/shows', 3), (40, '/shows', 5)]:
+            for _ in range(n):
+                db_session.add(AnalyticsEvent(event_type='page_view', path=path,
+                                              created_at=now - timedelta(days=days_ago)))
+        db_session.add(AnalyticsEvent(event_type='click', path='/radio', created_at=now))
+        db_session.commit()
+
+    def test_default_window_merges_rollup_and_today(self, admin_client, db_session):
+        """Completed days come from the daily table, today is counted live."""
+        self._seed_page_views(db_session)
+        refresh_rollups(full=True, metrics=['paths'])
+        # Written after the refresh: only visible through the live half
+        db_session.add(AnalyticsEvent(event_type='page_view', path='/radio', created_at=datetime.utcnow()))
+        db_session.commit()
+
+        response = admin_client.get('/api/admin/heatmap')
+        assert response.status_code == 200
+        assert response.get_json() == [
+            {'path': '/radio', 'count': 4},
+            {'path': '/shows', 'count': 3},
+        ]
+
+    def test_explicit_window(self, admin_client, db_session):
+        """start/end select whole UTC days."""
+        self._seed_page_views(db_session)
+        refresh_rollups(full=True, metrics=['paths'])
+        day = (datetime.utcnow() - timedelta(days=40)).date().isoformat()
+
+        response = admin_client.get(f'/api/admin/heatmap?start={day}&end={day}')
+        assert response.get_json() == [{'path': '/shows', 'count': 5}]
+
+    def test_invalid_window(self, admin_client):
+        """Bad or oversized windows are rejected."""
+        assert admin_client.get('/api/admin/heatmap?start=2025-02-01&end=2025-01-01').status_code == 400
+        assert admin_client.get('/api/admin/heatmap?days=5000').status_code == 400
+        assert admin_client.get('/api/admin/heatmap?start=yesterday').status_code == 400
+
+
+class TestUserExport:
+    """Test the streamed users CSV export."""
+
+    def _seed_users(self, db_session, n):
+        for i in range(n):
+            db_session.add(User(email=f'user{i}@example.com', password_hash='x',
+                                created_at=datetime.utcnow() - timedelta(minutes=i + 1)))
+        db_session.commit()
+
+    def test_streams_all_users(self, admin_client, db_session):
+        """The export is streamed and contains every user."""
+        self._seed_users(db_session, 1200)
+
+        response = admin_client.get('/api/admin/users/export')
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.mimetype == 'text/csv'
+        assert 'users_export.csv' in response.headers['Content-Disposition']
+
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        assert rows[0][:2] == ['ID', 'Email']
+        assert len(rows) == 1 + 1201  # header + seeded users + admin
+        assert rows[1][1] == 'admin@example.com'
+
+    def test_gzip(self, admin_client, db_session):
+        """?gzip=1 compresses the stream when the client accepts gzip."""
+        self._seed_users(db_session, 10)
+
+        response = admin_client.get('/api/admin/users/export?gzip=1', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        text = gzip.decompress(response.get_data()).decode('utf-8')
+        assert len(list(csv.reader(io.StringIO(text)))) == 12
+
+        plain = admin_client.get('/api/admin/users/export?gzip=1')
+        assert 'Content-Encoding' not in plain.headers
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
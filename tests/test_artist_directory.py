@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for the cached artist directory (services/artist_directory.py).
+"""
+
+import pytest
+
+from models import ContentArtist
+from services import artist_directory, content_db
+
+
+@pytest.fixture
+def artists(db_session):
+    """Two content_db artists; the directory cache is cleared around the test."""
+    content_db.invalidate_cache()
+    db_session.add_all([
+        ContentArtist(artist_id='artist_1', name='Rob Meglio', slug='rob-meglio', position=0,
+                      extra_fields={'email': ' rob@example.com '}),
+        ContentArtist(artist_id='artist_2', name='Poets', slug='poets-and-friends', position=1),
+    ])
+    db_session.commit()
+    yield
+    content_db.invalidate_cache()
+
+
+class TestArtistDirectory:
+    def test_lookup_by_id_slug_and_name(self, artists):
+        assert artist_directory.artist_name('artist_1') == 'Rob Meglio'
+        assert artist_directory.artist_name('rob-meglio') == 'Rob Meglio'
+        assert artist_directory.artist_name('ROB MEGLIO') == 'Rob Meglio'
+        assert artist_directory.artist_name('nobody') is None
+        assert [a['id'] for a in artist_directory.all_artists()] == ['artist_1', 'artist_2']
+
+    def test_email_precedence(self, artists, monkeypatch):
+        assert artist_directory.artist_email('rob-meglio') == 'rob@example.com'
+        assert artist_directory.artist_email('artist_2') is None
+
+        monkeypatch.setenv('ARTIST_EMAIL_POETS_AND_FRIENDS', 'poets@example.com')
+        assert artist_directory.artist_email('artist_2') == 'poets@example.com'
+
+        monkeypatch.setenv('ARTIST_EMAIL_ROB_MEGLIO', 'override@example.com')
+        assert artist_directory.artist_email('rob-meglio') == 'override@example.com'
+
+    def test_lookups_are_cached(self, artists, count_queries):
+        artist_directory.get_directory()
+        with count_queries() as statements:
+            for _ in range(100):
+                artist_directory.artist_name('poets-and-friends')
+                artist_directory.artist_email('artist_1')
+        assert statements == []
+
+    def test_invalidate_rebuilds(self, artists, db_session):
+        assert artist_directory.artist_name('artist_3') is None
+        db_session.add(ContentArtist(artist_id='artist_3', name='New Artist', slug='new-artist', position=2))
+        db_session.commit()
+        content_db.invalidate_cache()
+        assert artist_directory.artist_name('new-artist') == 'New Artist'
+
+    def test_rebuild_keeps_content_version(self, artists, monkeypatch):
+        artist_directory.get_directory()
+        version = content_db.content_version()
+        monkeypatch.setattr(content_db, '_now', lambda: 1e12)  # every cached query has expired
+        assert artist_directory.artist_name('poets') == 'Poets'
+        assert content_db.content_version() == version
+
+    def test_notifications_use_directory(self, artists):
+        from services.notifications import _get_artist_email
+
+        assert _get_artist_email('artist_1') == 'rob@example.com'
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental GCS podcast sync (services/gcs_sync.py).
+"""
+
+import json
+
+import pytest
+
+from models import GcsSyncObject, PodcastEpisode
+from services.gcs_sync import sync_from_gcs
+
+
+def _meta(**fields):
+    return json.dumps(fields).encode('utf-8')
+
+
+@pytest.fixture
+def bucket(gcs_client):
+    gcs_client.put('podcasts/show-a/ep-1.mp3')
+    gcs_client.put('podcasts/show-a/ep-1.mp3.json', _meta(title='Episode One', date='2026-01-02'))
+    gcs_client.put('podcasts/show-a/ep-2.mp3')
+    gcs_client.put('podcasts/show-b/ep-3.wav')
+    gcs_client.put('podcasts/show-b/ep-3.wav.json', _meta(title='Three', artwork='a.jpg', position=3))
+    gcs_client.put('podcasts/show-b/cover.jpg')
+    gcs_client.put('podcasts/loose.mp3')
+    return gcs_client
+
+
+def _episodes(db_session):
+    db_session.expire_all()
+    return {e.episode_id: e for e in db_session.query(PodcastEpisode)}
+
+
+class TestGcsSync:
+    def test_initial_sync(self, db_session, bucket):
+        stats = sync_from_gcs('ahoy', client=bucket, page_size=3, workers=4)
+        assert stats['pages'] == 3
+        assert stats['upserted'] == 3
+        assert sorted(bucket.downloads) == ['podcasts/show-a/ep-1.mp3.json', 'podcasts/show-b/ep-3.wav.json']
+
+        episodes = _episodes(db_session)
+        assert set(episodes) == {'ep-1', 'ep-2', 'ep-3'}
+        assert episodes['ep-1'].title == 'Episode One'
+        assert episodes['ep-1'].date == '2026-01-02'
+        assert episodes['ep-2'].title == 'Ep 2'
+        assert episodes['ep-2'].date == '2026-01-01'
+        assert episodes['ep-3'].show_slug == 'show-b'
+        assert episodes['ep-3'].artwork == 'a.jpg'
+        assert episodes['ep-3'].audio_url == 'https://storage.googleapis.com/ahoy/podcasts/show-b/ep-3.wav'
+        assert db_session.query(GcsSyncObject).count() == 4  # includes the unparseable path
+
+    def test_sidecar_on_next_page_is_paired(self, db_session, bucket):
+        # Page size 1 splits every media blob from its sidecar
+        sync_from_gcs('ahoy', client=bucket, page_size=1)
+        assert _episodes(db_session)['ep-1'].title == 'Episode One'
+
+    def test_unchanged_blobs_are_skipped(self, db_session, bucket, count_queries):
+        sync_from_gcs('ahoy', client=bucket, page_size=100)
+        bucket.downloads.clear()
+        with count_queries() as statements:
+            stats = sync_from_gcs('ahoy', client=bucket, page_size=100)
+        assert stats['skipped'] == 4
+        assert stats['upserted'] == 0
+        assert bucket.downloads == []
+        assert not [s for s in statements if s.lstrip().upper().startswith('INSERT')]
+
+    def test_only_changed_blobs_are_rewritten(self, db_session, bucket):
+        sync_from_gcs('ahoy', client=bucket)
+        bucket.downloads.clear()
+        bucket.put('podcasts/show-b/ep-3.wav.json', _meta(title='Three (remastered)', artwork='b.jpg'))
+        bucket.put('podcasts/show-a/ep-4.mp3')
+
+        stats = sync_from_gcs('ahoy', client=bucket)
+        assert stats['upserted'] == 2
+        assert stats['skipped'] == 3
+        assert bucket.downloads == ['podcasts/show-b/ep-3.wav.json']
+        episodes = _episodes(db_session)
+        assert episodes['ep-3'].title == 'Three (remastered)'
+        assert episodes['ep-3'].artwork == 'a.jpg'  # artwork and position are kept on update
+        assert 'ep-4' in episodes
+
+    def test_full_resync(self, db_session, bucket):
+        sync_from_gcs('ahoy', client=bucket)
+        stats = sync_from_gcs('ahoy', client=bucket, full=True)
+        assert stats['skipped'] == 0
+        assert stats['upserted'] == 3
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for resized image variants (/img/<width>, services/image_variants.py).
+"""
+
+import io
+import os
+from urllib.parse import quote
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image
+
+from models import Track
+from services import content_db, image_variants
+
+
+def _image(width, height, mode='RGB', fmt='JPEG'):
+    buf = io.BytesIO()
+    color = (200, 40, 40, 128) if mode == 'RGBA' else (200, 40, 40)
+    Image.new(mode, (width, height), color).save(buf, format=fmt)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def static_dir(tmp_path, monkeypatch):
+    root = tmp_path / 'static'
+    (root / 'thumbnails').mkdir(parents=True)
+    (root / 'thumbnails' / 'cover.jpg').write_bytes(_image(2000, 1000))
+    (root / 'thumbnails' / 'logo.png').write_bytes(_image(400, 400, 'RGBA', 'PNG'))
+    monkeypatch.setattr(image_variants, 'STATIC_ROOT', root)
+    monkeypatch.setenv('IMAGE_VARIANT_DIR', str(tmp_path / 'variants'))
+    monkeypatch.setattr(image_variants, '_store', None)
+    yield root
+    monkeypatch.setattr(image_variants, '_store', None)
+
+
+@pytest.fixture
+def img_client(app, static_dir):
+    from app import app as module_app
+    module_app.config.update({'TESTING': True})
+    return module_app.test_client()
+
+
+def _get(client, src, width, accept='*/*', **headers):
+    version = image_variants.source_version(src)
+    url = f'/img/{width}?src={quote(src, safe="")}' + (f'&v={version}' if version else '')
+    return client.get(url, headers={'Accept': accept, **headers})
+
+
+class TestImageVariants:
+    def test_negotiates_format_and_buckets_width(self, img_client):
+        avif = _get(img_client, '/static/thumbnails/cover.jpg', 600, 'image/avif,image/webp,*/*')
+        assert avif.status_code == 200
+        assert avif.mimetype == 'image/avif'
+        assert Image.open(io.BytesIO(avif.data)).size == (640, 320)
+        assert avif.headers['Cache-Control'] == image_variants.CACHE_CONTROL
+        assert 'Accept' in avif.headers['Vary']
+
+        webp = _get(img_client, '/static/thumbnails/cover.jpg', 600, 'image/webp,*/*')
+        assert webp.mimetype == 'image/webp'
+        jpeg = _get(img_client, '/static/thumbnails/cover.jpg', 5000)
+        assert jpeg.mimetype == 'image/jpeg'
+        assert Image.open(io.BytesIO(jpeg.data)).size == (1280, 640)
+
+    def test_generated_once_and_conditional(self, img_client, monkeypatch):
+        first = _get(img_client, '/static/thumbnails/cover.jpg', 320)
+        monkeypatch.setattr(image_variants, 'encode', lambda *a: pytest.fail('re-encoded a cached variant'))
+        again = _get(img_client, '/static/thumbnails/cover.jpg', 300)
+        assert again.data == first.data
+        etag = again.headers['ETag']
+        assert _get(img_client, '/static/thumbnails/cover.jpg', 320, **{'If-None-Match': etag}).status_code == 304
+
+    def test_transparent_image_falls_back_to_png(self, img_client):
+        response = _get(img_client, '/static/thumbnails/logo.png', 160)
+        assert response.mimetype == 'image/png'
+        assert Image.open(io.BytesIO(response.data)).size == (160, 160)
+
+    def test_rejects_and_missing(self, img_client):
+        assert _get(img_client, 'https://evil.example.com/a.jpg', 320).status_code == 403
+        assert _get(img_client, '/static/../app.py', 320).status_code == 403
+        assert _get(img_client, '/static/thumbnails/missing.jpg', 320).status_code == 404
+        assert img_client.get('/img/320').status_code == 400
+
+    def test_stale_version_redirects(self, img_client, static_dir, monkeypatch):
+        src = '/static/thumbnails/cover.jpg'
+        current = image_variants.variant_url(src, 320)
+        for v in ('', '&v=bogus'):
+            response = img_client.get(f'/img/320?src={quote(src, safe="")}{v}')
+            assert response.status_code == 302
+            assert response.headers['Location'].endswith(current)
+        monkeypatch.setattr(image_variants, 'encode', lambda *a: pytest.fail('generated for a client-supplied v'))
+        img_client.get(f'/img/320?src={quote(src, safe="")}&v=other')
+
+    def test_evicts_least_recently_used(self, tmp_path, static_dir):
+        store = image_variants.VariantStore(str(tmp_path / 'lru'), max_bytes=1024 * 1024)
+        src = '/static/thumbnails/cover.jpg'
+        old, middle, used = (store.get(src, 'v1', w, 'jpeg') for w in (320, 160, 640))
+        for i, variant in enumerate((old, middle, used)):
+            os.utime(variant.path, (i + 1, i + 1))
+        store.get(src, 'v1', 640, 'jpeg')  # hit: now the most recently used
+        store.max_bytes = sum(os.path.getsize(v.path) for v in (old, middle, used)) - 1
+        store.evict()
+        assert not os.path.exists(old.path)
+        assert os.path.exists(used.path)
+        # An evicted variant is regenerated on its next request
+        assert os.path.exists(store.get(src, 'v1', 320, 'jpeg').path)
+
+    def test_remote_source(self, tmp_path, media_server):
+        media_server.files['/cover.jpg'] = _image(800, 800)
+        store = image_variants.VariantStore(str(tmp_path / 'remote'), max_bytes=1024 * 1024)
+        variant = store.get(media_server.url('/cover.jpg'), '', 320, 'webp')
+        assert variant.mimetype == 'image/webp'
+        assert variant.path.endswith(variant.etag + '.webp')
+        store.get(media_server.url('/cover.jpg'), '', 320, 'webp')
+        assert len(media_server.requests) == 1
+
+    def test_serializer_srcset(self, db_session, static_dir):
+        content_db.invalidate_cache()
+        db_session.add_all([
+            Track(track_id='a', cover_art='https://storage.googleapis.com/ahoy/a.jpg', position=0),
+            Track(track_id='b', cover_art='https://example.com/b.jpg', position=1),
+            Track(track_id='c', cover_art='/static/thumbnails/cover.jpg', position=2),
+        ])
+        db_session.commit()
+        tracks = content_db.get_all_tracks()['tracks']
+        content_db.invalidate_cache()
+
+        srcset = tracks[0]['cover_art_srcset'].split(', ')
+        assert len(srcset) == len(image_variants.WIDTHS)
+        assert srcset[0] == '/img/160?src=' + quote('https://storage.googleapis.com/ahoy/a.jpg', safe='') + ' 160w'
+        assert 'cover_art_srcset' not in tracks[1]
+        version = image_variants.source_version('/static/thumbnails/cover.jpg')
+        assert f'&v={version} 1280w' in tracks[2]['cover_art_srcset']
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Tests for the background mail queue and connection-reusing transports.
+"""
+
+import os
+import time
+from decimal import Decimal
+
+import pytest
+
+from services import mail_queue
+from services.emailer import ResendTransport, get_transport, send_email
+from services.mail_queue import MailQueue
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    """A fresh process mail queue with instant retries."""
+    q = MailQueue(backoff=lambda attempts: 0, idle_timeout=0.2)
+    monkeypatch.setattr(mail_queue, '_queue', q)
+    monkeypatch.setattr(mail_queue, '_queue_pid', os.getpid())
+    yield q
+    q.close(timeout=5)
+
+
+class TestSmtpTransport:
+    def test_messages_share_one_connection(self, smtp_server):
+        transport = get_transport()
+        try:
+            for i in range(3):
+                result = send_email(f'fan{i}@example.com', f'Hello {i}', 'body', '<p>body</p>', transport=transport)
+                assert result['ok'] is True
+        finally:
+            transport.close()
+
+        assert [m['to'] for m in smtp_server.messages] == [['fan0@example.com'], ['fan1@example.com'], ['fan2@example.com']]
+        assert smtp_server.connections == 1
+        assert smtp_server.logins == 1
+
+    def test_reconnects_after_close(self, smtp_server):
+        transport = get_transport()
+        assert send_email('a@example.com', 'one', 'body', transport=transport)['ok']
+        transport.close()
+        assert send_email('b@example.com', 'two', 'body', transport=transport)['ok']
+        transport.close()
+        assert smtp_server.connections == 2
+
+    def test_transient_reply_is_retryable(self, smtp_server):
+        from services.emailer import is_retryable
+
+        smtp_server.fail_next.append('451 4.3.0 Try again later')
+        transport = get_transport()
+        try:
+            result = send_email('a@example.com', 'one', 'body', transport=transport)
+        finally:
+            transport.close()
+        assert result['ok'] is False
+        assert is_retryable(result)
+
+    def test_resend_reuses_session(self, monkeypatch):
+        calls = []
+
+        class Response:
+            ok = True
+            status_code = 200
+            content = b'{"id": "re_1"}'
+
+            def json(self):
+                return {'id': 're_1'}
+
+        transport = ResendTransport('re_test')
+        monkeypatch.setattr(transport.session, 'post', lambda url, **kw: calls.append(kw) or Response())
+        for i in range(2):
+            assert transport.send(f'fan{i}@example.com', 'hi', 'body')['ok']
+        assert len(calls) == 2
+        assert transport.session.headers['Authorization'] == 'Bearer re_test'
+
+
+class TestMailQueue:
+    def test_send_returns_before_delivery(self, smtp_server, queue):
+        result = mail_queue.send('fan@example.com', 'Queued', 'body')
+        assert result == {'ok': True, 'provider': 'queue', 'detail': 'queued'}
+        assert queue.flush(timeout=5)
+        assert len(smtp_server.messages) == 1
+        assert smtp_server.messages[0]['message']['Subject'] == 'Queued'
+
+    def test_batch_uses_one_connection(self, smtp_server, queue):
+        for i in range(10):
+            mail_queue.send(f'fan{i}@example.com', f'Message {i}', 'body')
+        assert queue.flush(timeout=5)
+        assert len(smtp_server.messages) == 10
+        assert smtp_server.connections == 1
+
+    def test_idle_connection_is_closed_and_reopened(self, smtp_server, queue):
+        mail_queue.send('a@example.com', 'one', 'body')
+        assert queue.flush(timeout=5)
+        time.sleep(0.5)  # past idle_timeout
+        mail_queue.send('b@example.com', 'two', 'body')
+        assert queue.flush(timeout=5)
+        assert smtp_server.connections == 2
+
+    def test_transient_failure_is_retried(self, smtp_server, queue):
+        smtp_server.fail_next.extend(['451 4.3.0 Try again later', '421 4.7.0 Slow down'])
+        result = mail_queue.send('fan@example.com', 'Retry me', 'body', wait=True, timeout=5)
+        assert result['ok'] is True
+        assert len(smtp_server.messages) == 1
+
+    def test_permanent_failure_is_not_retried(self, smtp_server, queue):
+        smtp_server.fail_next.extend(['554 5.6.0 Message rejected', '554 5.6.0 Message rejected'])
+        result = mail_queue.send('fan@example.com', 'Rejected', 'body', wait=True, timeout=5)
+        assert result['ok'] is False
+        assert result['detail']['status'] == 554
+        assert smtp_server.fail_next == ['554 5.6.0 Message rejected']
+
+    def test_gives_up_after_max_attempts(self, smtp_server, queue):
+        smtp_server.fail_next.extend(['451 4.3.0 Try again later'] * 3)
+        result = mail_queue.send('fan@example.com', 'Flaky', 'body', max_attempts=2, wait=True, timeout=5)
+        assert result['ok'] is False
+        assert smtp_server.fail_next == ['451 4.3.0 Try again later']
+
+    def test_unconfigured_email_is_dropped(self, monkeypatch, queue):
+        for var in ('RESEND_API_KEY', 'SMTP_HOST', 'SMTP_USER', 'SMTP_PASS', 'SMTP_PASSWORD'):
+            monkeypatch.delenv(var, raising=False)
+        result = mail_queue.send('fan@example.com', 'Nowhere', 'body', wait=True, timeout=5)
+        assert result['detail'] == 'email_not_configured'
+        assert len(queue) == 0
+
+
+class TestNotifications:
+    def test_boost_notifications_are_queued(self, smtp_server, queue, monkeypatch):
+        from services.notifications import notify_boost_received
+
+        monkeypatch.setenv('AHOY_ADMIN_EMAIL', 'admin@ahoy.test')
+        monkeypatch.setenv('ARTIST_EMAIL_TEST_ARTIST', 'artist@example.com')
+
+        results = notify_boost_received(
+            artist_id='test-artist',
+            artist_name='Test Artist',
+            boost_amount=Decimal('10.00'),
+            artist_payout=Decimal('10.00'),
+            total_paid=Decimal('11.34'),
+            tipper_email='fan@example.com',
+        )
+        assert results == {'admin_notified': True, 'user_notified': True, 'artist_notified': True}
+
+        assert queue.flush(timeout=5)
+        recipients = sorted(m['to'][0] for m in smtp_server.messages)
+        assert recipients == ['admin@ahoy.test', 'artist@example.com', 'fan@example.com']
+        assert smtp_server.connections == 1
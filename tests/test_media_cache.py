@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Tests for the on-disk byte-range cache behind /proxy/audio (services/media_cache.py).
+"""
+
+import os
+from urllib.parse import quote
+
+import pytest
+import requests
+
+from services import media_cache, media_proxy
+
+AUDIO = bytes(range(256)) * 40  # 10 KiB
+CHUNK = 4096
+
+
+def _gets(media_server):
+    return [r for r in media_server.requests if r[0] == 'GET']
+
+
+@pytest.fixture
+def cache(tmp_path, media_server):
+    media_server.files['/track.mp3'] = AUDIO
+    return media_cache.MediaCache(str(tmp_path), max_bytes=1024 * 1024, chunk_size=CHUNK,
+                                  session=requests.Session())
+
+
+def _body(response):
+    """Read a cache response (possibly a direct-passthrough file wrapper) and close it."""
+    try:
+        return b''.join(response.iter_encoded())
+    finally:
+        response.close()
+
+
+def _serve(cache, media_server, range_header, name='/track.mp3', **headers):
+    headers['Range'] = range_header
+    return cache.serve(media_server.url(name), headers, {})
+
+
+class TestMediaCache:
+    def test_miss_then_hit(self, cache, media_server):
+        first = _serve(cache, media_server, 'bytes=0-')
+        assert first.status_code == 206
+        assert first.headers['Content-Range'] == f'bytes 0-{CHUNK - 1}/{len(AUDIO)}'
+        assert _body(first) == AUDIO[:CHUNK]
+        assert len(_gets(media_server)) == 1
+
+        again = _serve(cache, media_server, 'bytes=100-')
+        assert _body(again) == AUDIO[100:CHUNK]
+        assert len(_gets(media_server)) == 1  # served from disk
+
+    def test_exact_range_inside_chunk(self, cache, media_server):
+        response = _serve(cache, media_server, 'bytes=5000-5009')
+        assert response.status_code == 206
+        assert response.headers['Content-Length'] == '10'
+        assert response.headers['Content-Range'] == f'bytes 5000-5009/{len(AUDIO)}'
+        assert _body(response) == AUDIO[5000:5010]
+        # The origin was asked for the whole aligned chunk
+        assert _gets(media_server)[-1][2]['Range'] == f'bytes={CHUNK}-{2 * CHUNK - 1}'
+
+    def test_last_chunk_is_short(self, cache, media_server):
+        response = _serve(cache, media_server, 'bytes=-100')
+        assert _body(response) == AUDIO[-100:]
+        assert response.headers['Content-Range'] == f'bytes {len(AUDIO) - 100}-{len(AUDIO) - 1}/{len(AUDIO)}'
+
+    def test_unsatisfiable_range(self, cache, media_server):
+        response = _serve(cache, media_server, f'bytes={len(AUDIO)}-')
+        assert response.status_code == 416
+        assert response.headers['Content-Range'] == f'bytes */{len(AUDIO)}'
+
+    def test_declines_what_it_cannot_answer(self, cache, media_server):
+        url = media_server.url('/track.mp3')
+        assert cache.serve(url, {}, {}) is None
+        assert cache.serve(url, {'Range': 'bytes=0-1,5-6'}, {}) is None
+        assert _serve(cache, media_server, 'bytes=0-9', **{'If-Range': '"stale"'}) is None
+        assert _serve(cache, media_server, 'bytes=0-9', name='/missing.mp3') is None
+
+    def test_changed_file_is_not_served_stale(self, cache, media_server):
+        assert _body(_serve(cache, media_server, 'bytes=0-9')) == AUDIO[:10]
+        media_server.files['/track.mp3'] = b'\xff' * len(AUDIO)
+        # Chunk 1 was never cached; fetching it exposes the new ETag, so the cache steps aside
+        assert _serve(cache, media_server, f'bytes={CHUNK}-') is None
+        # ...and re-learns the file on the next request
+        assert _body(_serve(cache, media_server, 'bytes=0-9')) == b'\xff' * 10
+
+    def test_meta_is_revalidated_after_ttl(self, cache, media_server):
+        cache.meta_ttl = 0
+        _serve(cache, media_server, 'bytes=0-9')
+        media_server.files['/track.mp3'] = b'\x01' * len(AUDIO)
+        assert _body(_serve(cache, media_server, 'bytes=0-9')) == b'\x01' * 10
+
+    def test_shared_between_instances(self, cache, media_server, tmp_path):
+        _serve(cache, media_server, 'bytes=0-')
+        other = media_cache.MediaCache(str(tmp_path), max_bytes=cache.max_bytes, chunk_size=CHUNK,
+                                       session=requests.Session())
+        before = len(media_server.requests)
+        assert _body(_serve(other, media_server, 'bytes=0-99')) == AUDIO[:100]
+        assert len(media_server.requests) == before
+
+    def test_unwritable_cache_declines(self, cache, media_server, monkeypatch):
+        def full(path, data):
+            raise OSError(28, 'No space left on device')
+
+        monkeypatch.setattr(media_cache, '_atomic_write', full)
+        assert _serve(cache, media_server, 'bytes=0-') is None
+
+    def test_miss_takes_a_proxy_slot(self, cache, media_server, monkeypatch):
+        monkeypatch.setenv('AUDIO_PROXY_MAX_CONCURRENT', '1')
+        monkeypatch.setattr(media_proxy, '_pid', None)
+        with media_proxy.slot():
+            assert _serve(cache, media_server, 'bytes=0-') is None
+        assert media_server.requests == []
+        assert _body(_serve(cache, media_server, 'bytes=0-')) == AUDIO[:CHUNK]
+        with media_proxy.slot():  # hits need no slot
+            assert _body(_serve(cache, media_server, 'bytes=100-')) == AUDIO[100:CHUNK]
+        monkeypatch.setattr(media_proxy, '_pid', None)
+
+    def test_evicts_least_recently_used(self, cache, media_server):
+        cache.max_bytes = 2 * CHUNK
+        url = media_server.url('/track.mp3')
+        _serve(cache, media_server, 'bytes=0-0')
+        _serve(cache, media_server, f'bytes={CHUNK}-{CHUNK}')
+        os.utime(cache.chunk_path(url, media_server.etag(AUDIO), 0), (1, 1))  # chunk 0 is oldest
+        _serve(cache, media_server, f'bytes={2 * CHUNK}-{2 * CHUNK}')
+        etag = media_server.etag(AUDIO)
+        assert not os.path.exists(cache.chunk_path(url, etag, 0))
+        assert os.path.exists(cache.chunk_path(url, etag, 1))
+        assert os.path.exists(cache.chunk_path(url, etag, 2))
+
+
+def test_proxy_route_uses_cache(app, media_server, tmp_path, monkeypatch):
+    from app import app as module_app
+    module_app.config.update({'TESTING': True})
+    media_server.files['/track.mp3'] = AUDIO
+    monkeypatch.setattr(media_proxy, 'is_allowed_source', lambda url: url.startswith('http://127.0.0.1'))
+    monkeypatch.setenv('MEDIA_CACHE_DIR', str(tmp_path))
+    monkeypatch.setenv('MEDIA_CACHE_MAX_MB', '1')
+    monkeypatch.setattr(media_cache, '_cache', None)
+    client = module_app.test_client()
+    path = '/proxy/audio?url=' + quote(media_server.url('/track.mp3'), safe='')
+
+    for _ in range(2):
+        response = client.get(path, headers={'Range': 'bytes=0-'})
+        assert response.status_code == 206
+        assert response.get_data() == AUDIO
+    assert len(_gets(media_server)) == 1
+    # Without Range the request is proxied straight through
+    assert client.get(path).get_data() == AUDIO
+    monkeypatch.setattr(media_cache, '_cache', None)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming, Range-aware /proxy/audio (services/media_proxy.py).
+"""
+
+import os
+from urllib.parse import quote
+
+import pytest
+
+from services import media_proxy
+
+AUDIO = bytes(range(256)) * 1024  # 256 KiB
+
+
+@pytest.fixture
+def proxy_client(app, media_server, monkeypatch):
+    """Module-level app client whose proxy accepts the local media server."""
+    from app import app as module_app
+    module_app.config.update({'TESTING': True})
+    media_server.files['/track.mp3'] = AUDIO
+    monkeypatch.setattr(media_proxy, 'is_allowed_source', lambda url: url.startswith('http://127.0.0.1'))
+    monkeypatch.setenv('AUDIO_PROXY_MAX_CONCURRENT', '1')
+    monkeypatch.setenv('MEDIA_CACHE_MAX_MB', '0')  # exercise the proxy itself, not the disk cache
+    monkeypatch.setattr(media_proxy, '_pid', None)  # rebuild session and slots with the env above
+    yield module_app.test_client()
+    monkeypatch.setattr(media_proxy, '_pid', None)
+
+
+def _path(media_server, name='/track.mp3'):
+    return '/proxy/audio?url=' + quote(media_server.url(name), safe='')
+
+
+class TestAudioProxy:
+    def test_full_response_is_streamed(self, proxy_client, media_server):
+        response = proxy_client.get(_path(media_server), buffered=False)
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.headers['Content-Length'] == str(len(AUDIO))
+        assert response.headers['Accept-Ranges'] == 'bytes'
+        assert response.get_data() == AUDIO
+        response.close()
+
+    def test_range_is_forwarded(self, proxy_client, media_server):
+        response = proxy_client.get(_path(media_server), headers={'Range': 'bytes=1000-1999'})
+        assert response.status_code == 206
+        assert response.headers['Content-Range'] == f'bytes 1000-1999/{len(AUDIO)}'
+        assert response.get_data() == AUDIO[1000:2000]
+        assert media_server.requests[-1][2]['Range'] == 'bytes=1000-1999'
+
+    def test_stale_if_range_gets_full_body(self, proxy_client, media_server):
+        response = proxy_client.get(_path(media_server), headers={'Range': 'bytes=0-9', 'If-Range': '"old"'})
+        assert response.status_code == 200
+        assert len(response.get_data()) == len(AUDIO)
+
+    def test_unsatisfiable_range(self, proxy_client, media_server):
+        response = proxy_client.get(_path(media_server), headers={'Range': f'bytes={len(AUDIO) + 10}-'})
+        assert response.status_code == 416
+        assert response.headers['Content-Range'] == f'bytes */{len(AUDIO)}'
+
+    def test_origin_error_is_502(self, proxy_client, media_server):
+        assert proxy_client.get(_path(media_server, '/missing.mp3')).status_code == 502
+
+    def test_concurrency_cap(self, proxy_client, media_server):
+        first = proxy_client.get(_path(media_server), buffered=False)
+        assert first.status_code == 200
+        busy = proxy_client.get(_path(media_server))
+        assert busy.status_code == 503
+        assert busy.headers['Retry-After']
+        first.close()  # frees the slot
+        assert proxy_client.get(_path(media_server)).status_code == 200
+
+    def test_rejects_other_sources(self, app):
+        from app import app as module_app
+        client = module_app.test_client()
+        assert client.get('/proxy/audio?url=' + quote('http://example.com/a.mp3', safe='')).status_code == 403
+        assert client.get('/proxy/audio').status_code == 400
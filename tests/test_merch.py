@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for the cached merch catalog and purchased-item set (services/merch_catalog.py).
+"""
+
+from decimal import Decimal
+
+import pytest
+
+from models import ContentMerch, Purchase
+from services import content_db, merch_catalog
+
+
+@pytest.fixture
+def main_client(app):
+    """Client for the module-level app, where the merch routes are registered."""
+    from app import app as module_app
+    module_app.config.update({'TESTING': True, 'WTF_CSRF_ENABLED': False})
+    return module_app.test_client()
+
+
+@pytest.fixture
+def merch(db_session):
+    """Two catalog items, one already purchased; caches cleared around the test."""
+    content_db.invalidate_cache()
+    merch_catalog.invalidate_purchased()
+    db_session.add_all([
+        ContentMerch(item_id='tee', name='Tee', image_url='/Users/me/Desktop/tee.png',
+                     price_usd=Decimal('20.00'), position=0),
+        ContentMerch(item_id='hat', name='Hat', image_url='https://cdn.example.com/hat.jpg',
+                     price_usd=Decimal('15.00'), position=1),
+    ])
+    db_session.add_all([
+        Purchase(type='merch', item_id='tee', amount=Decimal('20.00'), total=Decimal('22.00'), status='paid'),
+        Purchase(type='merch', item_id='tee', amount=Decimal('20.00'), total=Decimal('22.00'), status='pending'),
+        Purchase(type='tip', item_id='hat', amount=Decimal('5.00'), total=Decimal('5.50'), status='paid'),
+    ])
+    db_session.commit()
+    yield
+    content_db.invalidate_cache()
+    merch_catalog.invalidate_purchased()
+
+
+class TestMerchCatalog:
+    def test_api_merch(self, main_client, merch):
+        data = main_client.get('/api/merch').get_json()
+        assert data['purchased_item_ids'] == ['tee']
+        items = {it['id']: it for it in data['items']}
+        assert items['tee']['image_url'] == '/static/img/default-cover.jpg'
+        assert items['hat']['image_url'] == 'https://cdn.example.com/hat.jpg'
+
+    def test_repeat_views_do_not_query(self, main_client, merch, count_queries):
+        main_client.get('/api/merch')
+        with count_queries() as statements:
+            for _ in range(5):
+                assert main_client.get('/api/merch').status_code == 200
+        assert statements == []
+
+    def test_catalog_is_sanitized_once(self, merch):
+        first = merch_catalog.catalog()
+        assert merch_catalog.catalog() is first
+        content_db.invalidate_cache()
+        assert merch_catalog.catalog() is not first
+
+    def test_mark_purchased_updates_cached_set(self, merch):
+        assert merch_catalog.purchased_item_ids() == {'tee'}
+        merch_catalog.mark_purchased('hat')
+        assert 'hat' in merch_catalog.purchased_item_ids()
+
+    def test_invalidate_reloads(self, merch, db_session):
+        assert merch_catalog.purchased_item_ids() == {'tee'}
+        db_session.add(Purchase(type='merch', item_id='hat', amount=Decimal('15.00'),
+                                total=Decimal('16.50'), status='pending'))
+        db_session.commit()
+        assert merch_catalog.purchased_item_ids() == {'tee'}
+        merch_catalog.invalidate_purchased()
+        assert merch_catalog.purchased_item_ids() == {'tee', 'hat'}
+
+
+class TestCheckoutIndex:
+    def test_entries_are_priced_once(self, merch):
+        index = merch_catalog.checkout_index()
+        entry = index.get('hat')
+        assert entry['name'] == 'Hat'
+        assert entry['unit_price'] == Decimal('15.00')
+        assert entry['unit_amount_cents'] == 1500
+        assert index.total(entry, 3) == Decimal('45.00')
+        assert index.total(entry, 50) == Decimal('750.00')
+        assert index.get('missing') is None
+        assert merch_catalog.checkout_index() is index
+
+    def test_new_catalog_version_rebuilds(self, merch):
+        index = merch_catalog.checkout_index()
+        content_db.invalidate_cache()
+        rebuilt = merch_catalog.checkout_index()
+        assert rebuilt is not index
+        assert rebuilt.version > index.version
+
+    def test_checkout_page_prices_from_index(self, main_client, merch, monkeypatch):
+        def no_file_reads(*args, **kwargs):
+            raise AssertionError("checkout read a JSON file")
+
+        merch_catalog.checkout_index()
+        monkeypatch.setattr(merch_catalog, 'read_json', no_file_reads)
+        response = main_client.get('/checkout?type=merch&item_id=hat')
+        assert response.status_code == 200
+        assert b'15.00' in response.data
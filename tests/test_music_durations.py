@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for the partial-download duration probe (scripts/refresh_music_durations.py).
+"""
+
+import io
+import wave
+
+import pytest
+import requests
+
+pytest.importorskip("mutagen")
+
+from models import Track
+from scripts import refresh_music_durations as rmd
+
+# 1200 CBR frames (MPEG-1 Layer III, 128 kbps, 44.1 kHz) ~= 31.3 s, ~490 KiB
+MP3 = (b'\xff\xfb\x90\x00' + b'\x00' * 413) * 1200
+
+
+def _synchsafe(n):
+    return bytes((n >> shift) & 0x7f for shift in (21, 14, 7, 0))
+
+
+def _id3(body_size):
+    """An ID3v2.4 tag with one PRIV frame (cover-art sized) filling ``body_size`` bytes."""
+    data = b'cover\x00' + bytes(range(1, 256)) * (body_size // 255)
+    data = data[:body_size - 10]
+    frame = b'PRIV' + _synchsafe(len(data)) + b'\x00\x00' + data
+    return b'ID3\x04\x00\x00' + _synchsafe(len(frame)) + frame
+
+
+def _wav(seconds):
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(b'\x00' * 16000 * seconds)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def tracks(media_server):
+    media_server.files['/a.mp3'] = MP3
+    media_server.files['/b.wav'] = _wav(20)
+    return [
+        {'id': 'song_a', 'audio_url': media_server.url('/a.mp3'), 'duration_seconds': 0},
+        {'id': 'song_b', 'audio_url': media_server.url('/b.wav'), 'duration_seconds': 0},
+        {'id': 'song_c', 'audio_url': media_server.url('/missing.mp3'), 'duration_seconds': 0},
+        {'id': 'song_d', 'audio_url': media_server.url('/a.mp3'), 'duration_seconds': 99},
+        {'id': 'song_e', 'audio_url': '', 'duration_seconds': 0},
+    ]
+
+
+class TestDurationProbe:
+    def test_sparse_file_reads(self):
+        f = rmd.SparseFile(10, b'ab', b'yz')
+        assert f.read() == b'ab\x00\x00\x00\x00\x00\x00yz'
+        f.seek(-3, io.SEEK_END)
+        assert f.read(2) == b'\x00y'
+        assert f.read(5) == b'z'
+
+    def test_sparse_file_pieces(self):
+        f = rmd.SparseFile(10, b'ab', b'z', pieces=[(4, b'mn')])
+        assert f.read() == b'ab\x00\x00mn\x00\x00\x00z'
+
+    def test_large_id3_tag(self, media_server):
+        tag = _id3(400 * 1024)
+        assert rmd.id3_size(tag + MP3) == len(tag)
+        media_server.files['/tagged.mp3'] = tag + MP3
+        assert rmd.probe_duration(requests.Session(), media_server.url('/tagged.mp3'), 5) == 31
+        ranges = [h.get('Range') for _, _, h in media_server.requests]
+        assert ranges == [f'bytes=0-{rmd.HEAD_BYTES - 1}', f'bytes={len(tag)}-{len(tag) + rmd.HEAD_BYTES - 1}']
+
+    def test_refresh_fetches_only_head_ranges(self, tracks, media_server):
+        stats = rmd.refresh_durations(tracks, timeout=5, force=False, max_tracks=None,
+                                      dry_run=False, workers=4)
+        assert stats['durations'] == {'song_a': 31, 'song_b': 20}
+        assert (stats['updated'], stats['skipped'], stats['failed']) == (2, 1, 2)
+        assert tracks[0]['duration_seconds'] == 31
+        assert tracks[3]['duration_seconds'] == 99
+        ranges = {h.get('Range') for _, path, h in media_server.requests if path != '/missing.mp3'}
+        assert ranges == {f'bytes=0-{rmd.HEAD_BYTES - 1}'}
+
+    def test_dry_run_leaves_tracks(self, tracks):
+        stats = rmd.refresh_durations(tracks, timeout=5, force=True, max_tracks=2,
+                                      dry_run=True, workers=2)
+        assert stats['processed'] == 2
+        assert stats['durations'] == {'song_a': 31, 'song_b': 20}
+        assert tracks[0]['duration_seconds'] == 0
+
+    def test_durations_written_to_db(self, db_session):
+        db_session.add_all([
+            Track(track_id='song_a', duration_seconds=0, position=0),
+            Track(track_id='song_b', duration_seconds=20, position=1),
+        ])
+        db_session.commit()
+        assert rmd.save_db_durations({'song_a': 31, 'song_b': 20, 'song_x': 5}) == 1
+        db_session.expire_all()
+        assert [t['duration_seconds'] for t in rmd.load_db_tracks()] == [31, 20]
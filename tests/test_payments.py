@@ -166,6 +166,78 @@ class TestWalletUse:
         assert response.status_code == 401
 
 
+
+def _wallet_engines():
+    """Engines the concurrency test runs against: a SQLite file, plus Postgres if TEST_POSTGRES_URL is set."""
+    import os
+    engines = [pytest.param('sqlite', id='sqlite')]
+    engines.append(pytest.param(
+        os.getenv('TEST_POSTGRES_URL'), id='postgres',
+        marks=pytest.mark.skipif(not os.getenv('TEST_POSTGRES_URL'), reason='TEST_POSTGRES_URL not set'),
+    ))
+    return engines
+
+
+class TestWalletConcurrency:
+    """Parallel spends against services/wallet.py never overdraw."""
+
+    @pytest.mark.parametrize('url', _wallet_engines())
+    def test_parallel_spends(self, url, tmp_path):
+        import threading
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from models import Base, User, WalletTransaction
+        from services import wallet
+
+        if url == 'sqlite':
+            engine = create_engine(f"sqlite:///{tmp_path / 'wallet.db'}", connect_args={'timeout': 30})
+        else:
+            engine = create_engine(url, pool_size=20)
+        tables = [User.__table__, WalletTransaction.__table__]
+        Base.metadata.drop_all(engine, tables=tables)
+        Base.metadata.create_all(engine, tables=tables)
+        Session = sessionmaker(bind=engine, expire_on_commit=False)
+
+        with Session() as session:
+            user = User(email='race@example.com', username='race', password_hash='x',
+                        wallet_balance=Decimal('10.00'))
+            session.add(user)
+            session.commit()
+            user_id = user.id
+
+        results = []
+        start = threading.Barrier(20)
+
+        def spend():
+            start.wait()
+            with Session() as session:
+                balance_after = wallet.debit(session, user_id, Decimal('1.00'), 'race')
+                session.commit()
+                results.append(balance_after)
+
+        threads = [threading.Thread(target=spend) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        successes = sorted(r for r in results if r is not None)
+        assert len(results) == 20
+        assert successes == [Decimal(n) for n in range(10)]
+        with Session() as session:
+            assert wallet.balance(session, user_id) == Decimal('0.00')
+            assert session.query(WalletTransaction).filter_by(user_id=user_id).count() == 10
+
+        Base.metadata.drop_all(engine, tables=tables)
+        engine.dispose()
+
+    def test_credit_and_missing_user(self, db_session, test_user):
+        from services import wallet
+        assert wallet.credit(db_session, test_user.id, Decimal('5.25')) == Decimal('105.25')
+        assert wallet.debit(db_session, 999999, Decimal('1.00')) is None
+        assert wallet.credit(db_session, 999999, Decimal('1.00')) is None
+        assert wallet.balance(db_session, 999999) is None
+
 class TestWalletFunding:
     """Test wallet funding operations."""
 
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Artist payout tests for Ahoy Indie Media
+
+Tests cover:
+- Set-based pending totals (services/payouts.py)
+- payout_tips links written with payout records
+- Daily payout scan query count
+- Stripe payout executor state machine against a fake Stripe client
+"""
+
+import pytest
+import threading
+from decimal import Decimal
+from datetime import datetime
+
+from models import Tip, ArtistPayout, PayoutTip
+from services import artist_directory
+from services.payouts import link_tips, match_artists, pending_tips, pending_totals
+from services.payout_executor import (
+    RetryableTransferError, TransferError, execute_payouts, queue_payout, stripe_key,
+)
+
+ARTISTS = [
+    {'id': 'ahoy-band', 'slug': 'ahoy-band', 'name': 'Ahoy Band'},
+    {'id': '42', 'slug': 'sea-shanty', 'name': 'Sea Shanty'},
+    {'id': 'quiet', 'slug': 'quiet', 'name': 'Quiet'},
+]
+
+
+def _tip(db_session, artist_id, amount, artist_payout=None):
+    tip = Tip(artist_id=artist_id, amount=Decimal(amount),
+              artist_payout=Decimal(artist_payout) if artist_payout else None,
+              created_at=datetime.utcnow())
+    db_session.add(tip)
+    db_session.flush()
+    return tip
+
+
+def _payout(db_session, artist_id, tips, status):
+    payout = ArtistPayout(artist_id=artist_id, amount=sum(t.amount for t in tips), status=status,
+                          related_tip_ids=[t.id for t in tips], created_at=datetime.utcnow())
+    db_session.add(payout)
+    db_session.flush()
+    link_tips(db_session, payout.id, [t.id for t in tips])
+    return payout
+
+
+@pytest.fixture
+def tips(db_session):
+    """ahoy-band: two paid + one pending; sea-shanty (tips keyed by slug): two pending."""
+    paid = [_tip(db_session, 'ahoy-band', '5.00'), _tip(db_session, 'ahoy-band', '3.00')]
+    _payout(db_session, 'ahoy-band', paid, 'completed')
+    pending = _tip(db_session, 'ahoy-band', '10.00', artist_payout='9.50')
+    queued = _tip(db_session, 'sea-shanty', '2.00')
+    _payout(db_session, 'sea-shanty', [queued], 'pending')  # not completed: still owed
+    _tip(db_session, 'sea-shanty', '4.00')
+    db_session.commit()
+    return {'paid': paid, 'pending': pending}
+
+
+class TestPendingTotals:
+    """Test the grouped anti-join."""
+
+    def test_excludes_tips_in_completed_payouts(self, db_session, tips):
+        totals = pending_totals(db_session)
+        assert totals == {
+            'ahoy-band': {'total': Decimal('9.50'), 'tip_count': 1},
+            'sea-shanty': {'total': Decimal('6.00'), 'tip_count': 2},
+        }
+
+    def test_min_amount_and_filter(self, db_session, tips):
+        assert list(pending_totals(db_session, min_amount=Decimal('7.00'))) == ['ahoy-band']
+        assert list(pending_totals(db_session, artist_ids=['sea-shanty'])) == ['sea-shanty']
+
+    def test_pending_tips(self, db_session, tips):
+        by_artist = pending_tips(db_session, ['ahoy-band', 'sea-shanty'])
+        assert [t.id for t in by_artist['ahoy-band']] == [tips['pending'].id]
+        assert len(by_artist['sea-shanty']) == 2
+
+    def test_match_artists_tries_id_slug_name(self, db_session, tips):
+        matches = match_artists(ARTISTS, pending_totals(db_session))
+        assert [(a['name'], identifier) for a, identifier in matches] == [
+            ('Ahoy Band', 'ahoy-band'),
+            ('Sea Shanty', 'sea-shanty'),
+        ]
+
+
+class TestDailyPayoutScan:
+    """Test scripts/daily_payout_processor.py against the link table."""
+
+    def test_scan_is_two_queries(self, db_session, tips, count_queries, monkeypatch):
+        from scripts import daily_payout_processor as processor
+        monkeypatch.setattr(processor, 'load_all_artists', lambda: ARTISTS * 50)
+        artist_directory.get_directory()  # contact lookups come from the per-process cache
+
+        with count_queries() as statements:
+            results = processor.scan_pending_payouts(min_amount=Decimal('0.01'))
+
+        assert len(statements) == 2
+        assert results[0]['artist_name'] == 'Ahoy Band'
+        assert results[0]['total_pending'] == Decimal('9.50')
+
+    def test_payout_record_links_tips(self, db_session, tips):
+        from scripts.daily_payout_processor import create_payout_record
+        payout = create_payout_record('ahoy-band', Decimal('9.50'), [tips['pending'].id],
+                                      payment_method='stripe_connect', stripe_transfer_id='tr_123')
+
+        db_session.expire_all()
+        assert db_session.query(PayoutTip).filter_by(payout_id=payout.id).count() == 1
+        assert 'ahoy-band' not in pending_totals(db_session)
+
+
+class FakeStripe:
+    """Local stand-in for StripeTransferClient: idempotent on the key, scriptable errors."""
+
+    def __init__(self, errors=None, lost=None):
+        self.lock = threading.Lock()
+        self.transfers = {}  # idempotency key -> transfer id (Stripe forgets these after 24h)
+        self.groups = {}  # transfer_group -> transfer id
+        self.creates = []
+        self.errors = dict(errors or {})  # destination -> list of exceptions to raise in turn
+        self.lost = dict(lost or {})  # destination -> responses lost after the transfer was made
+
+    def create_transfer(self, amount_cents, destination, idempotency_key, transfer_group, description, metadata):
+        with self.lock:
+            self.creates.append((destination, amount_cents, idempotency_key))
+            pending = self.errors.get(destination)
+            if pending:
+                raise pending.pop(0)
+            if idempotency_key not in self.transfers:
+                self.transfers[idempotency_key] = f"tr_{len(self.creates)}"
+                self.groups.setdefault(transfer_group, self.transfers[idempotency_key])
+            if self.lost.get(destination):
+                self.lost[destination] -= 1
+                raise RetryableTransferError('connection reset')
+            return self.transfers[idempotency_key]
+
+    def find_transfer(self, transfer_group):
+        with self.lock:
+            return self.groups.get(transfer_group)
+
+
+def _run(db_session, client, **kwargs):
+    return execute_payouts(db_session, client=client, sleep=lambda _: None, **kwargs)
+
+
+class TestPayoutExecutor:
+    """Test services/payout_executor.py."""
+
+    def test_queue_is_idempotent_per_tip_set(self, db_session, tips):
+        tip_ids = [tips['pending'].id]
+        first = queue_payout(db_session, 'ahoy-band', Decimal('9.50'), tip_ids, 'acct_ahoy')
+        again = queue_payout(db_session, 'ahoy-band', Decimal('9.50'), tip_ids, 'acct_ahoy')
+        db_session.commit()
+
+        assert first.id == again.id
+        assert first.status == 'queued'
+        assert 'ahoy-band' not in pending_totals(db_session)  # queued payouts claim their tips
+
+    def test_executes_in_parallel_and_completes(self, db_session, tips):
+        sea_tips = pending_tips(db_session, ['sea-shanty'])['sea-shanty']
+        queue_payout(db_session, 'ahoy-band', Decimal('9.50'), [tips['pending'].id], 'acct_ahoy')
+        queue_payout(db_session, 'sea-shanty', Decimal('6.00'), [t.id for t in sea_tips], 'acct_sea')
+        db_session.commit()
+
+        fake = FakeStripe()
+        results = _run(db_session, fake, max_workers=2)
+
+        assert [r['status'] for r in results] == ['completed', 'completed']
+        assert sorted(c[:2] for c in fake.creates) == [('acct_ahoy', 950), ('acct_sea', 600)]
+        payouts = db_session.query(ArtistPayout).filter_by(status='completed').all()
+        assert {p.stripe_transfer_id for p in payouts} >= {'tr_1', 'tr_2'}
+        assert _run(db_session, fake) == []  # nothing left to send
+
+    def test_resumes_submitted_payout_without_paying_twice(self, db_session, tips):
+        payout = queue_payout(db_session, 'ahoy-band', Decimal('9.50'), [tips['pending'].id], 'acct_ahoy')
+        # A previous run crashed after Stripe accepted the transfer but before recording it
+        payout.status = 'submitted'
+        db_session.commit()
+        fake = FakeStripe()
+        fake.groups[payout.idempotency_key] = 'tr_earlier'
+
+        results = _run(db_session, fake)
+
+        assert results[0]['status'] == 'completed'
+        assert results[0]['transfer_id'] == 'tr_earlier'
+        assert fake.creates == []
+
+    def test_retries_rate_limits(self, db_session, tips):
+        queue_payout(db_session, 'ahoy-band', Decimal('9.50'), [tips['pending'].id], 'acct_ahoy')
+        db_session.commit()
+        fake = FakeStripe(errors={'acct_ahoy': [RetryableTransferError('rate limited')] * 2})
+
+        results = _run(db_session, fake)
+
+        assert results[0]['status'] == 'completed'
+        assert len(fake.creates) == 3
+        assert len({c[2] for c in fake.creates}) == 1  # same idempotency key every attempt
+
+    def test_exhausted_retries_stay_submitted(self, db_session, tips):
+        queue_payout(db_session, 'ahoy-band', Decimal('9.50'), [tips['pending'].id], 'acct_ahoy')
+        db_session.commit()
+        fake = FakeStripe(errors={'acct_ahoy': [RetryableTransferError('rate limited')] * 3})
+
+        results = _run(db_session, fake, max_retries=2)
+
+        assert results[0]['status'] == 'submitted'
+        assert _run(db_session, fake)[0]['status'] == 'completed'
+
+    def test_unconfirmed_transfer_is_not_paid_twice(self, db_session, tips):
+        payout = queue_payout(db_session, 'ahoy-band', Decimal('9.50'), [tips['pending'].id], 'acct_ahoy')
+        db_session.commit()
+        # Stripe makes the transfer, but every response is lost on the way back
+        fake = FakeStripe(lost={'acct_ahoy': 3})
+
+        assert _run(db_session, fake, max_retries=2)[0]['status'] == 'submitted'
+        made = fake.groups[payout.idempotency_key]
+
+        fake.transfers.clear()  # next day: the idempotency key has expired
+        results = _run(db_session, fake)
+        assert results[0]['status'] == 'completed'
+        assert results[0]['transfer_id'] == made
+        assert len(fake.creates) == 3  # nothing sent after the lost responses
+
+    def test_requeued_round_finds_earlier_transfer(self, db_session, tips):
+        tip_ids = [tips['pending'].id]
+        payout = queue_payout(db_session, 'ahoy-band', Decimal('9.50'), tip_ids, 'acct_ahoy')
+        db_session.commit()
+        fake = FakeStripe()
+        fake.groups[payout.idempotency_key] = 'tr_round0'  # made in round 0, recorded as failed
+        payout.status = 'failed'
+        db_session.commit()
+
+        queue_payout(db_session, 'ahoy-band', Decimal('9.50'), tip_ids, 'acct_ahoy')
+        db_session.commit()
+        assert _run(db_session, fake)[0]['transfer_id'] == 'tr_round0'
+        assert fake.creates == []
+
+    def test_failed_transfer_releases_tips_and_requeues_with_new_key(self, db_session, tips):
+        tip_ids = [tips['pending'].id]
+        payout = queue_payout(db_session, 'ahoy-band', Decimal('9.50'), tip_ids, 'acct_ahoy')
+        db_session.commit()
+        first_key = stripe_key(payout)
+        fake = FakeStripe(errors={'acct_ahoy': [TransferError('account closed')]})
+
+        assert _run(db_session, fake)[0]['status'] == 'failed'
+        assert 'ahoy-band' in pending_totals(db_session)
+
+        again = queue_payout(db_session, 'ahoy-band', Decimal('9.50'), tip_ids, 'acct_ahoy')
+        db_session.commit()
+        assert again.id == payout.id
+        assert again.retry_round == 1
+        assert stripe_key(again) != first_key
+        assert _run(db_session, fake)[0]['status'] == 'completed'
+
+    def test_daily_processor_uses_executor(self, db_session, tips, monkeypatch):
+        from scripts import daily_payout_processor as processor
+        monkeypatch.setattr(processor, 'load_all_artists', lambda: ARTISTS)
+        monkeypatch.setattr(processor, '_get_artist_stripe_account',
+                            lambda artist_id: 'acct_ahoy' if artist_id == 'ahoy-band' else None)
+
+        results = processor.scan_pending_payouts()
+        fake = FakeStripe()
+        summary = processor.process_payouts(results, auto_process=True, client=fake)
+
+        assert [p['artist_id'] for p in summary['processed']] == ['ahoy-band']
+        assert summary['processed'][0]['transfer_id'] == 'tr_1'
+        assert [m['artist_id'] for m in summary['manual']] == ['sea-shanty']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for per-show podcast RSS feeds (/feeds/podcasts/<slug>.xml, services/podcast_feed.py).
+"""
+
+import gzip
+from datetime import datetime, timedelta, timezone
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from models import PodcastEpisode, PodcastShow
+from services import content_db, podcast_feed
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+ITUNES = '{http://www.itunes.com/dtds/podcast-1.0.dtd}'
+
+
+@pytest.fixture
+def show(db_session, monkeypatch):
+    monkeypatch.setenv('BASE_URL', 'https://ahoy.test')
+    monkeypatch.setattr(podcast_feed, '_cache', None)
+    db_session.add(PodcastShow(slug='dock-talk', title='Dock Talk', description='Harbor chat',
+                               artwork='/static/img/dock.jpg', last_updated='2026-01-01', position=0))
+    db_session.add_all([
+        PodcastEpisode(episode_id=f'ep-{n}', show_slug='dock-talk', title=f'Episode {n}',
+                       date=f'2026-0{n}-01', duration_seconds=600 + n, position=n,
+                       audio_url=f'https://storage.googleapis.com/ahoy/podcasts/dock-talk/ep-{n}.mp3')
+        for n in range(1, 6)
+    ])
+    db_session.commit()
+    content_db.invalidate_cache()
+    yield db_session
+    content_db.invalidate_cache()
+
+
+@pytest.fixture
+def client(app, show):
+    from app import app as module_app
+    return module_app.test_client()
+
+
+def _channel(body):
+    return ET.fromstring(body).find('channel')
+
+
+class TestPodcastFeed:
+    def test_feed_contents(self, client):
+        response = client.get('/feeds/podcasts/dock-talk.xml', headers={'Accept-Encoding': 'identity'})
+        assert response.status_code == 200
+        assert response.mimetype == 'application/rss+xml'
+        channel = _channel(response.data)
+        assert channel.find('title').text == 'Dock Talk'
+        assert channel.find(f'{ITUNES}image').get('href') == 'https://ahoy.test/static/img/dock.jpg'
+        items = channel.findall('item')
+        assert [i.find('title').text for i in items] == [f'Episode {n}' for n in range(5, 0, -1)]
+        enclosure = items[0].find('enclosure')
+        assert enclosure.get('url').endswith('/dock-talk/ep-5.mp3')
+        assert enclosure.get('type') == 'audio/mpeg'
+        assert items[0].find('pubDate').text == 'Fri, 01 May 2026 00:00:00 +0000'
+        assert items[0].find(f'{ITUNES}duration').text == '605'
+        assert channel.find('lastBuildDate').text == 'Fri, 01 May 2026 00:00:00 +0000'
+
+    def test_conditional_and_gzip(self, client, monkeypatch):
+        first = client.get('/feeds/podcasts/dock-talk.xml', headers={'Accept-Encoding': 'gzip'})
+        assert first.headers['Content-Encoding'] == 'gzip'
+        assert _channel(gzip.decompress(first.data)).find('title').text == 'Dock Talk'
+
+        monkeypatch.setattr(podcast_feed, 'render_item', lambda *a: pytest.fail('re-rendered a cached feed'))
+        again = client.get('/feeds/podcasts/dock-talk.xml', headers={
+            'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+        assert again.status_code == 304
+        since = client.get('/feeds/podcasts/dock-talk.xml', headers={
+            'Accept-Encoding': 'gzip', 'If-Modified-Since': first.headers['Last-Modified']})
+        assert since.status_code == 304
+
+    def test_new_episode_renders_one_item(self, client, show, monkeypatch):
+        first = client.get('/feeds/podcasts/dock-talk.xml')
+        rendered = []
+        original = podcast_feed.render_item
+        monkeypatch.setattr(podcast_feed, 'render_item', lambda *a: rendered.append(a[1]['id']) or original(*a))
+
+        show.add(PodcastEpisode(episode_id='ep-6', show_slug='dock-talk', title='Episode 6',
+                                date='2026-06-01', position=6))
+        show.commit()
+        content_db.invalidate_cache()
+        response = client.get('/feeds/podcasts/dock-talk.xml', headers={'If-None-Match': first.headers['ETag']})
+        assert response.status_code == 200
+        assert rendered == ['ep-6']
+        assert _channel(response.data).find('item/title').text == 'Episode 6'
+
+    def test_last_modified_tracks_the_bytes(self, client, show, monkeypatch):
+        first = client.get('/feeds/podcasts/dock-talk.xml')
+        content_db.invalidate_cache()  # new content version, same bytes
+        unchanged = client.get('/feeds/podcasts/dock-talk.xml')
+        assert unchanged.headers['Last-Modified'] == first.headers['Last-Modified']
+
+        later = datetime.now(timezone.utc) + timedelta(minutes=5)
+        monkeypatch.setattr(podcast_feed, 'datetime', type('FrozenDatetime', (datetime,), {
+            'now': staticmethod(lambda tz=None: later)}))
+        episode = show.query(PodcastEpisode).filter_by(episode_id='ep-5').one()
+        episode.title = 'Episode 5 (fixed)'  # same-day edit: the newest date doesn't move
+        show.commit()
+        content_db.invalidate_cache()
+        response = client.get('/feeds/podcasts/dock-talk.xml', headers={
+            'If-Modified-Since': first.headers['Last-Modified']})
+        assert response.status_code == 200
+        assert _channel(response.data).find('item/title').text == 'Episode 5 (fixed)'
+
+    def test_paging(self, client, monkeypatch):
+        monkeypatch.setenv('PODCAST_FEED_PAGE_SIZE', '2')
+        channel = _channel(client.get('/feeds/podcasts/dock-talk.xml').data)
+        links = {l.get('rel'): l.get('href') for l in channel.findall(f'{ATOM}link')}
+        assert links['next'] == 'https://ahoy.test/feeds/podcasts/dock-talk.xml?page=2'
+        assert links['last'] == 'https://ahoy.test/feeds/podcasts/dock-talk.xml?page=3'
+        assert 'previous' not in links
+
+        last = _channel(client.get('/feeds/podcasts/dock-talk.xml?page=3').data)
+        assert [i.find('title').text for i in last.findall('item')] == ['Episode 1']
+        assert client.get('/feeds/podcasts/dock-talk.xml?page=4').status_code == 404
+
+    def test_unknown_show(self, client):
+        assert client.get('/feeds/podcasts/nope.xml').status_code == 404
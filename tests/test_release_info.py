@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for the cached GitHub release metadata (services/release_info.py).
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from services import release_info
+
+RELEASE = {
+    'tag_name': 'v1.4.0',
+    'published_at': '2026-09-01T12:00:00Z',
+    'assets': [
+        {'name': 'Ahoy-1.4.0-arm64-mac.zip', 'size': 1024,
+         'browser_download_url': 'https://github.com/x/releases/Ahoy-1.4.0-arm64-mac.zip'},
+        {'name': 'Ahoy-Setup-1.4.0.exe', 'size': 2048,
+         'browser_download_url': 'https://github.com/x/releases/Ahoy-Setup-1.4.0.exe'},
+    ],
+}
+PATH = '/repos/ahoy/app/releases/latest'
+
+
+@pytest.fixture
+def github(media_server, monkeypatch):
+    media_server.files[PATH] = json.dumps(RELEASE).encode('utf-8')
+    monkeypatch.setenv('GITHUB_API_URL', media_server.url(''))
+    return media_server
+
+
+def _wait_idle(cache, timeout=5):
+    deadline = time.time() + timeout
+    while cache._refreshing and time.time() < deadline:
+        time.sleep(0.01)
+
+
+class TestReleaseCache:
+    def test_cached_within_ttl(self, github):
+        cache = release_info.ReleaseCache('ahoy/app', ttl=600)
+        assert cache.get()['tag_name'] == 'v1.4.0'
+        for _ in range(5):
+            cache.get()
+        assert len(github.requests) == 1
+
+    def test_revalidates_with_etag(self, github):
+        cache = release_info.ReleaseCache('ahoy/app', ttl=0)
+        first = cache.get()
+        _wait_idle(cache)
+        assert cache.get() is first  # served while the refresh runs
+        _wait_idle(cache)
+        assert github.requests[-1][2]['If-None-Match'] == github.etag(github.files[PATH])
+        assert cache.get() is first  # 304 keeps the cached copy
+
+    def test_stale_on_error_with_backoff(self, github):
+        cache = release_info.ReleaseCache('ahoy/app', ttl=0)
+        assert cache.get()
+        _wait_idle(cache)
+
+        def failing(*args, **kwargs):
+            raise release_info.ReleaseFetchError('boom')
+
+        cache._fetch = failing
+        assert cache.get()['tag_name'] == 'v1.4.0'
+        _wait_idle(cache)
+        assert cache.last_error == 'boom'
+        assert cache._next_refresh > time.time() + 30
+        assert cache.get()['tag_name'] == 'v1.4.0'
+
+    def test_rate_limit_waits_for_reset(self):
+        reset = time.time() + 3600
+
+        def throttled(*args, **kwargs):
+            raise release_info.ReleaseFetchError('GitHub returned 403', retry_at=reset)
+
+        cache = release_info.ReleaseCache('ahoy/app', ttl=0, fetch=throttled)
+        assert cache.get() is None
+        _wait_idle(cache)
+        assert cache._next_refresh == reset
+
+    def test_slow_github_does_not_block(self):
+        release = threading.Event()
+
+        def slow(*args, **kwargs):
+            release.wait(5)
+            return RELEASE, '"v1"', True
+
+        cache = release_info.ReleaseCache('ahoy/app', ttl=600, fetch=slow, first_wait=0.05)
+        started = time.time()
+        assert cache.get() is None
+        assert cache.get() is None
+        assert time.time() - started < 1
+        release.set()
+        _wait_idle(cache)
+        assert cache.get() == RELEASE
+
+
+def test_api_downloads_latest(app, github, monkeypatch):
+    from app import app as module_app
+    cache = release_info.ReleaseCache('ahoy/app', ttl=600)
+    monkeypatch.setattr(release_info, 'get_release_cache', lambda repo=None: cache)
+    client = module_app.test_client()
+    for _ in range(3):
+        data = client.get('/api/downloads/latest').get_json()
+        assert data['version'] == '1.4.0'
+        assert data['name'] == 'Ahoy-1.4.0-arm64-mac.zip'
+    assert b'Ahoy-Setup-1.4.0.exe' in client.get('/downloads').data
+    assert len(github.requests) == 1
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Event retention tests for Ahoy Indie Media
+
+Tests cover:
+- Archive-and-delete of expired months (SQLite path)
+- Rollups keep counting pruned months, including after a full refresh
+"""
+
+import gzip
+import json
+import pytest
+from datetime import datetime, timedelta
+
+from models import User, PlayHistory, AnalyticsEvent, StatsRollup, AnalyticsDailyPath, RetentionWatermark
+from services.retention import (
+    add_months, archive_path, archive_rows, month_start, retention_cutoff, run_retention,
+)
+from services.rollups import refresh_rollups
+
+
+@pytest.fixture
+def listener(db_session):
+    user = User(email='listener@example.com', password_hash='x', created_at=datetime.utcnow())
+    db_session.add(user)
+    db_session.commit()
+    db_session.refresh(user)
+    return user
+
+
+def _seed(db_session, user):
+    """Three plays and page views 15 months ago, two this month."""
+    old = add_months(month_start(datetime.utcnow()), -15) + timedelta(days=3)
+    for when, n in [(old, 3), (datetime.utcnow(), 2)]:
+        for _ in range(n):
+            db_session.add(PlayHistory(user_id=user.id, media_id='song_1', media_type='track', played_at=when))
+            db_session.add(AnalyticsEvent(event_type='page_view', path='/radio', created_at=when))
+    db_session.commit()
+    return old
+
+
+def _rollup_plays(db_session):
+    db_session.expire_all()
+    return sum(r.count for r in db_session.query(StatsRollup).filter_by(metric='plays'))
+
+
+class TestRetention:
+    """Test pruning expired months."""
+
+    def test_cutoff_counts_current_month(self):
+        assert retention_cutoff(1, now=datetime(2026, 3, 15)) == datetime(2026, 3, 1)
+        assert retention_cutoff(13, now=datetime(2026, 3, 15)) == datetime(2025, 3, 1)
+
+    def test_prune_archives_and_summarizes(self, db_session, listener, tmp_path):
+        """Expired rows are archived, deleted and still counted by the rollups."""
+        old = _seed(db_session, listener)
+
+        reports = run_retention(keep_months=13, tables=['play_history', 'analytics_events'],
+                                archive_dir=str(tmp_path))
+        assert [r['rows_deleted'] for r in reports] == [3, 3]
+
+        db_session.expire_all()
+        assert db_session.query(PlayHistory).count() == 2
+        assert db_session.get(RetentionWatermark, 'play_history').pruned_before == retention_cutoff(13)
+
+        archive = archive_path(str(tmp_path), 'play_history', f"{old:%Y-%m}", retention_cutoff(13))
+        with gzip.open(archive, 'rt') as fh:
+            rows = [json.loads(line) for line in fh]
+        assert len(rows) == 3 and rows[0]['media_id'] == 'song_1'
+
+        # Pruned months survive both the trailing refresh and a full rebuild
+        assert _rollup_plays(db_session) == 3
+        refresh_rollups(full=True)
+        assert _rollup_plays(db_session) == 5
+        paths = db_session.query(AnalyticsDailyPath).filter(AnalyticsDailyPath.day == old.date()).one()
+        assert paths.count == 3
+
+    def test_rerun_is_noop(self, db_session, listener, tmp_path):
+        """A second run past the same watermark deletes nothing."""
+        _seed(db_session, listener)
+        run_retention(keep_months=13, tables=['play_history'], archive_dir=str(tmp_path))
+        reports = run_retention(keep_months=13, tables=['play_history'], archive_dir=str(tmp_path))
+        assert reports[0]['rows_deleted'] == 0
+
+    def test_failed_run_is_not_archived_twice(self, db_session, listener, tmp_path):
+        """Archives from a run that never committed are replaced, not appended to."""
+        _seed(db_session, listener)
+        # What a run whose delete/watermark commit failed leaves behind
+        archive_rows(db_session, 'play_history', retention_cutoff(13), str(tmp_path))
+        db_session.rollback()
+
+        run_retention(keep_months=13, tables=['play_history'], archive_dir=str(tmp_path))
+        files = list((tmp_path / 'play_history').iterdir())
+        assert len(files) == 1
+        with gzip.open(files[0], 'rt') as fh:
+            assert len(fh.readlines()) == 3
+
+    def test_dry_run_changes_nothing(self, db_session, listener, tmp_path):
+        _seed(db_session, listener)
+        run_retention(keep_months=13, dry_run=True, archive_dir=str(tmp_path))
+        db_session.expire_all()
+        assert db_session.query(PlayHistory).count() == 5
+        assert db_session.query(RetentionWatermark).count() == 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the generated sitemap (/sitemap.xml, services/sitemap.py).
+"""
+
+import gzip
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from services import content_db, sitemap
+
+NS = {'sm': sitemap.XMLNS}
+CONTENT = {
+    'tracks': [
+        {'id': 't1', 'artist_slug': 'sea-shanty', 'added_date': '2026-03-04'},
+        {'id': 't2', 'artist_slug': 'sea-shanty', 'added_date': '2025-12-01T10:00:00Z'},
+    ],
+    'shows': [{'id': 's1', 'published_date': '2026-02-01'}],
+    'artists': [
+        {'id': 'a1', 'name': 'Sea Shanty', 'slug': 'sea-shanty', 'updated_at': '2026-01-10'},
+        {'id': 'a2', 'name': 'Low Tide', 'albums': [{'release_date': '2024-05-05'}]},
+    ],
+    'podcasts': [{'slug': 'dock-talk', 'last_updated': '2026-01-01',
+                  'episodes': [{'date': '2026-04-01'}]}],
+    'events': [{'id': 'fall fest', 'date': '2099-10-01'}],
+    'whats_new': {'2026': {'March': {'music': {'items': [{'date': '2026-03-15'}]}}}},
+}
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    calls = []
+
+    def fake_catalog():
+        calls.append(1)
+        return CONTENT
+
+    monkeypatch.setattr(sitemap, 'catalog', fake_catalog)
+    monkeypatch.setattr(sitemap, '_cached', None)
+    monkeypatch.setenv('BASE_URL', 'https://ahoy.test')
+    return calls
+
+
+@pytest.fixture
+def client(app, catalog):
+    from app import app as module_app
+    return module_app.test_client()
+
+
+def _urls(body):
+    root = ET.fromstring(body)
+    return {
+        u.find('sm:loc', NS).text: getattr(u.find('sm:lastmod', NS), 'text', None)
+        for u in root.findall('sm:url', NS)
+    }
+
+
+class TestSitemap:
+    def test_urls_and_lastmod(self, catalog):
+        urls = _urls(sitemap.get_document('sitemap.xml').body)
+        assert urls['https://ahoy.test/artist/sea-shanty'] == '2026-03-04'
+        assert urls['https://ahoy.test/artist/low-tide'] == '2024-05-05'
+        assert urls['https://ahoy.test/podcasts/dock-talk'] == '2026-04-01'
+        assert urls['https://ahoy.test/events/fall%20fest'] is None  # upcoming: no lastmod
+        assert urls['https://ahoy.test/whats-new/2026/march'] == '2026-03-15'
+        assert urls['https://ahoy.test/music'] == '2026-03-04'
+        assert urls['https://ahoy.test/'] == '2026-04-01'
+        assert 'https://ahoy.test/privacy' in urls
+
+    def test_cached_per_content_version(self, catalog):
+        first = sitemap.get_documents()
+        assert sitemap.get_documents() is first
+        content_db.invalidate_cache()
+        assert sitemap.get_documents() is not first
+
+    def test_sharded_index(self):
+        urls = [sitemap.Url(f'/artist/a{i}', f'2026-01-0{i + 1}') for i in range(5)]
+        docs = sitemap.render(urls, 'https://ahoy.test', max_urls=2)
+        assert sorted(docs) == ['sitemap-1.xml', 'sitemap-2.xml', 'sitemap-3.xml', 'sitemap.xml']
+        index = ET.fromstring(docs['sitemap.xml'].body)
+        entries = [(s.find('sm:loc', NS).text, s.find('sm:lastmod', NS).text)
+                   for s in index.findall('sm:sitemap', NS)]
+        assert entries[0] == ('https://ahoy.test/sitemap-1.xml', '2026-01-02')
+        assert len(_urls(docs['sitemap-3.xml'].body)) == 1
+
+
+def test_sitemap_route(client, monkeypatch):
+    plain = client.get('/sitemap.xml', headers={'Accept-Encoding': 'identity'})
+    assert plain.status_code == 200
+    assert plain.mimetype == 'application/xml'
+    assert 'https://ahoy.test/artist/sea-shanty' in _urls(plain.data)
+
+    zipped = client.get('/sitemap.xml', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(zipped.data) == plain.data
+    assert zipped.headers['ETag'] != plain.headers['ETag']
+
+    monkeypatch.setattr(sitemap, 'render', lambda *a: pytest.fail('rebuilt an unchanged sitemap'))
+    again = client.get('/sitemap.xml', headers={'If-None-Match': plain.headers['ETag'],
+                                                'Accept-Encoding': 'identity'})
+    assert again.status_code == 304
+    assert client.get('/sitemap-2.xml').status_code == 404
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tests for static serving from the metadata index (services/static_files.py).
+"""
+
+import gzip
+import os
+
+import pytest
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request
+
+from services import static_files
+from services.static_files import StaticIndex
+
+JS = b'console.log("ahoy");\n' * 200
+
+
+def _request(**headers):
+    return Request(EnvironBuilder(path='/x', headers=headers).get_environ())
+
+
+def _body(response):
+    return b''.join(response.iter_encoded())
+
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / 'index-BxY3k9aZ.js').write_bytes(JS)
+    (tmp_path / 'index-BxY3k9aZ.js.gz').write_bytes(gzip.compress(JS))
+    (tmp_path / 'index-BxY3k9aZ.js.br').write_bytes(b'brotli-bytes')
+    (tmp_path / 'Ahoy-Setup-1.4.0.exe').write_bytes(bytes(range(256)) * 40)
+    return tmp_path
+
+
+class TestStaticIndex:
+    def test_precompressed_sibling_by_accept_encoding(self, root):
+        index = StaticIndex(root, precompressed=True, hashed_names=True)
+        br = index.serve('index-BxY3k9aZ.js', _request(**{'Accept-Encoding': 'gzip, br'}))
+        assert br.headers['Content-Encoding'] == 'br'
+        assert _body(br) == b'brotli-bytes'
+        assert 'Accept-Encoding' in br.headers['Vary']
+        assert br.headers['Cache-Control'] == static_files.IMMUTABLE
+
+        gz = index.serve('index-BxY3k9aZ.js', _request(**{'Accept-Encoding': 'gzip'}))
+        assert gz.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(_body(gz)) == JS
+        assert gz.get_etag() != br.get_etag()
+
+        plain = index.serve('index-BxY3k9aZ.js', _request(**{'Accept-Encoding': 'identity'}))
+        assert 'Content-Encoding' not in plain.headers
+        assert _body(plain) == JS
+        assert plain.mimetype == 'text/javascript'
+
+    def test_stale_sibling_is_ignored(self, root):
+        src = root / 'index-BxY3k9aZ.js'
+        st = src.stat()
+        os.utime(root / 'index-BxY3k9aZ.js.br', (st.st_atime - 100, st.st_mtime - 100))
+        index = StaticIndex(root, precompressed=True)
+        response = index.serve('index-BxY3k9aZ.js', _request(**{'Accept-Encoding': 'br, gzip'}))
+        assert response.headers['Content-Encoding'] == 'gzip'
+
+    def test_range_and_if_range(self, root):
+        index = StaticIndex(root)
+        data = (root / 'Ahoy-Setup-1.4.0.exe').read_bytes()
+        partial = index.serve('Ahoy-Setup-1.4.0.exe', _request(Range='bytes=100-299'), as_attachment=True)
+        assert partial.status_code == 206
+        assert partial.headers['Content-Range'] == f'bytes 100-299/{len(data)}'
+        assert _body(partial) == data[100:300]
+        assert 'attachment' in partial.headers['Content-Disposition']
+
+        etag = partial.headers['ETag']
+        assert index.serve('Ahoy-Setup-1.4.0.exe', _request(Range='bytes=100-', **{'If-Range': etag})).status_code == 206
+        stale = index.serve('Ahoy-Setup-1.4.0.exe', _request(Range='bytes=100-', **{'If-Range': '"old"'}))
+        assert stale.status_code == 200
+        assert _body(stale) == data
+        with pytest.raises(RequestedRangeNotSatisfiable):
+            index.serve('Ahoy-Setup-1.4.0.exe', _request(Range=f'bytes={len(data) + 10}-'))
+
+    def test_conditional_and_cache_control(self, root):
+        index = StaticIndex(root)
+        first = index.serve('Ahoy-Setup-1.4.0.exe', _request())
+        assert first.headers['Cache-Control'] == 'no-cache'
+        assert first.headers['Accept-Ranges'] == 'bytes'
+        again = index.serve('Ahoy-Setup-1.4.0.exe', _request(**{'If-None-Match': first.headers['ETag']}))
+        assert again.status_code == 304
+        assert index.serve('Ahoy-Setup-1.4.0.exe', _request(), max_age=60).headers['Cache-Control'] == 'public, max-age=60'
+
+    def test_metadata_is_cached(self, root, monkeypatch):
+        index = StaticIndex(root, precompressed=True, ttl=60)
+        index.serve('index-BxY3k9aZ.js', _request())
+        monkeypatch.setattr(static_files.os, 'stat', lambda *a: pytest.fail('re-stat within the TTL'))
+        assert index.serve('index-BxY3k9aZ.js', _request()).status_code == 200
+
+    def test_missing_and_outside_root(self, root):
+        index = StaticIndex(root)
+        assert index.serve('nope.js', _request()) is None
+        assert index.serve('../secret', _request()) is None
+        (root / 'gone.js').write_bytes(b'x')
+        index.lookup('gone.js')
+        (root / 'gone.js').unlink()
+        assert index.serve('gone.js', _request()) is None
+
+    def test_immutable_only_in_hashed_index(self, root):
+        (root / 'ahoy-fall2025-favicon.png').write_bytes(b'png')
+        plain = StaticIndex(root)
+        assert plain.serve('ahoy-fall2025-favicon.png', _request(), max_age=60).headers['Cache-Control'] == 'public, max-age=60'
+        assert plain.serve('index-BxY3k9aZ.js', _request()).headers['Cache-Control'] == 'no-cache'
+        hashed = StaticIndex(root, hashed_names=True)
+        assert hashed.serve('index-BxY3k9aZ.js', _request()).headers['Cache-Control'] == static_files.IMMUTABLE
+
+    def test_hashed_names(self):
+        assert static_files.is_hashed('AboutView-C8Pko-gq.css')
+        assert static_files.is_hashed('index-BxY3k9aZ.js')
+        assert not static_files.is_hashed('service-worker.js')
+        assert not static_files.is_hashed('default-avatar.png')
+
+
+def test_spa_assets_route(app, root, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, '_SPA_ASSETS_INDEX', StaticIndex(root, precompressed=True, hashed_names=True))
+    monkeypatch.setattr(app_module, '_spa_dist_ready', lambda: True)
+    client = app_module.app.test_client()
+    response = client.get('/assets/index-BxY3k9aZ.js', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == JS
+    assert response.headers['Cache-Control'] == static_files.IMMUTABLE
+    assert client.get('/assets/missing-12345678.js').status_code == 404
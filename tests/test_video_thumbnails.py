@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the thumbnail pipeline (scripts/extract_video_thumbnails.py).
+"""
+
+import json
+
+import pytest
+
+from models import ContentVideo, Show
+from scripts import extract_video_thumbnails as evt
+
+SHARED = 'https://storage.googleapis.com/ahoy-videos/shared.mp4'
+OTHER = 'https://storage.googleapis.com/ahoy-videos/other.mp4'
+
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    monkeypatch.setattr(evt, 'THUMBNAILS_DIR', tmp_path / 'thumbnails')
+    monkeypatch.setattr(evt, 'SHOWS_JSON', tmp_path / 'shows.json')
+    monkeypatch.setattr(evt, 'VIDEOS_JSON', tmp_path / 'videos.json')
+    return tmp_path
+
+
+@pytest.fixture
+def extractions(paths, monkeypatch):
+    """Record extractions and write placeholder files instead of running ffmpeg."""
+    calls = []
+
+    def fake_extract(video_url, video_hash, seek_seconds=5, formats=None):
+        calls.append(video_url)
+        evt.ensure_thumbnails_dir()
+        for ext, _, _ in formats:
+            for width in evt.THUMBNAIL_WIDTHS:
+                (evt.THUMBNAILS_DIR / evt.thumbnail_filename(video_hash, width, ext)).write_bytes(b'img')
+        return evt.variants_for(video_hash, formats)
+
+    monkeypatch.setattr(evt, 'extract_thumbnail_from_video', fake_extract)
+    monkeypatch.setattr(evt, 'available_formats', lambda: evt.THUMBNAIL_FORMATS[1:])  # webp + jpg
+    return calls
+
+
+class TestThumbnailPipeline:
+    def test_ffmpeg_seeks_by_input_option_and_decodes_once(self):
+        outputs = [(320, ['-c:v', 'libwebp'], 'a.webp'), (1280, ['-c:v', 'mjpeg'], 'b.jpg')]
+        cmd = evt.build_ffmpeg_command(SHARED, outputs, seek_seconds=7)
+        assert cmd.count('ffmpeg') == 1
+        assert cmd.index('-ss') < cmd.index('-i')
+        assert cmd[cmd.index('-ss') + 1] == '7'
+        assert 'split=2' in cmd[cmd.index('-filter_complex') + 1]
+        assert cmd[-1] == 'b.jpg' and 'a.webp' in cmd
+
+    def test_concurrent_checks(self, media_server):
+        media_server.files['/ok.jpg'] = b'img'
+        results = evt.check_thumbnails([media_server.url('/ok.jpg'), media_server.url('/gone.jpg'),
+                                        media_server.url('/ok.jpg')], workers=4)
+        assert results == {media_server.url('/ok.jpg'): True, media_server.url('/gone.jpg'): False}
+        assert all(method == 'HEAD' for method, _, _ in media_server.requests)
+
+    def test_dedupes_and_writes_json_and_db(self, db_session, paths, extractions):
+        (paths / 'shows.json').write_text(json.dumps({'shows': [
+            {'id': 'ep1', 'video_url': SHARED, 'thumbnail': ''},
+            {'id': 'ep1-trailer', 'trailer_url': SHARED, 'thumbnail': ''},
+            {'id': 'ep2', 'video_url': OTHER, 'thumbnail': 'https://cdn.example.com/keep.jpg'},
+        ]}))
+        db_session.add_all([
+            Show(show_id='ep1', video_url=SHARED, thumbnail=''),
+            ContentVideo(video_id='v1', url=SHARED, status='available', thumbnail=''),
+            ContentVideo(video_id='v2', url=OTHER, status='coming_soon', thumbnail=''),
+        ])
+        db_session.commit()
+
+        assert evt.process_thumbnails() == 4
+        assert extractions == [SHARED]  # one ffmpeg run for four records
+
+        video_hash = evt.get_video_hash(SHARED)
+        primary = f'/static/thumbnails/{video_hash}-1280.jpg'
+        shows = json.loads((paths / 'shows.json').read_text())['shows']
+        assert [s['thumbnail'] for s in shows] == [primary, primary, 'https://cdn.example.com/keep.jpg']
+        assert shows[0]['thumbnail_variants']['webp']['320'] == f'/static/thumbnails/{video_hash}-320.webp'
+        assert not (paths / 'videos.json').exists()
+
+        db_session.expire_all()
+        show = db_session.query(Show).filter_by(show_id='ep1').one()
+        assert show.thumbnail == primary
+        assert set(show.extra_fields['thumbnail_variants']) == {'webp', 'jpg'}
+        assert db_session.query(ContentVideo).filter_by(video_id='v1').one().thumbnail == primary
+        assert db_session.query(ContentVideo).filter_by(video_id='v2').one().thumbnail == ''
+
+    def test_existing_files_are_reused(self, db_session, paths, extractions):
+        (paths / 'videos.json').write_text(json.dumps({'videos': [
+            {'id': 'v1', 'url': SHARED, 'status': 'available', 'thumbnail': ''},
+        ]}))
+        assert evt.process_thumbnails(use_db=False) == 1
+        assert evt.process_thumbnails(use_db=False, force=True) == 0  # nothing changed
+        assert evt.process_thumbnails(use_db=False) == 0
+        assert extractions == [SHARED, SHARED]  # --force re-extracts; the plain run found nothing to do
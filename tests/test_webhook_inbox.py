@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Webhook inbox tests for Ahoy Indie Media
+
+Tests cover:
+- Endpoints store events and acknowledge without fulfilling inline
+- Deduplication by source and Stripe event id
+- Draining fulfils events exactly once
+- Retry with backoff and the failed state (services/webhook_inbox.py)
+"""
+
+import pytest
+import json
+from decimal import Decimal
+from datetime import datetime, timedelta
+
+from models import Tip, User, WebhookEvent, WalletTransaction
+from services import webhook_inbox
+from services.ledger import artist_balance
+
+
+def _wallet_event(user_id, event_id='evt_wallet_1'):
+    return {
+        'id': event_id,
+        'type': 'checkout.session.completed',
+        'data': {'object': {
+            'id': 'cs_wallet_1',
+            'metadata': {'type': 'wallet_fund', 'user_id': str(user_id), 'amount': '20.00'},
+        }},
+    }
+
+
+def _post(client, url, event):
+    return client.post(url, data=json.dumps(event), content_type='application/json')
+
+
+class TestWebhookInbox:
+    """Test the durable inbox behind the Stripe webhook endpoints."""
+
+    def test_acknowledges_then_drain_fulfils_once(self, client, db_session, test_user):
+        event = _wallet_event(test_user.id)
+        assert _post(client, '/webhooks/stripe', event).status_code == 200
+        assert _post(client, '/webhooks/stripe', event).status_code == 200  # Stripe redelivery
+
+        db_session.expire_all()
+        assert db_session.query(WebhookEvent).count() == 1
+        assert db_session.get(User, test_user.id).wallet_balance == Decimal('100.00')  # not fulfilled inline
+
+        assert webhook_inbox.drain() == {'done': 1}
+        assert webhook_inbox.drain() == {}
+
+        db_session.expire_all()
+        assert db_session.get(User, test_user.id).wallet_balance == Decimal('120.00')
+        assert db_session.query(WalletTransaction).filter_by(reference_id='cs_wallet_1').count() == 1
+        assert db_session.get(WebhookEvent, ('webhooks', 'evt_wallet_1')).status == 'done'
+
+    def test_wallet_credit_is_idempotent_across_events(self, client, db_session, test_user):
+        """Two distinct events for the same checkout session credit once."""
+        _post(client, '/webhooks/stripe', _wallet_event(test_user.id, 'evt_a'))
+        _post(client, '/webhooks/stripe', _wallet_event(test_user.id, 'evt_b'))
+        assert webhook_inbox.drain() == {'done': 2}
+
+        db_session.expire_all()
+        assert db_session.get(User, test_user.id).wallet_balance == Decimal('120.00')
+
+    def test_event_sent_to_both_endpoints(self, client, db_session, test_user, monkeypatch):
+        """Each endpoint keeps and processes its own copy; the first to arrive doesn't win."""
+        import stripe
+        monkeypatch.setattr(stripe, 'api_key', 'sk_test_inbox')
+        monkeypatch.delenv('STRIPE_WEBHOOK_SECRET', raising=False)
+        event = _wallet_event(test_user.id)
+        assert _post(client, '/payments/webhook', event).status_code == 200
+        assert _post(client, '/webhooks/stripe', event).status_code == 200
+
+        assert webhook_inbox.drain() == {'done': 2}
+        db_session.expire_all()
+        assert {row.source for row in db_session.query(WebhookEvent)} == {'payments', 'webhooks'}
+        assert db_session.get(User, test_user.id).wallet_balance == Decimal('120.00')
+
+    def test_payments_webhook_records_boost(self, client, db_session, test_user, monkeypatch):
+        import stripe
+        monkeypatch.setattr(stripe, 'api_key', 'sk_test_inbox')
+        monkeypatch.delenv('STRIPE_WEBHOOK_SECRET', raising=False)
+        event = {
+            'id': 'evt_boost_1',
+            'type': 'checkout.session.completed',
+            'data': {'object': {
+                'id': 'cs_boost_1',
+                'payment_intent': 'pi_boost_1',
+                'metadata': {
+                    'artist_id': 'inbox-artist', 'boost_amount': '7.25', 'stripe_fee': '0.51',
+                    'platform_fee': '0.54', 'total_paid': '8.30', 'artist_payout': '7.25',
+                    'user_id': str(test_user.id),
+                },
+            }},
+        }
+        response = _post(client, '/payments/webhook', event)
+        assert response.status_code == 200
+        assert response.get_json() == {'status': 'received'}
+
+        assert webhook_inbox.drain() == {'done': 1}
+        db_session.expire_all()
+        assert db_session.query(Tip).filter_by(stripe_checkout_session_id='cs_boost_1').count() == 1
+        assert artist_balance(db_session, 'inbox-artist')['total_payout'] == Decimal('7.25')
+
+    def test_retries_with_backoff_then_fails(self, db_session, monkeypatch):
+        calls = []
+
+        def flaky(event):
+            calls.append(event['id'])
+            raise RuntimeError('downstream unavailable')
+
+        webhook_inbox.register_handler('test', flaky)
+        monkeypatch.setattr(webhook_inbox, 'MAX_ATTEMPTS', 2)
+        webhook_inbox.enqueue(db_session, 'evt_flaky', 'test', 'test.event', json.dumps({'id': 'evt_flaky'}))
+        db_session.commit()
+
+        assert webhook_inbox.process('test', 'evt_flaky') == 'pending'
+        assert webhook_inbox.drain() == {}  # backing off
+
+        db_session.expire_all()
+        row = db_session.get(WebhookEvent, ('test', 'evt_flaky'))
+        assert row.next_attempt_at > datetime.utcnow()
+        assert 'downstream unavailable' in row.last_error
+        row.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        db_session.commit()
+
+        assert webhook_inbox.drain() == {'failed': 1}
+        assert calls == ['evt_flaky', 'evt_flaky']
+
+        assert webhook_inbox.requeue_failed(db_session) == 1
+        db_session.commit()
+        webhook_inbox.register_handler('test', lambda event: None)
+        assert webhook_inbox.drain() == {'done': 1}
+
+    def test_claimed_event_is_not_processed_twice(self, db_session):
+        webhook_inbox.enqueue(db_session, 'evt_busy', 'test', 'test.event', '{}')
+        db_session.commit()
+        row = db_session.get(WebhookEvent, ('test', 'evt_busy'))
+        row.status = 'processing'
+        row.locked_at = datetime.utcnow()
+        db_session.commit()
+
+        assert webhook_inbox.process('test', 'evt_busy') is None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -5,6 +5,7 @@ All payment-related fee constants and calculations should be here
 to ensure consistency across the platform.
 """
 from decimal import Decimal
+from functools import lru_cache
 
 
 # Fee Constants - single source of truth
@@ -13,10 +14,13 @@ STRIPE_PERCENTAGE = Decimal("0.029")     # 2.9%
 STRIPE_FIXED = Decimal("0.30")           # $0.30
 
 
+@lru_cache(maxsize=1024, typed=True)
 def calculate_boost_fees(boost_amount: Decimal):
     """
     Calculate all fees for a boost.
 
+    Memoized: checkout computes the same few preset amounts over and over.
+
     Logic:
     - Artist receives 100% of boost_amount
     - Tipper pays: boost_amount + stripe_fee + platform_fee